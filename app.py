@@ -1,7 +1,11 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from src.pages import home, indicators, associates, expenses, dashboard
+from src.pages import load_page
+from src.utils import metrics, profiling
+from src.models.indicators import get_indicator_catalog
+from src.models.indicator_rules import compile_rules
+from src.models.expense_schedule import current_fiscal_year, schedule_expenses
+from src.utils.calculations import get_share_matrix
+from src.utils.cashflow import project_cash_flow
 
 # Configuration de la page
 st.set_page_config(
@@ -16,33 +20,66 @@ with open('src/static/css/style.css', 'r') as f:
     css = f.read()
 st.markdown(f'<style>{css}</style>', unsafe_allow_html=True)
 
-# Import des fonctions de chargement des données
-from src.utils.data_manager import load_indicators, load_associates, load_expenses
+# Export des métriques Prometheus (configuré par les variables SISA_METRICS_*)
+metrics.configure_from_env()
+metrics.register_cache("indicator_catalog", get_indicator_catalog)
+metrics.register_cache("indicator_rules", compile_rules)
+metrics.register_cache("expense_schedule", schedule_expenses)
+metrics.register_cache("cash_flow", project_cash_flow)
+metrics.register_cache("share_matrix", get_share_matrix)
 
-# Initialisation des données de session si elles n'existent pas
-if 'indicators' not in st.session_state:
-    st.session_state.indicators = load_indicators()
-if 'associates' not in st.session_state:
-    st.session_state.associates = load_associates()
-if 'expenses' not in st.session_state:
-    st.session_state.expenses = load_expenses()
+# Instrumentation des chemins critiques (activée depuis le panneau de débogage)
+profiling.enable(st.session_state.get("debug_panel", False))
+profiling.start_rerun()
+
+# Les données (indicateurs, associés, charges) sont chargées à la demande par les
+# pages, via le dépôt de la session (src/utils/data_manager.get_repository)
+if 'fiscal_year' not in st.session_state:
+    st.session_state.fiscal_year = current_fiscal_year()
 
 # Barre latérale pour la navigation
 st.sidebar.markdown("<h1 class='blue-text'>Gestion SISA</h1>", unsafe_allow_html=True)
 pages = {
-    "Accueil": home,
-    "Indicateurs ACI": indicators,
-    "Gestion des Associés": associates,
-    "Charges Fixes": expenses,
-    "Tableau de Bord": dashboard
+    "Accueil": "home",
+    "Indicateurs ACI": "indicators",
+    "Gestion des Associés": "associates",
+    "Charges Fixes": "expenses",
+    "Tableau de Bord": "dashboard"
 }
 
 # Sélection de la page
 selection = st.sidebar.radio("Navigation", list(pages.keys()))
 
-# Affichage de la page sélectionnée
-pages[selection].show()
+# Exercice sur lequel les charges sont proratisées
+st.sidebar.number_input("Exercice", min_value=2000, max_value=2100, step=1, key="fiscal_year")
+
+# Affichage de la page sélectionnée (module importé au premier affichage)
+metrics.set_context(pages[selection], st.session_state.get("structure_id"))
+with profiling.timer("app.rerun"):
+    load_page(pages[selection]).show()
+metrics.flush()
 
 # Pied de page
 st.sidebar.markdown("---")
 st.sidebar.markdown("© 2025 - Application de Gestion SISA")
+
+# Panneau de débogage : temps d'exécution de la dernière exécution du script
+if st.sidebar.checkbox("Panneau de débogage", key="debug_panel"):
+    stats = profiling.get_rerun_stats()
+    if stats:
+        st.sidebar.dataframe(
+            [
+                {
+                    "Mesure": name,
+                    "Appels": entry["calls"],
+                    "Total (ms)": round(entry["total_s"] * 1000, 2),
+                    "Max (ms)": round(entry["max_s"] * 1000, 2),
+                    "Solde des blocs mémoire": entry["net_blocks"]
+                }
+                for name, entry in sorted(stats.items(), key=lambda item: -item[1]["total_s"])
+            ],
+            hide_index=True,
+            use_container_width=True
+        )
+    else:
+        st.sidebar.info("Les mesures seront affichées à la prochaine exécution.")
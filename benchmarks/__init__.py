@@ -0,0 +1,3 @@
+"""
+Bancs de mesure des performances de l'application
+"""
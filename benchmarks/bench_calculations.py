@@ -0,0 +1,203 @@
+"""
+Banc de mesure des fonctions de calcul (src/utils/calculations.py)
+
+Utilisation :
+    python -m benchmarks.bench_calculations [--profile quick|full]
+"""
+
+import argparse
+
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import generate_associates, generate_expenses, generate_indicators
+from src.models.expenses import get_distribution_methods
+from src.models.expense_schedule import build_expense_schedule
+from src.utils.cashflow import build_cash_flow_projection
+from src.utils.computation_graph import build_remuneration_graph
+from src.utils.reverse_solver import solve_distribution_keys, solve_distribution_methods
+from src.utils.shapley import EXACT_MAX_ASSOCIATES, calculate_shapley_values
+from src.utils.calculations import (
+    BLENDED_METHODS, calculate_associate_distribution, calculate_associate_net_amount, calculate_blended_distribution,
+    get_share_matrix,
+    calculate_expense_distribution, calculate_points_by_axis, calculate_total_amount,
+    calculate_total_expenses, get_total_patients_mt
+)
+
+PROFILES = {
+    "quick": {
+        "associates": [5, 100, 1000],
+        "expenses": [10, 1000, 10000],
+        "expenses_per_associate_run": 100,
+    },
+    "full": {
+        "associates": [5, 100, 1000, 10000],
+        "expenses": [10, 1000, 10000, 100000],
+        "expenses_per_associate_run": 100,
+    },
+}
+
+# Exercice de proratisation des charges
+FISCAL_YEAR = 2024
+
+# Nombres propres aux indicateurs (protocoles, missions, stages) pour les règles
+RULE_COUNTS = {"A1O4": 2, "A2S2": 6, "A2O1": 3, "A2O4": 4}
+
+# Taille de structure du calcul inverse (curseurs du tableau de bord) : associés, dont
+# le montant net de certains est visé et celui des autres est borné par un plancher
+SOLVER_ASSOCIATES = 50
+SOLVER_TARGETS = 10
+
+# Taille de structure de l'estimation des valeurs de Shapley (échantillonnage de permutations)
+SHAPLEY_ASSOCIATES = 50
+
+# Méthodes de répartition effectivement calculées
+DISTRIBUTION_METHODS = [method for method in get_distribution_methods() if method != "custom"]
+
+def run(profile="quick"):
+    """
+    Exécute le banc de mesure des calculs
+    
+    Args:
+        profile (str, optional): Profil de tailles ("quick" ou "full"). Defaults to "quick".
+    
+    Returns:
+        dict: Temps en secondes, indexés par "fonction/paramètres"
+    """
+    sizes = PROFILES[profile]
+    results = {}
+    indicators = generate_indicators()
+    
+    for nb_associates in sizes["associates"]:
+        associates = generate_associates(nb_associates)
+        nb_patients = get_total_patients_mt(associates)
+        total_amount = calculate_total_amount(indicators, nb_patients, nb_associates)
+        
+        results[f"calculate_total_amount/associates={nb_associates}"] = time_call(
+            lambda: calculate_total_amount(indicators, nb_patients, nb_associates)
+        )
+        # Règles propres aux indicateurs : toutes actives (nombres saisis et présence d'un IPA)
+        results[f"calculate_total_amount/rules/associates={nb_associates}"] = time_call(
+            lambda: calculate_total_amount(indicators, nb_patients, nb_associates, counts=RULE_COUNTS, has_ipa=True)
+        )
+        results[f"calculate_points_by_axis/associates={nb_associates}"] = time_call(
+            lambda: calculate_points_by_axis(indicators, nb_patients, nb_associates)
+        )
+        
+        for method in DISTRIBUTION_METHODS:
+            results[f"calculate_associate_distribution/{method}/associates={nb_associates}"] = time_call(
+                lambda: calculate_associate_distribution(total_amount, associates, method)
+            )
+            # Parts pondérées par la durée de présence pendant l'exercice
+            results[f"calculate_associate_distribution/{method}/prorated/associates={nb_associates}"] = time_call(
+                lambda: calculate_associate_distribution(total_amount, associates, method, campaign_year=FISCAL_YEAR)
+            )
+        
+        # Répartition mixte : matrice des parts (sans mémoïsation), puis combinaison pour de
+        # nouveaux poids (matrice mémoïsée)
+        method_weights = dict(zip(BLENDED_METHODS, [40, 20, 10, 20, 10]))
+        results[f"get_share_matrix/associates={nb_associates}"] = time_call(
+            lambda: get_share_matrix.__wrapped__(tuple(associates), tuple(BLENDED_METHODS))
+        )
+        results[f"calculate_blended_distribution/associates={nb_associates}"] = time_call(
+            lambda: calculate_blended_distribution(total_amount, associates, method_weights)
+        )
+        
+        # Répartition personnalisée : poids creux (un associé sur dix)
+        custom_weights = {associate.id: 1.0 + i % 3 for i, associate in enumerate(associates[::10])}
+        results[f"calculate_associate_distribution/custom/associates={nb_associates}"] = time_call(
+            lambda: calculate_associate_distribution(total_amount, associates, "custom", custom_weights=custom_weights)
+        )
+        
+        # Répartition d'un lot de charges entre tous les associés, puis montants nets
+        expenses = generate_expenses(sizes["expenses_per_associate_run"])
+        associate_distribution = calculate_associate_distribution(total_amount, associates)
+        expense_distributions = [calculate_expense_distribution(expense, associates) for expense in expenses]
+        
+        results[f"calculate_expense_distribution/expenses={len(expenses)}/associates={nb_associates}"] = time_call(
+            lambda: [calculate_expense_distribution(expense, associates) for expense in expenses]
+        )
+        results[f"calculate_associate_net_amount/expenses={len(expenses)}/associates={nb_associates}"] = time_call(
+            lambda: [
+                calculate_associate_net_amount(associate.id, associate_distribution, expense_distributions)
+                for associate in associates
+            ]
+        )
+        # Graphe de calcul : modification d'une charge puis lecture des montants nets
+        graph = build_remuneration_graph()
+        graph.set_inputs(indicators=indicators, associates=associates, expenses=expenses, fiscal_year=FISCAL_YEAR)
+        graph.get("net_amounts")
+        
+        def edit_expense():
+            expenses[0].amount += 1
+            graph.set_input("expenses", expenses)
+            return graph.get("net_amounts")
+        
+        results[f"computation_graph/edit_expense/expenses={len(expenses)}/associates={nb_associates}"] = time_call(edit_expense)
+        results[f"computation_graph/unchanged/expenses={len(expenses)}/associates={nb_associates}"] = time_call(
+            lambda: graph.set_inputs(expenses=expenses, associates=associates) or graph.get("net_amounts")
+        )
+        
+        # Répartition mixte dans le graphe : modification des poids (matrice des parts conservée)
+        graph.set_inputs(distribution_method="blended", method_weights=dict(method_weights))
+        graph.get("net_amounts")
+        
+        def change_weights():
+            method_weights["equal"] += 1
+            graph.set_input("method_weights", dict(method_weights))
+            return graph.get("net_amounts")
+        
+        results[f"computation_graph/blend_weights/associates={nb_associates}"] = time_call(change_weights)
+        # Projection de trésorerie sur 10 exercices (sans mémoïsation)
+        results[f"build_cash_flow_projection/years=10/expenses={len(expenses)}/associates={nb_associates}"] = time_call(
+            lambda: build_cash_flow_projection(associates, expenses, total_amount, FISCAL_YEAR, 10)
+        )
+    
+    # Calcul inverse : clés de répartition et combinaison de méthodes
+    associates = generate_associates(SOLVER_ASSOCIATES)
+    expenses = generate_expenses(sizes["expenses_per_associate_run"])
+    # Rémunération égale au double des charges : montant net positif à répartir
+    total_amount = 2 * calculate_total_expenses(expenses, FISCAL_YEAR)
+    net_share = total_amount / 2 / SOLVER_ASSOCIATES
+    targets = {associate.id: net_share * 1.2 for associate in associates[:SOLVER_TARGETS]}
+    floors = {associate.id: net_share * 0.5 for associate in associates[SOLVER_TARGETS:]}
+    
+    for solve in (solve_distribution_keys, solve_distribution_methods):
+        results[f"{solve.__name__}/associates={SOLVER_ASSOCIATES}"] = time_call(
+            lambda: solve(total_amount, associates, expenses, targets, floors, FISCAL_YEAR)
+        )
+    
+    # Contribution des associés : calcul exact (toutes les coalitions), puis estimation
+    for nb_associates in (EXACT_MAX_ASSOCIATES, SHAPLEY_ASSOCIATES):
+        associates = generate_associates(nb_associates)
+        results[f"calculate_shapley_values/associates={nb_associates}"] = time_call(
+            lambda: calculate_shapley_values(indicators, associates, RULE_COUNTS)
+        )
+    
+    for nb_expenses in sizes["expenses"]:
+        expenses = generate_expenses(nb_expenses)
+        results[f"calculate_total_expenses/expenses={nb_expenses}"] = time_call(
+            lambda: calculate_total_expenses(expenses)
+        )
+        # Étalement mensuel sans mémoïsation, puis total mémoïsé de l'exercice
+        results[f"build_expense_schedule/expenses={nb_expenses}"] = time_call(
+            lambda: build_expense_schedule(expenses, FISCAL_YEAR)
+        )
+        results[f"calculate_total_expenses/fiscal_year/expenses={nb_expenses}"] = time_call(
+            lambda: calculate_total_expenses(expenses, FISCAL_YEAR)
+        )
+    
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure des calculs")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="Profil de tailles")
+    args = parser.parse_args(argv)
+    
+    results = run(args.profile)
+    filepath = write_results("calculations", results)
+    
+    for name, seconds in results.items():
+        print(f"{name:<80} {seconds * 1000:>10.3f} ms")
+    print(f"Résultats écrits dans {filepath}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Banc de mesure du chargement, de la sauvegarde et de l'export (src/utils/data_manager.py)
+
+Les fichiers sont écrits dans un dossier temporaire : le dossier data/ de
+l'application n'est jamais modifié.
+
+Utilisation :
+    python -m benchmarks.bench_data_manager [--profile quick|full]
+"""
+
+import argparse
+import tempfile
+
+from benchmarks.common import time_call, write_results
+from benchmarks.synthetic import generate_structure
+from src.utils import data_manager
+
+PROFILES = {
+    "quick": [(5, 10), (100, 1000), (1000, 10000)],
+    "full": [(5, 10), (100, 1000), (1000, 10000), (10000, 100000)],
+}
+
+def run(profile="quick"):
+    """
+    Exécute le banc de mesure de la gestion des données
+    
+    Args:
+        profile (str, optional): Profil de tailles ("quick" ou "full"). Defaults to "quick".
+    
+    Returns:
+        dict: Temps en secondes, indexés par "fonction/paramètres"
+    """
+    results = {}
+    data_dir = data_manager.DATA_DIR
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_manager.DATA_DIR = tmpdir
+        try:
+            for nb_associates, nb_expenses in PROFILES[profile]:
+                indicators, associates, expenses = generate_structure(nb_associates, nb_expenses)
+                suffix = f"associates={nb_associates}/expenses={nb_expenses}"
+                
+                results[f"save_indicators/{suffix}"] = time_call(lambda: data_manager.save_indicators(indicators))
+                results[f"load_indicators/{suffix}"] = time_call(data_manager.load_indicators)
+                results[f"save_associates/{suffix}"] = time_call(lambda: data_manager.save_associates(associates))
+                results[f"load_associates/{suffix}"] = time_call(data_manager.load_associates)
+                results[f"save_expenses/{suffix}"] = time_call(lambda: data_manager.save_expenses(expenses))
+                results[f"load_expenses/{suffix}"] = time_call(data_manager.load_expenses)
+                
+                # L'export Excel est coûteux : moins de répétitions
+                filepath = data_manager.export_to_excel(indicators, associates, expenses, "bench.xlsx")
+                results[f"export_to_excel/{suffix}"] = time_call(
+                    lambda: data_manager.export_to_excel(indicators, associates, expenses, "bench.xlsx"), repeat=2
+                )
+                results[f"import_from_excel/{suffix}"] = time_call(
+                    lambda: data_manager.import_from_excel(filepath), repeat=2
+                )
+        finally:
+            data_manager.DATA_DIR = data_dir
+    
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure de la gestion des données")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="quick", help="Profil de tailles")
+    args = parser.parse_args(argv)
+    
+    results = run(args.profile)
+    filepath = write_results("data_manager", results)
+    
+    for name, seconds in results.items():
+        print(f"{name:<60} {seconds * 1000:>10.3f} ms")
+    print(f"Résultats écrits dans {filepath}")
+
+if __name__ == "__main__":
+    main()
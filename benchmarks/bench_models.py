@@ -0,0 +1,103 @@
+"""
+Banc de mesure des modèles : mémoire, temps de construction et conversions dict
+
+Chaque modèle (à __slots__) est comparé à une variante identique mais dont les
+instances ont un __dict__, ce qui correspond à l'implémentation précédente.
+
+Utilisation :
+    python -m benchmarks.bench_models [--sizes 1000 100000]
+"""
+
+import argparse
+
+from benchmarks.common import measure_memory, time_call, write_results
+from src.models.associates import Associate, get_sample_associates
+from src.models.expenses import Expense, get_sample_expenses
+from src.models.indicators import Indicator, get_indicators
+
+DEFAULT_SIZES = [1000, 100000]
+
+def dict_based_variant(cls):
+    """
+    Construit une copie de la classe sans __slots__ (instances avec __dict__)
+    """
+    namespace = {
+        name: value for name, value in vars(cls).items()
+        if name not in cls.__slots__ and name not in ("__slots__", "__dict__", "__weakref__")
+    }
+    return type(f"Dict{cls.__name__}", (), namespace)
+
+def indicator_records():
+    """
+    Retourne des dictionnaires d'indicateurs servant de modèles
+    """
+    return [indicator.to_dict() for indicator in get_indicators()]
+
+MODELS = {
+    "Indicator": (Indicator, indicator_records),
+    "Associate": (Associate, lambda: [a.to_dict() for a in get_sample_associates()]),
+    "Expense": (Expense, lambda: [e.to_dict() for e in get_sample_expenses()]),
+}
+
+def bench_model(cls, records, size):
+    """
+    Mesure une classe de modèle pour un nombre d'instances donné
+    
+    Returns:
+        dict: Mémoire par instance (octets) et temps (secondes) de construction et de conversion
+    """
+    data = [records[i % len(records)] for i in range(size)]
+    objects = [cls.from_dict(record) for record in data]
+    
+    return {
+        "bytes_per_instance": measure_memory(lambda: [cls.from_dict(record) for record in data]) / size,
+        "from_dict_s": time_call(lambda: [cls.from_dict(record) for record in data]),
+        "to_dict_s": time_call(lambda: [obj.to_dict() for obj in objects]),
+        "hash_s": time_call(lambda: {obj for obj in objects}),
+    }
+
+def run(sizes=DEFAULT_SIZES):
+    """
+    Exécute le banc de mesure pour tous les modèles
+    
+    Returns:
+        dict: Résultats par modèle et par taille
+    """
+    results = {}
+    for model_name, (cls, records_factory) in MODELS.items():
+        records = records_factory()
+        legacy_cls = dict_based_variant(cls)
+        results[model_name] = {}
+        
+        for size in sizes:
+            slotted = bench_model(cls, records, size)
+            legacy = bench_model(legacy_cls, records, size)
+            results[model_name][str(size)] = {
+                "slots": slotted,
+                "dict": legacy,
+                "memory_ratio": round(slotted["bytes_per_instance"] / legacy["bytes_per_instance"], 3),
+                "from_dict_speedup": round(legacy["from_dict_s"] / slotted["from_dict_s"], 3),
+            }
+    
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure des modèles")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Nombres d'instances")
+    args = parser.parse_args(argv)
+    
+    results = run(args.sizes)
+    filepath = write_results("models", results)
+    
+    for model_name, by_size in results.items():
+        for size, data in by_size.items():
+            print(
+                f"{model_name:<10} n={size:>7} "
+                f"mémoire {data['slots']['bytes_per_instance']:>7.1f} o/instance "
+                f"(x{data['memory_ratio']} vs __dict__), "
+                f"from_dict x{data['from_dict_speedup']}"
+            )
+    print(f"Résultats écrits dans {filepath}")
+
+if __name__ == "__main__":
+    main()
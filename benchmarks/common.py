@@ -0,0 +1,80 @@
+"""
+Outils communs aux bancs de mesure : chronométrage, mémoire et écriture des résultats
+"""
+
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# Dossier de sortie des résultats
+RESULTS_DIR = os.path.join("build", "benchmarks")
+
+def time_call(func, repeat=5):
+    """
+    Chronomètre une fonction et retourne le meilleur temps observé
+    
+    Args:
+        func (callable): Fonction sans argument à chronométrer
+        repeat (int, optional): Nombre de répétitions. Defaults to 5.
+    
+    Returns:
+        float: Meilleur temps d'exécution en secondes
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure_memory(func):
+    """
+    Mesure la mémoire retenue par le résultat d'une fonction
+    
+    Args:
+        func (callable): Fonction sans argument dont le résultat est conservé pendant la mesure
+    
+    Returns:
+        int: Nombre d'octets alloués et toujours référencés par le résultat
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = func()
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del result
+    return after - before
+
+def write_results(name, results, output_dir=RESULTS_DIR):
+    """
+    Écrit les résultats d'un banc de mesure dans un fichier JSON
+    
+    Args:
+        name (str): Nom du banc de mesure
+        results (dict): Résultats à enregistrer
+        output_dir (str, optional): Dossier de sortie. Defaults to RESULTS_DIR.
+    
+    Returns:
+        str: Chemin du fichier écrit
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    filepath = os.path.join(output_dir, f"{name}.json")
+    payload = {
+        "benchmark": name,
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "results": results
+    }
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=4)
+    return filepath
@@ -0,0 +1,341 @@
+"""
+Test de charge : sessions simultanées de l'application pilotées par AppTest
+
+Chaque utilisateur simulé dispose de sa propre session (streamlit.testing AppTest)
+exécutée dans un thread : il navigue entre les pages au hasard (graine fixe) et
+modifie des valeurs (état de complétion des indicateurs, filtres, type de
+rapport). Pour chaque nombre de sessions simultanées, le test rapporte les
+percentiles p50/p95/p99 de la durée d'une exécution du script (rerun) et le pic
+de mémoire résidente du processus, comme le ferait un serveur Streamlit qui
+héberge toutes ses sessions dans un même processus.
+
+Les données sont lues et écrites dans un dossier temporaire : le dossier data/
+de l'application n'est jamais modifié.
+
+Utilisation :
+    python -m benchmarks.loadtest [--sessions 1 2 4 8] [--steps 20] [--associates 0 --expenses 0]
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.common import write_results
+from benchmarks.synthetic import DEFAULT_SEED, generate_structure
+from src.utils import data_manager
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+APP_PATH = os.path.join(ROOT_DIR, "app.py")
+
+# Libellés de la barre de navigation (voir app.py)
+PAGES = {
+    "home": "Accueil",
+    "indicators": "Indicateurs ACI",
+    "associates": "Gestion des Associés",
+    "expenses": "Charges Fixes",
+    "dashboard": "Tableau de Bord",
+}
+
+DEFAULT_SESSIONS = [1, 2, 4, 8]
+
+# Intervalle d'échantillonnage de la mémoire résidente (secondes)
+MEMORY_SAMPLING_INTERVAL = 0.01
+
+def _patch_apptest():
+    """
+    Adapte AppTest (Streamlit 1.31) à l'exécution de sessions simultanées
+    
+    - Chaque AppTest installe son propre runtime simulé dans Runtime._instance et
+      le remet à None à la fin de son exécution, ce qui interrompt les scripts des
+      autres sessions : toutes les sessions partagent ici un même runtime simulé,
+      comme elles partagent le runtime d'un serveur Streamlit.
+    - Avec format_func, AppTest cherche la valeur brute d'un bouton radio ou d'une
+      liste déroulante parmi les libellés affichés et échoue (« '0' is not in
+      list ») à l'exécution suivante : l'index est alors calculé par le
+      sérialiseur du widget, comme le ferait le navigateur.
+    """
+    from unittest.mock import MagicMock
+    
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.runtime import Runtime
+    from streamlit.testing.v1.element_tree import Radio, Selectbox
+    
+    shared_runtime = MagicMock(spec=Runtime)
+    shared_runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    shared_runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: shared_runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+    
+    def index(self):
+        if self.value is None:
+            return None
+        try:
+            return self.options.index(str(self.value))
+        except ValueError:
+            metadata = self.root.session_state._state._new_widget_state.widget_metadata[self.id]
+            return metadata.serializer(self.value)
+    
+    Radio.index = property(index)
+    Selectbox.index = property(index)
+
+def _current_rss():
+    """
+    Retourne la mémoire résidente du processus en octets
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        # Pic depuis le démarrage du processus (kilo-octets sous Linux, octets sous macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MemorySampler:
+    """
+    Relève le pic de mémoire résidente du processus dans un thread dédié
+    """
+    
+    def __init__(self, interval=MEMORY_SAMPLING_INTERVAL):
+        self.interval = interval
+        self.peak = _current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="loadtest-memory", daemon=True)
+    
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _current_rss())
+            self._stop.wait(self.interval)
+    
+    def __enter__(self):
+        self._thread.start()
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _current_rss())
+
+
+def _choose_option(widgets, label, rng):
+    """
+    Sélectionne une option au hasard dans la liste déroulante portant ce libellé
+    """
+    for widget in widgets:
+        if widget.label == label and widget.options:
+            widget.set_value(rng.choice(widget.options))
+            return True
+    return False
+
+def _edit_indicators(at, rng):
+    levels = [radio for radio in at.radio if radio.key and radio.key.startswith("completion_status_")]
+    checkboxes = [checkbox for checkbox in at.checkbox if checkbox.key and checkbox.key.startswith("completion_status_")]
+    if levels and rng.random() < 0.3:
+        radio = rng.choice(levels)
+        radio.set_value(rng.randrange(len(radio.options)))
+        return True
+    if checkboxes:
+        checkbox = rng.choice(checkboxes)
+        checkbox.set_value(not checkbox.value)
+        return True
+    return False
+
+def _edit_associates(at, rng):
+    return _choose_option(at.selectbox, "Filtrer par profession", rng)
+
+def _edit_expenses(at, rng):
+    return _choose_option(at.selectbox, "Filtrer par catégorie", rng)
+
+def _edit_dashboard(at, rng):
+    return _choose_option(at.selectbox, "Type de rapport", rng)
+
+# Modifications simulées sur chaque page, après la navigation
+EDITS = {
+    "indicators": _edit_indicators,
+    "associates": _edit_associates,
+    "expenses": _edit_expenses,
+    "dashboard": _edit_dashboard,
+}
+
+def _warm_up():
+    """
+    Importe les pages et les bibliothèques lourdes avant les mesures de mémoire
+    """
+    import matplotlib.pyplot
+    from src.pages import load_page
+    
+    for name in PAGES:
+        load_page(name)
+
+def _percentile(sorted_values, percent):
+    """
+    Percentile par la méthode du rang le plus proche
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(percent / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def simulate_user(user_id, steps, edit_ratio, barrier, latencies, errors, timeout, seed=DEFAULT_SEED):
+    """
+    Simule un utilisateur : ouverture de l'application, navigation et modifications
+    
+    Args:
+        user_id (int): Numéro de l'utilisateur (détermine sa graine)
+        steps (int): Nombre de navigations
+        edit_ratio (float): Probabilité de modifier une valeur après chaque navigation
+        barrier (threading.Barrier): Barrière de départ commune aux utilisateurs
+        latencies (list): Durées des exécutions du script (complétée par l'utilisateur)
+        errors (list): Exceptions remontées par l'application (complétée par l'utilisateur)
+        timeout (float): Durée maximale d'une exécution du script (secondes)
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+    """
+    from streamlit.testing.v1 import AppTest
+    
+    rng = random.Random(seed + user_id)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    
+    def rerun():
+        start = time.perf_counter()
+        try:
+            at.run()
+        except Exception as error:
+            # Dépassement du délai d'exécution notamment
+            errors.append(error)
+        else:
+            errors.extend(exception.value for exception in at.exception)
+        latencies.append(time.perf_counter() - start)
+    
+    barrier.wait()
+    rerun()
+    
+    for _ in range(steps):
+        page = rng.choice(list(PAGES))
+        at.sidebar.radio[0].set_value(PAGES[page])
+        rerun()
+        
+        edit = EDITS.get(page)
+        if edit and rng.random() < edit_ratio and edit(at, rng):
+            rerun()
+
+def run_level(nb_sessions, steps, edit_ratio, timeout):
+    """
+    Exécute le test de charge pour un nombre de sessions simultanées
+    
+    Returns:
+        dict: Nombre d'exécutions, percentiles de durée (secondes), débit et mémoire
+    """
+    latencies = []
+    errors = []
+    barrier = threading.Barrier(nb_sessions)
+    threads = [
+        threading.Thread(
+            target=simulate_user,
+            args=(user_id, steps, edit_ratio, barrier, latencies, errors, timeout),
+            name=f"loadtest-user-{user_id}"
+        )
+        for user_id in range(nb_sessions)
+    ]
+    
+    gc.collect()
+    baseline_rss = _current_rss()
+    with MemorySampler() as sampler:
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+    
+    latencies.sort()
+    peak_increase = max(0, sampler.peak - baseline_rss)
+    return {
+        "reruns": len(latencies),
+        "errors": len(errors),
+        "p50_s": _percentile(latencies, 50),
+        "p95_s": _percentile(latencies, 95),
+        "p99_s": _percentile(latencies, 99),
+        "max_s": latencies[-1] if latencies else 0.0,
+        "reruns_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "peak_rss_mb": sampler.peak / 2**20,
+        "peak_increase_per_session_mb": peak_increase / 2**20 / nb_sessions,
+        "first_errors": [f"{type(error).__name__}: {error}" for error in errors[:3]]
+    }
+
+def run(sessions=None, steps=20, edit_ratio=0.5, nb_associates=0, nb_expenses=0, timeout=60):
+    """
+    Exécute le test de charge pour chaque nombre de sessions simultanées
+    
+    Args:
+        sessions (list, optional): Nombres de sessions simultanées. Defaults to DEFAULT_SESSIONS.
+        steps (int, optional): Navigations par utilisateur. Defaults to 20.
+        edit_ratio (float, optional): Probabilité de modification après une navigation. Defaults to 0.5.
+        nb_associates (int, optional): Associés de la structure synthétique (0 : données d'exemple). Defaults to 0.
+        nb_expenses (int, optional): Charges de la structure synthétique. Defaults to 0.
+        timeout (float, optional): Durée maximale d'une exécution du script. Defaults to 60.
+    
+    Returns:
+        dict: Résultats indexés par nombre de sessions
+    """
+    _patch_apptest()
+    _warm_up()
+    results = {}
+    data_dir = data_manager.DATA_DIR
+    working_dir = os.getcwd()
+    
+    with tempfile.TemporaryDirectory() as tmpdir:
+        data_manager.DATA_DIR = tmpdir
+        # app.py lit sa feuille de style par un chemin relatif
+        os.chdir(ROOT_DIR)
+        try:
+            if nb_associates:
+                indicators, associates, expenses = generate_structure(nb_associates, nb_expenses)
+                data_manager.save_indicators(indicators)
+                data_manager.save_associates(associates)
+                data_manager.save_expenses(expenses)
+            
+            for nb_sessions in sessions or DEFAULT_SESSIONS:
+                results[f"sessions={nb_sessions}"] = run_level(nb_sessions, steps, edit_ratio, timeout)
+        finally:
+            os.chdir(working_dir)
+            data_manager.DATA_DIR = data_dir
+    
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge de l'application")
+    parser.add_argument("--sessions", type=int, nargs="+", default=DEFAULT_SESSIONS, help="Nombres de sessions simultanées")
+    parser.add_argument("--steps", type=int, default=20, help="Navigations par utilisateur")
+    parser.add_argument("--edit-ratio", type=float, default=0.5, help="Probabilité de modification après une navigation")
+    parser.add_argument("--associates", type=int, default=0, help="Associés de la structure synthétique (0 : données d'exemple)")
+    parser.add_argument("--expenses", type=int, default=0, help="Charges de la structure synthétique")
+    parser.add_argument("--timeout", type=float, default=60, help="Durée maximale d'une exécution du script (secondes)")
+    args = parser.parse_args(argv)
+    
+    results = run(args.sessions, args.steps, args.edit_ratio, args.associates, args.expenses, args.timeout)
+    filepath = write_results("loadtest", results)
+    
+    print(f"{'sessions':>8} {'reruns':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'rerun/s':>8} {'pic Mo':>8} {'Mo/session':>10} {'erreurs':>8}")
+    for name, data in results.items():
+        print(
+            f"{name.split('=')[1]:>8} {data['reruns']:>7} {data['p50_s'] * 1000:>9.1f} {data['p95_s'] * 1000:>9.1f} "
+            f"{data['p99_s'] * 1000:>9.1f} {data['reruns_per_s']:>8.1f} {data['peak_rss_mb']:>8.1f} "
+            f"{data['peak_increase_per_session_mb']:>10.1f} {data['errors']:>8}"
+        )
+        for error in data["first_errors"]:
+            print(f"    {error}", file=sys.stderr)
+    print(f"Résultats écrits dans {filepath}")
+    
+    return 1 if any(data["errors"] for data in results.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+Parité du moteur de calcul avec la calculette officielle (calculette-aci-v6.xlsx)
+
+La calculette est chargée une fois et ses formules sont compilées
+(src/utils/formula_evaluator.py). Des structures aléatoires (graine fixe) sont
+générées en lot : état de complétion de chaque indicateur, nombre de patients
+médecin traitant, nombre de PS associés, présence d'un IPA et nombres propres aux
+indicateurs (missions, protocoles, stages). Pour chaque structure :
+    - les cellules d'entrée de la calculette sont renseignées (table SHEET_INPUTS)
+      et ses formules évaluées pour tout le lot en une passe vectorielle ;
+    - les points de chaque indicateur sont calculés par score_indicators.
+Les points de chaque indicateur sont comparés à la somme des cellules résultat
+de ses lignes dans la calculette ; le rapport donne, par indicateur, le nombre
+de structures en écart, l'écart maximal et un exemple d'entrées.
+
+La calculette ne conditionne pas la rémunération aux prérequis : les structures
+générées les remplissent tous. Elle ne connaît pas non plus de pourcentage de
+complétion : les parts variables sont comptées en entier.
+
+Les écarts connus (parts variables non plafonnées, niveaux cumulés dans la
+calculette) peuvent être enregistrés comme référence (--save-baseline) : une
+optimisation du moteur est alors vérifiée en comparant le rapport à cette
+référence (--baseline), la commande échouant si les écarts ont changé.
+
+Utilisation :
+    python -m benchmarks.parity [--structures 5000] [--seed 0] [--tolerance 0.01]
+    python -m benchmarks.parity --save-baseline build/parity_baseline.json
+    python -m benchmarks.parity --baseline build/parity_baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+
+from benchmarks.common import write_results
+from benchmarks.synthetic import DEFAULT_SEED
+from src.models.indicators import get_indicator_catalog
+from src.utils.calculations import POINT_VALUE, score_indicators
+from src.utils.formula_evaluator import load_workbook
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+REFERENCE_WORKBOOK = os.path.join(ROOT_DIR, "calculette-aci-v6.xlsx")
+
+# Cellules de la calculette : patients médecin traitant, valeur du point, total des points
+PATIENTS_CELL = "B5"
+POINT_VALUE_CELL = "D8"
+TOTAL_POINTS_CELL = "F60"
+
+# Cellules d'entrée (colonne E) de chaque indicateur : (indicateur, cellule, entrée, paramètre)
+#   - "level" : "Oui" si le niveau de complétion atteint le paramètre ;
+#   - "patients" : patients médecin traitant compris dans la tranche (borne basse, haute) ;
+#   - "nb_associates" : nombre de PS associés ;
+#   - "count" : nombre propre à l'indicateur, ou "Oui" s'il atteint le paramètre ;
+#   - "ipa" : "Oui" en présence d'un IPA.
+# Les entrées d'un indicateur non complété restent vides. Le résultat d'une ligne est
+# dans la colonne F de la même ligne.
+SHEET_INPUTS = (
+    ("A1S1", "E12", "level", 1),
+    ("A1S2", "E17", "level", 1),
+    ("A1S2", "E18", "level", 1),
+    ("A2S1", "E19", "level", 1),
+    ("A2S1", "E20", "patients", (0, 8000)),
+    ("A2S1", "E21", "patients", (8000, None)),
+    ("A3S1", "E22", "level", 1),
+    ("A3S1", "E23", "nb_associates", None),
+    ("A2S2", "E27", "count", None),
+    ("A2S2", "E28", "ipa", None),
+    ("A2S3", "E29", "level", 1),
+    ("A2S3", "E30", "ipa", None),
+    ("A1O1", "E36", "level", 1),
+    ("A1O1", "E37", "level", 2),
+    ("A1O2", "E38", "level", 1),
+    ("A1O2", "E39", "level", 2),
+    ("A1O3", "E40", "level", 1),
+    ("A1O4", "E41", "count", None),
+    ("A1O4", "E42", "ipa", None),
+    ("A1O5", "E43", "level", 1),
+    ("A1O5", "E44", "level", 2),
+    ("A1O6", "E45", "level", 1),
+    ("A2O1", "E47", "count", None),
+    ("A2O1", "E48", "count", 3),
+    ("A2O1", "E49", "count", 4),
+    ("A2O2", "E50", "level", 1),
+    ("A2O3", "E51", "level", 1),
+    ("A2O3", "E52", "level", 2),
+    ("A2O3", "E53", "level", 3),
+    ("A2O4", "E54", "count", None),
+    ("A2O5", "E55", "level", 1),
+    ("A2O6", "E56", "level", 1),
+    ("A3O1", "E57", "level", 1),
+)
+
+# Tirage des structures : bornes des patients, des PS associés et des nombres propres
+MAX_PATIENTS = 12000
+MAX_ASSOCIATES = 40
+MAX_COUNTS = {"A1O4": 3, "A2S2": 10, "A2O1": 5, "A2O4": 7}
+
+# Écart accepté entre les deux calculs (points)
+DEFAULT_TOLERANCE = 0.01
+
+@lru_cache(maxsize=4)
+def load_reference(path=REFERENCE_WORKBOOK):
+    """
+    Charge la calculette et compile ses formules (une fois par chemin)
+    """
+    return load_workbook(path)
+
+def generate_structures(nb_structures, seed=DEFAULT_SEED, catalog=None):
+    """
+    Génère un lot de structures aléatoires, colonne par colonne
+    
+    Args:
+        nb_structures (int): Nombre de structures
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+        catalog (IndicatorCatalog, optional): Catalogue. Defaults to None (catalogue partagé).
+    
+    Returns:
+        dict: Niveaux de complétion (structures × indicateurs), patients, associés,
+            présence d'un IPA et nombres propres (vecteurs par identifiant)
+    """
+    catalog = catalog or get_indicator_catalog()
+    rng = np.random.default_rng(seed)
+    
+    # Niveau de chaque indicateur : non complété (30 %) ou niveau tiré entre 1 et le maximum
+    levels = rng.integers(1, catalog.max_level.astype(np.int64) + 1, size=(nb_structures, len(catalog)))
+    completed = (rng.random((nb_structures, len(catalog))) < 0.7) | catalog.is_prerequisite
+    return {
+        "status": np.where(completed, levels, 0),
+        "nb_patients": rng.integers(0, MAX_PATIENTS + 1, nb_structures),
+        "nb_associates": rng.integers(1, MAX_ASSOCIATES + 1, nb_structures),
+        "has_ipa": rng.random(nb_structures) < 0.5,
+        "counts": {
+            indicator_id: rng.integers(0, maximum + 1, nb_structures) for indicator_id, maximum in MAX_COUNTS.items()
+        },
+    }
+
+def sheet_inputs(structures, catalog=None, point_value=POINT_VALUE):
+    """
+    Retourne les valeurs des cellules d'entrée de la calculette pour un lot de structures
+    
+    Returns:
+        dict: Vecteur des valeurs de chaque cellule d'entrée
+    """
+    catalog = catalog or get_indicator_catalog()
+    nb_patients = structures["nb_patients"].astype(np.float64)
+    inputs = {PATIENTS_CELL: nb_patients, POINT_VALUE_CELL: float(point_value)}
+    
+    for indicator_id, cell, source, parameter in SHEET_INPUTS:
+        status = structures["status"][:, catalog.positions[indicator_id]]
+        completed = status > 0
+        if source == "level":
+            value = status >= parameter
+        elif source == "patients":
+            lower, upper = parameter
+            value = np.clip(nb_patients - lower, 0, None if upper is None else upper - lower)
+        elif source == "nb_associates":
+            value = structures["nb_associates"].astype(np.float64)
+        elif source == "ipa":
+            value = structures["has_ipa"]
+        else:
+            count = structures["counts"][indicator_id]
+            value = count.astype(np.float64) if parameter is None else count >= parameter
+        
+        if value.dtype == bool:
+            inputs[cell] = np.where(completed & value, "Oui", "")
+        else:
+            inputs[cell] = np.where(completed, value, 0.0)
+    
+    return inputs
+
+def sheet_points(workbook, structures, catalog=None):
+    """
+    Évalue la calculette pour un lot de structures
+    
+    Returns:
+        tuple: Matrice structures × indicateurs des points et vecteur du total des points
+    """
+    catalog = catalog or get_indicator_catalog()
+    inputs = sheet_inputs(structures, catalog)
+    result_cells = {indicator_id: [] for indicator_id in catalog.ids}
+    for indicator_id, cell, _, _ in SHEET_INPUTS:
+        result_cells[indicator_id].append("F" + cell[1:])
+    
+    values = workbook.evaluate(inputs, [TOTAL_POINTS_CELL] + [cell for cells in result_cells.values() for cell in cells])
+    nb_structures = len(structures["nb_patients"])
+    points = np.zeros((nb_structures, len(catalog)))
+    for indicator_id, cells in result_cells.items():
+        for cell in cells:
+            points[:, catalog.positions[indicator_id]] += np.broadcast_to(values[cell], nb_structures)
+    return points, np.broadcast_to(values[TOTAL_POINTS_CELL], nb_structures).astype(np.float64)
+
+def engine_points(structures, catalog=None):
+    """
+    Calcule les points de chaque indicateur par le moteur de l'application (score_indicators)
+    
+    Returns:
+        numpy.ndarray: Matrice structures × indicateurs des points
+    """
+    catalog = catalog or get_indicator_catalog()
+    nb_structures = len(structures["nb_patients"])
+    percentage = np.zeros(len(catalog))
+    points = np.zeros((nb_structures, len(catalog)))
+    for i in range(nb_structures):
+        counts = {indicator_id: int(values[i]) for indicator_id, values in structures["counts"].items()}
+        points[i] = score_indicators(
+            catalog, structures["status"][i], percentage, int(structures["nb_patients"][i]),
+            int(structures["nb_associates"][i]), counts, bool(structures["has_ipa"][i])
+        )
+    return points
+
+def _structure_inputs(structures, index, catalog):
+    return {
+        "nb_patients": int(structures["nb_patients"][index]),
+        "nb_associates": int(structures["nb_associates"][index]),
+        "has_ipa": bool(structures["has_ipa"][index]),
+        "counts": {indicator_id: int(values[index]) for indicator_id, values in structures["counts"].items()},
+        "status": dict(zip(catalog.ids, structures["status"][index].tolist())),
+    }
+
+def compare(nb_structures, seed=DEFAULT_SEED, tolerance=DEFAULT_TOLERANCE, path=REFERENCE_WORKBOOK):
+    """
+    Compare le moteur à la calculette sur un lot de structures aléatoires
+    
+    Args:
+        nb_structures (int): Nombre de structures
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+        tolerance (float, optional): Écart accepté (points). Defaults to DEFAULT_TOLERANCE.
+        path (str, optional): Chemin de la calculette. Defaults to REFERENCE_WORKBOOK.
+    
+    Returns:
+        dict: Écarts par indicateur (et pour le total des points) : nombre de structures en
+            écart, écart maximal, écart moyen, exemple d'entrées de l'écart maximal ;
+            durées des deux calculs
+    """
+    catalog = get_indicator_catalog()
+    workbook = load_reference(path)
+    structures = generate_structures(nb_structures, seed, catalog)
+    
+    start = time.perf_counter()
+    reference, reference_total = sheet_points(workbook, structures, catalog)
+    sheet_seconds = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    points = engine_points(structures, catalog)
+    engine_seconds = time.perf_counter() - start
+    
+    columns = list(catalog.ids) + ["total"]
+    differences = np.column_stack([points - reference, points.sum(axis=1) - reference_total])
+    
+    report = {}
+    for column, difference in zip(columns, differences.T):
+        mismatches = np.abs(difference) > tolerance
+        worst = int(np.argmax(np.abs(difference)))
+        report[column] = {
+            "structures": nb_structures,
+            "mismatches": int(mismatches.sum()),
+            "max_difference": float(difference[worst]),
+            "mean_difference": float(difference[mismatches].mean()) if mismatches.any() else 0.0,
+            "example": _structure_inputs(structures, worst, catalog) if mismatches.any() else None,
+        }
+    
+    return {
+        "indicators": report,
+        "sheet_seconds": sheet_seconds,
+        "engine_seconds": engine_seconds,
+    }
+
+def changed_indicators(report, baseline):
+    """
+    Compare les écarts d'un rapport à ceux d'un rapport de référence (même graine, même lot)
+    
+    Returns:
+        list: Indicateurs dont le nombre de structures en écart ou l'écart maximal a changé
+    """
+    changed = []
+    for name, data in report["indicators"].items():
+        reference = baseline["indicators"].get(name)
+        if (reference is None or data["mismatches"] != reference["mismatches"]
+                or not np.isclose(data["max_difference"], reference["max_difference"])):
+            changed.append(name)
+    return changed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Parité du moteur de calcul avec la calculette officielle")
+    parser.add_argument("--structures", type=int, default=5000, help="Nombre de structures aléatoires")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="Graine du générateur")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Écart accepté (points)")
+    parser.add_argument("--workbook", default=REFERENCE_WORKBOOK, help="Chemin de la calculette")
+    parser.add_argument("--baseline", help="Rapport de référence : seuls les écarts modifiés font échouer la commande")
+    parser.add_argument("--save-baseline", help="Enregistre le rapport comme référence")
+    args = parser.parse_args(argv)
+    
+    results = compare(args.structures, args.seed, args.tolerance, args.workbook)
+    filepath = write_results("parity", results)
+    
+    print(f"{'indicateur':<10} {'écarts':>8} {'écart max':>12} {'écart moyen':>12}")
+    for name, data in results["indicators"].items():
+        print(f"{name:<10} {data['mismatches']:>8} {data['max_difference']:>12.2f} {data['mean_difference']:>12.2f}")
+    print(
+        f"{args.structures} structures : calculette {results['sheet_seconds'] * 1000:.1f} ms, "
+        f"moteur {results['engine_seconds'] * 1000:.1f} ms"
+    )
+    print(f"Résultats écrits dans {filepath}")
+    
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"structures": args.structures, "seed": args.seed, **results}, f, ensure_ascii=False, indent=4)
+        print(f"Référence enregistrée dans {args.save_baseline}")
+        return 0
+    
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            changed = changed_indicators(results, json.load(f))
+        for name in changed:
+            print(f"Écart modifié par rapport à la référence : {name}", file=sys.stderr)
+        return 1 if changed else 0
+    
+    return 1 if any(data["mismatches"] for data in results["indicators"].values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Exécute les bancs de mesure et les compare à la référence enregistrée
+
+Les résultats de chaque banc sont écrits en JSON dans build/benchmarks/ ; toute
+mesure plus lente que la référence (benchmarks/baseline.json) au-delà du seuil
+de tolérance est signalée comme une régression et fait échouer la commande.
+
+Utilisation :
+    python -m benchmarks.run [--profile quick|full] [--tolerance 1.5] [--update-baseline]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from benchmarks import bench_calculations, bench_data_manager
+from benchmarks.common import write_results
+
+SUITES = {
+    "calculations": bench_calculations.run,
+    "data_manager": bench_data_manager.run,
+}
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# En dessous de ce temps, les variations relèvent du bruit de mesure
+MIN_SECONDS = 0.001
+
+def load_baseline(path=BASELINE_PATH):
+    """
+    Charge la référence des temps de mesure
+    
+    Returns:
+        dict: Temps de référence par banc et par mesure (vide si aucune référence)
+    """
+    if not os.path.exists(path):
+        return {}
+    
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def find_regressions(results, baseline, tolerance):
+    """
+    Compare des résultats à la référence
+    
+    Args:
+        results (dict): Temps mesurés par banc et par mesure
+        baseline (dict): Temps de référence par banc et par mesure
+        tolerance (float): Rapport maximal accepté entre temps mesuré et temps de référence
+    
+    Returns:
+        list: Régressions détectées (banc, mesure, temps de référence, temps mesuré)
+    """
+    regressions = []
+    for suite, measures in results.items():
+        for name, seconds in measures.items():
+            reference = baseline.get(suite, {}).get(name)
+            if reference is None or max(seconds, reference) < MIN_SECONDS:
+                continue
+            if seconds > reference * tolerance:
+                regressions.append((suite, name, reference, seconds))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bancs de mesure des calculs et de la gestion des données")
+    parser.add_argument("--profile", choices=["quick", "full"], default="quick", help="Profil de tailles")
+    parser.add_argument("--suite", choices=sorted(SUITES), nargs="+", default=sorted(SUITES), help="Bancs à exécuter")
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Ralentissement maximal accepté")
+    parser.add_argument("--update-baseline", action="store_true", help="Remplace la référence par les résultats")
+    args = parser.parse_args(argv)
+    
+    results = {}
+    for suite in args.suite:
+        results[suite] = SUITES[suite](args.profile)
+        print(f"{suite} : résultats écrits dans {write_results(suite, results[suite])}")
+    
+    baseline = load_baseline()
+    
+    if args.update_baseline:
+        baseline.update(results)
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=4, sort_keys=True)
+        print(f"Référence mise à jour : {BASELINE_PATH}")
+        return 0
+    
+    regressions = find_regressions(results, baseline, args.tolerance)
+    for suite, name, reference, seconds in regressions:
+        print(
+            f"RÉGRESSION {suite} {name} : {reference * 1000:.3f} ms -> {seconds * 1000:.3f} ms "
+            f"(x{seconds / reference:.2f})",
+            file=sys.stderr
+        )
+    
+    if not regressions:
+        print("Aucune régression détectée.")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Profil de démarrage de l'application
+
+Mesure le temps d'import de chaque module de l'application avec
+``python -X importtime`` (dans un interpréteur neuf pour chaque module, afin de
+mesurer un démarrage à froid) et vérifie que les modèles et les calculs
+n'importent aucune bibliothèque lourde.
+
+Utilisation :
+    python -m benchmarks.startup_profile [--output build/startup_profile.json]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Modules mesurés, dans l'ordre de chargement de l'application
+MODULES = [
+    "src.models.indicators",
+    "src.models.associates",
+    "src.models.expenses",
+    "src.utils.calculations",
+    "src.utils.data_manager",
+    "src.utils.profiling",
+    "src.utils.metrics",
+    "src.pages",
+    "src.pages.home",
+    "src.pages.indicators",
+    "src.pages.associates",
+    "src.pages.expenses",
+    "src.pages.dashboard",
+]
+
+# Modules qui ne doivent jamais être importés par les modèles et les calculs
+HEAVY_MODULES = ["pandas", "matplotlib", "seaborn", "streamlit", "openpyxl"]
+
+# Modules devant rester légers
+LIGHTWEIGHT_MODULES = [
+    "src.models.indicators",
+    "src.models.associates",
+    "src.models.expenses",
+    "src.utils.calculations",
+    "src.utils.data_manager",
+    "src.utils.profiling",
+    "src.utils.metrics",
+    "src.pages",
+]
+
+DEFAULT_OUTPUT = os.path.join("build", "startup_profile.json")
+
+def profile_module(module):
+    """
+    Importe un module dans un interpréteur neuf et analyse la sortie de -X importtime
+    
+    Args:
+        module (str): Nom du module à importer
+    
+    Returns:
+        dict: Temps d'import cumulé (ms) et liste des modules importés
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    
+    imported = []
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        
+        parts = line[len("import time:"):].split("|")
+        if not parts[0].strip().isdigit():
+            continue
+        
+        name = parts[2].strip()
+        imported.append(name)
+        if name == module:
+            cumulative_us = int(parts[1])
+    
+    return {
+        "cumulative_ms": round(cumulative_us / 1000, 2),
+        "imported": imported
+    }
+
+def build_profile():
+    """
+    Construit le profil de démarrage de l'ensemble des modules
+    
+    Returns:
+        dict: Profil par module et liste des violations détectées
+    """
+    profile = {"python": sys.version.split()[0], "modules": {}, "violations": []}
+    
+    for module in MODULES:
+        data = profile_module(module)
+        heavy = sorted({
+            heavy_module for heavy_module in HEAVY_MODULES
+            if heavy_module in data["imported"]
+        })
+        profile["modules"][module] = {
+            "cumulative_ms": data["cumulative_ms"],
+            "heavy_imports": heavy
+        }
+        
+        if module in LIGHTWEIGHT_MODULES and heavy:
+            profile["violations"].append(f"{module} importe {', '.join(heavy)}")
+    
+    return profile
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profil de démarrage de l'application")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Fichier JSON de sortie")
+    args = parser.parse_args(argv)
+    
+    profile = build_profile()
+    
+    output_dir = os.path.dirname(args.output)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=4)
+    
+    for module, data in profile["modules"].items():
+        heavy = f"  [{', '.join(data['heavy_imports'])}]" if data["heavy_imports"] else ""
+        print(f"{module:<28} {data['cumulative_ms']:>9.2f} ms{heavy}")
+    
+    for violation in profile["violations"]:
+        print(f"ERREUR : {violation}", file=sys.stderr)
+    
+    return 1 if profile["violations"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Générateur reproductible de structures (SISA) synthétiques pour les bancs de mesure
+"""
+
+import random
+from datetime import date, timedelta
+
+from src.models.associates import Associate, get_professions, get_medical_specialities, get_roles
+from src.models.expenses import (
+    Expense, get_expense_categories, get_expense_frequencies, get_distribution_methods
+)
+from src.models.indicators import IndicatorState
+
+DEFAULT_SEED = 20240101
+
+def generate_associates(nb_associates, seed=DEFAULT_SEED):
+    """
+    Génère une liste d'associés synthétiques
+    
+    Args:
+        nb_associates (int): Nombre d'associés
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+    
+    Returns:
+        list: Liste des associés
+    """
+    rng = random.Random(seed)
+    professions = get_professions()["all"]
+    specialities = get_medical_specialities()
+    roles = get_roles()
+    
+    associates = []
+    for i in range(nb_associates):
+        # Environ un tiers de médecins, comme dans les structures réelles
+        if rng.random() < 0.35:
+            profession = rng.choice(["Médecin généraliste", "Médecin spécialiste"])
+        else:
+            profession = rng.choice(professions)
+        is_doctor = profession.startswith("Médecin")
+        
+        entry_date = date(2015, 1, 1) + timedelta(days=rng.randrange(0, 3650))
+        associates.append(Associate(
+            id=str(i + 1),
+            first_name=f"Prénom{i + 1}",
+            last_name=f"Nom{i + 1}",
+            profession=profession,
+            speciality=rng.choice(specialities) if profession == "Médecin spécialiste" else None,
+            entry_date=entry_date.strftime("%Y-%m-%d"),
+            roles=rng.sample(roles, rng.choice([0, 0, 0, 1, 2])),
+            patients_mt=rng.randrange(200, 1500) if is_doctor else 0,
+            presence_time=round(rng.uniform(0.2, 1.0), 1),
+            distribution_key=round(rng.uniform(0.1, 1.0), 1),
+            email=f"prenom{i + 1}.nom{i + 1}@example.com",
+            phone=f"06{rng.randrange(10**8):08d}",
+            rpps=f"10{rng.randrange(10**9):09d}"
+        ))
+    
+    return associates
+
+def generate_expenses(nb_expenses, seed=DEFAULT_SEED):
+    """
+    Génère une liste de charges synthétiques
+    
+    Args:
+        nb_expenses (int): Nombre de lignes de charges
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+    
+    Returns:
+        list: Liste des charges
+    """
+    rng = random.Random(seed + 1)
+    categories = get_expense_categories()
+    frequencies = get_expense_frequencies()
+    # La répartition personnalisée n'est pas un mode de calcul à part entière
+    methods = [method for method in get_distribution_methods() if method != "custom"]
+    
+    expenses = []
+    for i in range(nb_expenses):
+        start_date = date(2020, 1, 1) + timedelta(days=rng.randrange(0, 1800))
+        end_date = start_date + timedelta(days=rng.randrange(90, 1500)) if rng.random() < 0.2 else None
+        expenses.append(Expense(
+            id=str(i + 1),
+            name=f"Charge {i + 1}",
+            description=f"Charge synthétique {i + 1}",
+            category=rng.choice(categories),
+            amount=round(rng.uniform(10, 5000), 2),
+            frequency=rng.choice(frequencies),
+            start_date=start_date.strftime("%Y-%m-%d"),
+            end_date=end_date.strftime("%Y-%m-%d") if end_date else None,
+            distribution_method=rng.choice(methods)
+        ))
+    
+    return expenses
+
+def generate_indicators(seed=DEFAULT_SEED):
+    """
+    Génère un état de complétion des indicateurs où tous les prérequis sont validés
+    
+    Args:
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+    
+    Returns:
+        IndicatorState: État de complétion des indicateurs
+    """
+    rng = random.Random(seed + 2)
+    state = IndicatorState()
+    for indicator in state:
+        if indicator.is_prerequisite or rng.random() < 0.7:
+            indicator.completion_status = rng.randint(1, indicator.max_level)
+            if indicator.points_variable > 0:
+                indicator.completion_percentage = rng.choice([50, 75, 100])
+    return state
+
+def generate_structure(nb_associates, nb_expenses, seed=DEFAULT_SEED):
+    """
+    Génère une structure complète (indicateurs, associés et charges)
+    
+    Args:
+        nb_associates (int): Nombre d'associés
+        nb_expenses (int): Nombre de lignes de charges
+        seed (int, optional): Graine du générateur. Defaults to DEFAULT_SEED.
+    
+    Returns:
+        tuple: État des indicateurs, liste des associés et liste des charges
+    """
+    return (
+        generate_indicators(seed),
+        generate_associates(nb_associates, seed),
+        generate_expenses(nb_expenses, seed)
+    )
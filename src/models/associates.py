@@ -2,10 +2,17 @@
 Modèle de données pour les associés de la SISA
 """
 
+from src.models.schema import compile_schema
+
 class Associate:
+    __slots__ = (
+        "id", "first_name", "last_name", "profession", "speciality", "entry_date", "roles",
+        "patients_mt", "presence_time", "distribution_key", "email", "phone", "rpps", "exit_date"
+    )
+    
     def __init__(self, id, first_name, last_name, profession, speciality=None, 
                  entry_date=None, roles=None, patients_mt=0, presence_time=1.0, 
-                 distribution_key=None, email=None, phone=None, rpps=None):
+                 distribution_key=None, email=None, phone=None, rpps=None, exit_date=None):
         self.id = id
         self.first_name = first_name
         self.last_name = last_name
@@ -19,12 +26,13 @@ class Associate:
         self.email = email
         self.phone = phone
         self.rpps = rpps  # Numéro RPPS pour les professionnels de santé
+        self.exit_date = exit_date  # Date de sortie de la SISA (None : toujours associé)
 
     def is_doctor(self):
         """
-        Vérifie si l'associé est un médecin
+        Vérifie si l'associé est un médecin (généraliste ou spécialiste)
         """
-        return self.profession.lower() == "médecin"
+        return self.profession.lower().startswith("médecin")
     
     def is_medical_profession(self):
         """
@@ -57,6 +65,26 @@ class Associate:
         """
         return f"{self.first_name} {self.last_name}"
     
+    def _key(self):
+        """
+        Retourne le tuple des valeurs de l'associé (utilisé pour l'égalité et le hachage)
+        """
+        return (
+            self.id, self.first_name, self.last_name, self.profession, self.speciality,
+            self.entry_date, tuple(self.roles), self.patients_mt, self.presence_time,
+            self.distribution_key, self.email, self.phone, self.rpps, self.exit_date
+        )
+    
+    def __eq__(self, other):
+        if not isinstance(other, Associate):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        # Le hachage dépend des valeurs courantes : un associé ne doit pas être
+        # modifié tant qu'il sert de clé de mémoïsation
+        return hash(self._key())
+    
     def to_dict(self):
         """
         Convertit l'objet en dictionnaire
@@ -74,29 +102,39 @@ class Associate:
             "distribution_key": self.distribution_key,
             "email": self.email,
             "phone": self.phone,
-            "rpps": self.rpps
+            "rpps": self.rpps,
+            "exit_date": self.exit_date
         }
     
     @classmethod
     def from_dict(cls, data):
         """
-        Crée un objet Associate à partir d'un dictionnaire
+        Crée un objet Associate à partir d'un dictionnaire, validé par ASSOCIATE_SCHEMA
+        
+        Raises:
+            SchemaError: Valeur absente ou invalide
         """
-        return cls(
-            id=data.get("id"),
-            first_name=data.get("first_name"),
-            last_name=data.get("last_name"),
-            profession=data.get("profession"),
-            speciality=data.get("speciality"),
-            entry_date=data.get("entry_date"),
-            roles=data.get("roles"),
-            patients_mt=data.get("patients_mt", 0),
-            presence_time=data.get("presence_time", 1.0),
-            distribution_key=data.get("distribution_key"),
-            email=data.get("email"),
-            phone=data.get("phone"),
-            rpps=data.get("rpps")
-        )
+        return ASSOCIATE_SCHEMA.decode_record(data, cls=cls)
+
+# Champs persistés d'un associé (voir src/models/schema.py)
+ASSOCIATE_FIELDS = (
+    {"name": "id", "kind": "string", "required": True},
+    {"name": "first_name", "kind": "string", "required": True},
+    {"name": "last_name", "kind": "string", "required": True},
+    {"name": "profession", "kind": "string", "required": True},
+    {"name": "speciality", "kind": "string", "nullable": True},
+    {"name": "entry_date", "kind": "date", "nullable": True},
+    {"name": "roles", "kind": "strings", "nullable": True, "default": []},
+    {"name": "patients_mt", "kind": "number", "default": 0, "min": 0, "round": True},
+    {"name": "presence_time", "kind": "number", "default": 1.0, "min": 0},
+    {"name": "distribution_key", "kind": "number", "nullable": True, "default": 1.0, "min": 0, "empty_default": True},
+    {"name": "email", "kind": "string", "nullable": True},
+    {"name": "phone", "kind": "string", "nullable": True},
+    {"name": "rpps", "kind": "string", "nullable": True},
+    {"name": "exit_date", "kind": "date", "nullable": True},
+)
+
+ASSOCIATE_SCHEMA = compile_schema(Associate, ASSOCIATE_FIELDS, label="associé")
 
 
 # Liste des professions médicales et paramédicales
@@ -213,6 +251,22 @@ def get_roles():
     ]
 
 
+# Rôles dont dépendent des indicateurs ACI
+def get_aci_roles():
+    """
+    Retourne, pour chaque rôle lié aux indicateurs ACI, les identifiants des indicateurs concernés
+    """
+    return {
+        "Coordinateur": ["A2S1"],
+        "Référent qualité": ["A2O3"],
+        "Référent système d'information": ["A3S1", "A3O1"],
+        "Référent formation": ["A2O1"],
+        "Référent protocoles": ["A2S2", "A2O4"],
+        "Référent missions de santé publique": ["A1O4"],
+        "Référent relations externes": ["A2O2"]
+    }
+
+
 # Exemples d'associés pour initialiser l'application
 def get_sample_associates():
     """
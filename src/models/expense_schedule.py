@@ -0,0 +1,222 @@
+"""
+Étalement des charges par mois sur un exercice comptable
+
+Chaque charge est développée en un vecteur de 12 montants mensuels, en tenant
+compte de ses dates de début et de fin :
+    - une charge récurrente (mensuelle, trimestrielle, annuelle) est étalée au
+      prorata du nombre de jours couverts dans chaque mois : montant / 1, / 3 ou
+      / 12 pour un mois entier ;
+    - une charge ponctuelle est comptée en entier le mois de sa date de début, et
+      seulement si ce mois appartient à l'exercice (sans date, elle est étalée sur
+      les 12 mois, comme auparavant) ;
+    - une date absente laisse la période ouverte de ce côté ; la date de fin est
+      incluse.
+
+Le calcul est vectoriel (arithmétique de dates NumPy) : les charges forment les
+lignes d'une matrice et les mois de l'exercice ses colonnes.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+
+# Mois de début de l'exercice (1 : exercice calé sur l'année civile)
+FISCAL_YEAR_START_MONTH = 1
+
+MONTHS_PER_YEAR = 12
+
+# Nombre de mois couverts par le montant d'une charge récurrente, selon sa fréquence
+FREQUENCY_MONTHS = {
+    "mensuel": 1,
+    "trimestriel": 3,
+    "annuel": 12,
+}
+
+# Fréquence des charges comptées en une seule fois
+ONE_OFF_FREQUENCY = "ponctuel"
+
+MONTH_LABELS = ("janv.", "févr.", "mars", "avr.", "mai", "juin", "juil.", "août", "sept.", "oct.", "nov.", "déc.")
+
+def current_fiscal_year(today=None, start_month=FISCAL_YEAR_START_MONTH):
+    """
+    Retourne l'exercice en cours (désigné par l'année de son premier mois)
+    
+    Args:
+        today (date, optional): Date de référence. Defaults to la date du jour.
+        start_month (int, optional): Mois de début de l'exercice. Defaults to FISCAL_YEAR_START_MONTH.
+    
+    Returns:
+        int: Année de début de l'exercice
+    """
+    today = today or date.today()
+    return today.year if today.month >= start_month else today.year - 1
+
+def get_fiscal_year_months(fiscal_year, start_month=FISCAL_YEAR_START_MONTH):
+    """
+    Retourne les 12 mois d'un exercice
+    
+    Args:
+        fiscal_year (int): Année de début de l'exercice
+        start_month (int, optional): Mois de début de l'exercice. Defaults to FISCAL_YEAR_START_MONTH.
+    
+    Returns:
+        numpy.ndarray: Mois de l'exercice (datetime64[M])
+    """
+    first_month = np.datetime64(f"{int(fiscal_year):04d}-{int(start_month):02d}", "M")
+    return first_month + np.arange(MONTHS_PER_YEAR)
+
+def format_month(month):
+    """
+    Retourne le libellé d'un mois (par exemple « juin 2026 »)
+    
+    Args:
+        month (numpy.datetime64): Mois
+    """
+    year, month_index = divmod(int(month.astype("datetime64[M]").astype(np.int64)), MONTHS_PER_YEAR)
+    return f"{MONTH_LABELS[month_index]} {1970 + year}"
+
+def _date_text(value):
+    # Valeurs vides : None, chaîne vide, NaN ou NaT (import Excel)
+    if value is None or value != value or value == "":
+        return "NaT"
+    return str(value)[:10]
+
+def parse_dates(values):
+    """
+    Convertit des dates (chaînes AAAA-MM-JJ, date, Timestamp) en vecteur datetime64[D]
+    
+    Les dates absentes ou illisibles deviennent NaT.
+    """
+    texts = [_date_text(value) for value in values]
+    try:
+        return np.array(texts, dtype="datetime64[D]")
+    except ValueError:
+        parsed = np.empty(len(texts), dtype="datetime64[D]")
+        for i, text in enumerate(texts):
+            try:
+                parsed[i] = np.datetime64(text, "D")
+            except ValueError:
+                parsed[i] = np.datetime64("NaT")
+        return parsed
+
+
+class ExpenseSchedule:
+    """
+    Montants mensuels d'une liste de charges sur un exercice
+    
+    La matrice amounts compte une ligne par charge (dans l'ordre de la liste) et
+    une colonne par mois de l'exercice ; elle est en lecture seule.
+    """
+    
+    __slots__ = ("expenses", "fiscal_year", "months", "amounts")
+    
+    def __init__(self, expenses, fiscal_year, months, amounts):
+        self.expenses = expenses
+        self.fiscal_year = fiscal_year
+        self.months = months
+        self.amounts = amounts
+    
+    def annual_amounts(self):
+        """
+        Retourne le montant de chaque charge sur l'exercice
+        """
+        return self.amounts.sum(axis=1)
+    
+    def monthly_totals(self):
+        """
+        Retourne le total des charges de chaque mois de l'exercice
+        """
+        return self.amounts.sum(axis=0)
+    
+    def total(self):
+        """
+        Retourne le total des charges de l'exercice
+        """
+        return float(self.amounts.sum())
+    
+    def totals_by(self, attribute):
+        """
+        Regroupe les montants de l'exercice selon un attribut des charges
+        
+        Args:
+            attribute (str): Attribut de regroupement ("category", "frequency", ...)
+        
+        Returns:
+            dict: Montant de l'exercice par valeur de l'attribut
+        """
+        keys = [getattr(expense, attribute) for expense in self.expenses]
+        if not keys:
+            return {}
+        
+        groups = list(dict.fromkeys(keys))
+        positions = {key: i for i, key in enumerate(groups)}
+        totals = np.bincount(
+            [positions[key] for key in keys], weights=self.annual_amounts(), minlength=len(groups)
+        )
+        return dict(zip(groups, totals.tolist()))
+
+
+def build_expense_schedule(expenses, fiscal_year, start_month=FISCAL_YEAR_START_MONTH):
+    """
+    Développe les charges en montants mensuels sur un exercice
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int): Année de début de l'exercice
+        start_month (int, optional): Mois de début de l'exercice. Defaults to FISCAL_YEAR_START_MONTH.
+    
+    Returns:
+        ExpenseSchedule: Montants mensuels des charges
+    """
+    expenses = tuple(expenses)
+    months = get_fiscal_year_months(fiscal_year, start_month)
+    month_starts = months.astype("datetime64[D]")
+    month_ends = (months + 1).astype("datetime64[D]")
+    month_days = (month_ends - month_starts).astype(np.float64)
+    
+    amounts = np.array([float(expense.amount or 0) for expense in expenses], dtype=np.float64)
+    periods = np.array(
+        [FREQUENCY_MONTHS.get(expense.frequency, MONTHS_PER_YEAR) for expense in expenses], dtype=np.float64
+    )
+    one_off = np.array([expense.frequency == ONE_OFF_FREQUENCY for expense in expenses], dtype=bool)
+    starts = parse_dates([expense.start_date for expense in expenses])
+    ends = parse_dates([expense.end_date for expense in expenses]) + np.timedelta64(1, "D")
+    
+    # Périodes ouvertes : bornées par l'exercice
+    open_starts = np.isnat(starts)
+    bounded_starts = np.where(open_starts, month_starts[0], starts)
+    bounded_ends = np.where(np.isnat(ends), month_ends[-1], ends)
+    
+    # Part de chaque mois couverte par la charge (jours couverts / jours du mois)
+    covered_days = (
+        np.minimum(bounded_ends[:, None], month_ends) - np.maximum(bounded_starts[:, None], month_starts)
+    ).astype(np.float64)
+    schedule = np.clip(covered_days, 0, None) / month_days * (amounts / periods)[:, None]
+    
+    if one_off.any():
+        dated = one_off & ~open_starts
+        undated = one_off & open_starts
+        schedule[dated] = (starts[dated].astype("datetime64[M]")[:, None] == months) * amounts[dated, None]
+        schedule[undated] = amounts[undated, None] / MONTHS_PER_YEAR
+    
+    schedule.setflags(write=False)
+    return ExpenseSchedule(expenses, int(fiscal_year), months, schedule)
+
+@lru_cache(maxsize=32)
+def schedule_expenses(expenses, fiscal_year, start_month=FISCAL_YEAR_START_MONTH):
+    """
+    Version mémoïsée de build_expense_schedule
+    
+    Les charges sont hachées sur leurs valeurs : une charge modifiée produit une
+    nouvelle entrée.
+    
+    Args:
+        expenses (tuple): Charges (tuple, pour pouvoir servir de clé)
+        fiscal_year (int): Année de début de l'exercice
+        start_month (int, optional): Mois de début de l'exercice. Defaults to FISCAL_YEAR_START_MONTH.
+    
+    Returns:
+        ExpenseSchedule: Montants mensuels des charges (partagés, en lecture seule)
+    """
+    return build_expense_schedule(expenses, fiscal_year, start_month)
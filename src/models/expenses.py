@@ -2,9 +2,17 @@
 Modèle de données pour les charges fixes de la SISA
 """
 
+from src.models.expense_schedule import build_expense_schedule
+from src.models.schema import compile_schema
+
 class Expense:
+    __slots__ = (
+        "id", "name", "description", "category", "amount", "frequency",
+        "start_date", "end_date", "distribution_method", "custom_weights"
+    )
+    
     def __init__(self, id, name, description, category, amount, frequency="mensuel", 
-                 start_date=None, end_date=None, distribution_method="equal"):
+                 start_date=None, end_date=None, distribution_method="equal", custom_weights=None):
         self.id = id
         self.name = name
         self.description = description
@@ -14,11 +22,22 @@ class Expense:
         self.start_date = start_date  # Date de début (pour les charges récurrentes)
         self.end_date = end_date  # Date de fin (pour les charges récurrentes)
         self.distribution_method = distribution_method  # Méthode de répartition (égale, au prorata du temps de présence, etc.)
+        # Poids de la répartition personnalisée, par identifiant d'associé (creux : poids nuls omis)
+        self.custom_weights = {
+            associate_id: float(weight) for associate_id, weight in (custom_weights or {}).items() if weight
+        }
 
-    def get_annual_amount(self):
+    def get_annual_amount(self, fiscal_year=None):
         """
         Calcule le montant annuel de la charge
+        
+        Args:
+            fiscal_year (int, optional): Exercice ; le montant est alors proratisé
+                selon les dates de début et de fin. Defaults to None (montant nominal).
         """
+        if fiscal_year is not None:
+            return float(self.get_monthly_amounts(fiscal_year).sum())
+        
         if self.frequency == "mensuel":
             return self.amount * 12
         elif self.frequency == "trimestriel":
@@ -45,6 +64,38 @@ class Expense:
         else:
             return self.amount
     
+    def get_monthly_amounts(self, fiscal_year):
+        """
+        Calcule les montants mensuels de la charge sur un exercice
+        
+        Args:
+            fiscal_year (int): Année de début de l'exercice
+        
+        Returns:
+            numpy.ndarray: Montant de chacun des 12 mois de l'exercice
+        """
+        return build_expense_schedule((self,), fiscal_year).amounts[0]
+    
+    def _key(self):
+        """
+        Retourne le tuple des valeurs de la charge (utilisé pour l'égalité et le hachage)
+        """
+        return (
+            self.id, self.name, self.description, self.category, self.amount,
+            self.frequency, self.start_date, self.end_date, self.distribution_method,
+            tuple(sorted(self.custom_weights.items()))
+        )
+    
+    def __eq__(self, other):
+        if not isinstance(other, Expense):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        # Le hachage dépend des valeurs courantes : une charge ne doit pas être
+        # modifiée tant qu'elle sert de clé de mémoïsation
+        return hash(self._key())
+    
     def to_dict(self):
         """
         Convertit l'objet en dictionnaire
@@ -58,25 +109,35 @@ class Expense:
             "frequency": self.frequency,
             "start_date": self.start_date,
             "end_date": self.end_date,
-            "distribution_method": self.distribution_method
+            "distribution_method": self.distribution_method,
+            "custom_weights": dict(self.custom_weights)
         }
     
     @classmethod
     def from_dict(cls, data):
         """
-        Crée un objet Expense à partir d'un dictionnaire
+        Crée un objet Expense à partir d'un dictionnaire, validé par EXPENSE_SCHEMA
+        
+        Raises:
+            SchemaError: Valeur absente ou invalide
         """
-        return cls(
-            id=data.get("id"),
-            name=data.get("name"),
-            description=data.get("description"),
-            category=data.get("category"),
-            amount=data.get("amount", 0),
-            frequency=data.get("frequency", "mensuel"),
-            start_date=data.get("start_date"),
-            end_date=data.get("end_date"),
-            distribution_method=data.get("distribution_method", "equal")
-        )
+        return EXPENSE_SCHEMA.decode_record(data, cls=cls)
+
+# Champs persistés d'une charge (voir src/models/schema.py)
+EXPENSE_FIELDS = (
+    {"name": "id", "kind": "string", "required": True},
+    {"name": "name", "kind": "string", "required": True},
+    {"name": "description", "kind": "string", "nullable": True},
+    {"name": "category", "kind": "string", "required": True},
+    {"name": "amount", "kind": "number", "default": 0},
+    {"name": "frequency", "kind": "string", "default": "mensuel"},
+    {"name": "start_date", "kind": "date", "nullable": True},
+    {"name": "end_date", "kind": "date", "nullable": True},
+    {"name": "distribution_method", "kind": "string", "default": "equal"},
+    {"name": "custom_weights", "kind": "weights", "nullable": True, "default": {}},
+)
+
+EXPENSE_SCHEMA = compile_schema(Expense, EXPENSE_FIELDS, label="charge")
 
 
 # Liste des catégories de charges
@@ -0,0 +1,329 @@
+"""
+Règles de calcul propres à certains indicateurs ACI (bonus, paliers, points par unité)
+
+Les règles sont décrites dans une table déclarative. Chaque règle porte sur un
+indicateur et calcule des points à partir d'une entrée :
+    - "nb_patients" : nombre de patients médecin traitant
+    - "nb_associates" : nombre de professionnels de santé associés
+    - "count" : nombre propre à l'indicateur (protocoles, missions, stages)
+    - None : règle sans entrée (montant constant)
+
+Les points d'une règle sont la somme :
+    - d'un montant constant ("points") ;
+    - de paliers ("tiers") : (plafond, points par unité), appliqués successivement
+      à partir de 0, le dernier plafond pouvant être None (sans limite) ;
+    - de seuils ("steps") : (seuil, points), attribués lorsque l'entrée dépasse le seuil.
+
+Les points calculés s'ajoutent à la partie fixe ("target": "fixed") ou à la partie
+variable ("target": "variable", pondérée par le ratio de patients et le pourcentage
+de complétion) de l'indicateur. Une règle peut remplacer ("replaces") la partie
+fixe ou variable du catalogue, et n'être active qu'en présence d'un IPA
+("requires_ipa"). Une règle dont l'entrée n'est pas fournie ne s'applique pas :
+les points du catalogue sont alors conservés.
+
+La table est évaluée indicateur par indicateur (apply_indicator_rules) ou compilée
+en vecteurs pour l'ensemble du catalogue (compile_rules).
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+INDICATOR_RULES = (
+    # Fonction de coordination : +1100 points au-delà de 8000 patients
+    {"indicator": "A2S1", "source": "nb_patients", "target": "fixed", "steps": ((8000, 1100),)},
+    # Système d'information : 200 points par PS associé jusqu'à 16, puis 150 par PS au-delà
+    {"indicator": "A3S1", "source": "nb_associates", "target": "fixed", "replaces": "variable",
+     "tiers": ((16, 200), (None, 150))},
+    # Protocoles pluri-professionnels : 100 points par protocole (8 au maximum), +40 avec un IPA
+    {"indicator": "A2S2", "source": "count", "target": "fixed", "replaces": "fixed", "tiers": ((8, 100),)},
+    {"indicator": "A2S2", "source": "count", "target": "fixed", "requires_ipa": True, "tiers": ((8, 40),)},
+    # Missions de santé publique : 350 points variables par mission (2 au maximum),
+    # +200 points fixes avec un IPA lorsque les 2 missions sont réalisées
+    {"indicator": "A1O4", "source": "count", "target": "variable", "replaces": "variable", "tiers": ((2, 350),)},
+    {"indicator": "A1O4", "source": "count", "target": "fixed", "requires_ipa": True, "steps": ((1, 200),)},
+    # Concertation pluri-professionnelle : +200 points variables avec un IPA
+    {"indicator": "A2S3", "source": None, "target": "variable", "requires_ipa": True, "points": 200},
+    # Formation : 450 points à partir de 2 stages, +225 pour le 3ème et le 4ème stage
+    {"indicator": "A2O1", "source": "count", "target": "fixed", "replaces": "fixed",
+     "steps": ((1, 450),), "tiers": ((2, 0), (4, 225))},
+    # Protocoles nationaux de coopération : 100 points par protocole (6 au maximum)
+    {"indicator": "A2O4", "source": "count", "target": "fixed", "replaces": "fixed", "tiers": ((6, 100),)},
+)
+
+# Libellés des nombres saisis pour les indicateurs dont une règle dépend d'un nombre propre
+COUNT_LABELS = {
+    "A1O4": "Nombre de missions de santé publique",
+    "A2S2": "Nombre de protocoles pluri-professionnels",
+    "A2O1": "Nombre de stages",
+    "A2O4": "Nombre de protocoles de coopération",
+}
+
+# Nombres proposés par défaut à la saisie : ils reproduisent les points du catalogue
+DEFAULT_COUNTS = {
+    "A1O4": 2,
+    "A2S2": 1,
+    "A2O1": 2,
+    "A2O4": 1,
+}
+
+_SOURCES = (None, "nb_patients", "nb_associates", "count")
+
+def _rules_by_indicator(rules):
+    grouped = {}
+    for rule in rules:
+        grouped.setdefault(rule["indicator"], []).append(rule)
+    return grouped
+
+_RULES_BY_INDICATOR = _rules_by_indicator(INDICATOR_RULES)
+
+def get_counted_indicators(rules=INDICATOR_RULES):
+    """
+    Retourne les identifiants des indicateurs dont une règle dépend d'un nombre propre
+    """
+    return sorted({rule["indicator"] for rule in rules if rule.get("source") == "count"})
+
+def evaluate_rule(rule, value):
+    """
+    Calcule les points d'une règle pour une valeur de son entrée
+    
+    Args:
+        rule (dict): Règle de la table
+        value (float): Valeur de l'entrée (ignorée pour une règle sans entrée)
+    
+    Returns:
+        float: Points attribués par la règle
+    """
+    points = rule.get("points", 0)
+    
+    lower = 0
+    for upper, rate in rule.get("tiers", ()):
+        high = value if upper is None else min(value, upper)
+        if high > lower:
+            points += (high - lower) * rate
+        if upper is None:
+            break
+        lower = upper
+    
+    for threshold, bonus in rule.get("steps", ()):
+        if value > threshold:
+            points += bonus
+    
+    return points
+
+def _rule_input(rule, nb_patients, nb_associates, count):
+    source = rule.get("source")
+    if source is None:
+        return 0
+    if source == "nb_patients":
+        return nb_patients
+    if source == "nb_associates":
+        return nb_associates
+    return count
+
+def apply_indicator_rules(indicator_id, points_fixed, points_variable, nb_patients,
+                          nb_associates=None, count=None, has_ipa=False, rules=None):
+    """
+    Applique les règles d'un indicateur à ses points fixes et variables
+    
+    Args:
+        indicator_id (str): Identifiant de l'indicateur
+        points_fixed (float): Points fixes du catalogue
+        points_variable (float): Points variables du catalogue
+        nb_patients (int): Nombre de patients médecin traitant
+        nb_associates (int, optional): Nombre de PS associés. Defaults to None.
+        count (int, optional): Nombre propre à l'indicateur. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
+        rules (tuple, optional): Table des règles. Defaults to INDICATOR_RULES.
+    
+    Returns:
+        tuple: Points fixes et points variables après application des règles
+    """
+    indicator_rules = (
+        _RULES_BY_INDICATOR if rules is None else _rules_by_indicator(rules)
+    ).get(indicator_id)
+    if not indicator_rules:
+        return points_fixed, points_variable
+    
+    fixed_extra = 0
+    variable_extra = 0
+    keep_fixed = True
+    keep_variable = True
+    for rule in indicator_rules:
+        value = _rule_input(rule, nb_patients, nb_associates, count)
+        if value is None or (rule.get("requires_ipa") and not has_ipa):
+            continue
+        
+        replaces = rule.get("replaces")
+        if replaces == "fixed":
+            keep_fixed = False
+        elif replaces == "variable":
+            keep_variable = False
+        
+        if rule["target"] == "fixed":
+            fixed_extra += evaluate_rule(rule, value)
+        else:
+            variable_extra += evaluate_rule(rule, value)
+    
+    return (
+        (points_fixed if keep_fixed else 0) + fixed_extra,
+        (points_variable if keep_variable else 0) + variable_extra
+    )
+
+
+class CompiledRules:
+    """
+    Table des règles compilée en vecteurs pour un catalogue d'indicateurs
+    
+    Chaque règle occupe une ligne ; les paliers et les seuils sont stockés dans
+    des matrices complétées par des lignes neutres, de sorte que l'évaluation de
+    toutes les règles ne demande que quelques opérations vectorielles. Les
+    vecteurs de points obtenus ne dépendent que des entrées des règles : ils sont
+    conservés pour chaque combinaison d'entrées déjà rencontrée.
+    """
+    __slots__ = (
+        "points_fixed", "points_variable", "index", "source", "count_ids", "to_fixed",
+        "replaces_fixed", "replaces_variable", "requires_ipa", "constant", "tier_lower",
+        "tier_width", "tier_rate", "step_threshold", "step_points", "rule_matrix", "_results"
+    )
+    
+    # Nombre maximal de combinaisons d'entrées conservées
+    MAX_RESULTS = 256
+    
+    def __init__(self, catalog, rules=INDICATOR_RULES):
+        rules = [rule for rule in rules if rule["indicator"] in catalog.positions]
+        nb_tiers = max([len(rule.get("tiers", ())) for rule in rules] + [1])
+        nb_steps = max([len(rule.get("steps", ())) for rule in rules] + [1])
+        
+        self.points_fixed = catalog.points_fixed
+        self.points_variable = catalog.points_variable
+        self._results = {}
+        self.index = np.array([catalog.positions[rule["indicator"]] for rule in rules], dtype=np.intp)
+        self.source = tuple(_SOURCES.index(rule.get("source")) for rule in rules)
+        self.count_ids = tuple(rule["indicator"] for rule in rules)
+        self.to_fixed = np.array([rule["target"] == "fixed" for rule in rules], dtype=bool)
+        self.replaces_fixed = np.array([rule.get("replaces") == "fixed" for rule in rules], dtype=bool)
+        self.replaces_variable = np.array([rule.get("replaces") == "variable" for rule in rules], dtype=bool)
+        self.requires_ipa = np.array([bool(rule.get("requires_ipa")) for rule in rules], dtype=bool)
+        self.constant = np.array([rule.get("points", 0) for rule in rules], dtype=np.float64)
+        # Règles × indicateurs : ventilation des points des règles sur leur indicateur
+        self.rule_matrix = np.zeros((len(rules), len(catalog)))
+        self.rule_matrix[np.arange(len(rules)), self.index] = 1
+        
+        # Paliers : borne inférieure, largeur (infinie pour le dernier palier sans plafond) et taux
+        self.tier_lower = np.zeros((len(rules), nb_tiers))
+        self.tier_width = np.zeros((len(rules), nb_tiers))
+        self.tier_rate = np.zeros((len(rules), nb_tiers))
+        # Seuils : les seuils inutilisés sont infinis et ne sont jamais dépassés
+        self.step_threshold = np.full((len(rules), nb_steps), np.inf)
+        self.step_points = np.zeros((len(rules), nb_steps))
+        
+        for row, rule in enumerate(rules):
+            lower = 0
+            for column, (upper, rate) in enumerate(rule.get("tiers", ())):
+                self.tier_lower[row, column] = lower
+                self.tier_width[row, column] = np.inf if upper is None else upper - lower
+                self.tier_rate[row, column] = rate
+                lower = upper
+            for column, (threshold, bonus) in enumerate(rule.get("steps", ())):
+                self.step_threshold[row, column] = threshold
+                self.step_points[row, column] = bonus
+    
+    def apply(self, nb_patients, nb_associates=None, counts=None, has_ipa=False):
+        """
+        Applique les règles aux points fixes et variables du catalogue
+        
+        Args:
+            nb_patients (int): Nombre de patients médecin traitant
+            nb_associates (int, optional): Nombre de PS associés. Defaults to None.
+            counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+            has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
+        
+        Returns:
+            tuple: Vecteurs (en lecture seule) des points fixes et variables après application des règles
+        """
+        counts = counts or {}
+        inputs = (0, nb_patients, nb_associates)
+        values = tuple(
+            inputs[source] if source < 3 else counts.get(indicator_id)
+            for source, indicator_id in zip(self.source, self.count_ids)
+        )
+        key = (values, bool(has_ipa))
+        
+        result = self._results.get(key)
+        if result is None:
+            result = self._evaluate(values, has_ipa)
+            if len(self._results) >= self.MAX_RESULTS:
+                self._results.clear()
+            self._results[key] = result
+        
+        return result
+    
+    def apply_batch(self, nb_patients, nb_associates, counts=None, has_ipa=False):
+        """
+        Applique les règles pour plusieurs jeux d'entrées à la fois (par exemple
+        plusieurs coalitions d'associés)
+        
+        Args:
+            nb_patients (array): Nombre de patients médecin traitant de chaque jeu
+            nb_associates (array): Nombre de PS associés de chaque jeu
+            counts (dict, optional): Nombres propres aux indicateurs, communs à tous les jeux.
+                Defaults to None.
+            has_ipa (array, optional): Présence d'un IPA dans chaque jeu. Defaults to False.
+        
+        Returns:
+            tuple: Matrices jeux × indicateurs des points fixes et variables
+        """
+        counts = counts or {}
+        nb_patients = np.asarray(nb_patients, dtype=np.float64)
+        size = len(nb_patients)
+        inputs = (np.zeros(size), nb_patients, np.broadcast_to(np.asarray(nb_associates, dtype=np.float64), size))
+        columns = [
+            inputs[source] if source < 3 else np.full(size, np.nan if counts.get(indicator_id) is None
+                                                      else float(counts[indicator_id]))
+            for source, indicator_id in zip(self.source, self.count_ids)
+        ]
+        values = np.column_stack(columns) if columns else np.zeros((size, 0))
+        return self._evaluate_rows(values, np.broadcast_to(np.asarray(has_ipa, dtype=bool), size))
+    
+    def _evaluate(self, values, has_ipa):
+        if not len(self.index):
+            return self.points_fixed, self.points_variable
+        
+        values = np.array([[np.nan if value is None else float(value) for value in values]])
+        points_fixed, points_variable = self._evaluate_rows(values, np.array([bool(has_ipa)]))
+        points_fixed, points_variable = points_fixed[0], points_variable[0]
+        points_fixed.setflags(write=False)
+        points_variable.setflags(write=False)
+        return points_fixed, points_variable
+    
+    def _evaluate_rows(self, values, has_ipa):
+        """
+        Évalue les règles pour une matrice d'entrées jeux × règles (NaN : entrée absente)
+        """
+        active = ~np.isnan(values) & ~(self.requires_ipa & ~has_ipa[:, None])
+        values = np.where(active, values, 0)[:, :, None]
+        
+        points = (
+            self.constant
+            + (np.clip(values - self.tier_lower, 0, self.tier_width) * self.tier_rate).sum(axis=2)
+            + ((values > self.step_threshold) * self.step_points).sum(axis=2)
+        )
+        points = np.where(active, points, 0)
+        
+        fixed_extra = np.where(self.to_fixed, points, 0) @ self.rule_matrix
+        variable_extra = np.where(self.to_fixed, 0, points) @ self.rule_matrix
+        keep_fixed = (active & self.replaces_fixed) @ self.rule_matrix == 0
+        keep_variable = (active & self.replaces_variable) @ self.rule_matrix == 0
+        
+        points_fixed = np.where(keep_fixed, self.points_fixed, 0) + fixed_extra
+        points_variable = np.where(keep_variable, self.points_variable, 0) + variable_extra
+        return points_fixed, points_variable
+
+
+@lru_cache(maxsize=16)
+def compile_rules(catalog):
+    """
+    Retourne la table des règles compilée pour un catalogue (mise en cache par catalogue)
+    """
+    return CompiledRules(catalog)
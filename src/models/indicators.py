@@ -2,7 +2,21 @@
 Modèle de données pour les indicateurs ACI
 """
 
+from functools import lru_cache
+
+import numpy as np
+
+from src.models.indicator_rules import apply_indicator_rules
+from src.models.schema import compile_schema
+from src.utils.money import to_cents
+
 class Indicator:
+    __slots__ = (
+        "id", "name", "description", "axis", "type_indicator", "is_prerequisite",
+        "points_fixed", "points_variable", "reference_patients", "max_level",
+        "completion_status", "completion_percentage"
+    )
+    
     def __init__(self, id, name, description, axis, type_indicator, is_prerequisite, 
                  points_fixed, points_variable, reference_patients=4000, max_level=1):
         self.id = id
@@ -18,32 +32,455 @@ class Indicator:
         self.completion_status = 0  # 0: Non complété, 1: Niveau 1 complété, 2: Niveau 2 complété, etc.
         self.completion_percentage = 0  # Pour les indicateurs avec pourcentage de complétion
 
-    def calculate_points(self, nb_patients, nb_associates=None):
+    def calculate_points(self, nb_patients, nb_associates=None, completion_status=None, completion_percentage=None,
+                         count=None, has_ipa=False):
         """
         Calcule les points obtenus pour cet indicateur
+        
+        L'état de complétion peut être fourni explicitement (par exemple par un
+        scénario de simulation) ; à défaut, celui de l'indicateur est utilisé.
+        Les règles propres à l'indicateur (voir src/models/indicator_rules.py)
+        dépendent du nombre de PS associés, du nombre propre à l'indicateur
+        (protocoles, missions, stages) et de la présence d'un IPA.
+        """
+        if completion_status is None:
+            completion_status = self.completion_status
+        if completion_percentage is None:
+            completion_percentage = self.completion_percentage
+        
+        points_fixed, points_variable = apply_indicator_rules(
+            self.id, self.points_fixed, self.points_variable, nb_patients, nb_associates, count, has_ipa
+        )
+        return compute_indicator_points(
+            points_fixed, points_variable, self.reference_patients,
+            completion_status, completion_percentage, nb_patients
+        )
+    
+    def calculate_amount(self, nb_patients, nb_associates=None, point_value=7, count=None, has_ipa=False):
+        """
+        Calcule le montant de cet indicateur, en centimes (point_value : valeur du point en euros)
+        """
+        return to_cents(self.calculate_points(nb_patients, nb_associates, count=count, has_ipa=has_ipa) * point_value)
+    
+    def _key(self):
+        """
+        Retourne le tuple des valeurs de l'indicateur (utilisé pour l'égalité et le hachage)
+        """
+        return (
+            self.id, self.name, self.description, self.axis, self.type_indicator,
+            self.is_prerequisite, self.points_fixed, self.points_variable,
+            self.reference_patients, self.max_level, self.completion_status,
+            self.completion_percentage
+        )
+    
+    def __eq__(self, other):
+        if not isinstance(other, Indicator):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        # Le hachage dépend des valeurs courantes : un indicateur ne doit pas être
+        # modifié tant qu'il sert de clé de mémoïsation
+        return hash(self._key())
+    
+    def to_dict(self):
+        """
+        Convertit l'objet en dictionnaire
+        """
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "axis": self.axis,
+            "type_indicator": self.type_indicator,
+            "is_prerequisite": self.is_prerequisite,
+            "points_fixed": self.points_fixed,
+            "points_variable": self.points_variable,
+            "reference_patients": self.reference_patients,
+            "max_level": self.max_level,
+            "completion_status": self.completion_status,
+            "completion_percentage": self.completion_percentage
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
         """
-        if self.completion_status == 0:
-            return 0
+        Crée un objet Indicator à partir d'un dictionnaire, validé par INDICATOR_SCHEMA
         
-        points = self.points_fixed
+        Raises:
+            SchemaError: Valeur absente ou invalide
+        """
+        return INDICATOR_SCHEMA.decode_record(data, cls=cls)
+
+# Champs persistés d'un indicateur (voir src/models/schema.py)
+INDICATOR_FIELDS = (
+    {"name": "id", "kind": "string", "required": True},
+    {"name": "name", "kind": "string", "required": True},
+    {"name": "description", "kind": "string", "required": True},
+    {"name": "axis", "kind": "integer", "required": True, "min": 1, "max": 3},
+    {"name": "type_indicator", "kind": "string", "required": True},
+    {"name": "is_prerequisite", "kind": "boolean", "required": True},
+    {"name": "points_fixed", "kind": "number", "required": True, "min": 0},
+    {"name": "points_variable", "kind": "number", "required": True, "min": 0},
+    {"name": "reference_patients", "kind": "number", "default": 4000, "min": 1},
+    {"name": "max_level", "kind": "integer", "default": 1, "min": 1},
+    {"name": "completion_status", "kind": "integer", "default": 0, "min": 0, "max_field": "max_level"},
+    {"name": "completion_percentage", "kind": "number", "default": 0, "min": 0, "max": 100},
+)
+
+INDICATOR_SCHEMA = compile_schema(Indicator, INDICATOR_FIELDS, label="indicateur")
+
+
+def compute_indicator_points(points_fixed, points_variable, reference_patients,
+                             completion_status, completion_percentage, nb_patients):
+    """
+    Calcule les points d'un indicateur à partir de ses paramètres et de son état de complétion
+    """
+    if completion_status == 0:
+        return 0
+    
+    points = points_fixed
+    
+    # Si l'indicateur a des points variables, on les calcule en fonction du nombre de patients
+    if points_variable > 0:
+        ratio = min(nb_patients / reference_patients, 1) if reference_patients > 0 else 1
+        
+        # Pour les indicateurs avec pourcentage de complétion
+        if completion_percentage > 0:
+            ratio = ratio * (completion_percentage / 100)
         
-        # Si l'indicateur a des points variables, on les calcule en fonction du nombre de patients
-        if self.points_variable > 0:
-            ratio = min(nb_patients / self.reference_patients, 1) if self.reference_patients > 0 else 1
-            
-            # Pour les indicateurs avec pourcentage de complétion
-            if self.completion_percentage > 0:
-                ratio = ratio * (self.completion_percentage / 100)
-                
-            points += self.points_variable * ratio
+        points += points_variable * ratio
+    
+    return points
+
+
+class IndicatorScenario:
+    """
+    Scénario de simulation superposé à une liste d'indicateurs de référence
+    
+    Le scénario ne copie pas les indicateurs : il ne stocke que les états de
+    complétion modifiés, indexés par identifiant d'indicateur, et lit les autres
+    valeurs dans la liste de référence. Plusieurs scénarios peuvent ainsi
+    partager les mêmes indicateurs.
+    """
+    __slots__ = ("base", "status_overrides", "percentage_overrides")
+    
+    def __init__(self, base):
+        self.base = base
+        self.status_overrides = {}
+        self.percentage_overrides = {}
+    
+    def __iter__(self):
+        return iter(self.base)
+    
+    def __len__(self):
+        return len(self.base)
+    
+    def get_completion_status(self, indicator):
+        """
+        Retourne le niveau de complétion de l'indicateur dans le scénario
+        """
+        return self.status_overrides.get(indicator.id, indicator.completion_status)
+    
+    def get_completion_percentage(self, indicator):
+        """
+        Retourne le pourcentage de complétion de l'indicateur dans le scénario
+        """
+        return self.percentage_overrides.get(indicator.id, indicator.completion_percentage)
+    
+    def set_completion_status(self, indicator, value):
+        """
+        Modifie le niveau de complétion de l'indicateur dans le scénario
+        """
+        if value == indicator.completion_status:
+            self.status_overrides.pop(indicator.id, None)
+        else:
+            self.status_overrides[indicator.id] = value
+    
+    def set_completion_percentage(self, indicator, value):
+        """
+        Modifie le pourcentage de complétion de l'indicateur dans le scénario
+        """
+        if value == indicator.completion_percentage:
+            self.percentage_overrides.pop(indicator.id, None)
+        else:
+            self.percentage_overrides[indicator.id] = value
+    
+    def iter_completion(self):
+        """
+        Parcourt les indicateurs avec leur état de complétion dans le scénario
         
-        return points
+        Returns:
+            iterator: Triplets (indicateur, niveau de complétion, pourcentage de complétion)
+        """
+        status_overrides = self.status_overrides
+        percentage_overrides = self.percentage_overrides
+        for indicator in self.base:
+            yield (
+                indicator,
+                status_overrides.get(indicator.id, indicator.completion_status),
+                percentage_overrides.get(indicator.id, indicator.completion_percentage)
+            )
     
-    def calculate_amount(self, nb_patients, nb_associates=None, point_value=7):
+    def reset(self):
         """
-        Calcule le montant en euros pour cet indicateur
+        Supprime toutes les modifications du scénario
         """
-        return self.calculate_points(nb_patients, nb_associates) * point_value
+        self.status_overrides.clear()
+        self.percentage_overrides.clear()
+
+
+class IndicatorCatalog:
+    """
+    Catalogue immuable des indicateurs ACI, stocké colonne par colonne
+    
+    Le catalogue ne contient que les données statiques (libellés, axes, points) ;
+    il est partagé par toutes les sessions. L'état de complétion propre à chaque
+    structure est conservé à part dans un IndicatorState.
+    """
+    __slots__ = (
+        "ids", "names", "descriptions", "type_indicator", "axis", "is_prerequisite",
+        "is_socle", "points_fixed", "points_variable", "reference_patients",
+        "max_level", "positions"
+    )
+    
+    def __init__(self, indicators):
+        indicators = list(indicators)
+        columns = {
+            "ids": tuple(indicator.id for indicator in indicators),
+            "names": tuple(indicator.name for indicator in indicators),
+            "descriptions": tuple(indicator.description for indicator in indicators),
+            "type_indicator": tuple(indicator.type_indicator for indicator in indicators),
+            "axis": np.array([indicator.axis for indicator in indicators], dtype=np.int8),
+            "is_prerequisite": np.array([bool(indicator.is_prerequisite) for indicator in indicators], dtype=bool),
+            "is_socle": np.array([indicator.type_indicator == "socle" for indicator in indicators], dtype=bool),
+            "points_fixed": np.array([indicator.points_fixed for indicator in indicators], dtype=np.float64),
+            "points_variable": np.array([indicator.points_variable for indicator in indicators], dtype=np.float64),
+            "reference_patients": np.array([indicator.reference_patients for indicator in indicators], dtype=np.float64),
+            "max_level": np.array([indicator.max_level for indicator in indicators], dtype=np.int8),
+        }
+        for name, column in columns.items():
+            if isinstance(column, np.ndarray):
+                column.setflags(write=False)
+            object.__setattr__(self, name, column)
+        object.__setattr__(self, "positions", {indicator_id: i for i, indicator_id in enumerate(columns["ids"])})
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("Le catalogue des indicateurs est immuable")
+    
+    def __setstate__(self, state):
+        # Restauration après sérialisation (calculs répartis sur plusieurs processus)
+        _, columns = state
+        for name, column in columns.items():
+            if isinstance(column, np.ndarray):
+                column.setflags(write=False)
+            object.__setattr__(self, name, column)
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    def matches(self, indicators):
+        """
+        Vérifie que des indicateurs ont les mêmes données statiques que le catalogue
+        """
+        if len(indicators) != len(self):
+            return False
+        
+        for i, indicator in enumerate(indicators):
+            if (indicator.id != self.ids[i]
+                    or indicator.name != self.names[i]
+                    or indicator.description != self.descriptions[i]
+                    or indicator.type_indicator != self.type_indicator[i]
+                    or indicator.axis != self.axis[i]
+                    or bool(indicator.is_prerequisite) != self.is_prerequisite[i]
+                    or indicator.points_fixed != self.points_fixed[i]
+                    or indicator.points_variable != self.points_variable[i]
+                    or indicator.reference_patients != self.reference_patients[i]
+                    or indicator.max_level != self.max_level[i]):
+                return False
+        
+        return True
+
+
+@lru_cache(maxsize=None)
+def get_indicator_catalog():
+    """
+    Retourne le catalogue des indicateurs ACI, partagé par toutes les sessions
+    """
+    return IndicatorCatalog(get_indicators())
+
+
+class IndicatorState:
+    """
+    État de complétion des indicateurs d'une structure
+    
+    Seuls deux vecteurs compacts (niveau et pourcentage de complétion) sont
+    propres à la structure ; les données statiques sont lues dans le catalogue
+    partagé. Le parcours de l'état produit des IndicatorView qui exposent la même
+    interface qu'un Indicator.
+    """
+    __slots__ = ("catalog", "status", "percentage")
+    
+    def __init__(self, catalog=None, status=None, percentage=None):
+        self.catalog = catalog if catalog is not None else get_indicator_catalog()
+        size = len(self.catalog)
+        self.status = np.zeros(size, dtype=np.int8) if status is None else np.asarray(status, dtype=np.int8)
+        # Pourcentages en flottants : un pourcentage fractionnaire (33.3) est conservé tel quel
+        self.percentage = (
+            np.zeros(size, dtype=np.float64) if percentage is None else np.asarray(percentage, dtype=np.float64)
+        )
+    
+    @classmethod
+    def from_indicators(cls, indicators):
+        """
+        Crée un état à partir d'une liste d'indicateurs
+        
+        Le catalogue partagé est utilisé lorsque les données statiques des
+        indicateurs y correspondent ; sinon un catalogue propre est construit.
+        """
+        indicators = list(indicators)
+        catalog = get_indicator_catalog()
+        if not catalog.matches(indicators):
+            catalog = IndicatorCatalog(indicators)
+        
+        return cls(
+            catalog,
+            [indicator.completion_status for indicator in indicators],
+            [indicator.completion_percentage for indicator in indicators]
+        )
+    
+    def __len__(self):
+        return len(self.catalog)
+    
+    def __iter__(self):
+        for i in range(len(self.catalog)):
+            yield IndicatorView(self, i)
+    
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.catalog)
+        if not 0 <= index < len(self.catalog):
+            raise IndexError(index)
+        return IndicatorView(self, index)
+    
+    def get(self, indicator_id):
+        """
+        Retourne la vue de l'indicateur correspondant à l'identifiant, ou None
+        """
+        index = self.catalog.positions.get(indicator_id)
+        return IndicatorView(self, index) if index is not None else None
+    
+    def copy(self):
+        """
+        Retourne une copie de l'état partageant le même catalogue
+        """
+        return IndicatorState(self.catalog, self.status.copy(), self.percentage.copy())
+    
+    def to_indicators(self):
+        """
+        Convertit l'état en une liste d'objets Indicator indépendants
+        """
+        indicators = []
+        for view in self:
+            indicator = Indicator(
+                id=view.id,
+                name=view.name,
+                description=view.description,
+                axis=view.axis,
+                type_indicator=view.type_indicator,
+                is_prerequisite=view.is_prerequisite,
+                points_fixed=view.points_fixed,
+                points_variable=view.points_variable,
+                reference_patients=view.reference_patients,
+                max_level=view.max_level
+            )
+            indicator.completion_status = view.completion_status
+            indicator.completion_percentage = view.completion_percentage
+            indicators.append(indicator)
+        return indicators
+
+
+class IndicatorView:
+    """
+    Vue d'un indicateur d'un IndicatorState, avec la même interface qu'un Indicator
+    
+    Les données statiques sont lues dans le catalogue ; l'état de complétion est
+    lu et écrit directement dans les vecteurs de l'état.
+    """
+    __slots__ = ("state", "index")
+    
+    def __init__(self, state, index):
+        self.state = state
+        self.index = index
+    
+    @property
+    def id(self):
+        return self.state.catalog.ids[self.index]
+    
+    @property
+    def name(self):
+        return self.state.catalog.names[self.index]
+    
+    @property
+    def description(self):
+        return self.state.catalog.descriptions[self.index]
+    
+    @property
+    def axis(self):
+        return int(self.state.catalog.axis[self.index])
+    
+    @property
+    def type_indicator(self):
+        return self.state.catalog.type_indicator[self.index]
+    
+    @property
+    def is_prerequisite(self):
+        return bool(self.state.catalog.is_prerequisite[self.index])
+    
+    @property
+    def points_fixed(self):
+        return _as_number(self.state.catalog.points_fixed[self.index])
+    
+    @property
+    def points_variable(self):
+        return _as_number(self.state.catalog.points_variable[self.index])
+    
+    @property
+    def reference_patients(self):
+        return _as_number(self.state.catalog.reference_patients[self.index])
+    
+    @property
+    def max_level(self):
+        return int(self.state.catalog.max_level[self.index])
+    
+    @property
+    def completion_status(self):
+        return int(self.state.status[self.index])
+    
+    @completion_status.setter
+    def completion_status(self, value):
+        self.state.status[self.index] = value
+    
+    @property
+    def completion_percentage(self):
+        return _as_number(self.state.percentage[self.index])
+    
+    @completion_percentage.setter
+    def completion_percentage(self, value):
+        self.state.percentage[self.index] = value
+    
+    # Même calcul que l'indicateur : les méthodes d'Indicator ne lisent que des
+    # attributs que la vue expose aussi
+    calculate_points = Indicator.calculate_points
+    calculate_amount = Indicator.calculate_amount
+
+
+def _as_number(value):
+    """
+    Convertit une valeur du catalogue en entier lorsqu'elle n'a pas de partie décimale
+    """
+    value = float(value)
+    return int(value) if value.is_integer() else value
 
 
 # Définition des indicateurs ACI basés sur le guide
@@ -0,0 +1,316 @@
+"""
+Schémas des enregistrements persistés (associés, charges, indicateurs) : validation et décodage
+
+Chaque modèle décrit ses champs dans une table déclarative. Chaque champ a :
+    - "name" : nom du champ (dans le JSON et dans l'objet) ;
+    - "kind" : type attendu ("string", "date" au format AAAA-MM-JJ, "integer",
+      "number", "boolean", "strings" pour une liste de chaînes, "weights" pour un
+      dictionnaire identifiant → poids positif) ;
+    - "required" : champ obligatoire (sinon, un champ absent prend la valeur
+      "default", None par défaut) ;
+    - "nullable" : la valeur null est acceptée (et remplacée par "default") ;
+    - "empty_default" : toute valeur vide (0, liste vide) est remplacée par "default" ;
+    - "min", "max" : bornes d'une valeur numérique ; "max_field" : champ
+      précédent servant de borne supérieure (niveau ≤ niveau maximal) ;
+    - "round" : un nombre validé est arrondi à l'entier le plus proche (un
+      décompte enregistré en flottant, 706.0, devient 706).
+
+La table est compilée une fois (compile_schema) en deux fonctions Python générées
+pour le modèle, qui créent les objets sans passer par leur constructeur :
+    - un décodage champ par champ, qui applique les valeurs par défaut et lève
+      SchemaError à la première valeur invalide, avec son emplacement exact, par
+      exemple « data/associates.json[12].profession : chaîne attendue, null reçu » ;
+    - un décodage des tableaux en une passe (decode_records) : les valeurs d'un
+      enregistrement sont lues en une opération (operator.itemgetter) et testées
+      par une seule condition générée, sans appel de fonction par champ. Un
+      enregistrement incomplet, invalide ou dont une valeur null doit être
+      remplacée est repris par le décodage champ par champ.
+La validation est toujours active : les fichiers JSON et l'import Excel passent
+par ces décodages.
+"""
+
+import json
+import re
+from datetime import date
+from functools import lru_cache
+from operator import itemgetter
+
+# Types acceptés, test de type (condition d'erreur, sur la valeur v) et message de chaque type de champ
+_KINDS = {
+    "string": ((str,), "type(v) is not str", "chaîne attendue"),
+    "date": ((str,), "type(v) is not str or not _is_date(v)", "date AAAA-MM-JJ attendue"),
+    "integer": ((int,), "type(v) is not int", "entier attendu"),
+    "number": ((int, float), "type(v) not in _NUMBERS or v != v", "nombre attendu"),
+    "boolean": ((bool,), "type(v) is not bool", "booléen attendu"),
+    "strings": ((list,), "type(v) is not list", "liste de chaînes attendue"),
+    "weights": ((dict,), "type(v) is not dict", "dictionnaire de poids attendu"),
+}
+
+# Types des nombres (les booléens sont refusés)
+_NUMBERS = frozenset((int, float))
+
+# Valeur décrivant un champ absent dans les erreurs
+_MISSING = object()
+
+class SchemaError(ValueError):
+    """
+    Erreur levée lorsqu'un enregistrement ne respecte pas son schéma
+    
+    Args:
+        location (str): Emplacement de la valeur invalide (fichier, rang, champ)
+        message (str): Description de l'erreur
+    """
+    
+    def __init__(self, location, message):
+        super().__init__(f"{location} : {message}")
+        self.location = location
+        self.message = message
+
+class RecordSchema:
+    """
+    Schéma compilé d'un modèle (voir compile_schema)
+    """
+    
+    __slots__ = ("cls", "fields", "label", "source", "_decode_records", "_decode_record")
+    
+    def __init__(self, cls, fields, label, source, decode_records, decode_record):
+        self.cls = cls
+        self.fields = fields
+        self.label = label
+        self.source = source
+        self._decode_records = decode_records
+        self._decode_record = decode_record
+    
+    def decode_records(self, records, path=None, cls=None):
+        """
+        Valide et décode un tableau d'enregistrements en une passe
+        
+        Args:
+            records (list): Enregistrements (dictionnaires issus du JSON)
+            path (str, optional): Origine des enregistrements, reprise dans les
+                erreurs (par exemple le chemin du fichier). Defaults to None (libellé du modèle).
+            cls (type, optional): Classe des objets créés. Defaults to None (classe du schéma).
+        
+        Returns:
+            list: Objets décodés
+        
+        Raises:
+            SchemaError: Première valeur invalide, avec son emplacement
+        """
+        path = path or self.label
+        if type(records) is not list:
+            raise SchemaError(path, f"tableau attendu, {_describe(records)} reçu")
+        return self._decode_records(records, cls or self.cls, path)
+    
+    def decode_record(self, data, path=None, cls=None):
+        """
+        Valide et décode un enregistrement (voir decode_records)
+        """
+        return self._decode_record(data, cls or self.cls, path or self.label)
+
+def compile_schema(cls, fields, label=None):
+    """
+    Compile la table des champs d'un modèle en fonctions de décodage
+    
+    Args:
+        cls (type): Classe du modèle (à __slots__ ; chaque attribut doit être décrit)
+        fields (tuple): Table des champs (voir la description du module)
+        label (str, optional): Libellé du modèle dans les erreurs. Defaults to None (nom de la classe).
+    
+    Returns:
+        RecordSchema: Schéma compilé
+    """
+    names = [field["name"] for field in fields]
+    if sorted(names) != sorted(cls.__slots__):
+        raise ValueError(f"Le schéma de {cls.__name__} doit décrire exactement ses attributs")
+    
+    lines = ["def decode_record(d, cls, path, i=None):", "    if type(d) is not dict:"]
+    lines += ["        _fail(path, i, None, 'objet attendu', d)", "    o = cls.__new__(cls)"]
+    for field in fields:
+        lines += ["    " + line for line in _field_lines(field, fields, names)]
+    lines += ["    return o", ""]
+    
+    # Décodage d'un tableau : une variable vK par champ, dans l'ordre de la table
+    variables = ", ".join(f"v{k}" for k in range(len(fields)))
+    lines += [
+        "def decode_records(records, cls, path):",
+        "    new = cls.__new__",
+        "    decoded = []",
+        "    append = decoded.append",
+        "    for i, d in enumerate(records):",
+        "        try:",
+        f"            {variables}, = _fetch(d)",
+    ]
+    
+    # Les tests natifs lèvent TypeError sur une valeur d'un autre type (null compris)
+    checks = []
+    for k, field in enumerate(fields):
+        lines += ["            " + line for line in _fast_lines(k, field, names, checks)]
+    lines += [
+        f"            invalid = {' or '.join(checks)}",
+        "        except (KeyError, TypeError, IndexError):",
+        "            invalid = True",
+        "        if invalid:",
+        "            append(decode_record(d, cls, path, i))",
+        "            continue",
+        "        o = new(cls)",
+    ]
+    lines += [f"        o.{field['name']} = {_value(f'v{k}', field)}" for k, field in enumerate(fields)]
+    lines += ["        append(o)", "    return decoded"]
+    
+    source = "\n".join(lines)
+    getter = itemgetter(*names)
+    namespace = {
+        "_MISSING": _MISSING, "_NUMBERS": _NUMBERS, "_fail": _fail, "_is_date": _is_date,
+        "_decode_weights": _decode_weights,
+        "_fetch": getter if len(names) > 1 else lambda record: (getter(record),),
+    }
+    exec(compile(source, f"<schema {cls.__name__}>", "exec"), namespace)
+    return RecordSchema(
+        cls, fields, label or cls.__name__, source, namespace["decode_records"], namespace["decode_record"]
+    )
+
+def _field_lines(field, fields, names):
+    """
+    Lignes du décodage champ par champ : lecture, valeur par défaut, type, bornes, affectation
+    """
+    name = field["name"]
+    _, condition, message = _KINDS[field["kind"]]
+    default = _literal(field.get("default"))
+    if not field.get("required") and not field.get("nullable") and field.get("default") is None:
+        raise ValueError(f"Le champ facultatif {name} doit accepter null ou avoir une valeur par défaut")
+    if field.get("round") and (field["kind"] != "number" or field.get("nullable")):
+        raise ValueError(f"Seul un champ numérique non nul peut être arrondi : {name}")
+    
+    def fail(message, location=repr(name), value="v"):
+        return f"    _fail(path, i, {location}, {message!r}, {value})"
+    
+    lines = ["try:", f"    v = d[{name!r}]", "except KeyError:"]
+    lines += [fail("champ obligatoire", value="_MISSING") if field.get("required") else f"    v = {default}"]
+    
+    # Une valeur par défaut passe les tests suivants
+    lines += ["if v is None:", f"    v = {default}"] if field.get("nullable") else []
+    lines += [f"{'elif' if field.get('nullable') else 'if'} {condition}:", fail(message)]
+    if "min" in field:
+        lines += [f"elif v < {field['min']!r}:", fail(f"valeur supérieure ou égale à {field['min']} attendue")]
+    if "max" in field:
+        lines += [f"elif v > {field['max']!r}:", fail(f"valeur inférieure ou égale à {field['max']} attendue")]
+    if "max_field" in field:
+        bound = field["max_field"]
+        if names.index(bound) > names.index(name) or next(f for f in fields if f["name"] == bound).get("nullable"):
+            raise ValueError(f"Le champ {bound} doit précéder le champ {name} et ne pas accepter null")
+        lines += [f"elif v > o.{bound}:", fail(f"valeur inférieure ou égale à {bound} attendue")]
+    if field["kind"] == "strings":
+        lines += [
+            "else:",
+            "    for k, item in enumerate(v):",
+            "        if type(item) is not str:",
+            "        " + fail("chaîne attendue", f"f'{name}[{{k}}]'", "item"),
+        ]
+    elif field["kind"] == "weights":
+        lines += ["else:", f"    v = _decode_weights(v, path, i, {name!r})"]
+    if field.get("empty_default"):
+        lines += ["if not v:", f"    v = {default}"]
+    if field.get("round"):
+        lines += ["v = round(v)"]
+    
+    lines.append(f"o.{name} = v")
+    return lines
+
+def _fast_lines(k, field, names, checks):
+    """
+    Tests du décodage d'un tableau pour un champ (valeur vK)
+    
+    Les conditions d'invalidité sont ajoutées à checks ; les tests qui lèvent
+    TypeError sur une valeur invalide sont retournés comme instructions. Un
+    enregistrement qui échoue est repris par le décodage champ par champ.
+    """
+    value = f"v{k}"
+    kind = field["kind"]
+    _, condition, _ = _KINDS[kind]
+    lines = []
+    if kind == "date":
+        # Type vérifié par _is_date (une valeur non hachable lève TypeError)
+        condition = "not _is_date(v)"
+    elif kind == "strings":
+        # Les éléments sont des chaînes : join lève TypeError sinon
+        lines.append(f"''.join({value})")
+    condition = re.sub(r"\bv\b", value, condition)
+    
+    # Une valeur null est acceptée par le test de type, mais lève TypeError dans les bornes
+    checks.append(f"({value} is not None and ({condition}))" if field.get("nullable") else f"({condition})")
+    if "min" in field:
+        checks.append(f"{value} < {field['min']!r}")
+    if "max" in field:
+        checks.append(f"{value} > {field['max']!r}")
+    if "max_field" in field:
+        checks.append(f"{value} > v{names.index(field['max_field'])}")
+    return lines
+
+def _value(variable, field):
+    """
+    Expression de la valeur affectée par le décodage d'un tableau (valeurs par défaut, poids)
+    """
+    default = _literal(field.get("default"))
+    value = variable
+    if field["kind"] == "weights":
+        value = f"_decode_weights({variable}, path, i, {field['name']!r})"
+    elif field.get("round"):
+        value = f"round({variable})"
+    if field.get("empty_default"):
+        # Une valeur vide (ou null) prend la valeur par défaut
+        return f"{value} or {default}" if value == variable else f"({value}) or {default}"
+    if field.get("nullable") and field.get("default") is not None:
+        return f"{default} if {variable} is None else {value}"
+    return value
+
+def _literal(value):
+    """
+    Expression Python d'une valeur par défaut (listes et dictionnaires recréés pour chaque objet)
+    """
+    if isinstance(value, (list, dict)):
+        if value:
+            raise ValueError("Seuls une liste ou un dictionnaire vides sont acceptés comme valeur par défaut")
+        return "[]" if isinstance(value, list) else "{}"
+    return repr(value)
+
+def _location(path, i, name):
+    location = path if i is None else f"{path}[{i}]"
+    return f"{location}.{name}" if name else location
+
+def _describe(value):
+    if value is _MISSING:
+        return "champ absent"
+    text = json.dumps(value, ensure_ascii=False, default=repr)
+    return text if len(text) <= 60 else text[:57] + "..."
+
+def _fail(path, i, name, message, value):
+    raise SchemaError(_location(path, i, name), f"{message}, {_describe(value)} reçu")
+
+@lru_cache(maxsize=4096)
+def _is_date(text):
+    """
+    Indique si un texte est une date valide au format AAAA-MM-JJ
+    
+    Les résultats sont mémoïsés, en nombre borné : les dates d'entrée et de début se
+    répètent d'un enregistrement à l'autre.
+    """
+    if type(text) is not str or len(text) != 10 or text[4] != "-" or text[7] != "-":
+        return False
+    try:
+        date.fromisoformat(text)
+    except ValueError:
+        return False
+    return True
+
+def _decode_weights(weights, path, i, name):
+    """
+    Valide un dictionnaire identifiant → poids et retourne les poids non nuls (en flottants)
+    """
+    decoded = {}
+    for key, weight in weights.items():
+        if type(weight) not in _NUMBERS or weight != weight or weight < 0:
+            _fail(path, i, f"{name}[{key!r}]", "poids positif attendu", weight)
+        if weight:
+            decoded[key] = float(weight)
+    return decoded
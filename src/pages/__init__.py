@@ -1,6 +1,15 @@
-# Import des modules de pages
-from src.pages import home
-from src.pages import indicators
-from src.pages import associates
-from src.pages import expenses
-from src.pages import dashboard
+# Les modules de pages sont importés à la demande : chaque page charge ses
+# dépendances (pandas, matplotlib) lors de son premier affichage uniquement.
+import importlib
+
+def load_page(name):
+    """
+    Importe et retourne le module de la page demandée
+    
+    Args:
+        name (str): Nom du module de la page (home, indicators, associates, expenses, dashboard)
+        
+    Returns:
+        module: Module de la page, exposant une fonction show()
+    """
+    return importlib.import_module(f"src.pages.{name}")
@@ -1,33 +1,34 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import uuid
 from datetime import datetime
 
 from src.models.associates import (
     Associate, get_professions, get_medical_specialities, 
-    get_roles, get_sample_associates
+    get_roles
 )
-from src.utils.data_manager import save_associates
+from src.utils.data_manager import get_repository, save_associates
 from src.utils.calculations import (
     get_total_patients_mt, get_total_medical_professions,
-    get_total_paramedical_professions, get_unique_professions,
-    format_currency
+    get_total_paramedical_professions, get_unique_professions, get_role_coverage
 )
+from src.utils.profiling import timed, timer
+from src.utils.edit_history import display_history_controls, get_history, snapshot_record
+from src.utils.record_index import get_session_index, paginate
 
+@timed("page.associates")
 def show():
     """
     Affiche la page de gestion des associés
     """
     st.markdown("<h1 class='main-header'>Gestion des Associés</h1>", unsafe_allow_html=True)
     
-    # Initialisation des associés s'ils n'existent pas dans la session
-    if 'associates' not in st.session_state:
-        st.session_state.associates = get_sample_associates()
+    # Récupération des associés (chargés au premier accès)
+    associates = get_repository().associates
     
-    # Récupération des associés
-    associates = st.session_state.associates
+    # Annulation et rétablissement des modifications de la session
+    display_history_controls("associates")
     
     # Onglets pour les différentes fonctionnalités
     tab1, tab2, tab3 = st.tabs(["Liste des associés", "Ajouter/Modifier un associé", "Statistiques"])
@@ -52,39 +53,46 @@ def display_associates_list(associates):
     """
     st.markdown("<h2 class='sub-header'>Liste des associés</h2>", unsafe_allow_html=True)
     
+    # Index des associés (profession, rôles, noms), maintenu lors des modifications
+    index = get_session_index(st.session_state, "associates")
+    
     # Filtres
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         # Filtre par profession
-        professions = ["Toutes"] + list(set(associate.profession for associate in associates))
+        professions = ["Toutes"] + index.values("profession")
         selected_profession = st.selectbox("Filtrer par profession", professions)
     
     with col2:
         # Filtre par rôle
-        all_roles = set()
-        for associate in associates:
-            all_roles.update(associate.roles)
-        
-        roles = ["Tous"] + list(all_roles)
+        roles = ["Tous"] + index.values("roles")
         selected_role = st.selectbox("Filtrer par rôle", roles)
     
-    # Filtrage des associés
-    filtered_associates = associates
-    
-    if selected_profession != "Toutes":
-        filtered_associates = [a for a in filtered_associates if a.profession == selected_profession]
-    
-    if selected_role != "Tous":
-        filtered_associates = [a for a in filtered_associates if selected_role in a.roles]
+    with col3:
+        # Recherche par début du nom ou du prénom
+        name_prefix = st.text_input("Rechercher un nom", placeholder="Nom ou prénom")
+    
+    # Filtrage des associés par les index
+    filtered_associates = index.search(
+        {
+            "profession": None if selected_profession == "Toutes" else selected_profession,
+            "roles": None if selected_role == "Tous" else selected_role
+        },
+        prefix=name_prefix
+    )
     
     # Affichage des associés
     if not filtered_associates:
         st.info("Aucun associé ne correspond aux critères de filtrage.")
     else:
+        # Seule la page affichée est mise en forme
+        page = st.session_state.get("associates_page", 1)
+        page_associates, page, nb_pages = paginate(filtered_associates, page)
+        
         # Création d'un DataFrame pour l'affichage
         associates_data = []
-        for associate in filtered_associates:
+        for associate in page_associates:
             associates_data.append({
                 "ID": associate.id,
                 "Nom": associate.last_name,
@@ -93,6 +101,8 @@ def display_associates_list(associates):
                 "Spécialité": associate.speciality or "",
                 "Patients MT": associate.patients_mt,
                 "Temps de présence": associate.presence_time,
+                "Entrée": associate.entry_date or "",
+                "Sortie": associate.exit_date or "",
                 "Rôles": ", ".join(associate.roles) if associate.roles else ""
             })
         
@@ -101,11 +111,19 @@ def display_associates_list(associates):
         # Affichage du DataFrame
         st.dataframe(df, use_container_width=True)
         
-        # Sélection d'un associé pour modification ou suppression
+        if nb_pages > 1:
+            # Page ramenée au nombre de pages (après un changement de filtre)
+            st.session_state.associates_page = page
+            st.number_input(
+                f"Page (sur {nb_pages}, {len(filtered_associates)} associés)",
+                min_value=1, max_value=nb_pages, key="associates_page"
+            )
+        
+        # Sélection d'un associé de la page pour modification ou suppression
         selected_associate_id = st.selectbox(
             "Sélectionner un associé pour modification ou suppression",
-            options=[a.id for a in filtered_associates],
-            format_func=lambda x: next((a.get_full_name() + " - " + a.profession) for a in filtered_associates if a.id == x)
+            options=[a.id for a in page_associates],
+            format_func=lambda x: index.get(x).get_full_name() + " - " + index.get(x).profession
         )
         
         col1, col2 = st.columns(2)
@@ -120,8 +138,8 @@ def display_associates_list(associates):
             if st.button("Supprimer l'associé sélectionné"):
                 # Confirmation de suppression
                 if st.checkbox("Confirmer la suppression"):
-                    # Suppression de l'associé
-                    st.session_state.associates = [a for a in st.session_state.associates if a.id != selected_associate_id]
+                    # Suppression de l'associé (liste de la session et index), annulable
+                    get_history(st.session_state, "associates").remove_record(index, selected_associate_id)
                     st.success("L'associé a été supprimé avec succès.")
                     st.rerun()
 
@@ -137,7 +155,7 @@ def add_edit_associate(associates):
     # Récupération de l'associé à éditer si on est en mode édition
     associate_to_edit = None
     if edit_mode:
-        associate_to_edit = next((a for a in associates if a.id == st.session_state.edit_associate_id), None)
+        associate_to_edit = get_session_index(st.session_state, "associates").get(st.session_state.edit_associate_id)
         
         if associate_to_edit:
             st.markdown(f"<h3 class='blue-text'>Modification de l'associé : {associate_to_edit.get_full_name()}</h3>", unsafe_allow_html=True)
@@ -221,6 +239,10 @@ def add_edit_associate(associates):
                 "Date d'entrée dans la SISA",
                 value=datetime.strptime(associate_to_edit.entry_date, "%Y-%m-%d").date() if edit_mode and associate_to_edit.entry_date else datetime.now().date()
             )
+            exit_date = st.date_input(
+                "Date de sortie de la SISA (optionnelle)",
+                value=datetime.strptime(associate_to_edit.exit_date, "%Y-%m-%d").date() if edit_mode and associate_to_edit.exit_date else None
+            )
         
         # Paramètres spécifiques
         st.markdown("<h4>Paramètres spécifiques</h4>", unsafe_allow_html=True)
@@ -282,11 +304,13 @@ def add_edit_associate(associates):
                 # Création ou mise à jour de l'associé
                 if edit_mode:
                     # Mise à jour de l'associé existant
+                    before = snapshot_record(associate_to_edit)
                     associate_to_edit.first_name = first_name
                     associate_to_edit.last_name = last_name
                     associate_to_edit.profession = profession
                     associate_to_edit.speciality = speciality
                     associate_to_edit.entry_date = entry_date.strftime("%Y-%m-%d")
+                    associate_to_edit.exit_date = exit_date.strftime("%Y-%m-%d") if exit_date else None
                     associate_to_edit.roles = selected_roles
                     associate_to_edit.patients_mt = patients_mt
                     associate_to_edit.presence_time = presence_time
@@ -294,6 +318,9 @@ def add_edit_associate(associates):
                     associate_to_edit.email = email
                     associate_to_edit.phone = phone
                     associate_to_edit.rpps = rpps
+                    get_history(st.session_state, "associates").update_record(
+                        get_session_index(st.session_state, "associates"), associate_to_edit, before
+                    )
                     
                     st.success("L'associé a été modifié avec succès.")
                     
@@ -315,11 +342,12 @@ def add_edit_associate(associates):
                         distribution_key=distribution_key,
                         email=email,
                         phone=phone,
-                        rpps=rpps
+                        rpps=rpps,
+                        exit_date=exit_date.strftime("%Y-%m-%d") if exit_date else None
                     )
                     
-                    # Ajout de l'associé à la liste
-                    st.session_state.associates.append(new_associate)
+                    # Ajout de l'associé à la liste (et à l'index), annulable
+                    get_history(st.session_state, "associates").add_record(get_session_index(st.session_state, "associates"), new_associate)
                     
                     st.success("L'associé a été ajouté avec succès.")
                 
@@ -339,6 +367,8 @@ def display_statistics(associates):
     """
     Affiche des statistiques sur les associés
     """
+    import matplotlib.pyplot as plt
+    
     st.markdown("<h2 class='sub-header'>Statistiques</h2>", unsafe_allow_html=True)
     
     if not associates:
@@ -374,51 +404,21 @@ def display_statistics(associates):
         # Graphique de répartition des professions
         st.markdown("<h3 class='blue-text'>Répartition des professions</h3>", unsafe_allow_html=True)
         
+        index = get_session_index(st.session_state, "associates")
         profession_counts = {}
         for profession in unique_professions:
-            profession_counts[profession] = len([a for a in associates if a.profession == profession])
+            profession_counts[profession] = index.count("profession", profession)
         
-        fig, ax = plt.subplots(figsize=(10, 6))
-        
-        # Tri des professions par nombre d'associés
-        sorted_professions = sorted(profession_counts.items(), key=lambda x: x[1], reverse=True)
-        professions = [p[0] for p in sorted_professions]
-        counts = [p[1] for p in sorted_professions]
-        
-        # Création du graphique
-        bars = ax.bar(professions, counts, color="#1E88E5")
-        
-        # Rotation des étiquettes pour une meilleure lisibilité
-        plt.xticks(rotation=45, ha='right')
-        
-        # Ajout des valeurs sur les barres
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, str(int(height)), ha='center', va='bottom')
-        
-        plt.tight_layout()
-        st.pyplot(fig)
-    
-    with col2:
-        # Graphique de répartition des patients médecin traitant
-        st.markdown("<h3 class='blue-text'>Patients médecin traitant par médecin</h3>", unsafe_allow_html=True)
-        
-        # Filtrage des médecins
-        doctors = [a for a in associates if a.profession.startswith("Médecin")]
-        
-        if doctors:
+        with timer("associates.chart.professions"):
             fig, ax = plt.subplots(figsize=(10, 6))
             
-            # Création du graphique
-            doctor_names = [f"{d.first_name} {d.last_name}" for d in doctors]
-            patient_counts = [d.patients_mt for d in doctors]
-            
-            # Tri des médecins par nombre de patients
-            sorted_indices = sorted(range(len(patient_counts)), key=lambda i: patient_counts[i], reverse=True)
-            doctor_names = [doctor_names[i] for i in sorted_indices]
-            patient_counts = [patient_counts[i] for i in sorted_indices]
+            # Tri des professions par nombre d'associés
+            sorted_professions = sorted(profession_counts.items(), key=lambda x: x[1], reverse=True)
+            professions = [p[0] for p in sorted_professions]
+            counts = [p[1] for p in sorted_professions]
             
-            bars = ax.bar(doctor_names, patient_counts, color="#42A5F5")
+            # Création du graphique
+            bars = ax.bar(professions, counts, color="#1E88E5")
             
             # Rotation des étiquettes pour une meilleure lisibilité
             plt.xticks(rotation=45, ha='right')
@@ -430,9 +430,63 @@ def display_statistics(associates):
             
             plt.tight_layout()
             st.pyplot(fig)
+    
+    with col2:
+        # Graphique de répartition des patients médecin traitant
+        st.markdown("<h3 class='blue-text'>Patients médecin traitant par médecin</h3>", unsafe_allow_html=True)
+        
+        # Filtrage des médecins
+        doctors = [a for a in associates if a.profession.startswith("Médecin")]
+        
+        if doctors:
+            with timer("associates.chart.doctor_patients"):
+                fig, ax = plt.subplots(figsize=(10, 6))
+                
+                # Création du graphique
+                doctor_names = [f"{d.first_name} {d.last_name}" for d in doctors]
+                patient_counts = [d.patients_mt for d in doctors]
+                
+                # Tri des médecins par nombre de patients
+                sorted_indices = sorted(range(len(patient_counts)), key=lambda i: patient_counts[i], reverse=True)
+                doctor_names = [doctor_names[i] for i in sorted_indices]
+                patient_counts = [patient_counts[i] for i in sorted_indices]
+                
+                bars = ax.bar(doctor_names, patient_counts, color="#42A5F5")
+                
+                # Rotation des étiquettes pour une meilleure lisibilité
+                plt.xticks(rotation=45, ha='right')
+                
+                # Ajout des valeurs sur les barres
+                for bar in bars:
+                    height = bar.get_height()
+                    ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, str(int(height)), ha='center', va='bottom')
+                
+                plt.tight_layout()
+                st.pyplot(fig)
         else:
             st.info("Aucun médecin n'a été ajouté.")
     
+    # Couverture des rôles dont dépendent des indicateurs ACI
+    st.markdown("<h3 class='blue-text'>Couverture des rôles ACI</h3>", unsafe_allow_html=True)
+    
+    coverage = get_role_coverage(associates, get_session_index(st.session_state, "associates"))
+    missing_roles = [item["role"] for item in coverage if not item["covered"]]
+    if missing_roles:
+        st.warning(f"Rôles non tenus : {', '.join(missing_roles)}.")
+    else:
+        st.success("Tous les rôles liés aux indicateurs ACI sont tenus.")
+    
+    coverage_df = pd.DataFrame([
+        {
+            "Rôle": item["role"],
+            "Indicateurs": ", ".join(item["indicators"]),
+            "Tenu": "Oui" if item["covered"] else "Non",
+            "Associés": ", ".join(associate.get_full_name() for associate in item["associates"])
+        }
+        for item in coverage
+    ])
+    st.dataframe(coverage_df, use_container_width=True, hide_index=True)
+    
     # Tableau récapitulatif
     st.markdown("<h3 class='blue-text'>Tableau récapitulatif</h3>", unsafe_allow_html=True)
     
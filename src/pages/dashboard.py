@@ -1,73 +1,102 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+import io
 from datetime import datetime
 
 from src.utils.calculations import (
     calculate_total_points, calculate_total_amount, calculate_points_by_axis,
     calculate_points_by_type, calculate_total_expenses, calculate_net_amount,
-    calculate_associate_distribution, calculate_expense_distribution,
-    calculate_associate_net_amount, format_currency, format_percentage,
-    get_total_patients_mt, has_ipa
+    calculate_expenses_by_category, format_cents, format_percentage,
+    get_total_patients_mt, has_ipa, BLENDED_METHODS
 )
-from src.utils.data_manager import export_to_excel, initialize_session_state
+from src.utils.data_manager import export_to_excel, get_repository
+from src.models.indicators import IndicatorScenario
+from src.models.expense_schedule import current_fiscal_year
+from src.utils.cashflow import PROJECTION_HORIZONS, project_cash_flow
+from src.utils.computation_graph import get_session_graph, trace_remuneration
+from src.utils.money import to_cents, to_euros
+from src.utils.reverse_solver import solve_distribution_keys, solve_distribution_methods
+from src.utils.profiling import timed, timer
 
+# Libellés des critères de la répartition mixte
+BLENDED_METHOD_LABELS = {
+    "equal": "Répartition égale",
+    "presence_time": "Temps de présence",
+    "distribution_key": "Clé de répartition",
+    "patients_mt": "Patients médecin traitant",
+    "medical_only": "Professions médicales"
+}
+
+@timed("page.dashboard")
 def show():
     """
     Affiche le tableau de bord
     """
     st.markdown("<h1 class='main-header'>Tableau de Bord</h1>", unsafe_allow_html=True)
     
-    # Initialisation des données de session
-    initialize_session_state()
+    # Récupération des données (chargées au premier accès)
+    repository = get_repository()
+    indicators = repository.indicators
+    associates = repository.associates
+    expenses = repository.expenses
+    
+    # Exercice sur lequel les charges sont proratisées (choisi dans la barre latérale)
+    fiscal_year = st.session_state.get("fiscal_year", current_fiscal_year())
     
-    # Récupération des données
-    indicators = st.session_state.indicators
-    associates = st.session_state.associates
-    expenses = st.session_state.expenses
+    # Graphe de calcul de la page : seuls les calculs touchés par une modification sont refaits
+    graph = get_session_graph(st.session_state, "dashboard")
+    graph.set_inputs(
+        indicators=indicators, associates=associates, expenses=expenses,
+        counts=repository.indicator_counts, fiscal_year=fiscal_year
+    )
     
     # Onglets pour les différentes fonctionnalités
-    tab1, tab2, tab3, tab4 = st.tabs(["Synthèse", "Rémunération par associé", "Simulation", "Export"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+        "Synthèse", "Rémunération par associé", "Objectifs de rémunération", "Trésorerie", "Simulation", "Export"
+    ])
     
     with tab1:
-        display_summary(indicators, associates, expenses)
+        display_summary(indicators, associates, expenses, fiscal_year, graph)
     
     with tab2:
-        display_associate_distribution(indicators, associates, expenses)
+        display_associate_distribution(indicators, associates, expenses, fiscal_year, graph)
     
     with tab3:
-        display_simulation(indicators, associates, expenses)
+        display_net_targets(associates, expenses, fiscal_year, graph)
     
     with tab4:
-        display_export(indicators, associates, expenses)
+        display_cash_flow(indicators, associates, expenses, fiscal_year, graph)
+    
+    with tab5:
+        display_simulation(indicators, associates, expenses, fiscal_year)
+    
+    with tab6:
+        display_export(indicators, associates, expenses, fiscal_year, graph)
 
-def display_summary(indicators, associates, expenses):
+def display_summary(indicators, associates, expenses, fiscal_year, graph):
     """
     Affiche une synthèse des rémunérations et des charges
     """
-    st.markdown("<h2 class='sub-header'>Synthèse</h2>", unsafe_allow_html=True)
+    import matplotlib.pyplot as plt
     
-    # Calcul du nombre total de patients médecin traitant
-    nb_patients = get_total_patients_mt(associates)
+    st.markdown("<h2 class='sub-header'>Synthèse</h2>", unsafe_allow_html=True)
     
-    # Vérification de la présence d'un IPA
-    has_ipa_in_structure = has_ipa(associates)
+    # Nombre total de patients médecin traitant et présence d'un IPA
+    nb_patients = graph.get("nb_patients")
+    has_ipa_in_structure = graph.get("has_ipa")
     
-    # Calcul des points et du montant total
-    total_points = calculate_total_points(indicators, nb_patients, len(associates))
-    total_amount = calculate_total_amount(indicators, nb_patients, len(associates))
+    # Points et montant total
+    total_points = graph.get("total_points")
+    total_amount = graph.get("total_amount")
     
-    # Calcul des points par axe et par type
-    points_by_axis = calculate_points_by_axis(indicators, nb_patients, len(associates))
-    points_by_type = calculate_points_by_type(indicators, nb_patients, len(associates))
+    # Points par axe et par type
+    points_by_axis = graph.get("points_by_axis")
+    points_by_type = graph.get("points_by_type")
     
-    # Calcul du montant total des charges
-    total_expenses_amount = calculate_total_expenses(expenses)
-    
-    # Calcul du montant net
-    net_amount = calculate_net_amount(total_amount, total_expenses_amount)
+    # Montant total des charges de l'exercice et montant net
+    total_expenses_amount = graph.get("total_expenses")
+    net_amount = graph.get("net_amount")
     
     # Affichage des informations générales
     st.markdown("<h3 class='blue-text'>Informations générales</h3>", unsafe_allow_html=True)
@@ -89,13 +118,13 @@ def display_summary(indicators, associates, expenses):
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        st.metric("Rémunération ACI", format_currency(total_amount))
+        st.metric("Rémunération ACI", format_cents(total_amount))
     
     with col2:
-        st.metric("Charges totales", format_currency(total_expenses_amount))
+        st.metric(f"Charges totales {fiscal_year}", format_cents(total_expenses_amount))
     
     with col3:
-        st.metric("Montant net", format_currency(net_amount))
+        st.metric("Montant net", format_cents(net_amount))
     
     # Graphique de répartition des points par axe
     st.markdown("<h3 class='blue-text'>Répartition des points par axe</h3>", unsafe_allow_html=True)
@@ -103,120 +132,134 @@ def display_summary(indicators, associates, expenses):
     col1, col2 = st.columns(2)
     
     with col1:
-        fig, ax = plt.subplots(figsize=(6, 4))
-        axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
-        values = [points_by_axis[1], points_by_axis[2], points_by_axis[3]]
-        colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
-        
-        ax.bar(axes, values, color=colors)
-        ax.set_title("Répartition des points par axe")
-        ax.set_ylabel("Points")
-        
-        # Ajout des valeurs sur les barres
-        for i, v in enumerate(values):
-            ax.text(i, v + 5, str(int(v)), ha='center')
-        
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        st.pyplot(fig)
+        with timer("dashboard.chart.points_by_axis"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
+            values = [points_by_axis[1], points_by_axis[2], points_by_axis[3]]
+            colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
+            
+            bars = ax.bar(axes, values, color=colors)
+            ax.set_title("Répartition des points par axe")
+            ax.set_ylabel("Points")
+            
+            # Ajout des valeurs sur les barres (décalage en points : un décalage en
+            # unités de données agrandit démesurément l'image quand toutes les valeurs sont nulles)
+            ax.bar_label(bars, labels=[str(int(v)) for v in values], padding=3)
+            
+            plt.xticks(rotation=45, ha='right')
+            plt.tight_layout()
+            st.pyplot(fig)
     
     with col2:
         # Graphique de répartition des points par type
-        fig, ax = plt.subplots(figsize=(6, 4))
-        types = ["Indicateurs socles", "Indicateurs optionnels"]
-        values = [points_by_type["socle"], points_by_type["optionnel"]]
-        colors = ["#1E88E5", "#42A5F5"]
-        
-        # Vérification que les valeurs ne sont pas NaN
-        if not np.isnan(values).any() and sum(values) > 0:
-            ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-            ax.set_title("Répartition des points par type d'indicateur")
-        else:
-            ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
-                   horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-            ax.axis('off')
-        
-        st.pyplot(fig)
+        with timer("dashboard.chart.points_by_type"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            types = ["Indicateurs socles", "Indicateurs optionnels"]
+            values = [points_by_type["socle"], points_by_type["optionnel"]]
+            colors = ["#1E88E5", "#42A5F5"]
+            
+            # Vérification que les valeurs ne sont pas NaN
+            if not np.isnan(values).any() and sum(values) > 0:
+                ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
+                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+                ax.set_title("Répartition des points par type d'indicateur")
+            else:
+                ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
+                       horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+                ax.axis('off')
+            
+            st.pyplot(fig)
     
     # Graphique de répartition des charges par catégorie
     st.markdown("<h3 class='blue-text'>Répartition des charges par catégorie</h3>", unsafe_allow_html=True)
     
     if expenses:
         # Calcul de la répartition des charges par catégorie
-        expenses_by_category = {}
-        for expense in expenses:
-            if expense.category not in expenses_by_category:
-                expenses_by_category[expense.category] = 0
-            expenses_by_category[expense.category] += expense.get_annual_amount()
-        
-        fig, ax = plt.subplots(figsize=(8, 5))
-        
-        # Tri des catégories par montant
-        sorted_categories = sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)
-        categories = [c[0] for c in sorted_categories]
-        amounts = [c[1] for c in sorted_categories]
-        
-        # Création du graphique
-        bars = ax.bar(categories, amounts, color="#1E88E5")
-        
-        # Rotation des étiquettes pour une meilleure lisibilité
-        plt.xticks(rotation=45, ha='right')
+        expenses_by_category = calculate_expenses_by_category(expenses, fiscal_year)
         
-        # Ajout des valeurs sur les barres
-        for bar in bars:
-            height = bar.get_height()
-            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_currency(height), ha='center', va='bottom')
-        
-        plt.tight_layout()
-        st.pyplot(fig)
+        with timer("dashboard.chart.expenses_by_category"):
+            fig, ax = plt.subplots(figsize=(8, 5))
+            
+            # Tri des catégories par montant (en centimes)
+            sorted_categories = sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)
+            categories = [c[0] for c in sorted_categories]
+            amounts = [c[1] for c in sorted_categories]
+            
+            # Création du graphique (hauteurs en euros)
+            bars = ax.bar(categories, to_euros(np.array(amounts, dtype=np.int64)), color="#1E88E5")
+            
+            # Rotation des étiquettes pour une meilleure lisibilité
+            plt.xticks(rotation=45, ha='right')
+            
+            # Ajout des valeurs sur les barres
+            for bar, amount in zip(bars, amounts):
+                height = bar.get_height()
+                ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_cents(amount), ha='center', va='bottom')
+            
+            plt.tight_layout()
+            st.pyplot(fig)
     else:
         st.info("Aucune charge n'a été ajoutée.")
 
-def display_associate_distribution(indicators, associates, expenses):
+def display_associate_distribution(indicators, associates, expenses, fiscal_year, graph):
     """
     Affiche la répartition des rémunérations par associé
     """
+    import matplotlib.pyplot as plt
+    
     st.markdown("<h2 class='sub-header'>Rémunération par associé</h2>", unsafe_allow_html=True)
     
     if not associates:
         st.info("Aucun associé n'a été ajouté.")
         return
     
-    # Calcul du nombre total de patients médecin traitant
-    nb_patients = get_total_patients_mt(associates)
-    
-    # Calcul des points et du montant total
-    total_points = calculate_total_points(indicators, nb_patients, len(associates))
-    total_amount = calculate_total_amount(indicators, nb_patients, len(associates))
-    
-    # Calcul du montant total des charges
-    total_expenses_amount = calculate_total_expenses(expenses)
+    # Montant total des rémunérations
+    total_amount = graph.get("total_amount")
     
     # Calcul de la répartition des rémunérations par associé
     distribution_method = st.selectbox(
         "Méthode de répartition des rémunérations",
-        options=["equal", "presence_time", "distribution_key"],
+        options=["equal", "presence_time", "distribution_key", "blended", "shapley"],
         format_func=lambda x: {
             "equal": "Répartition égale entre tous les associés",
             "presence_time": "Répartition au prorata du temps de présence",
-            "distribution_key": "Répartition selon la clé de répartition définie pour chaque associé"
-        }[x]
+            "distribution_key": "Répartition selon la clé de répartition définie pour chaque associé",
+            "blended": "Répartition mixte (pondération de plusieurs critères)",
+            "shapley": "Répartition selon la contribution de chaque associé au montant ACI (valeur de Shapley)"
+        }[x],
+        key="remuneration_distribution_method"
     )
     
-    associate_distribution = calculate_associate_distribution(total_amount, associates, distribution_method)
+    # Poids de chaque critère de la répartition mixte : les parts de chaque critère sont
+    # mémoïsées, un changement de poids ne refait que leur combinaison
+    method_weights = None
+    if distribution_method == "blended":
+        method_weights = {}
+        for column, method in zip(st.columns(len(BLENDED_METHODS)), BLENDED_METHODS):
+            with column:
+                method_weights[method] = st.slider(
+                    BLENDED_METHOD_LABELS[method],
+                    min_value=0,
+                    max_value=100,
+                    value=100 if method == "equal" else 0,
+                    key=f"blend_weight_{method}"
+                )
     
-    # Calcul de la répartition des charges par associé
-    expense_distributions = []
-    for expense in expenses:
-        expense_distributions.append(calculate_expense_distribution(expense, associates))
+    # Parts pondérées par la durée de présence dans la SISA pendant l'exercice (arrivées et départs en cours d'année)
+    prorate_membership = st.checkbox(
+        f"Proratiser selon les dates d'entrée et de sortie ({fiscal_year})",
+        help="Chaque part est pondérée par le nombre de jours de présence dans la SISA pendant l'exercice."
+    )
     
-    # Calcul du montant net par associé
-    associate_net_amounts = {}
-    for associate in associates:
-        associate_net_amounts[associate.id] = calculate_associate_net_amount(
-            associate.id, associate_distribution, expense_distributions
-        )
+    graph.set_inputs(
+        distribution_method=distribution_method,
+        method_weights=method_weights,
+        campaign_year=fiscal_year if prorate_membership else None
+    )
+    associate_distribution = graph.get("associate_distribution")
+    
+    # Montant net par associé (rémunération moins charges réparties)
+    associate_net_amounts = graph.get("net_amounts")
     
     # Création d'un DataFrame pour l'affichage
     associates_data = []
@@ -236,63 +279,317 @@ def display_associate_distribution(indicators, associates, expenses):
     # Tri du DataFrame par rémunération brute
     df = df.sort_values(by="Rémunération brute", ascending=False)
     
+    # Montants des graphiques, en centimes (avant formatage)
+    gross_amounts = df["Rémunération brute"].tolist()
+    net_amounts = df["Rémunération nette"].tolist()
+    
     # Formatage des colonnes
-    df["Rémunération brute"] = df["Rémunération brute"].apply(format_currency)
-    df["Charges"] = df["Charges"].apply(format_currency)
-    df["Rémunération nette"] = df["Rémunération nette"].apply(format_currency)
+    df["Rémunération brute"] = df["Rémunération brute"].apply(format_cents)
+    df["Charges"] = df["Charges"].apply(format_cents)
+    df["Rémunération nette"] = df["Rémunération nette"].apply(format_cents)
     df["Pourcentage"] = df["Pourcentage"].apply(lambda x: f"{x:.2f}%")
     
     # Affichage du DataFrame
     st.dataframe(df, use_container_width=True)
     
+    if distribution_method == "shapley":
+        display_shapley_values(associates, graph.get("shapley_values"))
+    
     # Graphique de répartition des rémunérations par associé
     st.markdown("<h3 class='blue-text'>Répartition des rémunérations par associé</h3>", unsafe_allow_html=True)
     
-    fig, ax = plt.subplots(figsize=(8, 5))
+    with timer("dashboard.chart.gross_by_associate"):
+        fig, ax = plt.subplots(figsize=(8, 5))
+        
+        # Création du graphique (hauteurs en euros)
+        associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
+        
+        bars = ax.bar(associate_names, to_euros(np.array(gross_amounts, dtype=np.int64)), color="#1E88E5")
+        
+        # Rotation des étiquettes pour une meilleure lisibilité
+        plt.xticks(rotation=45, ha='right')
+        
+        # Ajout des valeurs sur les barres
+        for bar, amount in zip(bars, gross_amounts):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_cents(amount), ha='center', va='bottom')
+        
+        plt.tight_layout()
+        st.pyplot(fig)
+    
+    # Graphique de répartition des rémunérations nettes par associé
+    st.markdown("<h3 class='blue-text'>Répartition des rémunérations nettes par associé</h3>", unsafe_allow_html=True)
+    
+    with timer("dashboard.chart.net_by_associate"):
+        fig, ax = plt.subplots(figsize=(8, 5))
+        
+        # Création du graphique (hauteurs en euros)
+        associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
+        
+        bars = ax.bar(associate_names, to_euros(np.array(net_amounts, dtype=np.int64)), color="#42A5F5")
+        
+        # Rotation des étiquettes pour une meilleure lisibilité
+        plt.xticks(rotation=45, ha='right')
+        
+        # Ajout des valeurs sur les barres
+        for bar, amount in zip(bars, net_amounts):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_cents(amount), ha='center', va='bottom')
+        
+        plt.tight_layout()
+        st.pyplot(fig)
+
+def display_shapley_values(associates, shapley_values):
+    """
+    Affiche la contribution de chaque associé au montant ACI et la précision de son estimation
+    """
+    if shapley_values.exact:
+        st.caption("Contributions calculées exactement, sur toutes les coalitions d'associés.")
+    else:
+        status = "convergée" if shapley_values.converged else "non convergée (nombre maximal de permutations atteint)"
+        st.caption(
+            f"Contributions estimées sur {shapley_values.nb_permutations} ordres d'arrivée des associés "
+            f"tirés au hasard : estimation {status}."
+        )
+    
+    with st.expander("Contribution de chaque associé au montant ACI"):
+        contributions = shapley_values.as_dict()
+        errors = dict(zip(shapley_values.associate_ids, shapley_values.standard_errors.tolist()))
+        rows = []
+        for associate in associates:
+            row = {
+                "Associé": f"{associate.first_name} {associate.last_name}",
+                "Contribution": format_cents(contributions[associate.id])
+            }
+            if not shapley_values.exact:
+                row["Erreur-type"] = format_cents(errors[associate.id])
+            rows.append(row)
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+        
+        if shapley_values.history:
+            st.line_chart(
+                pd.DataFrame(shapley_values.history, columns=["Permutations", "Plus grande erreur-type"]),
+                x="Permutations", y="Plus grande erreur-type"
+            )
+
+def display_net_targets(associates, expenses, fiscal_year, graph):
+    """
+    Affiche le calcul inverse : clés de répartition ou combinaison de méthodes
+    atteignant les montants nets visés
+    """
+    st.markdown("<h2 class='sub-header'>Objectifs de rémunération</h2>", unsafe_allow_html=True)
+    
+    if not associates:
+        st.info("Aucun associé n'a été ajouté.")
+        return
     
-    # Création du graphique
-    associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
-    amounts = [float(a["Rémunération brute"].replace(" €", "").replace(",", ".")) for _, a in df.iterrows()]
+    total_amount = graph.get("total_amount")
+    net_amount = graph.get("net_amount")
+    current_net_amounts = graph.get("net_amounts")
+    names = {associate.id: associate.get_full_name() for associate in associates}
     
-    bars = ax.bar(associate_names, amounts, color="#1E88E5")
+    unknown = st.radio(
+        "Paramètres recherchés",
+        options=["distribution_key", "methods"],
+        format_func=lambda x: {
+            "distribution_key": "Clés de répartition des associés",
+            "methods": "Combinaison des méthodes de répartition"
+        }[x],
+        horizontal=True
+    )
     
-    # Rotation des étiquettes pour une meilleure lisibilité
-    plt.xticks(rotation=45, ha='right')
+    # Montants nets visés (curseurs) et plancher commun aux autres associés
+    target_ids = st.multiselect(
+        "Associés dont le montant net est visé",
+        options=list(names),
+        format_func=lambda x: names[x]
+    )
     
-    # Ajout des valeurs sur les barres
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_currency(height), ha='center', va='bottom')
+    # Curseurs en euros, convertis en centimes pour le calcul inverse
+    slider_max = max(int(to_euros(net_amount)), 1)
+    step = max(slider_max // 200, 1)
+    targets = {}
+    for associate_id in target_ids:
+        targets[associate_id] = st.slider(
+            f"Montant net visé pour {names[associate_id]}",
+            min_value=0,
+            max_value=slider_max,
+            value=min(max(int(to_euros(current_net_amounts[associate_id])), 0), slider_max),
+            step=step,
+            key=f"net_target_{associate_id}"
+        )
     
-    plt.tight_layout()
-    st.pyplot(fig)
+    floor = st.slider(
+        "Montant net minimal des autres associés",
+        min_value=0,
+        max_value=max(slider_max // len(associates), 1),
+        value=0,
+        step=max(step // 10, 1),
+        help="Plancher appliqué aux associés sans montant visé (0 : aucun plancher)."
+    )
+    targets = {associate_id: to_cents(target) for associate_id, target in targets.items()}
+    floors = {associate.id: to_cents(floor) for associate in associates if floor > 0 and associate.id not in targets}
     
-    # Graphique de répartition des rémunérations nettes par associé
-    st.markdown("<h3 class='blue-text'>Répartition des rémunérations nettes par associé</h3>", unsafe_allow_html=True)
+    if unknown == "distribution_key":
+        solution = solve_distribution_keys(total_amount, associates, expenses, targets, floors, fiscal_year)
+    else:
+        # Répartition en place : méthode choisie ou poids de la répartition mixte
+        current_method = graph.get("distribution_method")
+        solution = solve_distribution_methods(
+            total_amount, associates, expenses, targets, floors, fiscal_year,
+            reference_weights=graph.get("method_weights") if current_method == "blended" else {current_method: 1.0}
+        )
+    
+    if solution["status"] != "optimal":
+        st.error("Aucune répartition ne respecte les montants minimaux : leur somme dépasse le montant net à répartir.")
+        return
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.metric("Montant net à répartir", format_cents(net_amount))
+    
+    with col2:
+        st.metric("Écart total aux montants visés", format_cents(solution["deviation"]))
+    
+    if unknown == "methods":
+        st.dataframe(pd.DataFrame([
+            {"Méthode": BLENDED_METHOD_LABELS.get(method, method), "Part du montant": format_percentage(weight)}
+            for method, weight in solution["method_weights"].items()
+        ]), hide_index=True, use_container_width=True)
+        
+        st.button(
+            "Appliquer cette combinaison à la répartition mixte",
+            on_click=apply_method_weights,
+            args=(solution["method_weights"],),
+            help="Sélectionne la répartition mixte dans l'onglet « Rémunération par associé » avec ces poids."
+        )
+    
+    rows = []
+    for associate in associates:
+        row = {
+            "Associé": names[associate.id],
+            "Montant net actuel": format_cents(current_net_amounts[associate.id]),
+            "Montant visé": format_cents(targets[associate.id]) if associate.id in targets else "",
+            "Montant net obtenu": format_cents(solution["net_amounts"][associate.id])
+        }
+        if unknown == "distribution_key":
+            row["Clé de répartition"] = f"{solution['distribution_keys'][associate.id]:.3f}"
+        rows.append(row)
+    
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    
+    if unknown == "distribution_key":
+        st.caption("Clés relatives : la plus grande vaut 1. Les charges réparties selon la clé suivent les nouvelles clés.")
+
+def apply_method_weights(method_weights):
+    """
+    Reporte des poids de méthodes sur les curseurs de la répartition mixte
+    
+    Args:
+        method_weights (dict): Part du montant attribuée à chaque méthode
+    """
+    st.session_state.remuneration_distribution_method = "blended"
+    for method in BLENDED_METHODS:
+        st.session_state[f"blend_weight_{method}"] = int(round(method_weights.get(method, 0) * 100))
+
+def display_cash_flow(indicators, associates, expenses, fiscal_year, graph):
+    """
+    Affiche la projection mensuelle de trésorerie sur plusieurs exercices
+    """
+    import matplotlib.pyplot as plt
+    
+    st.markdown("<h2 class='sub-header'>Projection de trésorerie</h2>", unsafe_allow_html=True)
+    
+    if not associates:
+        st.info("Aucun associé n'a été ajouté.")
+        return
+    
+    # Rémunération ACI de l'exercice, reconduite sur tout l'horizon
+    total_amount = graph.get("total_amount")
+    
+    # Répartition de l'onglet « Rémunération par associé » (méthode et poids du graphe),
+    # proratisée pour chaque exercice projeté
+    distribution_method = graph.get("distribution_method")
+    method_weights = graph.get("method_weights")
+    custom_weights = None
+    if distribution_method == "shapley":
+        distribution_method = "custom"
+        custom_weights = graph.get("shapley_values").distribution_weights()
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        horizon_years = st.selectbox("Horizon (exercices)", options=PROJECTION_HORIZONS, index=PROJECTION_HORIZONS.index(5))
+    
+    with col2:
+        previous_balance = st.checkbox(
+            f"Solde {fiscal_year - 1} perçu en {fiscal_year}", value=True,
+            help="Décocher pour une structure dont le premier exercice ACI est l'exercice choisi."
+        )
     
-    fig, ax = plt.subplots(figsize=(8, 5))
+    st.write(
+        "Avance de l'exercice N versée pendant l'exercice N, solde versé pendant l'exercice N+1 ; "
+        f"rémunération annuelle de {format_cents(total_amount)} reconduite chaque exercice. "
+        "Chaque versement est réparti selon la méthode de l'onglet « Rémunération par associé », "
+        "au prorata de la présence de chaque associé pendant l'exercice au titre duquel il est versé."
+    )
     
-    # Création du graphique
-    associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
-    amounts = [float(a["Rémunération nette"].replace(" €", "").replace(",", ".")) for _, a in df.iterrows()]
+    projection = project_cash_flow(
+        tuple(associates), tuple(expenses), int(total_amount), int(fiscal_year), int(horizon_years),
+        distribution_method, None if previous_balance else 0,
+        None if method_weights is None else tuple(method_weights.items()),
+        None if custom_weights is None else tuple(custom_weights.items())
+    )
     
-    bars = ax.bar(associate_names, amounts, color="#42A5F5")
+    structure_inflows = projection.structure_inflows()
+    structure_outflows = projection.structure_outflows()
+    structure_balance = projection.structure_balance()
     
-    # Rotation des étiquettes pour une meilleure lisibilité
-    plt.xticks(rotation=45, ha='right')
+    col1, col2, col3 = st.columns(3)
     
-    # Ajout des valeurs sur les barres
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_currency(height), ha='center', va='bottom')
+    with col1:
+        st.metric("Encaissements", format_cents(int(structure_inflows.sum())))
     
-    plt.tight_layout()
-    st.pyplot(fig)
+    with col2:
+        st.metric("Décaissements", format_cents(int(structure_outflows.sum())))
+    
+    with col3:
+        st.metric("Solde cumulé final", format_cents(int(structure_balance[-1])))
+    
+    # Graphique des flux mensuels et du solde cumulé de la structure
+    with timer("dashboard.chart.cash_flow"):
+        fig, ax = plt.subplots(figsize=(10, 5))
+        dates = projection.months.astype("datetime64[D]").astype(object)
+        
+        ax.bar(dates, to_euros(structure_inflows), width=20, color="#1E88E5", label="Encaissements")
+        ax.bar(dates, -to_euros(structure_outflows), width=20, color="#90CAF9", label="Décaissements")
+        ax.plot(dates, to_euros(structure_balance), color="#0D47A1", label="Solde cumulé")
+        ax.axhline(0, color="grey", linewidth=0.5)
+        ax.set_ylabel("Montant (€)")
+        ax.legend()
+        
+        plt.xticks(rotation=45, ha='right')
+        plt.tight_layout()
+        st.pyplot(fig)
+    
+    # Solde cumulé de chaque associé à la fin de chaque exercice
+    st.markdown("<h3 class='blue-text'>Solde cumulé par associé en fin d'exercice</h3>", unsafe_allow_html=True)
+    
+    years = [str(fiscal_year + year) for year in range(horizon_years)]
+    df = pd.DataFrame(projection.year_end_balance().T, columns=years)
+    df.insert(0, "Associé", [associate.get_full_name() for associate in associates])
+    for year in years:
+        df[year] = df[year].apply(format_cents)
+    
+    st.dataframe(df, hide_index=True, use_container_width=True)
 
-def display_simulation(indicators, associates, expenses):
+def display_simulation(indicators, associates, expenses, fiscal_year):
     """
     Affiche une simulation interactive
     """
+    import matplotlib.pyplot as plt
+    
     st.markdown("<h2 class='sub-header'>Simulation</h2>", unsafe_allow_html=True)
     
     if not associates:
@@ -319,17 +616,15 @@ def display_simulation(indicators, associates, expenses):
     # Simulation des indicateurs
     st.markdown("<h3 class='blue-text'>Simulation des indicateurs</h3>", unsafe_allow_html=True)
     
-    # Création d'une copie des indicateurs pour la simulation
-    sim_indicators = []
-    for indicator in indicators:
-        sim_indicator = type('', (), {})()
-        for attr in dir(indicator):
-            if not attr.startswith('__') and not callable(getattr(indicator, attr)):
-                setattr(sim_indicator, attr, getattr(indicator, attr))
-        sim_indicators.append(sim_indicator)
+    # Nombres saisis pour les règles propres aux indicateurs (protocoles, missions, stages)
+    counts = get_repository().indicator_counts
+    
+    # Scénario de simulation : seules les valeurs modifiées sont stockées,
+    # les indicateurs de la session ne sont ni copiés ni modifiés
+    scenario = IndicatorScenario(indicators)
     
     # Affichage des indicateurs pour simulation
-    for i, indicator in enumerate(sim_indicators):
+    for i, indicator in enumerate(indicators):
         col1, col2 = st.columns([3, 1])
         
         with col1:
@@ -338,41 +633,43 @@ def display_simulation(indicators, associates, expenses):
         with col2:
             if indicator.max_level > 1:
                 # Indicateur avec plusieurs niveaux
-                indicator.completion_status = st.selectbox(
+                scenario.set_completion_status(indicator, st.selectbox(
                     f"Niveau de complétion",
                     options=list(range(indicator.max_level + 1)),
                     index=indicator.completion_status,
                     key=f"sim_completion_status_{i}",
                     format_func=lambda x: f"Niveau {x}" if x > 0 else "Non complété"
-                )
+                ))
             else:
                 # Indicateur avec un seul niveau
-                indicator.completion_status = 1 if st.checkbox(
+                scenario.set_completion_status(indicator, 1 if st.checkbox(
                     f"Complété",
                     value=indicator.completion_status == 1,
                     key=f"sim_completion_status_{i}"
-                ) else 0
+                ) else 0)
             
             # Pour les indicateurs avec pourcentage de complétion
-            if indicator.points_variable > 0 and indicator.completion_status > 0:
-                indicator.completion_percentage = st.slider(
+            if indicator.points_variable > 0 and scenario.get_completion_status(indicator) > 0:
+                percentage = indicator.completion_percentage
+                # Bornes du type de la valeur : un pourcentage fractionnaire donne un curseur décimal
+                scenario.set_completion_percentage(indicator, st.slider(
                     f"Pourcentage",
-                    min_value=0,
-                    max_value=100,
-                    value=indicator.completion_percentage,
+                    min_value=type(percentage)(0),
+                    max_value=type(percentage)(100),
+                    value=percentage,
                     key=f"sim_completion_percentage_{i}"
-                )
+                ))
     
     # Calcul des résultats de la simulation
-    sim_total_points = calculate_total_points(sim_indicators, sim_nb_patients, len(associates))
-    sim_total_amount = calculate_total_amount(sim_indicators, sim_nb_patients, len(associates))
+    sim_total_points = calculate_total_points(scenario, sim_nb_patients, len(associates), counts=counts, has_ipa=sim_has_ipa)
+    sim_total_amount = calculate_total_amount(scenario, sim_nb_patients, len(associates), counts=counts, has_ipa=sim_has_ipa)
     
     # Calcul des points par axe et par type
-    sim_points_by_axis = calculate_points_by_axis(sim_indicators, sim_nb_patients, len(associates))
-    sim_points_by_type = calculate_points_by_type(sim_indicators, sim_nb_patients, len(associates))
+    sim_points_by_axis = calculate_points_by_axis(scenario, sim_nb_patients, len(associates), counts=counts, has_ipa=sim_has_ipa)
+    sim_points_by_type = calculate_points_by_type(scenario, sim_nb_patients, len(associates), counts=counts, has_ipa=sim_has_ipa)
     
-    # Calcul du montant total des charges
-    total_expenses_amount = calculate_total_expenses(expenses)
+    # Calcul du montant total des charges de l'exercice
+    total_expenses_amount = calculate_total_expenses(expenses, fiscal_year)
     
     # Calcul du montant net
     sim_net_amount = calculate_net_amount(sim_total_amount, total_expenses_amount)
@@ -386,52 +683,54 @@ def display_simulation(indicators, associates, expenses):
         st.metric("Points totaux", int(sim_total_points))
     
     with col2:
-        st.metric("Rémunération totale", format_currency(sim_total_amount))
+        st.metric("Rémunération totale", format_cents(sim_total_amount))
     
     with col3:
-        st.metric("Montant net", format_currency(sim_net_amount))
+        st.metric("Montant net", format_cents(sim_net_amount))
     
     # Graphique de répartition des points par axe
     col1, col2 = st.columns(2)
     
     with col1:
-        fig, ax = plt.subplots(figsize=(6, 4))
-        axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
-        values = [sim_points_by_axis[1], sim_points_by_axis[2], sim_points_by_axis[3]]
-        colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
-        
-        ax.bar(axes, values, color=colors)
-        ax.set_title("Répartition des points par axe")
-        ax.set_ylabel("Points")
-        
-        # Ajout des valeurs sur les barres
-        for i, v in enumerate(values):
-            ax.text(i, v + 5, str(int(v)), ha='center')
-        
-        plt.xticks(rotation=45, ha='right')
-        plt.tight_layout()
-        st.pyplot(fig)
+        with timer("dashboard.chart.simulation_points_by_axis"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
+            values = [sim_points_by_axis[1], sim_points_by_axis[2], sim_points_by_axis[3]]
+            colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
+            
+            bars = ax.bar(axes, values, color=colors)
+            ax.set_title("Répartition des points par axe")
+            ax.set_ylabel("Points")
+            
+            # Ajout des valeurs sur les barres (décalage en points : un décalage en
+            # unités de données agrandit démesurément l'image quand toutes les valeurs sont nulles)
+            ax.bar_label(bars, labels=[str(int(v)) for v in values], padding=3)
+            
+            plt.xticks(rotation=45, ha='right')
+            plt.tight_layout()
+            st.pyplot(fig)
     
     with col2:
         # Graphique de répartition des points par type
-        fig, ax = plt.subplots(figsize=(6, 4))
-        types = ["Indicateurs socles", "Indicateurs optionnels"]
-        values = [sim_points_by_type["socle"], sim_points_by_type["optionnel"]]
-        colors = ["#1E88E5", "#42A5F5"]
-        
-        # Vérification que les valeurs ne sont pas NaN
-        if not np.isnan(values).any() and sum(values) > 0:
-            ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-            ax.set_title("Répartition des points par type d'indicateur")
-        else:
-            ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
-                   horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-            ax.axis('off')
-        
-        st.pyplot(fig)
+        with timer("dashboard.chart.simulation_points_by_type"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            types = ["Indicateurs socles", "Indicateurs optionnels"]
+            values = [sim_points_by_type["socle"], sim_points_by_type["optionnel"]]
+            colors = ["#1E88E5", "#42A5F5"]
+            
+            # Vérification que les valeurs ne sont pas NaN
+            if not np.isnan(values).any() and sum(values) > 0:
+                ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
+                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+                ax.set_title("Répartition des points par type d'indicateur")
+            else:
+                ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
+                       horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+                ax.axis('off')
+            
+            st.pyplot(fig)
 
-def display_export(indicators, associates, expenses):
+def display_export(indicators, associates, expenses, fiscal_year, graph):
     """
     Affiche les options d'export
     """
@@ -444,7 +743,7 @@ def display_export(indicators, associates, expenses):
         try:
             # Export des données
             filename = f"export_sisa_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            filepath = export_to_excel(indicators, associates, expenses, filename)
+            filepath = export_to_excel(indicators, associates, expenses, filename, fiscal_year=fiscal_year)
             
             # Affichage du message de succès
             st.success(f"Les données ont été exportées avec succès dans le fichier {filepath}.")
@@ -460,6 +759,37 @@ def display_export(indicators, associates, expenses):
         except Exception as e:
             st.error(f"Une erreur s'est produite lors de l'export des données : {str(e)}")
     
+    # Détail du calcul : entrées, règle, ratio et résultat de chaque indicateur et de chaque répartition
+    st.markdown("<h3 class='blue-text'>Détail du calcul</h3>", unsafe_allow_html=True)
+    st.caption(
+        "Justificatif des montants : points de chaque indicateur (entrées, règle appliquée, ratio), "
+        "montant total, répartition de la rémunération et de chaque charge, montant net de chaque associé."
+    )
+    
+    if st.button("Générer le détail du calcul"):
+        try:
+            calculation_trace = trace_remuneration(graph)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            
+            st.success(f"Le détail du calcul compte {len(calculation_trace)} étapes.")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button(
+                    label="Télécharger le détail (JSON)",
+                    data=calculation_trace.to_json(),
+                    file_name=f"detail_calcul_{timestamp}.json",
+                    mime="application/json"
+                )
+            with col2:
+                st.download_button(
+                    label="Télécharger le détail (Excel)",
+                    data=calculation_trace.to_excel(io.BytesIO()).getvalue(),
+                    file_name=f"detail_calcul_{timestamp}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+        except Exception as e:
+            st.error(f"Une erreur s'est produite lors du calcul du détail : {str(e)}")
+    
     # Génération de rapports
     st.markdown("<h3 class='blue-text'>Génération de rapports</h3>", unsafe_allow_html=True)
     
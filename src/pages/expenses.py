@@ -1,63 +1,72 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import uuid
 from datetime import datetime
 
 from src.models.expenses import (
     Expense, get_expense_categories, get_expense_frequencies,
-    get_distribution_methods, get_sample_expenses
+    get_distribution_methods
 )
-from src.utils.data_manager import save_expenses
+from src.models.expense_schedule import current_fiscal_year, format_month
+from src.utils.data_manager import get_repository, save_expenses
 from src.utils.calculations import (
-    calculate_total_expenses, calculate_expense_distribution,
-    format_currency
+    calculate_expense_amounts,
+    calculate_expenses_by_category, calculate_expenses_by_frequency, calculate_monthly_expenses,
+    format_cents
 )
+from src.utils.computation_graph import get_session_graph
+from src.utils.money import to_cents, to_euros
+from src.utils.profiling import timed, timer
+from src.utils.edit_history import display_history_controls, get_history, snapshot_record
+from src.utils.record_index import get_session_index, paginate
 
+@timed("page.expenses")
 def show():
     """
     Affiche la page de gestion des charges fixes
     """
     st.markdown("<h1 class='main-header'>Gestion des Charges Fixes</h1>", unsafe_allow_html=True)
     
-    # Initialisation des charges s'ils n'existent pas dans la session
-    if 'expenses' not in st.session_state:
-        st.session_state.expenses = get_sample_expenses()
+    # Récupération des charges et des associés (chargés au premier accès)
+    repository = get_repository()
+    expenses = repository.expenses
+    associates = repository.associates
     
-    # Initialisation des associés s'ils n'existent pas dans la session
-    if 'associates' not in st.session_state:
-        st.session_state.associates = []
+    # Annulation et rétablissement des modifications de la session
+    display_history_controls("expenses")
     
-    # Récupération des charges et des associés
-    expenses = st.session_state.expenses
-    associates = st.session_state.associates
+    # Exercice sur lequel les charges sont proratisées (choisi dans la barre latérale)
+    fiscal_year = st.session_state.get("fiscal_year", current_fiscal_year())
     
     # Onglets pour les différentes fonctionnalités
     tab1, tab2, tab3 = st.tabs(["Liste des charges", "Ajouter/Modifier une charge", "Répartition des charges"])
     
     with tab1:
-        display_expenses_list(expenses)
+        display_expenses_list(expenses, fiscal_year)
     
     with tab2:
-        add_edit_expense(expenses)
+        add_edit_expense(expenses, associates)
     
     with tab3:
-        display_expense_distribution(expenses, associates)
+        display_expense_distribution(expenses, associates, fiscal_year)
     
     # Bouton pour sauvegarder les modifications
     if st.button("Sauvegarder les modifications"):
         save_expenses(expenses)
         st.success("Les modifications ont été sauvegardées avec succès.")
 
-def display_expenses_list(expenses):
+def display_expenses_list(expenses, fiscal_year):
     """
     Affiche la liste des charges
     """
     st.markdown("<h2 class='sub-header'>Liste des charges</h2>", unsafe_allow_html=True)
     
+    # Index des charges (catégorie, fréquence, nom), maintenu lors des modifications
+    index = get_session_index(st.session_state, "expenses")
+    
     # Filtres
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns(3)
     
     with col1:
         # Filtre par catégorie
@@ -69,48 +78,69 @@ def display_expenses_list(expenses):
         frequencies = ["Toutes"] + get_expense_frequencies()
         selected_frequency = st.selectbox("Filtrer par fréquence", frequencies)
     
-    # Filtrage des charges
-    filtered_expenses = expenses
-    
-    if selected_category != "Toutes":
-        filtered_expenses = [e for e in filtered_expenses if e.category == selected_category]
+    with col3:
+        # Recherche par début du nom
+        name_prefix = st.text_input("Rechercher une charge", placeholder="Nom de la charge")
     
-    if selected_frequency != "Toutes":
-        filtered_expenses = [e for e in filtered_expenses if e.frequency == selected_frequency]
+    # Filtrage des charges par les index
+    filtered_expenses = index.search(
+        {
+            "category": None if selected_category == "Toutes" else selected_category,
+            "frequency": None if selected_frequency == "Toutes" else selected_frequency
+        },
+        prefix=name_prefix
+    )
     
     # Affichage des charges
     if not filtered_expenses:
         st.info("Aucune charge ne correspond aux critères de filtrage.")
     else:
+        # Seule la page affichée est calculée et mise en forme
+        page = st.session_state.get("expenses_page", 1)
+        page_expenses, page, nb_pages = paginate(filtered_expenses, page)
+        
         # Création d'un DataFrame pour l'affichage
+        year_amounts = calculate_expense_amounts(page_expenses, fiscal_year)
         expenses_data = []
-        for expense in filtered_expenses:
+        for expense, year_amount in zip(page_expenses, year_amounts):
             expenses_data.append({
                 "ID": expense.id,
                 "Nom": expense.name,
                 "Catégorie": expense.category,
                 "Montant": expense.amount,
                 "Fréquence": expense.frequency,
+                "Début": expense.start_date,
+                "Fin": expense.end_date,
                 "Montant annuel": expense.get_annual_amount(),
+                f"Montant {fiscal_year}": year_amount,
                 "Montant mensuel": expense.get_monthly_amount(),
                 "Méthode de répartition": expense.distribution_method
             })
         
         df = pd.DataFrame(expenses_data)
         
-        # Formatage des colonnes monétaires
-        df["Montant"] = df["Montant"].apply(format_currency)
-        df["Montant annuel"] = df["Montant annuel"].apply(format_currency)
-        df["Montant mensuel"] = df["Montant mensuel"].apply(format_currency)
+        # Formatage des colonnes monétaires (montants saisis en euros, montant de l'exercice en centimes)
+        df["Montant"] = df["Montant"].apply(lambda amount: format_cents(to_cents(amount)))
+        df["Montant annuel"] = df["Montant annuel"].apply(lambda amount: format_cents(to_cents(amount)))
+        df[f"Montant {fiscal_year}"] = df[f"Montant {fiscal_year}"].apply(format_cents)
+        df["Montant mensuel"] = df["Montant mensuel"].apply(lambda amount: format_cents(to_cents(amount)))
         
         # Affichage du DataFrame
         st.dataframe(df, use_container_width=True)
         
-        # Sélection d'une charge pour modification ou suppression
+        if nb_pages > 1:
+            # Page ramenée au nombre de pages (après un changement de filtre)
+            st.session_state.expenses_page = page
+            st.number_input(
+                f"Page (sur {nb_pages}, {len(filtered_expenses)} charges)",
+                min_value=1, max_value=nb_pages, key="expenses_page"
+            )
+        
+        # Sélection d'une charge de la page pour modification ou suppression
         selected_expense_id = st.selectbox(
             "Sélectionner une charge pour modification ou suppression",
-            options=[e.id for e in filtered_expenses],
-            format_func=lambda x: next((e.name + " - " + e.category) for e in filtered_expenses if e.id == x)
+            options=[e.id for e in page_expenses],
+            format_func=lambda x: index.get(x).name + " - " + index.get(x).category
         )
         
         col1, col2 = st.columns(2)
@@ -125,12 +155,12 @@ def display_expenses_list(expenses):
             if st.button("Supprimer la charge sélectionnée"):
                 # Confirmation de suppression
                 if st.checkbox("Confirmer la suppression"):
-                    # Suppression de la charge
-                    st.session_state.expenses = [e for e in st.session_state.expenses if e.id != selected_expense_id]
+                    # Suppression de la charge (liste de la session et index), annulable
+                    get_history(st.session_state, "expenses").remove_record(index, selected_expense_id)
                     st.success("La charge a été supprimée avec succès.")
                     st.rerun()
 
-def add_edit_expense(expenses):
+def add_edit_expense(expenses, associates):
     """
     Ajoute ou modifie une charge
     """
@@ -142,7 +172,7 @@ def add_edit_expense(expenses):
     # Récupération de la charge à éditer si on est en mode édition
     expense_to_edit = None
     if edit_mode:
-        expense_to_edit = next((e for e in expenses if e.id == st.session_state.edit_expense_id), None)
+        expense_to_edit = get_session_index(st.session_state, "expenses").get(st.session_state.edit_expense_id)
         
         if expense_to_edit:
             st.markdown(f"<h3 class='blue-text'>Modification de la charge : {expense_to_edit.name}</h3>", unsafe_allow_html=True)
@@ -230,17 +260,47 @@ def add_edit_expense(expenses):
             index=list(distribution_methods_dict.keys()).index(expense_to_edit.distribution_method) if edit_mode and expense_to_edit.distribution_method in distribution_methods_dict else 0
         )
         
+        # Poids de la répartition personnalisée (seuls les poids non nuls sont enregistrés)
+        weights_df = None
+        if associates:
+            current_weights = expense_to_edit.custom_weights if edit_mode else {}
+            st.caption("Poids de la répartition personnalisée, utilisés avec la méthode « Répartition personnalisée » : un poids nul exclut l'associé.")
+            weights_df = st.data_editor(
+                pd.DataFrame({
+                    "Associé": [associate.get_full_name() for associate in associates],
+                    "Poids": [current_weights.get(associate.id, 0.0) for associate in associates]
+                }),
+                column_config={
+                    "Associé": st.column_config.TextColumn(disabled=True),
+                    "Poids": st.column_config.NumberColumn(min_value=0.0, step=0.1)
+                },
+                hide_index=True,
+                use_container_width=True,
+                key=f"custom_weights_{expense_to_edit.id if edit_mode else 'new'}"
+            )
+        
         # Boutons de soumission
         submit_button = st.form_submit_button("Enregistrer")
         
         if submit_button:
+            custom_weights = {}
+            if distribution_method == "custom" and weights_df is not None:
+                custom_weights = {
+                    associate.id: float(weight)
+                    for associate, weight in zip(associates, weights_df["Poids"])
+                    if pd.notna(weight) and weight > 0
+                }
+            
             # Validation des champs obligatoires
             if not name or amount <= 0:
                 st.error("Les champs Nom et Montant sont obligatoires et le montant doit être supérieur à 0.")
+            elif distribution_method == "custom" and not custom_weights:
+                st.error("La répartition personnalisée nécessite un poids positif pour au moins un associé.")
             else:
                 # Création ou mise à jour de la charge
                 if edit_mode:
                     # Mise à jour de la charge existante
+                    before = snapshot_record(expense_to_edit)
                     expense_to_edit.name = name
                     expense_to_edit.description = description
                     expense_to_edit.category = category
@@ -249,6 +309,10 @@ def add_edit_expense(expenses):
                     expense_to_edit.start_date = start_date.strftime("%Y-%m-%d")
                     expense_to_edit.end_date = end_date.strftime("%Y-%m-%d") if end_date else None
                     expense_to_edit.distribution_method = distribution_method
+                    expense_to_edit.custom_weights = custom_weights
+                    get_history(st.session_state, "expenses").update_record(
+                        get_session_index(st.session_state, "expenses"), expense_to_edit, before
+                    )
                     
                     st.success("La charge a été modifiée avec succès.")
                     
@@ -266,11 +330,12 @@ def add_edit_expense(expenses):
                         frequency=frequency,
                         start_date=start_date.strftime("%Y-%m-%d"),
                         end_date=end_date.strftime("%Y-%m-%d") if end_date else None,
-                        distribution_method=distribution_method
+                        distribution_method=distribution_method,
+                        custom_weights=custom_weights
                     )
                     
-                    # Ajout de la charge à la liste
-                    st.session_state.expenses.append(new_expense)
+                    # Ajout de la charge à la liste (et à l'index), annulable
+                    get_history(st.session_state, "expenses").add_record(get_session_index(st.session_state, "expenses"), new_expense)
                     
                     st.success("La charge a été ajoutée avec succès.")
                 
@@ -286,10 +351,12 @@ def add_edit_expense(expenses):
             
             st.rerun()
 
-def display_expense_distribution(expenses, associates):
+def display_expense_distribution(expenses, associates, fiscal_year):
     """
-    Affiche la répartition des charges entre les associés
+    Affiche la répartition des charges de l'exercice entre les associés
     """
+    import matplotlib.pyplot as plt
+    
     st.markdown("<h2 class='sub-header'>Répartition des charges</h2>", unsafe_allow_html=True)
     
     if not expenses:
@@ -300,82 +367,85 @@ def display_expense_distribution(expenses, associates):
         st.info("Aucun associé n'a été ajouté. Veuillez ajouter des associés pour visualiser la répartition des charges.")
         return
     
-    # Calcul du montant total des charges
-    total_expenses_amount = calculate_total_expenses(expenses)
+    # Montant total des charges de l'exercice (proratisées selon leurs dates) ; le graphe
+    # de calcul ne refait que les calculs touchés par une modification
+    graph = get_session_graph(st.session_state, "expenses")
+    graph.set_inputs(expenses=expenses, associates=associates, fiscal_year=fiscal_year)
+    total_expenses_amount = graph.get("total_expenses")
     
     # Affichage du montant total des charges
-    st.markdown(f"<h3 class='blue-text'>Montant total des charges : {format_currency(total_expenses_amount)}</h3>", unsafe_allow_html=True)
+    st.markdown(f"<h3 class='blue-text'>Montant total des charges {fiscal_year} : {format_cents(total_expenses_amount)}</h3>", unsafe_allow_html=True)
+    
+    # Graphique des charges mois par mois
+    st.markdown("<h3 class='blue-text'>Charges mensuelles de l'exercice</h3>", unsafe_allow_html=True)
+    
+    months, monthly_totals = calculate_monthly_expenses(expenses, fiscal_year)
+    with timer("expenses.chart.by_month"):
+        fig, ax = plt.subplots(figsize=(10, 4))
+        ax.bar([format_month(month) for month in months], to_euros(monthly_totals), color="#1E88E5")
+        plt.xticks(rotation=45, ha='right')
+        plt.tight_layout()
+        st.pyplot(fig)
     
     # Calcul de la répartition des charges par catégorie
-    expenses_by_category = {}
-    for expense in expenses:
-        if expense.category not in expenses_by_category:
-            expenses_by_category[expense.category] = 0
-        expenses_by_category[expense.category] += expense.get_annual_amount()
+    expenses_by_category = calculate_expenses_by_category(expenses, fiscal_year)
     
     # Graphique de répartition des charges par catégorie
     st.markdown("<h3 class='blue-text'>Répartition des charges par catégorie</h3>", unsafe_allow_html=True)
     
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Tri des catégories par montant
-    sorted_categories = sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)
-    categories = [c[0] for c in sorted_categories]
-    amounts = [c[1] for c in sorted_categories]
-    
-    # Création du graphique
-    bars = ax.bar(categories, amounts, color="#1E88E5")
-    
-    # Rotation des étiquettes pour une meilleure lisibilité
-    plt.xticks(rotation=45, ha='right')
-    
-    # Ajout des valeurs sur les barres
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_currency(height), ha='center', va='bottom')
-    
-    plt.tight_layout()
-    st.pyplot(fig)
+    with timer("expenses.chart.by_category"):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        
+        # Tri des catégories par montant (en centimes)
+        sorted_categories = sorted(expenses_by_category.items(), key=lambda x: x[1], reverse=True)
+        categories = [c[0] for c in sorted_categories]
+        amounts = [c[1] for c in sorted_categories]
+        
+        # Création du graphique (hauteurs en euros)
+        bars = ax.bar(categories, to_euros(np.array(amounts, dtype=np.int64)), color="#1E88E5")
+        
+        # Rotation des étiquettes pour une meilleure lisibilité
+        plt.xticks(rotation=45, ha='right')
+        
+        # Ajout des valeurs sur les barres
+        for bar, amount in zip(bars, amounts):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_cents(amount), ha='center', va='bottom')
+        
+        plt.tight_layout()
+        st.pyplot(fig)
     
     # Graphique de répartition des charges par fréquence
     st.markdown("<h3 class='blue-text'>Répartition des charges par fréquence</h3>", unsafe_allow_html=True)
     
-    # Calcul de la répartition des charges par fréquence
-    expenses_by_frequency = {}
-    for expense in expenses:
-        if expense.frequency not in expenses_by_frequency:
-            expenses_by_frequency[expense.frequency] = 0
-        expenses_by_frequency[expense.frequency] += expense.get_annual_amount()
-    
-    # Création du graphique
-    fig, ax = plt.subplots(figsize=(8, 8))
-    
-    # Tri des fréquences par montant
-    sorted_frequencies = sorted(expenses_by_frequency.items(), key=lambda x: x[1], reverse=True)
-    frequencies = [f[0] for f in sorted_frequencies]
-    amounts = [f[1] for f in sorted_frequencies]
+    # Calcul de la répartition des charges par fréquence (fréquences sans charge sur l'exercice exclues)
+    expenses_by_frequency = {
+        frequency: amount
+        for frequency, amount in calculate_expenses_by_frequency(expenses, fiscal_year).items()
+        if amount > 0
+    }
     
     # Création du graphique
-    ax.pie(amounts, labels=frequencies, autopct='%1.1f%%', startangle=90, colors=["#1E88E5", "#42A5F5", "#90CAF9", "#BBDEFB"])
-    ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-    ax.set_title("Répartition des charges par fréquence")
-    
-    st.pyplot(fig)
+    with timer("expenses.chart.by_frequency"):
+        fig, ax = plt.subplots(figsize=(8, 8))
+        
+        # Tri des fréquences par montant
+        sorted_frequencies = sorted(expenses_by_frequency.items(), key=lambda x: x[1], reverse=True)
+        frequencies = [f[0] for f in sorted_frequencies]
+        amounts = [f[1] for f in sorted_frequencies]
+        
+        # Création du graphique
+        ax.pie(amounts, labels=frequencies, autopct='%1.1f%%', startangle=90, colors=["#1E88E5", "#42A5F5", "#90CAF9", "#BBDEFB"])
+        ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+        ax.set_title("Répartition des charges par fréquence")
+        
+        st.pyplot(fig)
     
     # Répartition des charges par associé
     st.markdown("<h3 class='blue-text'>Répartition des charges par associé</h3>", unsafe_allow_html=True)
     
-    # Calcul de la répartition des charges par associé
-    expense_distributions = []
-    for expense in expenses:
-        expense_distributions.append(calculate_expense_distribution(expense, associates))
-    
-    # Calcul du montant total par associé
-    total_by_associate = {}
-    for associate in associates:
-        total_by_associate[associate.id] = 0
-        for distribution in expense_distributions:
-            total_by_associate[associate.id] += distribution.get(associate.id, 0)
+    # Montant total des charges par associé
+    total_by_associate = graph.get("expenses_by_associate")
     
     # Création d'un DataFrame pour l'affichage
     associates_data = []
@@ -393,29 +463,32 @@ def display_expense_distribution(expenses, associates):
     # Tri du DataFrame par montant des charges
     df = df.sort_values(by="Montant des charges", ascending=False)
     
+    # Montants du graphique, en centimes (avant formatage)
+    associate_amounts = df["Montant des charges"].tolist()
+    
     # Formatage des colonnes
-    df["Montant des charges"] = df["Montant des charges"].apply(format_currency)
+    df["Montant des charges"] = df["Montant des charges"].apply(format_cents)
     df["Pourcentage"] = df["Pourcentage"].apply(lambda x: f"{x:.2f}%")
     
     # Affichage du DataFrame
     st.dataframe(df, use_container_width=True)
     
     # Graphique de répartition des charges par associé
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # Création du graphique
-    associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
-    amounts = [float(a["Montant des charges"].replace(" €", "").replace(",", ".")) for _, a in df.iterrows()]
-    
-    bars = ax.bar(associate_names, amounts, color="#1E88E5")
-    
-    # Rotation des étiquettes pour une meilleure lisibilité
-    plt.xticks(rotation=45, ha='right')
-    
-    # Ajout des valeurs sur les barres
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_currency(height), ha='center', va='bottom')
-    
-    plt.tight_layout()
-    st.pyplot(fig)
+    with timer("expenses.chart.by_associate"):
+        fig, ax = plt.subplots(figsize=(10, 6))
+        
+        # Création du graphique
+        associate_names = [f"{a['Prénom']} {a['Nom']}" for _, a in df.iterrows()]
+        
+        bars = ax.bar(associate_names, to_euros(np.array(associate_amounts, dtype=np.int64)), color="#1E88E5")
+        
+        # Rotation des étiquettes pour une meilleure lisibilité
+        plt.xticks(rotation=45, ha='right')
+        
+        # Ajout des valeurs sur les barres
+        for bar, amount in zip(bars, associate_amounts):
+            height = bar.get_height()
+            ax.text(bar.get_x() + bar.get_width()/2., height + 0.1, format_cents(amount), ha='center', va='bottom')
+        
+        plt.tight_layout()
+        st.pyplot(fig)
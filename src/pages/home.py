@@ -1,8 +1,8 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
 from datetime import datetime
+from src.utils.profiling import timed
 
+@timed("page.home")
 def show():
     """
     Affiche la page d'accueil de l'application
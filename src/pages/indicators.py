@@ -1,33 +1,30 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from src.utils.calculations import (
-    calculate_total_points, calculate_total_amount, calculate_points_by_axis,
-    calculate_points_by_type, format_currency, has_ipa
-)
-from src.utils.data_manager import save_indicators
-from src.models.indicators import get_indicators
+from src.utils.calculations import format_cents, has_ipa
+from src.utils.computation_graph import get_session_graph
+from src.utils.data_manager import get_repository, save_indicator_counts, save_indicators
+from src.utils.edit_history import display_history_controls, get_history
+from src.models.indicator_rules import COUNT_LABELS, DEFAULT_COUNTS
 from src.data.indicator_details import indicator_details
+from src.utils.profiling import timed, timer
 
+@timed("page.indicators")
 def show():
     """
     Affiche la page de gestion des indicateurs ACI
     """
-    st.markdown("<h1 class='main-header'>Gestion des Indicateurs ACI</h1>", unsafe_allow_html=True)
+    import matplotlib.pyplot as plt
     
-    # Initialisation des indicateurs s'ils n'existent pas dans la session
-    if 'indicators' not in st.session_state:
-        st.session_state.indicators = get_indicators()
+    st.markdown("<h1 class='main-header'>Gestion des Indicateurs ACI</h1>", unsafe_allow_html=True)
     
-    # Initialisation des associés s'ils n'existent pas dans la session
-    if 'associates' not in st.session_state:
-        st.session_state.associates = []
+    # Récupération des indicateurs et des associés (chargés au premier accès)
+    repository = get_repository()
+    indicators = repository.indicators
+    associates = repository.associates
     
-    # Récupération des indicateurs et des associés
-    indicators = st.session_state.indicators
-    associates = st.session_state.associates
+    # Annulation et rétablissement des modifications de la session
+    display_history_controls("indicators")
     
     # Calcul du nombre total de patients médecin traitant
     nb_patients = sum(associate.patients_mt for associate in associates if associate.profession.lower().startswith("médecin"))
@@ -62,13 +59,18 @@ def show():
     st.markdown("---")
     st.markdown("<h2 class='sub-header'>Résultats</h2>", unsafe_allow_html=True)
     
-    # Calcul des points et du montant total
-    total_points = calculate_total_points(indicators, nb_patients, len(associates))
-    total_amount = calculate_total_amount(indicators, nb_patients, len(associates))
+    # Calcul des points et du montant total (seuls les calculs touchés par une modification sont refaits)
+    graph = get_session_graph(st.session_state, "indicators")
+    graph.set_inputs(
+        indicators=indicators, associates=associates, counts=repository.indicator_counts,
+        nb_patients_override=nb_patients, has_ipa_override=has_ipa_in_structure
+    )
+    total_points = graph.get("total_points")
+    total_amount = graph.get("total_amount")
     
     # Calcul des points par axe et par type
-    points_by_axis = calculate_points_by_axis(indicators, nb_patients, len(associates))
-    points_by_type = calculate_points_by_type(indicators, nb_patients, len(associates))
+    points_by_axis = graph.get("points_by_axis")
+    points_by_type = graph.get("points_by_type")
     
     # Affichage des résultats
     col1, col2 = st.columns(2)
@@ -80,23 +82,24 @@ def show():
             <p>Total des points : <strong>{}</strong></p>
             <p>Montant total : <strong>{}</strong></p>
         </div>
-        """.format(int(total_points), format_currency(total_amount)), unsafe_allow_html=True)
+        """.format(int(total_points), format_cents(total_amount)), unsafe_allow_html=True)
         
         # Graphique de répartition des points par axe
-        fig, ax = plt.subplots(figsize=(6, 4))
-        axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
-        values = [points_by_axis[1], points_by_axis[2], points_by_axis[3]]
-        colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
-        
-        ax.bar(axes, values, color=colors)
-        ax.set_title("Répartition des points par axe")
-        ax.set_ylabel("Points")
-        
-        # Ajout des valeurs sur les barres
-        for i, v in enumerate(values):
-            ax.text(i, v + 5, str(int(v)), ha='center')
-        
-        st.pyplot(fig)
+        with timer("indicators.chart.points_by_axis"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            axes = ["Axe 1 - Accès aux soins", "Axe 2 - Travail en équipe", "Axe 3 - Système d'information"]
+            values = [points_by_axis[1], points_by_axis[2], points_by_axis[3]]
+            colors = ["#1E88E5", "#42A5F5", "#90CAF9"]
+            
+            bars = ax.bar(axes, values, color=colors)
+            ax.set_title("Répartition des points par axe")
+            ax.set_ylabel("Points")
+            
+            # Ajout des valeurs sur les barres (décalage en points : un décalage en
+            # unités de données agrandit démesurément l'image quand toutes les valeurs sont nulles)
+            ax.bar_label(bars, labels=[str(int(v)) for v in values], padding=3)
+            
+            st.pyplot(fig)
     
     with col2:
         st.markdown("""
@@ -117,26 +120,28 @@ def show():
         ), unsafe_allow_html=True)
         
         # Graphique de répartition des points par type
-        fig, ax = plt.subplots(figsize=(6, 4))
-        types = ["Indicateurs socles", "Indicateurs optionnels"]
-        values = [points_by_type["socle"], points_by_type["optionnel"]]
-        colors = ["#1E88E5", "#42A5F5"]
-        
-        # Vérification que les valeurs ne sont pas NaN
-        if not np.isnan(values).any() and sum(values) > 0:
-            ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
-            ax.set_title("Répartition des points par type d'indicateur")
-        else:
-            ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
-                   horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
-            ax.axis('off')
-        
-        st.pyplot(fig)
+        with timer("indicators.chart.points_by_type"):
+            fig, ax = plt.subplots(figsize=(6, 4))
+            types = ["Indicateurs socles", "Indicateurs optionnels"]
+            values = [points_by_type["socle"], points_by_type["optionnel"]]
+            colors = ["#1E88E5", "#42A5F5"]
+            
+            # Vérification que les valeurs ne sont pas NaN
+            if not np.isnan(values).any() and sum(values) > 0:
+                ax.pie(values, labels=types, autopct='%1.1f%%', startangle=90, colors=colors)
+                ax.axis('equal')  # Equal aspect ratio ensures that pie is drawn as a circle.
+                ax.set_title("Répartition des points par type d'indicateur")
+            else:
+                ax.text(0.5, 0.5, "Données insuffisantes pour afficher le graphique", 
+                       horizontalalignment='center', verticalalignment='center', transform=ax.transAxes)
+                ax.axis('off')
+            
+            st.pyplot(fig)
     
     # Bouton pour sauvegarder les modifications
     if st.button("Sauvegarder les modifications"):
         save_indicators(indicators)
+        save_indicator_counts(get_repository().indicator_counts)
         st.success("Les modifications ont été sauvegardées avec succès.")
 
 def display_all_indicators(indicators, nb_patients, has_ipa_in_structure):
@@ -250,33 +255,57 @@ def display_indicator(indicator, nb_patients, has_ipa_in_structure, tab="all"):
             st.markdown(f"**Points variables :** {indicator.points_variable}")
         
         with col2:
-            # Contrôles pour l'état de complétion
+            # Contrôles pour l'état de complétion (chaque changement est une étape annulable)
+            status_key = f"completion_status_{indicator.id}_{tab}"
             if indicator.max_level > 1:
                 # Indicateur avec plusieurs niveaux
-                indicator.completion_status = st.radio(
+                st.radio(
                     "Niveau de complétion",
                     options=list(range(indicator.max_level + 1)),
                     index=indicator.completion_status,
-                    key=f"completion_status_{indicator.id}_{tab}",
+                    key=status_key,
                     horizontal=True,
-                    format_func=lambda x: f"Niveau {x}" if x > 0 else "Non complété"
+                    format_func=lambda x: f"Niveau {x}" if x > 0 else "Non complété",
+                    on_change=store_indicator_completion,
+                    args=(indicator.id, "completion_status", status_key)
                 )
             else:
                 # Indicateur avec un seul niveau
-                indicator.completion_status = 1 if st.checkbox(
+                st.checkbox(
                     "Indicateur complété",
                     value=indicator.completion_status == 1,
-                    key=f"completion_status_{indicator.id}_{tab}"
-                ) else 0
+                    key=status_key,
+                    on_change=store_indicator_completion,
+                    args=(indicator.id, "completion_status", status_key)
+                )
             
             # Pour les indicateurs avec pourcentage de complétion
             if indicator.points_variable > 0 and indicator.completion_status > 0:
-                indicator.completion_percentage = st.slider(
+                percentage_key = f"completion_percentage_{indicator.id}_{tab}"
+                percentage = indicator.completion_percentage
+                # Bornes du type de la valeur : un pourcentage fractionnaire donne un curseur décimal
+                st.slider(
                     "Pourcentage de complétion",
+                    min_value=type(percentage)(0),
+                    max_value=type(percentage)(100),
+                    value=percentage,
+                    key=percentage_key,
+                    on_change=store_indicator_completion,
+                    args=(indicator.id, "completion_percentage", percentage_key)
+                )
+            
+            # Nombre propre à l'indicateur (protocoles, missions, stages), utilisé par ses règles de calcul
+            if indicator.id in COUNT_LABELS:
+                counts = get_repository().indicator_counts
+                count_key = f"count_{indicator.id}_{tab}"
+                st.number_input(
+                    COUNT_LABELS[indicator.id],
                     min_value=0,
-                    max_value=100,
-                    value=indicator.completion_percentage,
-                    key=f"completion_percentage_{indicator.id}_{tab}"
+                    value=counts.get(indicator.id, DEFAULT_COUNTS[indicator.id]),
+                    step=1,
+                    key=count_key,
+                    on_change=store_indicator_count,
+                    args=(indicator.id, count_key)
                 )
             
             # Cas spécifiques pour certains indicateurs
@@ -300,8 +329,31 @@ def display_indicator(indicator, nb_patients, has_ipa_in_structure, tab="all"):
                     st.markdown("**Bonus IPA :** +200 points variables si présence d'un IPA")
         
         # Calcul et affichage des points et du montant
-        points = indicator.calculate_points(nb_patients)
-        amount = indicator.calculate_amount(nb_patients)
+        repository = get_repository()
+        nb_associates = len(repository.associates)
+        count = repository.indicator_counts.get(indicator.id)
+        points = indicator.calculate_points(nb_patients, nb_associates, count=count, has_ipa=has_ipa_in_structure)
+        amount = indicator.calculate_amount(nb_patients, nb_associates, count=count, has_ipa=has_ipa_in_structure)
         
         st.markdown(f"**Points obtenus :** {int(points)}")
-        st.markdown(f"**Montant :** {format_currency(amount)}")
+        st.markdown(f"**Montant :** {format_cents(amount)}")
+
+def store_indicator_completion(indicator_id, field, key):
+    """
+    Enregistre le niveau ou le pourcentage de complétion saisi pour un indicateur (étape annulable)
+    
+    Le rappel est exécuté avant l'affichage de la page : les autres onglets et les
+    boutons d'annulation voient la nouvelle valeur.
+    """
+    value = st.session_state[key]
+    # Seul le niveau est entier : un pourcentage fractionnaire est conservé tel quel
+    if field == "completion_status":
+        value = int(value)
+    indicator = get_repository().indicators.get(indicator_id)
+    get_history(st.session_state, "indicators").set_indicator(indicator, field, value)
+
+def store_indicator_count(indicator_id, key):
+    """
+    Enregistre le nombre saisi pour un indicateur (l'indicateur est affiché dans plusieurs onglets)
+    """
+    get_history(st.session_state, "indicators").set_count(get_repository().indicator_counts, indicator_id, st.session_state[key])
@@ -2,252 +2,776 @@
 Utilitaires pour les calculs de rémunération et la gestion des données
 """
 
-import pandas as pd
+from functools import lru_cache
+
 import numpy as np
-from src.models.indicators import Indicator
-from src.models.associates import Associate
+
+from src.models.indicators import (
+    Indicator, IndicatorCatalog, IndicatorScenario, IndicatorState, get_indicator_catalog
+)
+from src.models.indicator_rules import compile_rules
+from src.models.associates import Associate, get_aci_roles
 from src.models.expenses import Expense
+from src.models.expense_schedule import parse_dates, schedule_expenses
+from src.utils import trace
+from src.utils.money import allocate_cents, split_cents, to_cents, to_euros
+from src.utils.profiling import timed
+from src.utils.record_index import build_associate_index
 
 # Valeur d'un point ACI en euros
 POINT_VALUE = 7
 
-def calculate_total_points(indicators, nb_patients, nb_associates=None):
+# Méthodes combinables dans une répartition mixte ("blended")
+BLENDED_METHODS = ["equal", "presence_time", "distribution_key", "patients_mt", "medical_only"]
+
+@timed()
+def completion_vectors(indicators):
     """
-    Calcule le nombre total de points obtenus pour l'ensemble des indicateurs
+    Retourne le catalogue et les vecteurs d'état de complétion des indicateurs
     
     Args:
-        indicators (list): Liste des indicateurs
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
+        
+    Returns:
+        tuple: Catalogue, vecteur des niveaux et vecteur des pourcentages de complétion
+    """
+    if isinstance(indicators, IndicatorState):
+        return indicators.catalog, indicators.status, indicators.percentage
+    
+    if isinstance(indicators, IndicatorScenario):
+        catalog, status, percentage = completion_vectors(indicators.base)
+        
+        # Application des seules valeurs modifiées par le scénario
+        if indicators.status_overrides:
+            status = status.copy()
+            for indicator_id, value in indicators.status_overrides.items():
+                status[catalog.positions[indicator_id]] = value
+        if indicators.percentage_overrides:
+            percentage = percentage.astype(np.float64)
+            for indicator_id, value in indicators.percentage_overrides.items():
+                percentage[catalog.positions[indicator_id]] = value
+        
+        return catalog, status, percentage
+    
+    indicators = list(indicators)
+    catalog = get_indicator_catalog()
+    if not catalog.matches(indicators):
+        catalog = IndicatorCatalog(indicators)
+    
+    status = np.array([indicator.completion_status for indicator in indicators], dtype=np.int64)
+    percentage = np.array([indicator.completion_percentage for indicator in indicators], dtype=np.float64)
+    return catalog, status, percentage
+
+@timed()
+def score_indicators(catalog, status, percentage, nb_patients, nb_associates=None, counts=None, has_ipa=False):
+    """
+    Calcule les points de tous les indicateurs en une seule opération vectorielle
+    
+    Args:
+        catalog (IndicatorCatalog): Catalogue des indicateurs
+        status (numpy.ndarray): Niveaux de complétion
+        percentage (numpy.ndarray): Pourcentages de complétion
         nb_patients (int): Nombre de patients médecin traitant
         nb_associates (int, optional): Nombre d'associés. Defaults to None.
+        counts (dict, optional): Nombres propres aux indicateurs (protocoles, missions,
+            stages), par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
         
     Returns:
-        float: Nombre total de points
+        numpy.ndarray: Points obtenus pour chaque indicateur
+    """
+    completed = status != 0
+    
+    # Si un indicateur prérequis n'est pas complété, aucun point n'est attribué
+    if np.any(catalog.is_prerequisite & ~completed):
+        points = np.zeros(len(catalog))
+        buffer = trace.current()
+        if buffer is not None:
+            buffer.add("indicators", catalog, status.copy(), percentage.copy(), nb_patients, nb_associates,
+                       dict(counts or {}), has_ipa, None, points, points, points)
+        return points
+    
+    # Ratio de patients, plafonné à 1, puis pondéré par le pourcentage de complétion
+    reference = catalog.reference_patients
+    ratio = np.where(reference > 0, np.minimum(nb_patients / np.where(reference > 0, reference, 1), 1), 1)
+    ratio = np.where(percentage > 0, ratio * (percentage / 100), ratio)
+    
+    # Bonus, paliers et points par unité propres à certains indicateurs
+    points_fixed, points_variable = compile_rules(catalog).apply(nb_patients, nb_associates, counts, has_ipa)
+    
+    points = np.where(completed, points_fixed + np.where(points_variable > 0, points_variable * ratio, 0), 0)
+    
+    buffer = trace.current()
+    if buffer is not None:
+        buffer.add("indicators", catalog, status.copy(), percentage.copy(), nb_patients, nb_associates,
+                   dict(counts or {}), has_ipa, ratio, points_fixed, points_variable, points)
+    return points
+
+@timed()
+def score_coalitions(catalog, status, percentage, nb_patients, nb_associates, counts=None, has_ipa=False):
     """
-    total_points = 0
+    Calcule le total des points pour plusieurs jeux d'entrées (par exemple les
+    coalitions d'associés d'une valeur de Shapley), en une opération matricielle
     
-    # Vérifier si tous les indicateurs socles et prérequis sont complétés
-    prerequisites_completed = True
-    for indicator in indicators:
-        if indicator.is_prerequisite and indicator.completion_status == 0:
-            prerequisites_completed = False
-            break
+    Chaque total est égal à la somme de score_indicators pour les mêmes entrées.
     
-    # Si tous les prérequis sont complétés, on calcule les points
-    if prerequisites_completed:
-        for indicator in indicators:
-            total_points += indicator.calculate_points(nb_patients, nb_associates)
+    Args:
+        catalog (IndicatorCatalog): Catalogue des indicateurs
+        status (numpy.ndarray): Niveaux de complétion
+        percentage (numpy.ndarray): Pourcentages de complétion
+        nb_patients (array): Nombre de patients médecin traitant de chaque jeu
+        nb_associates (array): Nombre d'associés de chaque jeu
+        counts (dict, optional): Nombres propres aux indicateurs. Defaults to None.
+        has_ipa (array, optional): Présence d'un IPA dans chaque jeu. Defaults to False.
+        
+    Returns:
+        numpy.ndarray: Total des points de chaque jeu
+    """
+    nb_patients = np.asarray(nb_patients, dtype=np.float64)
+    completed = status != 0
+    if np.any(catalog.is_prerequisite & ~completed):
+        return np.zeros(len(nb_patients))
+    
+    # Matrices jeux × indicateurs (voir score_indicators)
+    reference = catalog.reference_patients
+    ratio = np.where(
+        reference > 0, np.minimum(nb_patients[:, None] / np.where(reference > 0, reference, 1), 1), 1
+    )
+    ratio = np.where(percentage > 0, ratio * (percentage / 100), ratio)
+    points_fixed, points_variable = compile_rules(catalog).apply_batch(nb_patients, nb_associates, counts, has_ipa)
+    
+    points = points_fixed + np.where(points_variable > 0, points_variable * ratio, 0)
+    return np.where(completed, points, 0).sum(axis=1)
+
+@timed()
+def calculate_indicator_points(indicators, nb_patients, nb_associates=None, counts=None, has_ipa=False):
+    """
+    Calcule les points obtenus pour chaque indicateur, en tenant compte des prérequis
     
-    return total_points
+    Args:
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
+        nb_patients (int): Nombre de patients médecin traitant
+        nb_associates (int, optional): Nombre d'associés. Defaults to None.
+        counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
+        
+    Returns:
+        tuple: Catalogue des indicateurs et vecteur des points obtenus
+    """
+    catalog, status, percentage = completion_vectors(indicators)
+    return catalog, score_indicators(catalog, status, percentage, nb_patients, nb_associates, counts, has_ipa)
+
+@timed()
+def calculate_total_points(indicators, nb_patients, nb_associates=None, counts=None, has_ipa=False):
+    """
+    Calcule le nombre total de points obtenus pour l'ensemble des indicateurs
+    
+    Args:
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
+        nb_patients (int): Nombre de patients médecin traitant
+        nb_associates (int, optional): Nombre d'associés. Defaults to None.
+        counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
+        
+    Returns:
+        float: Nombre total de points
+    """
+    _, points = calculate_indicator_points(indicators, nb_patients, nb_associates, counts, has_ipa)
+    return float(points.sum())
 
-def calculate_total_amount(indicators, nb_patients, nb_associates=None, point_value=POINT_VALUE):
+@timed()
+def calculate_total_amount(indicators, nb_patients, nb_associates=None, point_value=POINT_VALUE, counts=None, has_ipa=False):
     """
-    Calcule le montant total en euros pour l'ensemble des indicateurs
+    Calcule le montant total pour l'ensemble des indicateurs
     
     Args:
-        indicators (list): Liste des indicateurs
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
         nb_patients (int): Nombre de patients médecin traitant
         nb_associates (int, optional): Nombre d'associés. Defaults to None.
         point_value (float, optional): Valeur d'un point en euros. Defaults to POINT_VALUE.
+        counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
         
     Returns:
-        float: Montant total en euros
+        int: Montant total en centimes
     """
-    total_points = calculate_total_points(indicators, nb_patients, nb_associates)
-    return total_points * point_value
+    total_points = calculate_total_points(indicators, nb_patients, nb_associates, counts, has_ipa)
+    amount = to_cents(total_points * point_value)
+    
+    buffer = trace.current()
+    if buffer is not None:
+        buffer.add("total", total_points, point_value, amount)
+    return amount
 
-def calculate_points_by_axis(indicators, nb_patients, nb_associates=None):
+@timed()
+def calculate_points_by_axis(indicators, nb_patients, nb_associates=None, counts=None, has_ipa=False):
     """
     Calcule le nombre de points obtenus par axe
     
     Args:
-        indicators (list): Liste des indicateurs
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
         nb_patients (int): Nombre de patients médecin traitant
         nb_associates (int, optional): Nombre d'associés. Defaults to None.
+        counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
         
     Returns:
         dict: Dictionnaire avec les points par axe
     """
-    points_by_axis = {1: 0, 2: 0, 3: 0}
+    return sum_points_by_axis(*calculate_indicator_points(indicators, nb_patients, nb_associates, counts, has_ipa))
+
+def sum_points_by_axis(catalog, points):
+    """
+    Totalise les points de chaque indicateur par axe (voir calculate_points_by_axis)
     
-    # Vérifier si tous les indicateurs socles et prérequis sont complétés
-    prerequisites_completed = True
-    for indicator in indicators:
-        if indicator.is_prerequisite and indicator.completion_status == 0:
-            prerequisites_completed = False
-            break
+    Args:
+        catalog (IndicatorCatalog): Catalogue des indicateurs
+        points (numpy.ndarray): Points obtenus par indicateur, dans l'ordre du catalogue
+        
+    Returns:
+        dict: Dictionnaire avec les points par axe
+    """
+    totals = np.bincount(catalog.axis, weights=points, minlength=4)
     
-    # Si tous les prérequis sont complétés, on calcule les points par axe
-    if prerequisites_completed:
-        for indicator in indicators:
-            axis = indicator.axis
-            points = indicator.calculate_points(nb_patients, nb_associates)
-            points_by_axis[axis] += points
+    points_by_axis = {1: 0, 2: 0, 3: 0}
+    for axis in np.unique(catalog.axis):
+        points_by_axis[int(axis)] = float(totals[axis])
     
     return points_by_axis
 
-def calculate_points_by_type(indicators, nb_patients, nb_associates=None):
+@timed()
+def calculate_points_by_type(indicators, nb_patients, nb_associates=None, counts=None, has_ipa=False):
     """
     Calcule le nombre de points obtenus par type d'indicateur (socle ou optionnel)
     
     Args:
-        indicators (list): Liste des indicateurs
+        indicators (IndicatorState | IndicatorScenario | list): État des indicateurs,
+            scénario de simulation ou liste d'indicateurs
         nb_patients (int): Nombre de patients médecin traitant
         nb_associates (int, optional): Nombre d'associés. Defaults to None.
+        counts (dict, optional): Nombres propres aux indicateurs, par identifiant. Defaults to None.
+        has_ipa (bool, optional): Présence d'un IPA. Defaults to False.
+        
+    Returns:
+        dict: Dictionnaire avec les points par type
+    """
+    return sum_points_by_type(*calculate_indicator_points(indicators, nb_patients, nb_associates, counts, has_ipa))
+
+def sum_points_by_type(catalog, points):
+    """
+    Totalise les points de chaque indicateur par type (voir calculate_points_by_type)
+    
+    Args:
+        catalog (IndicatorCatalog): Catalogue des indicateurs
+        points (numpy.ndarray): Points obtenus par indicateur, dans l'ordre du catalogue
         
     Returns:
         dict: Dictionnaire avec les points par type
     """
-    points_by_type = {"socle": 0, "optionnel": 0}
+    return {
+        "socle": float(points[catalog.is_socle].sum()),
+        "optionnel": float(points[~catalog.is_socle].sum())
+    }
+
+@timed()
+def calculate_membership_fractions(associates, campaign_year):
+    """
+    Calcule la part de l'année de campagne pendant laquelle chaque associé était membre
     
-    # Vérifier si tous les indicateurs socles et prérequis sont complétés
-    prerequisites_completed = True
-    for indicator in indicators:
-        if indicator.is_prerequisite and indicator.completion_status == 0:
-            prerequisites_completed = False
-            break
+    Les dates d'entrée et de sortie sont incluses ; une date absente laisse la
+    période ouverte de ce côté.
     
-    # Si tous les prérequis sont complétés, on calcule les points par type
-    if prerequisites_completed:
-        for indicator in indicators:
-            type_indicator = indicator.type_indicator
-            points = indicator.calculate_points(nb_patients, nb_associates)
-            points_by_type[type_indicator] += points
+    Args:
+        associates (list): Liste des associés
+        campaign_year (int): Année de campagne ACI
+        
+    Returns:
+        numpy.ndarray: Jours de présence dans la SISA / jours de l'année, dans l'ordre de la liste
+    """
+    year_start = np.datetime64(f"{int(campaign_year):04d}-01-01")
+    year_end = np.datetime64(f"{int(campaign_year) + 1:04d}-01-01")
+    
+    entries = parse_dates([associate.entry_date for associate in associates])
+    exits = parse_dates([associate.exit_date for associate in associates]) + np.timedelta64(1, "D")
+    entries = np.where(np.isnat(entries), year_start, np.maximum(entries, year_start))
+    exits = np.where(np.isnat(exits), year_end, np.minimum(exits, year_end))
     
-    return points_by_type
+    days = (exits - entries).astype(np.float64)
+    return np.clip(days, 0, None) / (year_end - year_start).astype(np.float64)
 
-def calculate_associate_distribution(total_amount, associates, distribution_method="equal"):
+@timed()
+def get_distribution_weights(associates, distribution_method, custom_weights=None):
+    """
+    Retourne le poids de chaque associé pour une méthode de répartition
+    
+    Les parts de calculate_associate_distribution sont ces poids divisés par leur somme.
+    
+    Args:
+        associates (list): Liste des associés
+        distribution_method (str): Méthode de répartition
+        custom_weights (dict, optional): Poids par identifiant d'associé de la méthode
+            "custom" (un associé absent a un poids nul). Defaults to None.
+        
+    Returns:
+        numpy.ndarray: Poids de chaque associé, dans l'ordre de la liste
+    """
+    return np.array(_distribution_weight_list(associates, distribution_method, custom_weights), dtype=np.float64)
+
+def _distribution_weight_list(associates, distribution_method, custom_weights=None):
+    """
+    Poids de get_distribution_weights, sous forme de liste (répartitions de quelques associés)
+    """
+    if distribution_method == "custom" and custom_weights:
+        weights = [custom_weights.get(associate.id, 0) for associate in associates]
+        # Sans poids pour les associés présents, répartition égale
+        if any(weights):
+            return weights
+    if distribution_method == "presence_time":
+        return [associate.presence_time for associate in associates]
+    if distribution_method == "patients_mt":
+        weights = [associate.patients_mt or 0 for associate in associates]
+        # Sans patient médecin traitant déclaré, répartition égale
+        if any(weights):
+            return weights
+    if distribution_method == "distribution_key":
+        return [associate.distribution_key for associate in associates]
+    if distribution_method == "medical_only":
+        weights = [1.0 if associate.is_medical_profession() else 0.0 for associate in associates]
+    elif distribution_method == "paramedical_only":
+        weights = [1.0 if associate.is_paramedical_profession() else 0.0 for associate in associates]
+    else:
+        weights = None
+    # Sans associé de la catégorie, répartition égale
+    if weights and any(weights):
+        return weights
+    return [1.0] * len(associates)
+
+def get_allocation_key(expense):
+    """
+    Retourne la clé de répartition d'une charge : méthode de répartition et, pour la
+    méthode "custom", poids propres à la charge
+    
+    Les charges de même clé sont réparties selon les mêmes poids ; les calculs
+    vectoriels les regroupent sur cette clé.
+    
+    Args:
+        expense (Expense): Charge
+        
+    Returns:
+        tuple: Méthode de répartition et poids personnalisés (triés, vides hors "custom")
+    """
+    if expense.distribution_method == "custom":
+        return ("custom", tuple(sorted(expense.custom_weights.items())))
+    return (expense.distribution_method, ())
+
+def get_allocation_weights(associates, allocation_key):
+    """
+    Retourne le poids de chaque associé pour une clé de répartition (voir get_allocation_key)
+    
+    Args:
+        associates (list): Liste des associés
+        allocation_key (tuple): Méthode de répartition et poids personnalisés
+        
+    Returns:
+        numpy.ndarray: Poids de chaque associé, dans l'ordre de la liste
+    """
+    distribution_method, custom_weights = allocation_key
+    return get_distribution_weights(associates, distribution_method, dict(custom_weights))
+
+@timed()
+def calculate_associate_distribution(total_amount, associates, distribution_method="equal", campaign_year=None,
+                                     custom_weights=None, method_weights=None):
     """
     Calcule la répartition du montant total entre les associés
     
     Args:
-        total_amount (float): Montant total à répartir
+        total_amount (int): Montant total à répartir, en centimes
         associates (list): Liste des associés
         distribution_method (str, optional): Méthode de répartition. Defaults to "equal".
+        campaign_year (int, optional): Année de campagne ; le poids de chaque associé
+            (selon la méthode) est alors pondéré par sa durée de présence dans la SISA
+            pendant l'année. Defaults to None (parts entières).
+        custom_weights (dict, optional): Poids par identifiant d'associé de la méthode
+            "custom". Defaults to None.
+        method_weights (dict, optional): Poids de chaque méthode de la répartition mixte
+            ("blended"). Defaults to None.
         
     Returns:
-        dict: Dictionnaire avec les montants par associé
-    """
-    distribution = {}
-    
-    if distribution_method == "equal":
-        # Répartition égale entre tous les associés
-        amount_per_associate = total_amount / len(associates)
-        for associate in associates:
-            distribution[associate.id] = amount_per_associate
-    
-    elif distribution_method == "presence_time":
-        # Répartition au prorata du temps de présence
-        total_presence_time = sum(associate.presence_time for associate in associates)
-        for associate in associates:
-            distribution[associate.id] = total_amount * (associate.presence_time / total_presence_time)
-    
-    elif distribution_method == "distribution_key":
-        # Répartition selon la clé de répartition définie pour chaque associé
-        total_distribution_key = sum(associate.distribution_key for associate in associates)
-        for associate in associates:
-            distribution[associate.id] = total_amount * (associate.distribution_key / total_distribution_key)
-    
-    elif distribution_method == "medical_only":
-        # Répartition uniquement entre les professions médicales
-        medical_associates = [a for a in associates if a.is_medical_profession()]
-        if medical_associates:
-            amount_per_associate = total_amount / len(medical_associates)
-            for associate in associates:
-                if associate.is_medical_profession():
-                    distribution[associate.id] = amount_per_associate
-                else:
-                    distribution[associate.id] = 0
-        else:
-            # Si aucun associé médical, répartition égale
-            amount_per_associate = total_amount / len(associates)
-            for associate in associates:
-                distribution[associate.id] = amount_per_associate
-    
-    elif distribution_method == "paramedical_only":
-        # Répartition uniquement entre les professions paramédicales
-        paramedical_associates = [a for a in associates if a.is_paramedical_profession()]
-        if paramedical_associates:
-            amount_per_associate = total_amount / len(paramedical_associates)
-            for associate in associates:
-                if associate.is_paramedical_profession():
-                    distribution[associate.id] = amount_per_associate
-                else:
-                    distribution[associate.id] = 0
-        else:
-            # Si aucun associé paramédical, répartition égale
-            amount_per_associate = total_amount / len(associates)
-            for associate in associates:
-                distribution[associate.id] = amount_per_associate
+        dict: Montant de chaque associé en centimes (int) ; leur somme est exactement
+            le montant réparti
+    """
+    if distribution_method == "blended":
+        return calculate_blended_distribution(total_amount, associates, method_weights, campaign_year)
     
+    if campaign_year is not None:
+        weights = _prorated_weights(associates, distribution_method, campaign_year, custom_weights)
     else:
-        # Méthode de répartition non reconnue, répartition égale
-        amount_per_associate = total_amount / len(associates)
-        for associate in associates:
-            distribution[associate.id] = amount_per_associate
+        # Poids de la méthode (poids égaux pour une méthode non reconnue), en liste : les
+        # répartitions entre quelques associés n'utilisent que des opérations Python
+        weights = _distribution_weight_list(associates, distribution_method, custom_weights)
+    
+    # Parts en centimes par la méthode du plus fort reste : leur somme est exactement
+    # le montant réparti
+    amounts = split_cents(int(total_amount), weights)
+    distribution = dict(zip([associate.id for associate in associates], amounts))
+    
+    buffer = trace.current()
+    if buffer is not None:
+        buffer.add("distribution", total_amount, distribution_method, campaign_year, distribution)
+    return distribution
+
+@lru_cache(maxsize=32)
+def get_share_matrix(associates, methods, campaign_year=None):
+    """
+    Retourne la matrice des parts de chaque associé selon chaque méthode
+    
+    La matrice compte une ligne par associé et une colonne par méthode ; chaque
+    colonne est de somme 1 (parts de calculate_associate_distribution). Elle est
+    mémoïsée sur les valeurs des associés : la modification des poids d'une
+    répartition mixte ne la recalcule pas.
     
+    Args:
+        associates (tuple): Associés (tuple, pour pouvoir servir de clé)
+        methods (tuple): Méthodes de répartition
+        campaign_year (int, optional): Année de campagne ; les poids sont alors pondérés
+            par la durée de présence dans la SISA pendant l'année. Defaults to None.
+        
+    Returns:
+        numpy.ndarray: Matrice associés × méthodes (partagée, en lecture seule)
+    """
+    fractions = None if campaign_year is None else calculate_membership_fractions(associates, campaign_year)
+    matrix = np.zeros((len(associates), len(methods)), dtype=np.float64)
+    for j, method in enumerate(methods):
+        weights = get_distribution_weights(associates, method)
+        if fractions is not None:
+            weights = weights * fractions
+            # Aucun membre de la catégorie présent pendant l'année : répartition entre les membres présents
+            if not weights.sum() > 0:
+                weights = fractions
+        total_weight = weights.sum()
+        if total_weight > 0:
+            matrix[:, j] = weights / total_weight
+    
+    matrix.setflags(write=False)
+    return matrix
+
+@timed()
+def calculate_blended_distribution(total_amount, associates, method_weights, campaign_year=None):
+    """
+    Calcule une répartition mixte : somme pondérée des répartitions de plusieurs méthodes
+    
+    Les parts de chaque méthode forment les colonnes d'une matrice (mémoïsée) ; la
+    répartition est le produit de cette matrice par le vecteur des poids normalisés.
+    
+    Args:
+        total_amount (int): Montant total à répartir, en centimes
+        associates (list): Liste des associés
+        method_weights (dict): Poids de chaque méthode (par exemple {"equal": 50, "presence_time": 50})
+        campaign_year (int, optional): Année de campagne (voir calculate_associate_distribution).
+            Defaults to None.
+        
+    Returns:
+        dict: Montant de chaque associé en centimes (int)
+    """
+    methods = tuple(method_weights or {}) or ("equal",)
+    matrix = get_share_matrix(tuple(associates), methods, campaign_year)
+    amounts = combine_shares(total_amount, matrix, methods, method_weights)
+    distribution = dict(zip((associate.id for associate in associates), amounts.tolist()))
+    
+    buffer = trace.current()
+    if buffer is not None:
+        method = " + ".join(f"{name} ({(method_weights or {}).get(name, 0):g})" for name in methods)
+        buffer.add("distribution", total_amount, f"blended : {method}", campaign_year, distribution)
     return distribution
 
-def calculate_expense_distribution(expense, associates):
+def combine_shares(total_amount, share_matrix, methods, method_weights):
+    """
+    Répartit un montant selon une combinaison pondérée des colonnes d'une matrice de parts
+    
+    Args:
+        total_amount (int): Montant total à répartir, en centimes
+        share_matrix (numpy.ndarray): Matrice associés × méthodes (voir get_share_matrix)
+        methods (tuple): Méthodes des colonnes de la matrice
+        method_weights (dict): Poids de chaque méthode (méthodes absentes : poids nul)
+        
+    Returns:
+        numpy.ndarray: Montant de chaque associé en centimes (int64), dans l'ordre des
+            lignes de la matrice (somme exactement égale au montant réparti)
+    """
+    weights = np.array([(method_weights or {}).get(method, 0) for method in methods], dtype=np.float64)
+    # Sans poids positif, répartition égale
+    if not weights.sum() > 0:
+        return allocate_cents(int(total_amount), np.ones(len(share_matrix)))
+    return allocate_cents(int(total_amount), share_matrix @ weights)
+
+def get_distribution_shares(associates, distribution_method="equal", campaign_year=None, custom_weights=None,
+                            method_weights=None):
+    """
+    Retourne la part de chaque associé dans une répartition des rémunérations
+    
+    Ce sont les parts de calculate_associate_distribution (mêmes méthodes, mêmes
+    poids personnalisés ou mixtes, même proratisation) : une répartition annuelle
+    peut ainsi être appliquée à chaque versement d'un exercice.
+    
+    Args:
+        associates (list): Liste des associés
+        distribution_method (str, optional): Méthode de répartition. Defaults to "equal".
+        campaign_year (int, optional): Année de campagne (voir calculate_associate_distribution).
+            Defaults to None.
+        custom_weights (dict, optional): Poids de la méthode "custom". Defaults to None.
+        method_weights (dict, optional): Poids de chaque méthode de la répartition mixte. Defaults to None.
+    
+    Returns:
+        numpy.ndarray: Part de chaque associé, dans l'ordre de la liste (somme 1, ou parts
+            nulles sans associé)
+    """
+    if distribution_method == "blended":
+        methods = tuple(method_weights or {}) or ("equal",)
+        weights = np.array([(method_weights or {}).get(method, 0) for method in methods], dtype=np.float64)
+        # Sans poids positif, répartition égale (combine_shares)
+        if not weights.sum() > 0:
+            shares = np.ones(len(associates))
+        else:
+            shares = get_share_matrix(tuple(associates), methods, campaign_year) @ weights
+    elif campaign_year is not None:
+        shares = _prorated_weights(associates, distribution_method, campaign_year, custom_weights)
+    else:
+        shares = get_distribution_weights(associates, distribution_method, custom_weights)
+    
+    total = shares.sum()
+    return shares / total if total > 0 else np.zeros(len(associates))
+
+def _prorated_weights(associates, distribution_method, campaign_year, custom_weights=None):
+    """
+    Poids de la méthode pondérés par la durée de présence, en une opération vectorielle
+    """
+    fractions = calculate_membership_fractions(associates, campaign_year)
+    weights = get_distribution_weights(associates, distribution_method, custom_weights) * fractions
+    
+    # Aucun membre de la catégorie présent pendant l'année : répartition entre les membres présents
+    if not weights.sum() > 0:
+        weights = fractions
+    return weights
+
+def get_expense_schedule(expenses, fiscal_year):
+    """
+    Retourne les montants mensuels des charges sur un exercice
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int): Année de début de l'exercice
+        
+    Returns:
+        ExpenseSchedule: Montants mensuels des charges (mémoïsés)
+    """
+    return schedule_expenses(tuple(expenses), int(fiscal_year))
+
+@timed()
+def calculate_expense_amounts(expenses, fiscal_year=None):
+    """
+    Calcule le montant de chaque charge sur l'année
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int, optional): Exercice ; les montants sont alors proratisés
+            selon les dates des charges. Defaults to None (montants nominaux).
+        
+    Returns:
+        list: Montant annuel de chaque charge en centimes (int), dans l'ordre de la liste
+    """
+    return _expense_cents(expenses, fiscal_year).tolist()
+
+def _expense_cents(expenses, fiscal_year):
+    """
+    Montant annuel de chaque charge, en centimes (int64)
+    """
+    if fiscal_year is None:
+        amounts = np.fromiter((expense.get_annual_amount() for expense in expenses), dtype=np.float64)
+    else:
+        amounts = get_expense_schedule(expenses, fiscal_year).annual_amounts()
+    return to_cents(amounts)
+
+@timed()
+def calculate_expense_distribution(expense, associates, fiscal_year=None):
     """
     Calcule la répartition d'une charge entre les associés
     
     Args:
         expense (Expense): Charge à répartir
         associates (list): Liste des associés
+        fiscal_year (int, optional): Exercice de proratisation. Defaults to None.
         
     Returns:
-        dict: Dictionnaire avec les montants par associé
+        dict: Montant de chaque associé en centimes (int)
+    """
+    annual_amount = to_cents(expense.get_annual_amount(fiscal_year))
+    if trace.current() is not None:
+        return _traced_expense_distribution(expense, annual_amount, associates)
+    return calculate_associate_distribution(
+        annual_amount, associates, expense.distribution_method, custom_weights=expense.custom_weights
+    )
+
+@timed()
+def calculate_expense_distributions(expenses, associates, fiscal_year=None):
     """
-    annual_amount = expense.get_annual_amount()
-    return calculate_associate_distribution(annual_amount, associates, expense.distribution_method)
+    Calcule la répartition de chaque charge entre les associés
+    
+    Args:
+        expenses (list): Liste des charges
+        associates (list): Liste des associés
+        fiscal_year (int, optional): Exercice de proratisation. Defaults to None.
+        
+    Returns:
+        list: Répartition de chaque charge (dictionnaires des montants par associé, en centimes)
+    """
+    amounts = calculate_expense_amounts(expenses, fiscal_year)
+    if trace.current() is not None:
+        return [_traced_expense_distribution(expense, amount, associates) for expense, amount in zip(expenses, amounts)]
+    return [
+        calculate_associate_distribution(
+            amount, associates, expense.distribution_method, custom_weights=expense.custom_weights
+        )
+        for expense, amount in zip(expenses, amounts)
+    ]
 
-def calculate_total_expenses(expenses):
+def _traced_expense_distribution(expense, amount, associates):
+    """
+    Répartition d'une charge, enregistrée dans la trace sous le nom de la charge
+    """
+    with trace.context(f"Charge : {expense.name}"):
+        return calculate_associate_distribution(
+            amount, associates, expense.distribution_method, custom_weights=expense.custom_weights
+        )
+
+@timed()
+def calculate_total_expenses(expenses, fiscal_year=None):
     """
     Calcule le montant total des charges
     
     Args:
         expenses (list): Liste des charges
+        fiscal_year (int, optional): Exercice de proratisation. Defaults to None.
+        
+    Returns:
+        int: Montant total des charges en centimes (somme des montants de chaque charge)
+    """
+    return int(_expense_cents(expenses, fiscal_year).sum())
+
+@timed()
+def calculate_expenses_by_category(expenses, fiscal_year=None):
+    """
+    Calcule le montant des charges par catégorie
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int, optional): Exercice de proratisation. Defaults to None.
+        
+    Returns:
+        dict: Montant annuel par catégorie, en centimes
+    """
+    return _group_expense_amounts(expenses, "category", fiscal_year)
+
+@timed()
+def calculate_expenses_by_frequency(expenses, fiscal_year=None):
+    """
+    Calcule le montant des charges par fréquence
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int, optional): Exercice de proratisation. Defaults to None.
+        
+    Returns:
+        dict: Montant annuel par fréquence, en centimes
+    """
+    return _group_expense_amounts(expenses, "frequency", fiscal_year)
+
+def _group_expense_amounts(expenses, attribute, fiscal_year):
+    # Sommes des montants de chaque charge en centimes : les totaux des groupes
+    # ont pour somme exacte le total des charges
+    totals = {}
+    for expense, amount in zip(expenses, _expense_cents(expenses, fiscal_year).tolist()):
+        key = getattr(expense, attribute)
+        totals[key] = totals.get(key, 0) + amount
+    return totals
+
+@timed()
+def calculate_monthly_expenses(expenses, fiscal_year):
+    """
+    Calcule le total des charges de chaque mois d'un exercice
+    
+    Args:
+        expenses (list): Liste des charges
+        fiscal_year (int): Année de début de l'exercice
+        
+    Returns:
+        tuple: Mois de l'exercice (datetime64[M]) et total des charges de chaque mois, en
+            centimes (int64)
+    """
+    schedule = get_expense_schedule(expenses, fiscal_year)
+    return schedule.months, allocate_monthly_cents(schedule).sum(axis=0)
+
+def allocate_monthly_cents(schedule):
+    """
+    Répartit le montant annuel de chaque charge (en centimes) entre les mois de l'exercice
+    
+    Chaque montant annuel est réparti au prorata des montants mensuels de l'étalement,
+    par la méthode du plus fort reste : la somme des mois d'une charge est exactement
+    son montant annuel (calculate_expense_amounts).
+    
+    Args:
+        schedule (ExpenseSchedule): Montants mensuels des charges
         
     Returns:
-        float: Montant total des charges
+        numpy.ndarray: Matrice charges × mois, en centimes (int64)
     """
-    return sum(expense.get_annual_amount() for expense in expenses)
+    return allocate_cents(to_cents(schedule.annual_amounts()), schedule.amounts)
 
 def calculate_net_amount(total_amount, total_expenses):
     """
     Calcule le montant net après déduction des charges
     
     Args:
-        total_amount (float): Montant total des rémunérations
-        total_expenses (float): Montant total des charges
+        total_amount (int): Montant total des rémunérations, en centimes
+        total_expenses (int): Montant total des charges, en centimes
         
     Returns:
-        float: Montant net
+        int: Montant net en centimes
     """
-    return total_amount - total_expenses
+    return int(total_amount) - int(total_expenses)
 
+@timed()
 def calculate_associate_net_amount(associate_id, associate_distribution, expense_distributions):
     """
     Calcule le montant net pour un associé après déduction des charges
     
     Args:
         associate_id (str): Identifiant de l'associé
-        associate_distribution (dict): Répartition des rémunérations
-        expense_distributions (list): Liste des répartitions des charges
+        associate_distribution (dict): Répartition des rémunérations, en centimes
+        expense_distributions (list): Liste des répartitions des charges, en centimes
         
     Returns:
-        float: Montant net pour l'associé
+        int: Montant net pour l'associé, en centimes
     """
     # Montant brut pour l'associé
     gross_amount = associate_distribution.get(associate_id, 0)
     
-    # Somme des charges pour l'associé
+    # Somme des charges pour l'associé (somme exacte de centimes)
     total_expenses = 0
     for expense_distribution in expense_distributions:
         total_expenses += expense_distribution.get(associate_id, 0)
     
     # Montant net
-    return gross_amount - total_expenses
+    net_amount = gross_amount - total_expenses
+    
+    buffer = trace.current()
+    if buffer is not None:
+        buffer.add("net", associate_id, gross_amount, total_expenses, net_amount)
+    return net_amount
 
 def get_total_patients_mt(associates):
     """
@@ -310,19 +834,53 @@ def get_associates_by_profession(associates, profession):
     """
     return [associate for associate in associates if associate.profession == profession]
 
-def get_associates_with_role(associates, role):
+@timed()
+def get_associates_with_role(associates, role, index=None):
     """
     Retourne la liste des associés ayant un rôle donné
     
     Args:
         associates (list): Liste des associés
         role (str): Rôle recherché
+        index (RecordIndex, optional): Index des associés (voir src/utils/record_index.py) ;
+            les associés sont alors lus dans l'index inversé des rôles. Defaults to None.
         
     Returns:
         list: Liste des associés ayant le rôle
     """
+    if index is not None and index.matches(associates):
+        return index.find("roles", role)
     return [associate for associate in associates if role in associate.roles]
 
+@timed()
+def get_role_coverage(associates, index=None):
+    """
+    Indique, pour chaque rôle lié aux indicateurs ACI, s'il est tenu et par quels associés
+    
+    Chaque rôle est lu dans l'index inversé des rôles : le coût par rôle ne dépend que
+    du nombre d'associés qui le tiennent.
+    
+    Args:
+        associates (list): Liste des associés
+        index (RecordIndex, optional): Index des associés, construit s'il n'est pas fourni
+            (ou ne correspond pas à la liste). Defaults to None.
+        
+    Returns:
+        list: Pour chaque rôle, dictionnaire (rôle, indicateurs, associés, couvert)
+    """
+    if index is None or not index.matches(associates):
+        index = build_associate_index(associates)
+    
+    return [
+        {
+            "role": role,
+            "indicators": indicators,
+            "associates": index.find("roles", role),
+            "covered": index.count("roles", role) > 0
+        }
+        for role, indicators in get_aci_roles().items()
+    ]
+
 def has_ipa(associates):
     """
     Vérifie si au moins un associé est un infirmier en pratique avancée (IPA)
@@ -335,17 +893,20 @@ def has_ipa(associates):
     """
     return any(associate.profession == "Infirmier en pratique avancée (IPA)" for associate in associates)
 
-def format_currency(amount):
+def format_cents(cents):
     """
-    Formate un montant en euros
+    Formate un montant en centimes en euros
+    
+    Tous les montants calculés sont en centimes ; les montants saisis en euros
+    (montant d'une charge) sont convertis par to_cents avant l'affichage.
     
     Args:
-        amount (float): Montant à formater
+        cents (int | float): Montant à formater, en centimes (arrondi au centime)
         
     Returns:
         str: Montant formaté
     """
-    return f"{amount:.2f} €"
+    return f"{to_euros(int(round(cents))):.2f} €"
 
 def format_percentage(value):
     """
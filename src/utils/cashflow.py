@@ -0,0 +1,237 @@
+"""
+Projection mensuelle de trésorerie sur plusieurs exercices
+
+La projection combine :
+    - le calendrier de versement de la rémunération ACI : une avance sur
+      l'exercice N, versée pendant l'exercice N, puis le solde de l'exercice N,
+      versé pendant l'exercice N+1 ;
+    - l'étalement mensuel des charges (voir src/models/expense_schedule.py).
+
+Chaque versement ACI est réparti entre les associés selon la répartition des
+rémunérations de l'exercice au titre duquel il est versé (même méthode, mêmes
+poids que l'onglet de rémunération), proratisée selon les dates d'entrée et de
+sortie de cet exercice : un associé sorti ne perçoit plus que le solde des
+exercices où il était membre. Les décaissements sont répartis selon la méthode
+(et les poids personnalisés) propres à chaque charge. Tous les montants sont en
+centimes (int64) ; les résultats sont des matrices denses mois × associé,
+mémoïsées sur les valeurs des entrées.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+from src.models.expense_schedule import FISCAL_YEAR_START_MONTH, MONTHS_PER_YEAR, schedule_expenses
+from src.utils.calculations import (
+    allocate_monthly_cents, get_allocation_key, get_allocation_weights, get_distribution_shares
+)
+from src.utils.money import allocate_cents
+from src.utils.profiling import timed
+
+# Calendrier de versement de la rémunération ACI
+ACI_ADVANCE_RATE = 0.6  # Part de la rémunération versée en avance sur l'exercice
+ACI_ADVANCE_MONTH = 4  # Mois de versement de l'avance (exercice N)
+ACI_BALANCE_MONTH = 4  # Mois de versement du solde (exercice N+1)
+
+# Horizons proposés (en exercices)
+PROJECTION_HORIZONS = [1, 2, 3, 5, 10]
+
+
+class CashFlowProjection:
+    """
+    Encaissements, décaissements et solde cumulé par mois et par associé
+    
+    Les matrices inflows, outflows et balance comptent une ligne par mois de
+    l'horizon et une colonne par associé (dans l'ordre de associate_ids) ; elles
+    sont en centimes (int64) et en lecture seule.
+    """
+    
+    __slots__ = ("months", "associate_ids", "inflows", "outflows", "balance")
+    
+    def __init__(self, months, associate_ids, inflows, outflows, balance):
+        self.months = months
+        self.associate_ids = associate_ids
+        self.inflows = inflows
+        self.outflows = outflows
+        self.balance = balance
+    
+    def structure_inflows(self):
+        """
+        Retourne les encaissements de la structure pour chaque mois
+        """
+        return self.inflows.sum(axis=1)
+    
+    def structure_outflows(self):
+        """
+        Retourne les décaissements de la structure pour chaque mois
+        """
+        return self.outflows.sum(axis=1)
+    
+    def structure_balance(self):
+        """
+        Retourne le solde cumulé de la structure à la fin de chaque mois
+        """
+        return self.balance.sum(axis=1)
+    
+    def year_end_balance(self):
+        """
+        Retourne le solde cumulé de chaque associé à la fin de chaque exercice
+        
+        Returns:
+            numpy.ndarray: Matrice exercice × associé
+        """
+        return self.balance[MONTHS_PER_YEAR - 1::MONTHS_PER_YEAR]
+
+
+def _freeze(array):
+    array.setflags(write=False)
+    return array
+
+def aci_payments(months, annual_amount, previous_amount, advance_rate=ACI_ADVANCE_RATE,
+                 advance_month=ACI_ADVANCE_MONTH, balance_month=ACI_BALANCE_MONTH):
+    """
+    Retourne les versements ACI de la structure sur l'horizon
+    
+    L'avance est arrondie au centime et le solde complète le montant de l'exercice :
+    avance et solde d'un exercice font exactement sa rémunération.
+    
+    Args:
+        months (numpy.ndarray): Mois de l'horizon (datetime64[M]), par exercices entiers
+        annual_amount (int): Rémunération de chaque exercice projeté, en centimes
+        previous_amount (int): Rémunération de l'exercice précédant l'horizon, en centimes
+        advance_rate (float, optional): Part versée en avance. Defaults to ACI_ADVANCE_RATE.
+        advance_month (int, optional): Mois de versement de l'avance. Defaults to ACI_ADVANCE_MONTH.
+        balance_month (int, optional): Mois de versement du solde. Defaults to ACI_BALANCE_MONTH.
+    
+    Returns:
+        tuple: Position du mois de chaque versement, montant en centimes et exercice
+            au titre duquel il est versé (0 : premier exercice, -1 : exercice précédent)
+    """
+    calendar_months = months.astype(np.int64) % MONTHS_PER_YEAR + 1
+    positions, amounts, earned_years = [], [], []
+    
+    for year in range(len(months) // MONTHS_PER_YEAR):
+        in_year = np.arange(year * MONTHS_PER_YEAR, (year + 1) * MONTHS_PER_YEAR)
+        earned_previous = int(previous_amount if year == 0 else annual_amount)
+        advance = int(round(annual_amount * advance_rate))
+        previous_advance = int(round(earned_previous * advance_rate))
+        for position in in_year[calendar_months[in_year] == advance_month]:
+            positions.append(position)
+            amounts.append(advance)
+            earned_years.append(year)
+        for position in in_year[calendar_months[in_year] == balance_month]:
+            positions.append(position)
+            amounts.append(earned_previous - previous_advance)
+            earned_years.append(year - 1)
+    
+    return (
+        np.array(positions, dtype=np.int64), np.array(amounts, dtype=np.int64), np.array(earned_years, dtype=np.int64)
+    )
+
+@timed()
+def build_cash_flow_projection(associates, expenses, annual_amount, first_year, horizon_years,
+                               distribution_method="equal", previous_amount=None, method_weights=None,
+                               custom_weights=None, advance_rate=ACI_ADVANCE_RATE,
+                               advance_month=ACI_ADVANCE_MONTH, balance_month=ACI_BALANCE_MONTH,
+                               start_month=FISCAL_YEAR_START_MONTH):
+    """
+    Construit la projection de trésorerie mois par mois
+    
+    Args:
+        associates (list): Liste des associés
+        expenses (list): Liste des charges
+        annual_amount (int): Rémunération ACI de chaque exercice projeté, en centimes
+        first_year (int): Premier exercice de l'horizon
+        horizon_years (int): Nombre d'exercices projetés
+        distribution_method (str, optional): Méthode de répartition des rémunérations. Defaults to "equal".
+        previous_amount (int, optional): Rémunération de l'exercice précédant l'horizon, en centimes,
+            dont le solde est versé pendant le premier exercice. Defaults to None (même montant).
+        method_weights (dict, optional): Poids de chaque méthode de la répartition mixte. Defaults to None.
+        custom_weights (dict, optional): Poids de la méthode "custom" (valeurs de Shapley). Defaults to None.
+        advance_rate (float, optional): Part versée en avance. Defaults to ACI_ADVANCE_RATE.
+        advance_month (int, optional): Mois de versement de l'avance. Defaults to ACI_ADVANCE_MONTH.
+        balance_month (int, optional): Mois de versement du solde. Defaults to ACI_BALANCE_MONTH.
+        start_month (int, optional): Mois de début de l'exercice. Defaults to FISCAL_YEAR_START_MONTH.
+    
+    Returns:
+        CashFlowProjection: Projection de trésorerie
+    """
+    associates = tuple(associates)
+    expenses = tuple(expenses)
+    annual_amount = int(annual_amount)
+    previous_amount = annual_amount if previous_amount is None else int(previous_amount)
+    
+    schedules = [
+        schedule_expenses(expenses, first_year + year, start_month) for year in range(horizon_years)
+    ]
+    months = np.concatenate([schedule.months for schedule in schedules])
+    associate_ids = tuple(associate.id for associate in associates)
+    
+    if not associates:
+        empty = _freeze(np.zeros((len(months), 0), dtype=np.int64))
+        return CashFlowProjection(months, associate_ids, empty, empty, empty)
+    
+    # Encaissements : chaque versement réparti selon les parts (proratisées) de
+    # l'exercice au titre duquel il est versé
+    positions, amounts, earned_years = aci_payments(
+        months, annual_amount, previous_amount, advance_rate, advance_month, balance_month
+    )
+    shares = np.array([
+        get_distribution_shares(
+            associates, distribution_method, first_year + year, custom_weights=custom_weights,
+            method_weights=method_weights
+        )
+        for year in range(-1, horizon_years)
+    ])
+    inflows = np.zeros((len(months), len(associates)), dtype=np.int64)
+    np.add.at(inflows, positions, allocate_cents(amounts, shares[earned_years + 1]))
+    
+    # Décaissements : charges de chaque mois regroupées par clé de répartition
+    # (clés × mois), puis réparties au centime entre les associés
+    keys = [get_allocation_key(expense) for expense in expenses]
+    allocations = list(dict.fromkeys(keys))
+    outflows = np.zeros_like(inflows)
+    if allocations:
+        allocation_positions = {allocation: i for i, allocation in enumerate(allocations)}
+        allocation_index = np.array([allocation_positions[key] for key in keys])
+        weights = np.array([get_allocation_weights(associates, allocation) for allocation in allocations])
+        for year, schedule in enumerate(schedules):
+            by_allocation = np.zeros((len(allocations), MONTHS_PER_YEAR), dtype=np.int64)
+            np.add.at(by_allocation, allocation_index, allocate_monthly_cents(schedule))
+            allocated = allocate_cents(
+                by_allocation, np.broadcast_to(weights[:, None, :], by_allocation.shape + (len(associates),))
+            )
+            outflows[year * MONTHS_PER_YEAR:(year + 1) * MONTHS_PER_YEAR] = allocated.sum(axis=0)
+    
+    balance = np.cumsum(inflows - outflows, axis=0)
+    return CashFlowProjection(months, associate_ids, _freeze(inflows), _freeze(outflows), _freeze(balance))
+
+@lru_cache(maxsize=16)
+def project_cash_flow(associates, expenses, annual_amount, first_year, horizon_years,
+                      distribution_method="equal", previous_amount=None, method_weights=None, custom_weights=None):
+    """
+    Version mémoïsée de build_cash_flow_projection
+    
+    Les associés et les charges sont hachés sur leurs valeurs : toute modification
+    d'une entrée produit une nouvelle projection.
+    
+    Args:
+        associates (tuple): Associés (tuple, pour pouvoir servir de clé)
+        expenses (tuple): Charges (tuple, pour pouvoir servir de clé)
+        annual_amount (int): Rémunération ACI de chaque exercice projeté, en centimes
+        first_year (int): Premier exercice de l'horizon
+        horizon_years (int): Nombre d'exercices projetés
+        distribution_method (str, optional): Méthode de répartition des rémunérations. Defaults to "equal".
+        previous_amount (int, optional): Rémunération de l'exercice précédant l'horizon. Defaults to None.
+        method_weights (tuple, optional): Couples (méthode, poids) de la répartition mixte. Defaults to None.
+        custom_weights (tuple, optional): Couples (identifiant, poids) de la méthode "custom". Defaults to None.
+    
+    Returns:
+        CashFlowProjection: Projection de trésorerie (partagée, en lecture seule)
+    """
+    return build_cash_flow_projection(
+        associates, expenses, annual_amount, first_year, horizon_years,
+        distribution_method=distribution_method, previous_amount=previous_amount,
+        method_weights=None if method_weights is None else dict(method_weights),
+        custom_weights=None if custom_weights is None else dict(custom_weights)
+    )
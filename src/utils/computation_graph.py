@@ -0,0 +1,382 @@
+"""
+Graphe de calcul incrémental des rémunérations
+
+Les calculs forment un graphe orienté :
+    indicateurs → points par indicateur → totaux par axe et par type → montant total
+    → répartition entre les associés → montants nets
+Les associés (nombre de patients médecin traitant, nombre d'associés, présence d'un
+IPA, parts) et les charges (montants de l'exercice, charges par associé) sont
+d'autres entrées. Tous les montants du graphe sont en centimes (voir src/utils/money.py).
+
+Chaque nœud conserve sa valeur et la version des valeurs dont il dépend. Lors d'une
+lecture, un nœud n'est recalculé que si l'une de ses dépendances a changé ; si la
+nouvelle valeur est égale à l'ancienne (par exemple le nombre de patients après la
+modification du nom d'un associé), sa version ne change pas et les nœuds en aval
+sont conservés. Les entrées sont comparées par empreinte de leurs valeurs, ce qui
+détecte aussi les modifications en place des objets de la session.
+"""
+
+import numpy as np
+
+from src.models.indicators import IndicatorState
+from src.utils.calculations import (
+    BLENDED_METHODS, POINT_VALUE, calculate_associate_distribution, calculate_associate_net_amount,
+    calculate_expense_amounts, calculate_expense_distributions, calculate_net_amount, calculate_total_amount,
+    combine_shares, completion_vectors, get_allocation_key, get_allocation_weights, get_share_matrix,
+    get_total_patients_mt, has_ipa, score_indicators, sum_points_by_axis, sum_points_by_type
+)
+from src.utils.money import allocate_cents, to_cents
+from src.utils.shapley import calculate_shapley_values
+from src.utils.trace import tracing
+
+# Clé des graphes dans l'état de session (un graphe par page)
+SESSION_KEY = "computation_graphs"
+
+
+class _Node:
+    __slots__ = ("name", "function", "dependencies", "value", "version", "dependency_versions", "fingerprint")
+    
+    def __init__(self, name, function=None, dependencies=()):
+        self.name = name
+        self.function = function
+        self.dependencies = tuple(dependencies)
+        self.value = None
+        self.version = 0
+        self.dependency_versions = None
+        self.fingerprint = None
+
+
+class ComputationGraph:
+    """
+    Graphe de calcul à recalcul paresseux et incrémental
+    
+    Les nœuds sont déclarés dans l'ordre : une entrée (add_input) ou une fonction
+    de ses dépendances (add_node). La lecture d'un nœud (get) recalcule les seuls
+    nœuds dont une dépendance a changé depuis leur dernier calcul.
+    """
+    
+    def __init__(self):
+        self._nodes = {}
+        self.recomputed = []  # Nœuds recalculés depuis le dernier appel à reset_stats
+    
+    def add_input(self, name, value=None):
+        """
+        Déclare une entrée du graphe
+        
+        Args:
+            name (str): Nom de l'entrée
+            value (optional): Valeur initiale. Defaults to None.
+        """
+        node = self._nodes[name] = _Node(name)
+        node.value = value
+        node.fingerprint = fingerprint(value)
+    
+    def add_node(self, name, function, dependencies):
+        """
+        Déclare un nœud calculé
+        
+        Args:
+            name (str): Nom du nœud
+            function (callable): Fonction appelée avec les valeurs des dépendances, dans l'ordre
+            dependencies (list): Noms des dépendances (déjà déclarées)
+        """
+        for dependency in dependencies:
+            if dependency not in self._nodes:
+                raise KeyError(f"Dépendance inconnue pour {name} : {dependency}")
+        self._nodes[name] = _Node(name, function, dependencies)
+    
+    def set_input(self, name, value):
+        """
+        Modifie une entrée ; les nœuds en aval ne sont invalidés que si sa valeur a changé
+        
+        Args:
+            name (str): Nom de l'entrée
+            value: Nouvelle valeur
+        
+        Returns:
+            bool: True si la valeur a changé
+        """
+        node = self._nodes[name]
+        if node.function is not None:
+            raise ValueError(f"{name} n'est pas une entrée du graphe")
+        
+        value_fingerprint = fingerprint(value)
+        node.value = value
+        if value_fingerprint == node.fingerprint:
+            return False
+        
+        node.fingerprint = value_fingerprint
+        node.version += 1
+        return True
+    
+    def set_inputs(self, **values):
+        """
+        Modifie plusieurs entrées (voir set_input)
+        """
+        for name, value in values.items():
+            self.set_input(name, value)
+    
+    def get(self, name):
+        """
+        Retourne la valeur d'un nœud, recalculée si l'une de ses dépendances a changé
+        
+        Args:
+            name (str): Nom du nœud
+        
+        Returns:
+            Valeur du nœud
+        """
+        node = self._nodes[name]
+        if node.function is None:
+            return node.value
+        
+        values = [self.get(dependency) for dependency in node.dependencies]
+        versions = tuple(self._nodes[dependency].version for dependency in node.dependencies)
+        if versions == node.dependency_versions:
+            return node.value
+        
+        value = node.function(*values)
+        self.recomputed.append(name)
+        if node.dependency_versions is None or not _same(value, node.value):
+            node.value = value
+            node.version += 1
+        node.dependency_versions = versions
+        return node.value
+    
+    def reset_stats(self):
+        """
+        Vide la liste des nœuds recalculés
+        """
+        self.recomputed = []
+
+
+def fingerprint(value):
+    """
+    Retourne une empreinte des valeurs d'une entrée (indépendante de l'identité des objets)
+    
+    Args:
+        value: Valeur d'une entrée (état des indicateurs, liste d'associés ou de charges,
+            dictionnaire, scalaire)
+    
+    Returns:
+        Empreinte comparable
+    """
+    if isinstance(value, IndicatorState):
+        return (id(value.catalog), value.status.tobytes(), value.percentage.tobytes())
+    if isinstance(value, dict):
+        return tuple(sorted(value.items()))
+    if isinstance(value, (list, tuple)):
+        # Associés et charges sont hachés sur leurs valeurs courantes
+        return tuple(hash(item) for item in value)
+    return value
+
+def _same(a, b):
+    if isinstance(a, np.ndarray) or isinstance(b, np.ndarray):
+        return isinstance(a, np.ndarray) and isinstance(b, np.ndarray) and a.shape == b.shape and np.array_equal(a, b)
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+def _completion(indicators):
+    # Copie des vecteurs : l'état des indicateurs est modifié en place par les pages
+    catalog, status, percentage = completion_vectors(indicators)
+    return catalog, status.copy(), percentage.copy()
+
+def _share_matrix(associates, distribution_method, campaign_year):
+    if distribution_method != "blended" or not associates:
+        return None
+    return get_share_matrix(tuple(associates), tuple(BLENDED_METHODS), campaign_year)
+
+def _shapley_values(completion, associates, counts, point_value, distribution_method):
+    if distribution_method != "shapley" or not associates:
+        return None
+    return calculate_shapley_values(completion, associates, counts, point_value)
+
+def _associate_distribution(total_amount, associates, distribution_method, share_matrix, method_weights,
+                            shapley_values, campaign_year):
+    if not associates:
+        return {}
+    if share_matrix is not None:
+        amounts = combine_shares(total_amount, share_matrix, tuple(BLENDED_METHODS), method_weights)
+        return dict(zip((associate.id for associate in associates), amounts.tolist()))
+    if shapley_values is not None:
+        # Parts proportionnelles à la contribution de chaque associé (poids "custom")
+        return calculate_associate_distribution(
+            total_amount, associates, "custom", campaign_year, custom_weights=shapley_values.distribution_weights()
+        )
+    return calculate_associate_distribution(total_amount, associates, distribution_method, campaign_year=campaign_year)
+
+def _expenses_by_associate(expenses, expense_amounts, associates):
+    """
+    Charges de chaque associé, en centimes : poids calculés une fois par clé de répartition
+    (méthode, poids personnalisés), puis chaque charge répartie au centime en une opération
+    """
+    if not associates:
+        return {}
+    
+    keys = [get_allocation_key(expense) for expense in expenses]
+    allocations = list(dict.fromkeys(keys))
+    totals = np.zeros(len(associates), dtype=np.int64)
+    if allocations:
+        positions = {allocation: i for i, allocation in enumerate(allocations)}
+        weights = np.array([get_allocation_weights(associates, allocation) for allocation in allocations])
+        # Même arrondi que la répartition de chaque charge (calculate_expense_distributions)
+        shares = allocate_cents(np.asarray(expense_amounts, dtype=np.int64), weights[[positions[key] for key in keys]])
+        totals = shares.sum(axis=0)
+    
+    return dict(zip((associate.id for associate in associates), totals.tolist()))
+
+def _net_amounts(associate_distribution, expenses_by_associate):
+    return {
+        associate_id: gross - expenses_by_associate.get(associate_id, 0)
+        for associate_id, gross in associate_distribution.items()
+    }
+
+def build_remuneration_graph():
+    """
+    Construit le graphe des calculs de rémunération
+    
+    Entrées : indicators, associates, expenses, counts, fiscal_year, point_value,
+    distribution_method, method_weights, campaign_year, nb_patients_override, has_ipa_override.
+    
+    Returns:
+        ComputationGraph: Graphe prêt à recevoir les entrées
+    """
+    graph = ComputationGraph()
+    
+    graph.add_input("indicators")
+    graph.add_input("associates", [])
+    graph.add_input("expenses", [])
+    graph.add_input("counts")
+    graph.add_input("fiscal_year")
+    graph.add_input("point_value", POINT_VALUE)
+    graph.add_input("distribution_method", "equal")
+    graph.add_input("method_weights")  # Poids des méthodes de la répartition mixte
+    graph.add_input("campaign_year")
+    # Valeurs saisies à la place des valeurs déduites des associés (page des indicateurs)
+    graph.add_input("nb_patients_override")
+    graph.add_input("has_ipa_override")
+    
+    # Valeurs déduites des associés
+    graph.add_node(
+        "nb_patients",
+        lambda associates, override: get_total_patients_mt(associates) if override is None else override,
+        ["associates", "nb_patients_override"]
+    )
+    graph.add_node("nb_associates", len, ["associates"])
+    graph.add_node(
+        "has_ipa",
+        lambda associates, override: has_ipa(associates) if override is None else bool(override),
+        ["associates", "has_ipa_override"]
+    )
+    
+    # Indicateurs
+    graph.add_node("completion", _completion, ["indicators"])
+    graph.add_node(
+        "indicator_points",
+        lambda completion, nb_patients, nb_associates, counts, ipa: score_indicators(
+            *completion, nb_patients, nb_associates, counts, ipa
+        ),
+        ["completion", "nb_patients", "nb_associates", "counts", "has_ipa"]
+    )
+    # Mêmes totaux que calculate_points_by_axis et calculate_points_by_type, sur les points du graphe
+    graph.add_node(
+        "points_by_axis", lambda completion, points: sum_points_by_axis(completion[0], points),
+        ["completion", "indicator_points"]
+    )
+    graph.add_node(
+        "points_by_type", lambda completion, points: sum_points_by_type(completion[0], points),
+        ["completion", "indicator_points"]
+    )
+    graph.add_node("total_points", lambda points: float(points.sum()), ["indicator_points"])
+    graph.add_node(
+        "total_amount", lambda total, point_value: to_cents(total * point_value), ["total_points", "point_value"]
+    )
+    
+    # Répartition des rémunérations ; pour la répartition mixte, la matrice des parts
+    # ne dépend pas des poids : un changement de poids ne refait que leur combinaison
+    graph.add_node("share_matrix", _share_matrix, ["associates", "distribution_method", "campaign_year"])
+    # Répartition selon la contribution de chaque associé (valeurs de Shapley)
+    graph.add_node(
+        "shapley_values", _shapley_values, ["completion", "associates", "counts", "point_value", "distribution_method"]
+    )
+    graph.add_node(
+        "associate_distribution",
+        _associate_distribution,
+        ["total_amount", "associates", "distribution_method", "share_matrix", "method_weights", "shapley_values",
+         "campaign_year"]
+    )
+    
+    # Charges (montants en centimes)
+    graph.add_node("expense_amounts", calculate_expense_amounts, ["expenses", "fiscal_year"])
+    graph.add_node("total_expenses", sum, ["expense_amounts"])
+    graph.add_node("expenses_by_associate", _expenses_by_associate, ["expenses", "expense_amounts", "associates"])
+    
+    # Montants nets
+    graph.add_node("net_amount", calculate_net_amount, ["total_amount", "total_expenses"])
+    graph.add_node("net_amounts", _net_amounts, ["associate_distribution", "expenses_by_associate"])
+    
+    return graph
+
+def get_session_graph(session_state, name):
+    """
+    Retourne le graphe de calcul d'une page, créé au premier appel
+    
+    Chaque page conserve son propre graphe : passer d'une page à l'autre ne
+    provoque aucun recalcul si les données n'ont pas changé.
+    
+    Args:
+        session_state: État de session (st.session_state)
+        name (str): Nom de la page
+    
+    Returns:
+        ComputationGraph: Graphe de la page
+    """
+    if SESSION_KEY not in session_state:
+        session_state[SESSION_KEY] = {}
+    
+    graphs = session_state[SESSION_KEY]
+    if name not in graphs:
+        graphs[name] = build_remuneration_graph()
+    return graphs[name]
+
+def trace_remuneration(graph):
+    """
+    Refait les calculs de rémunération du graphe étape par étape, sous trace
+    
+    Les valeurs du graphe peuvent provenir de calculs antérieurs (nœuds non
+    recalculés) : les montants sont donc recalculés par les fonctions de
+    src/utils/calculations.py, avec les entrées courantes du graphe.
+    
+    Args:
+        graph (ComputationGraph): Graphe de calcul d'une page
+    
+    Returns:
+        TraceBuffer: Étapes du calcul (points, montant total, répartitions, montants nets)
+    """
+    associates = graph.get("associates")
+    expenses = graph.get("expenses")
+    distribution_method = graph.get("distribution_method")
+    custom_weights = None
+    if distribution_method == "shapley" and associates:
+        # Parts proportionnelles à la contribution de chaque associé (voir _associate_distribution)
+        distribution_method = "custom"
+        custom_weights = graph.get("shapley_values").distribution_weights()
+    
+    with tracing() as buffer:
+        total_amount = calculate_total_amount(
+            graph.get("indicators"), graph.get("nb_patients"), graph.get("nb_associates"),
+            graph.get("point_value"), graph.get("counts"), graph.get("has_ipa")
+        )
+        if associates:
+            associate_distribution = calculate_associate_distribution(
+                total_amount, associates, distribution_method, graph.get("campaign_year"),
+                custom_weights=custom_weights, method_weights=graph.get("method_weights")
+            )
+            expense_distributions = calculate_expense_distributions(expenses, associates, graph.get("fiscal_year"))
+            for associate in associates:
+                calculate_associate_net_amount(associate.id, associate_distribution, expense_distributions)
+    return buffer
@@ -4,17 +4,24 @@ Utilitaires pour la gestion des données (sauvegarde et chargement)
 
 import json
 import os
-import pandas as pd
-import streamlit as st
 from datetime import datetime
 
-from src.models.indicators import Indicator, get_indicators
-from src.models.associates import Associate, get_sample_associates
-from src.models.expenses import Expense, get_sample_expenses
+from src.models.indicators import INDICATOR_SCHEMA, IndicatorState, get_indicators
+from src.models.associates import ASSOCIATE_SCHEMA, get_sample_associates
+from src.models.expenses import EXPENSE_SCHEMA, get_sample_expenses
+from src.models.indicator_rules import DEFAULT_COUNTS
+from src.models.schema import SchemaError
+from src.utils.profiling import timed
+from src.utils.metrics import observe_export_size
 
 # Dossier de sauvegarde des données
 DATA_DIR = "data"
 
+class DataImportError(Exception):
+    """
+    Erreur levée lorsqu'un fichier ne peut pas être importé
+    """
+
 def ensure_data_dir():
     """
     S'assure que le dossier de données existe
@@ -22,6 +29,7 @@ def ensure_data_dir():
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
 
+@timed()
 def save_indicators(indicators):
     """
     Sauvegarde les indicateurs dans un fichier JSON
@@ -54,45 +62,77 @@ def save_indicators(indicators):
     with open(os.path.join(DATA_DIR, "indicators.json"), "w", encoding="utf-8") as f:
         json.dump(indicators_data, f, ensure_ascii=False, indent=4)
 
+@timed()
 def load_indicators():
     """
     Charge les indicateurs depuis un fichier JSON
     
     Returns:
-        list: Liste des indicateurs
+        IndicatorState: État de complétion des indicateurs, adossé au catalogue partagé
     """
     ensure_data_dir()
     
     # Vérification de l'existence du fichier
     if not os.path.exists(os.path.join(DATA_DIR, "indicators.json")):
         # Si le fichier n'existe pas, on retourne les indicateurs par défaut
-        return get_indicators()
+        return IndicatorState()
     
     # Chargement depuis le fichier JSON
     with open(os.path.join(DATA_DIR, "indicators.json"), "r", encoding="utf-8") as f:
         indicators_data = json.load(f)
     
-    # Conversion des dictionnaires en objets Indicator
-    indicators = []
-    for indicator_dict in indicators_data:
-        indicator = Indicator(
-            id=indicator_dict["id"],
-            name=indicator_dict["name"],
-            description=indicator_dict["description"],
-            axis=indicator_dict["axis"],
-            type_indicator=indicator_dict["type_indicator"],
-            is_prerequisite=indicator_dict["is_prerequisite"],
-            points_fixed=indicator_dict["points_fixed"],
-            points_variable=indicator_dict["points_variable"],
-            reference_patients=indicator_dict["reference_patients"],
-            max_level=indicator_dict["max_level"]
-        )
-        indicator.completion_status = indicator_dict["completion_status"]
-        indicator.completion_percentage = indicator_dict["completion_percentage"]
-        indicators.append(indicator)
-    
-    return indicators
+    # Validation et conversion des dictionnaires en objets Indicator, en une passe
+    indicators = INDICATOR_SCHEMA.decode_records(indicators_data, path=os.path.join(DATA_DIR, "indicators.json"))
+    
+    return IndicatorState.from_indicators(indicators)
+
+@timed()
+def save_indicator_counts(counts):
+    """
+    Sauvegarde les nombres propres aux indicateurs (protocoles, missions, stages) dans un fichier JSON
+    
+    Args:
+        counts (dict): Nombre propre de chaque indicateur
+    """
+    ensure_data_dir()
+    
+    with open(os.path.join(DATA_DIR, "indicator_counts.json"), "w", encoding="utf-8") as f:
+        json.dump(counts, f, ensure_ascii=False, indent=4)
 
+@timed()
+def load_indicator_counts():
+    """
+    Charge les nombres propres aux indicateurs depuis un fichier JSON
+    
+    Les indicateurs absents du fichier (tous, s'il n'existe pas) prennent les nombres
+    proposés à la saisie (DEFAULT_COUNTS) : le montant calculé correspond toujours aux
+    nombres affichés.
+    
+    Returns:
+        dict: Nombre propre de chaque indicateur
+    
+    Raises:
+        SchemaError: Nombre absent ou invalide dans le fichier
+    """
+    ensure_data_dir()
+    
+    counts = dict(DEFAULT_COUNTS)
+    path = os.path.join(DATA_DIR, "indicator_counts.json")
+    if not os.path.exists(path):
+        return counts
+    
+    with open(path, "r", encoding="utf-8") as f:
+        counts_data = json.load(f)
+    
+    if type(counts_data) is not dict:
+        raise SchemaError(path, f"objet attendu, {json.dumps(counts_data, ensure_ascii=False)} reçu")
+    for indicator_id, count in counts_data.items():
+        if type(count) is not int or count < 0:
+            raise SchemaError(f"{path}.{indicator_id}", f"entier positif attendu, {json.dumps(count)} reçu")
+        counts[indicator_id] = count
+    return counts
+
+@timed()
 def save_associates(associates):
     """
     Sauvegarde les associés dans un fichier JSON
@@ -109,6 +149,7 @@ def save_associates(associates):
     with open(os.path.join(DATA_DIR, "associates.json"), "w", encoding="utf-8") as f:
         json.dump(associates_data, f, ensure_ascii=False, indent=4)
 
+@timed()
 def load_associates():
     """
     Charge les associés depuis un fichier JSON
@@ -127,11 +168,12 @@ def load_associates():
     with open(os.path.join(DATA_DIR, "associates.json"), "r", encoding="utf-8") as f:
         associates_data = json.load(f)
     
-    # Conversion des dictionnaires en objets Associate
-    associates = [Associate.from_dict(associate_dict) for associate_dict in associates_data]
+    # Validation et conversion des dictionnaires en objets Associate, en une passe
+    associates = ASSOCIATE_SCHEMA.decode_records(associates_data, path=os.path.join(DATA_DIR, "associates.json"))
     
     return associates
 
+@timed()
 def save_expenses(expenses):
     """
     Sauvegarde les charges dans un fichier JSON
@@ -148,6 +190,7 @@ def save_expenses(expenses):
     with open(os.path.join(DATA_DIR, "expenses.json"), "w", encoding="utf-8") as f:
         json.dump(expenses_data, f, ensure_ascii=False, indent=4)
 
+@timed()
 def load_expenses():
     """
     Charge les charges depuis un fichier JSON
@@ -166,12 +209,13 @@ def load_expenses():
     with open(os.path.join(DATA_DIR, "expenses.json"), "r", encoding="utf-8") as f:
         expenses_data = json.load(f)
     
-    # Conversion des dictionnaires en objets Expense
-    expenses = [Expense.from_dict(expense_dict) for expense_dict in expenses_data]
+    # Validation et conversion des dictionnaires en objets Expense, en une passe
+    expenses = EXPENSE_SCHEMA.decode_records(expenses_data, path=os.path.join(DATA_DIR, "expenses.json"))
     
     return expenses
 
-def export_to_excel(indicators, associates, expenses, filename=None):
+@timed()
+def export_to_excel(indicators, associates, expenses, filename=None, fiscal_year=None):
     """
     Exporte les données dans un fichier Excel
     
@@ -180,10 +224,14 @@ def export_to_excel(indicators, associates, expenses, filename=None):
         associates (list): Liste des associés
         expenses (list): Liste des charges
         filename (str, optional): Nom du fichier. Defaults to None.
+        fiscal_year (int, optional): Exercice ; ajoute le montant proratisé de chaque
+            charge sur cet exercice. Defaults to None.
         
     Returns:
         str: Chemin du fichier Excel
     """
+    import pandas as pd
+    
     ensure_data_dir()
     
     # Génération du nom de fichier s'il n'est pas spécifié
@@ -208,6 +256,8 @@ def export_to_excel(indicators, associates, expenses, filename=None):
                 "Prérequis": "Oui" if indicator.is_prerequisite else "Non",
                 "Points fixes": indicator.points_fixed,
                 "Points variables": indicator.points_variable,
+                "Patients de référence": indicator.reference_patients,
+                "Niveau maximal": indicator.max_level,
                 "Statut de complétion": indicator.completion_status,
                 "Pourcentage de complétion": indicator.completion_percentage
             }
@@ -225,6 +275,7 @@ def export_to_excel(indicators, associates, expenses, filename=None):
                 "Profession": associate.profession,
                 "Spécialité": associate.speciality,
                 "Date d'entrée": associate.entry_date,
+                "Date de sortie": associate.exit_date,
                 "Rôles": ", ".join(associate.roles),
                 "Patients MT": associate.patients_mt,
                 "Temps de présence": associate.presence_time,
@@ -250,15 +301,114 @@ def export_to_excel(indicators, associates, expenses, filename=None):
                 "Date de début": expense.start_date,
                 "Date de fin": expense.end_date,
                 "Méthode de répartition": expense.distribution_method,
+                "Poids personnalisés": json.dumps(expense.custom_weights) if expense.custom_weights else None,
                 "Montant annuel": expense.get_annual_amount(),
                 "Montant mensuel": expense.get_monthly_amount()
             }
+            if fiscal_year is not None:
+                expense_dict[f"Montant {fiscal_year}"] = expense.get_annual_amount(fiscal_year)
             expenses_data.append(expense_dict)
         
         pd.DataFrame(expenses_data).to_excel(writer, sheet_name="Charges", index=False)
     
+    observe_export_size("xlsx", os.path.getsize(filepath))
+    
     return filepath
 
+# Colonnes des feuilles Excel et champs correspondants des modèles
+INDICATOR_COLUMNS = {
+    "ID": "id",
+    "Nom": "name",
+    "Description": "description",
+    "Axe": "axis",
+    "Type": "type_indicator",
+    "Prérequis": "is_prerequisite",
+    "Points fixes": "points_fixed",
+    "Points variables": "points_variable",
+    "Patients de référence": "reference_patients",
+    "Niveau maximal": "max_level",
+    "Statut de complétion": "completion_status",
+    "Pourcentage de complétion": "completion_percentage",
+}
+
+ASSOCIATE_COLUMNS = {
+    "ID": "id",
+    "Prénom": "first_name",
+    "Nom": "last_name",
+    "Profession": "profession",
+    "Spécialité": "speciality",
+    "Date d'entrée": "entry_date",
+    "Date de sortie": "exit_date",
+    "Rôles": "roles",
+    "Patients MT": "patients_mt",
+    "Temps de présence": "presence_time",
+    "Clé de répartition": "distribution_key",
+    "Email": "email",
+    "Téléphone": "phone",
+    "RPPS": "rpps",
+}
+
+EXPENSE_COLUMNS = {
+    "ID": "id",
+    "Nom": "name",
+    "Description": "description",
+    "Catégorie": "category",
+    "Montant": "amount",
+    "Fréquence": "frequency",
+    "Date de début": "start_date",
+    "Date de fin": "end_date",
+    "Méthode de répartition": "distribution_method",
+    "Poids personnalisés": "custom_weights",
+}
+
+def _text_columns(schema, columns):
+    """
+    Colonnes lues comme du texte : champs de type chaîne (identifiants, téléphones et
+    numéros RPPS composés de chiffres)
+    """
+    kinds = {field["name"]: field["kind"] for field in schema.fields}
+    return {column: str for column, name in columns.items() if kinds[name] == "string"}
+
+def _sheet_records(df, columns):
+    """
+    Convertit une feuille Excel en enregistrements au format des fichiers JSON
+    
+    Les colonnes absentes (exports antérieurs) et les cellules vides sont omises :
+    le champ prend sa valeur par défaut. Les nombres NumPy deviennent des nombres
+    Python et les dates des textes AAAA-MM-JJ.
+    
+    Args:
+        df (pandas.DataFrame): Feuille lue
+        columns (dict): Champ du modèle de chaque colonne
+    
+    Returns:
+        list: Enregistrements (dictionnaires champ → valeur)
+    """
+    present = [column for column in columns if column in df.columns]
+    df = df[present].astype(object)
+    df = df.where(df.notna(), None)
+    
+    records = []
+    for row in df.itertuples(index=False, name=None):
+        record = {}
+        for column, value in zip(present, row):
+            if value is None:
+                continue
+            if isinstance(value, datetime):
+                value = value.date().isoformat()
+            record[columns[column]] = value
+        records.append(record)
+    return records
+
+def _parse_custom_weights(value):
+    """
+    Lit les poids personnalisés d'une charge (JSON {id d'associé: poids}) depuis une cellule Excel
+    """
+    if not isinstance(value, str) or not value.strip():
+        return None
+    return json.loads(value)
+
+@timed()
 def import_from_excel(filepath):
     """
     Importe les données depuis un fichier Excel
@@ -268,87 +418,128 @@ def import_from_excel(filepath):
         
     Returns:
         tuple: Tuple contenant les listes d'indicateurs, d'associés et de charges
+        
+    Raises:
+        DataImportError: Si le fichier n'existe pas ou ne peut pas être lu
     """
+    import pandas as pd
+    
     # Vérification de l'existence du fichier
     if not os.path.exists(filepath):
-        st.error(f"Le fichier {filepath} n'existe pas.")
-        return None, None, None
+        raise DataImportError(f"Le fichier {filepath} n'existe pas.")
     
     try:
         # Lecture du fichier Excel
-        indicators_df = pd.read_excel(filepath, sheet_name="Indicateurs")
-        associates_df = pd.read_excel(filepath, sheet_name="Associés")
-        expenses_df = pd.read_excel(filepath, sheet_name="Charges")
+        indicators_df = pd.read_excel(filepath, sheet_name="Indicateurs", dtype=_text_columns(INDICATOR_SCHEMA, INDICATOR_COLUMNS))
+        associates_df = pd.read_excel(filepath, sheet_name="Associés", dtype=_text_columns(ASSOCIATE_SCHEMA, ASSOCIATE_COLUMNS))
+        expenses_df = pd.read_excel(filepath, sheet_name="Charges", dtype=_text_columns(EXPENSE_SCHEMA, EXPENSE_COLUMNS))
         
-        # Conversion des DataFrames en objets
-        indicators = []
-        for _, row in indicators_df.iterrows():
-            indicator = Indicator(
-                id=row["ID"],
-                name=row["Nom"],
-                description=row["Description"],
-                axis=row["Axe"],
-                type_indicator=row["Type"],
-                is_prerequisite=row["Prérequis"] == "Oui",
-                points_fixed=row["Points fixes"],
-                points_variable=row["Points variables"],
-                reference_patients=4000,  # Valeur par défaut
-                max_level=1  # Valeur par défaut
-            )
-            indicator.completion_status = row["Statut de complétion"]
-            indicator.completion_percentage = row["Pourcentage de complétion"]
-            indicators.append(indicator)
+        # Conversion des feuilles en enregistrements, validés et décodés par les schémas
+        # des modèles (comme les fichiers JSON)
+        indicators_data = _sheet_records(indicators_df, INDICATOR_COLUMNS)
+        catalog = {indicator.id: indicator for indicator in get_indicators()}
+        for record in indicators_data:
+            record["is_prerequisite"] = record.get("is_prerequisite") == "Oui"
+            # Absents des exports antérieurs : valeurs de l'indicateur du catalogue
+            if record.get("id") in catalog:
+                record.setdefault("reference_patients", catalog[record["id"]].reference_patients)
+                record.setdefault("max_level", catalog[record["id"]].max_level)
+        indicators = INDICATOR_SCHEMA.decode_records(indicators_data, path=f"{filepath}[Indicateurs]")
         
-        associates = []
-        for _, row in associates_df.iterrows():
-            roles = row["Rôles"].split(", ") if isinstance(row["Rôles"], str) else []
-            associate = Associate(
-                id=row["ID"],
-                first_name=row["Prénom"],
-                last_name=row["Nom"],
-                profession=row["Profession"],
-                speciality=row["Spécialité"],
-                entry_date=row["Date d'entrée"],
-                roles=roles,
-                patients_mt=row["Patients MT"],
-                presence_time=row["Temps de présence"],
-                distribution_key=row["Clé de répartition"],
-                email=row["Email"],
-                phone=row["Téléphone"],
-                rpps=row["RPPS"]
-            )
-            associates.append(associate)
+        associates_data = _sheet_records(associates_df, ASSOCIATE_COLUMNS)
+        for record in associates_data:
+            roles = record.get("roles")
+            record["roles"] = roles.split(", ") if isinstance(roles, str) and roles else []
+        associates = ASSOCIATE_SCHEMA.decode_records(associates_data, path=f"{filepath}[Associés]")
         
-        expenses = []
-        for _, row in expenses_df.iterrows():
-            expense = Expense(
-                id=row["ID"],
-                name=row["Nom"],
-                description=row["Description"],
-                category=row["Catégorie"],
-                amount=row["Montant"],
-                frequency=row["Fréquence"],
-                start_date=row["Date de début"],
-                end_date=row["Date de fin"],
-                distribution_method=row["Méthode de répartition"]
-            )
-            expenses.append(expense)
+        expenses_data = _sheet_records(expenses_df, EXPENSE_COLUMNS)
+        for record in expenses_data:
+            # Absents des exports antérieurs
+            record["custom_weights"] = _parse_custom_weights(record.get("custom_weights"))
+        expenses = EXPENSE_SCHEMA.decode_records(expenses_data, path=f"{filepath}[Charges]")
         
         return indicators, associates, expenses
     
     except Exception as e:
-        st.error(f"Erreur lors de l'importation du fichier Excel : {str(e)}")
-        return None, None, None
+        raise DataImportError(f"Erreur lors de l'importation du fichier Excel : {str(e)}") from e
 
-def initialize_session_state():
+# Chargement de chaque collection de la session, au premier accès
+LOADERS = {
+    "indicators": load_indicators,
+    "associates": load_associates,
+    "expenses": load_expenses,
+    "indicator_counts": load_indicator_counts,  # Nombres propres aux indicateurs (protocoles, missions, stages)
+}
+
+class DataRepository:
     """
-    Initialise les données de session si elles n'existent pas
+    Accès unique des pages aux données de la session
+    
+    Chaque collection est chargée au premier accès (LOADERS), puis conservée dans
+    l'état de session sous son nom : une page ne charge que les données qu'elle
+    affiche, et chaque fichier n'est lu qu'une fois par session.
+    
+    Args:
+        session_state: État de session (st.session_state)
     """
-    if 'indicators' not in st.session_state:
-        st.session_state.indicators = load_indicators()
     
-    if 'associates' not in st.session_state:
-        st.session_state.associates = load_associates()
+    __slots__ = ("session_state",)
     
-    if 'expenses' not in st.session_state:
-        st.session_state.expenses = load_expenses()
+    def __init__(self, session_state):
+        self.session_state = session_state
+    
+    def get(self, name):
+        """
+        Retourne une collection de la session, chargée au premier accès
+        
+        Args:
+            name (str): Nom de la collection ("indicators", "associates", "expenses", "indicator_counts")
+        """
+        if name not in self.session_state:
+            self.session_state[name] = LOADERS[name]()
+        return self.session_state[name]
+    
+    def is_loaded(self, name):
+        """
+        Indique si une collection a déjà été chargée dans la session
+        """
+        return name in self.session_state
+    
+    def replace(self, name, value):
+        """
+        Remplace une collection de la session (import, réinitialisation)
+        """
+        if name not in LOADERS:
+            raise KeyError(f"Collection inconnue : {name}")
+        self.session_state[name] = value
+    
+    @property
+    def indicators(self):
+        return self.get("indicators")
+    
+    @property
+    def associates(self):
+        return self.get("associates")
+    
+    @property
+    def expenses(self):
+        return self.get("expenses")
+    
+    @property
+    def indicator_counts(self):
+        return self.get("indicator_counts")
+
+def get_repository(session_state=None):
+    """
+    Retourne le dépôt des données de la session
+    
+    Args:
+        session_state (optional): État de session. Defaults to st.session_state.
+    
+    Returns:
+        DataRepository: Dépôt des données
+    """
+    if session_state is None:
+        import streamlit as st
+        session_state = st.session_state
+    return DataRepository(session_state)
@@ -0,0 +1,290 @@
+"""
+Historique des modifications (annuler / rétablir) des éditeurs de la session
+
+Chaque éditeur (indicateurs, associés, charges) a son propre historique, conservé
+dans l'état de session (get_history). Une modification est enregistrée sous la
+forme d'une étape qui ne contient que ce qui a changé :
+    - RecordChange : ajout, modification ou suppression d'un associé ou d'une
+      charge (l'enregistrement et sa position dans la liste, ou ses valeurs avant
+      et après la modification) ;
+    - IndicatorChange : ancienne et nouvelle valeur d'un champ d'un indicateur
+      (niveau, pourcentage ou nombre propre).
+Les versions successives des données partagent donc tous les enregistrements non
+modifiés : une étape coûte la taille de l'enregistrement modifié, quelle que soit
+la taille des listes, au lieu d'une copie complète des données de la session.
+
+Annuler rejoue la dernière étape à l'envers sur les données de la session (les
+listes passent par leur index, qui reste à jour) ; rétablir la rejoue à l'endroit.
+Une nouvelle modification vide la pile des étapes à rétablir. L'historique est
+vidé si la collection de la session a été remplacée (chargement, import).
+"""
+
+from collections import deque
+
+from src.utils.data_manager import DataRepository
+from src.utils.record_index import get_session_index
+
+# Clé des historiques dans l'état de session
+SESSION_KEY = "edit_histories"
+
+# Nombre maximal d'étapes conservées par éditeur (les plus anciennes sont oubliées)
+MAX_LEVELS = 500
+
+def snapshot_record(record):
+    """
+    Retourne les valeurs d'un enregistrement (associé ou charge), listes et dictionnaires copiés
+    """
+    return tuple(_copy_value(getattr(record, name)) for name in type(record).__slots__)
+
+def restore_record(record, values):
+    """
+    Rétablit en place les valeurs d'un enregistrement relevées par snapshot_record
+    """
+    for name, value in zip(type(record).__slots__, values):
+        setattr(record, name, _copy_value(value))
+
+def _copy_value(value):
+    if isinstance(value, list):
+        return list(value)
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+class RecordChange:
+    """
+    Ajout, modification ou suppression d'un enregistrement d'une liste de la session
+    
+    Args:
+        name (str): Nom de la liste ("associates" ou "expenses")
+        kind (str): "add", "update" ou "remove"
+        record: Enregistrement ajouté ou supprimé, ou enregistrement modifié
+        position (int, optional): Position de l'enregistrement ajouté ou supprimé
+        before (tuple, optional): Valeurs avant la modification (snapshot_record)
+        after (tuple, optional): Valeurs après la modification (snapshot_record)
+    """
+    
+    __slots__ = ("name", "kind", "record", "position", "before", "after")
+    
+    def __init__(self, name, kind, record, position=None, before=None, after=None):
+        self.name = name
+        self.kind = kind
+        self.record = record
+        self.position = position
+        self.before = before
+        self.after = after
+    
+    def undo(self, session_state):
+        index = get_session_index(session_state, self.name)
+        if self.kind == "add":
+            index.remove(self.record.id)
+        elif self.kind == "remove":
+            index.restore(self.position, self.record)
+        else:
+            self._restore(index, self.before)
+    
+    def redo(self, session_state):
+        index = get_session_index(session_state, self.name)
+        if self.kind == "add":
+            index.restore(self.position, self.record)
+        elif self.kind == "remove":
+            index.remove(self.record.id)
+        else:
+            self._restore(index, self.after)
+    
+    def _restore(self, index, values):
+        record = index.get(self.record.id)
+        restore_record(record, values)
+        index.update(record)
+
+class IndicatorChange:
+    """
+    Modification d'un champ d'un indicateur
+    
+    Args:
+        indicator_id (str): Identifiant de l'indicateur
+        field (str): "completion_status", "completion_percentage" ou "count"
+            (nombre propre à l'indicateur, None s'il n'a pas été saisi)
+        before: Valeur avant la modification
+        after: Valeur après la modification
+    """
+    
+    __slots__ = ("indicator_id", "field", "before", "after")
+    
+    def __init__(self, indicator_id, field, before, after):
+        self.indicator_id = indicator_id
+        self.field = field
+        self.before = before
+        self.after = after
+    
+    def undo(self, session_state):
+        self._set(DataRepository(session_state), self.before)
+    
+    def redo(self, session_state):
+        self._set(DataRepository(session_state), self.after)
+    
+    def _set(self, repository, value):
+        if self.field != "count":
+            setattr(repository.indicators.get(self.indicator_id), self.field, value)
+        elif value is None:
+            repository.indicator_counts.pop(self.indicator_id, None)
+        else:
+            repository.indicator_counts[self.indicator_id] = value
+
+class EditHistory:
+    """
+    Piles des étapes à annuler et à rétablir d'un éditeur
+    
+    Args:
+        name (str): Nom de la collection éditée ("indicators", "associates", "expenses")
+        target: Collection de la session à laquelle s'appliquent les étapes
+        max_levels (int, optional): Nombre maximal d'étapes conservées. Defaults to MAX_LEVELS.
+    """
+    
+    __slots__ = ("name", "target", "undo_steps", "redo_steps")
+    
+    def __init__(self, name, target, max_levels=MAX_LEVELS):
+        self.name = name
+        self.target = target
+        self.undo_steps = deque(maxlen=max_levels)
+        self.redo_steps = deque(maxlen=max_levels)
+    
+    def can_undo(self):
+        return bool(self.undo_steps)
+    
+    def can_redo(self):
+        return bool(self.redo_steps)
+    
+    def record(self, step):
+        """
+        Enregistre une étape déjà appliquée (vide la pile des étapes à rétablir)
+        """
+        self.undo_steps.append(step)
+        self.redo_steps.clear()
+    
+    def undo(self, session_state):
+        """
+        Annule la dernière étape
+        
+        Returns:
+            bool: True si une étape a été annulée
+        """
+        if not self.undo_steps:
+            return False
+        step = self.undo_steps.pop()
+        step.undo(session_state)
+        self.redo_steps.append(step)
+        return True
+    
+    def redo(self, session_state):
+        """
+        Rétablit la dernière étape annulée
+        
+        Returns:
+            bool: True si une étape a été rétablie
+        """
+        if not self.redo_steps:
+            return False
+        step = self.redo_steps.pop()
+        step.redo(session_state)
+        self.undo_steps.append(step)
+        return True
+    
+    def add_record(self, index, record):
+        """
+        Ajoute un enregistrement à la liste (au travers de son index) et enregistre l'étape
+        """
+        index.add(record)
+        self.record(RecordChange(self.name, "add", record, position=index.position(record.id)))
+    
+    def update_record(self, index, record, before):
+        """
+        Met à jour l'index d'un enregistrement modifié en place et enregistre l'étape
+        
+        Args:
+            index (RecordIndex): Index de la liste
+            record: Enregistrement modifié
+            before (tuple): Valeurs avant la modification (snapshot_record)
+        """
+        index.update(record)
+        after = snapshot_record(record)
+        if after != before:
+            self.record(RecordChange(self.name, "update", record, before=before, after=after))
+    
+    def remove_record(self, index, record_id):
+        """
+        Supprime un enregistrement de la liste (au travers de son index) et enregistre l'étape
+        """
+        position = index.position(record_id)
+        record = index.remove(record_id)
+        self.record(RecordChange(self.name, "remove", record, position=position))
+        return record
+    
+    def set_indicator(self, indicator, field, value):
+        """
+        Modifie le niveau ou le pourcentage de complétion d'un indicateur (étape enregistrée
+        seulement si la valeur change)
+        """
+        before = getattr(indicator, field)
+        if value != before:
+            setattr(indicator, field, value)
+            self.record(IndicatorChange(indicator.id, field, before, getattr(indicator, field)))
+    
+    def set_count(self, counts, indicator_id, value):
+        """
+        Modifie le nombre propre à un indicateur (étape enregistrée seulement si la valeur change)
+        """
+        before = counts.get(indicator_id)
+        if value != before:
+            counts[indicator_id] = value
+            self.record(IndicatorChange(indicator_id, "count", before, value))
+
+def get_history(session_state, name):
+    """
+    Retourne l'historique d'un éditeur, créé au premier appel
+    
+    L'historique est recréé (vide) si la collection de la session a été remplacée.
+    
+    Args:
+        session_state: État de session (st.session_state)
+        name (str): Nom de la collection éditée ("indicators", "associates", "expenses")
+    
+    Returns:
+        EditHistory: Historique de l'éditeur
+    """
+    if SESSION_KEY not in session_state:
+        session_state[SESSION_KEY] = {}
+    
+    histories = session_state[SESSION_KEY]
+    target = DataRepository(session_state).get(name)
+    if name not in histories or histories[name].target is not target:
+        histories[name] = EditHistory(name, target)
+    return histories[name]
+
+def display_history_controls(name):
+    """
+    Affiche les boutons « Annuler » et « Rétablir » d'un éditeur
+    
+    Les étapes sont rejouées dans les rappels des boutons, avant l'affichage de la page.
+    """
+    import streamlit as st
+    
+    history = get_history(st.session_state, name)
+    col1, col2, _ = st.columns([1, 1, 4])
+    with col1:
+        st.button(
+            f"↶ Annuler ({len(history.undo_steps)})",
+            key=f"undo_{name}",
+            disabled=not history.can_undo(),
+            on_click=history.undo,
+            args=(st.session_state,),
+            use_container_width=True
+        )
+    with col2:
+        st.button(
+            f"↷ Rétablir ({len(history.redo_steps)})",
+            key=f"redo_{name}",
+            disabled=not history.can_redo(),
+            on_click=history.redo,
+            args=(st.session_state,),
+            use_container_width=True
+        )
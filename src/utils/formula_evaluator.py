@@ -0,0 +1,454 @@
+"""
+Évaluation des formules d'une feuille de calcul Excel (sous-ensemble)
+
+Les formules sont compilées une fois en fonctions Python, puis évaluées pour un
+jeu de valeurs des cellules d'entrée. Les valeurs peuvent être des scalaires ou
+des vecteurs NumPy : un lot de N jeux d'entrées est évalué en une seule passe,
+chaque opération portant sur les N valeurs à la fois.
+
+Sous-ensemble pris en charge :
+    - nombres, textes ("..."), TRUE / FALSE, références de cellules de la
+      feuille (A1, $A$1) et plages (A1:B5) en argument de fonction ;
+    - opérateurs + - * / ^ & % et comparaisons = <> < > <= >= ;
+    - fonctions IF, AND, OR, NOT, SUM, MIN, MAX, ABS.
+Comme dans Excel, les comparaisons de textes ignorent la casse, une cellule vide
+vaut 0 dans un calcul et "" dans une comparaison à un texte. Les divisions par
+zéro donnent NaN ou l'infini (au lieu de #DIV/0!).
+"""
+
+import re
+
+import numpy as np
+
+
+class FormulaError(Exception):
+    """
+    Erreur levée pour une formule non prise en charge ou une référence circulaire
+    """
+
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"]|"")*")
+      | (?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)
+      | (?P<function>[A-Za-z_][A-Za-z0-9_.]*)\s*\(
+      | (?P<range>\$?[A-Za-z]{1,3}\$?\d+:\$?[A-Za-z]{1,3}\$?\d+)
+      | (?P<cell>\$?[A-Za-z]{1,3}\$?\d+)(?![A-Za-z0-9_])
+      | (?P<boolean>(?i:TRUE|FALSE))(?![A-Za-z0-9_])
+      | (?P<operator><=|>=|<>|[-+*/^&=<>%])
+      | (?P<punctuation>[(),;])
+    )""", re.VERBOSE)
+
+_COMPARISONS = {
+    "=": np.equal, "<>": np.not_equal, "<": np.less, ">": np.greater, "<=": np.less_equal, ">=": np.greater_equal
+}
+
+# Rang des types dans une comparaison mixte (Excel : nombre < texte < booléen)
+_KIND_ORDER = {"number": 0, "text": 1, "boolean": 2}
+
+
+def tokenize(formula):
+    """
+    Découpe une formule (sans le signe = initial) en lexèmes
+    
+    Returns:
+        list: Lexèmes (type, texte)
+    """
+    tokens = []
+    position = 0
+    formula = formula.rstrip()
+    while position < len(formula):
+        match = _TOKEN.match(formula, position)
+        if match is None:
+            raise FormulaError(f"Formule non prise en charge : {formula!r} (position {position})")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind)))
+        if kind == "function":
+            tokens.append(("punctuation", "("))
+        position = match.end()
+    return tokens
+
+def normalize_reference(reference):
+    """
+    Retourne une référence de cellule sans $ et en majuscules (par exemple "F12")
+    """
+    return reference.replace("$", "").upper()
+
+def split_reference(reference):
+    """
+    Retourne la colonne (lettres) et la ligne (entier) d'une référence de cellule
+    """
+    match = re.fullmatch(r"([A-Z]{1,3})(\d+)", normalize_reference(reference))
+    if match is None:
+        raise FormulaError(f"Référence de cellule invalide : {reference!r}")
+    return match.group(1), int(match.group(2))
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord("A") + 1
+    return index
+
+def _column_letters(index):
+    letters = ""
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(ord("A") + remainder) + letters
+    return letters
+
+def expand_range(reference):
+    """
+    Retourne les cellules d'une plage (par exemple "F12:F14" → F12, F13, F14)
+    """
+    start, end = reference.split(":")
+    (start_column, start_row), (end_column, end_row) = split_reference(start), split_reference(end)
+    columns = range(_column_index(start_column), _column_index(end_column) + 1)
+    return [f"{_column_letters(column)}{row}" for row in range(start_row, end_row + 1) for column in columns]
+
+
+# Conversions (scalaires ou vecteurs ; None : cellule vide)
+
+def _kind(value):
+    if value is None:
+        return "blank"
+    if isinstance(value, (bool, np.bool_)) or (isinstance(value, np.ndarray) and value.dtype == bool):
+        return "boolean"
+    if isinstance(value, str) or (isinstance(value, np.ndarray) and value.dtype.kind in "UO"):
+        return "text"
+    return "number"
+
+def _number(value):
+    kind = _kind(value)
+    if kind == "blank":
+        return 0.0
+    if kind == "text":
+        # Texte vide (cellule d'entrée non renseignée) : 0
+        text = np.asarray(value, dtype=str)
+        try:
+            return np.where(text == "", "0", text).astype(np.float64)
+        except ValueError:
+            raise FormulaError(f"Texte utilisé dans un calcul : {value!r}") from None
+    return np.asarray(value, dtype=np.float64) if isinstance(value, np.ndarray) else float(value)
+
+def _text(value):
+    kind = _kind(value)
+    if kind == "blank":
+        return ""
+    if kind == "text":
+        return value
+    if kind == "boolean":
+        return np.where(value, "TRUE", "FALSE") if isinstance(value, np.ndarray) else ("TRUE" if value else "FALSE")
+    return np.char.mod("%.15g", value) if isinstance(value, np.ndarray) else f"{value:.15g}"
+
+def _boolean(value):
+    if _kind(value) == "text":
+        return np.char.upper(np.asarray(value, dtype=str)) == "TRUE"
+    return _number(value) != 0
+
+def _compare(operator, left, right):
+    left_kind, right_kind = _kind(left), _kind(right)
+    # Une cellule vide prend le type de l'autre opérande
+    if left_kind == "blank":
+        left_kind = right_kind if right_kind != "blank" else "number"
+    if right_kind == "blank":
+        right_kind = left_kind
+    
+    if left_kind != right_kind:
+        # Types différents : l'ordre des types décide
+        result = _COMPARISONS[operator](_KIND_ORDER[left_kind], _KIND_ORDER[right_kind])
+        shape = np.broadcast(np.asarray(left), np.asarray(right)).shape
+        return np.full(shape, result) if shape else result
+    if left_kind == "text":
+        return _COMPARISONS[operator](np.char.upper(_text(left)), np.char.upper(_text(right)))
+    return _COMPARISONS[operator](_number(left), _number(right))
+
+def _arithmetic(operator, left, right):
+    left, right = _number(left), _number(right)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if operator == "+":
+            return left + right
+        if operator == "-":
+            return left - right
+        if operator == "*":
+            return left * right
+        if operator == "/":
+            return np.divide(left, right)
+        return np.power(left, right)
+
+def _where(condition, if_true, if_false):
+    if _kind(if_true) in ("number", "blank", "boolean") and _kind(if_false) in ("number", "blank", "boolean"):
+        return np.where(condition, _number(if_true), _number(if_false))
+    return np.where(condition, _text(if_true), _text(if_false))
+
+
+# Fonctions : les arguments sont des fonctions du contexte (évaluation paresseuse pour IF)
+
+def _function_if(context, condition, if_true, if_false=None):
+    test = _boolean(condition(context))
+    if np.ndim(test) == 0:
+        if test:
+            return if_true(context)
+        return False if if_false is None else if_false(context)
+    return _where(test, if_true(context), False if if_false is None else if_false(context))
+
+def _values(context, arguments):
+    # Valeurs des arguments, plages développées ; les textes des plages sont ignorés (SUM, MIN, MAX)
+    values = []
+    for argument in arguments:
+        value = argument(context)
+        if isinstance(value, _RangeValues):
+            values.extend(_number(item) for item in value if _kind(item) not in ("text", "blank"))
+        else:
+            values.append(_number(value))
+    return values
+
+def _reduce(function, context, arguments, empty=0.0):
+    values = _values(context, arguments)
+    if not values:
+        return empty
+    result = values[0]
+    for value in values[1:]:
+        result = function(result, value)
+    return result
+
+_FUNCTIONS = {
+    "IF": _function_if,
+    "AND": lambda context, *arguments: _reduce(np.logical_and, context, arguments, True) if arguments else True,
+    "OR": lambda context, *arguments: _reduce(np.logical_or, context, arguments, False) if arguments else False,
+    "NOT": lambda context, value: np.logical_not(_boolean(value(context))),
+    "SUM": lambda context, *arguments: _reduce(np.add, context, arguments),
+    "MIN": lambda context, *arguments: _reduce(np.minimum, context, arguments),
+    "MAX": lambda context, *arguments: _reduce(np.maximum, context, arguments),
+    "ABS": lambda context, value: np.abs(_number(value(context))),
+}
+
+
+class _RangeValues(list):
+    """
+    Valeurs des cellules d'une plage (argument de fonction)
+    """
+
+
+class _Parser:
+    """
+    Analyse descendante d'une formule ; chaque règle retourne une fonction du contexte
+    """
+    
+    def __init__(self, formula):
+        self.formula = formula
+        self.tokens = tokenize(formula)
+        self.position = 0
+        self.references = set()
+    
+    def parse(self):
+        expression = self.comparison()
+        if self.position != len(self.tokens):
+            raise FormulaError(f"Formule non prise en charge : {self.formula!r}")
+        return expression
+    
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+    
+    def take(self, *texts):
+        kind, text = self.peek()
+        if kind in ("operator", "punctuation") and text in texts:
+            self.position += 1
+            return text
+        return None
+    
+    def expect(self, text):
+        if self.take(text) is None:
+            raise FormulaError(f"« {text} » attendu dans la formule {self.formula!r}")
+    
+    def binary(self, operand, operators, combine):
+        left = operand()
+        while True:
+            operator = self.take(*operators)
+            if operator is None:
+                return left
+            right = operand()
+            left = (lambda a, b, op: lambda context: combine(op, a(context), b(context)))(left, right, operator)
+    
+    def comparison(self):
+        return self.binary(self.concatenation, tuple(_COMPARISONS), _compare)
+    
+    def concatenation(self):
+        return self.binary(self.additive, ("&",), lambda op, a, b: np.char.add(_text(a), _text(b)))
+    
+    def additive(self):
+        return self.binary(self.multiplicative, ("+", "-"), _arithmetic)
+    
+    def multiplicative(self):
+        return self.binary(self.power, ("*", "/"), _arithmetic)
+    
+    def power(self):
+        return self.binary(self.percent, ("^",), _arithmetic)
+    
+    def percent(self):
+        operand = self.unary()
+        while self.take("%"):
+            operand = (lambda a: lambda context: _number(a(context)) / 100)(operand)
+        return operand
+    
+    def unary(self):
+        operator = self.take("-", "+")
+        if operator is None:
+            return self.primary()
+        operand = self.unary()
+        if operator == "+":
+            return operand
+        return lambda context: -_number(operand(context))
+    
+    def primary(self):
+        kind, text = self.peek()
+        self.position += 1
+        if kind == "number":
+            value = float(text)
+            return lambda context: value
+        if kind == "string":
+            value = text[1:-1].replace('""', '"')
+            return lambda context: value
+        if kind == "boolean":
+            value = text.upper() == "TRUE"
+            return lambda context: value
+        if kind == "cell":
+            reference = normalize_reference(text)
+            self.references.add(reference)
+            return lambda context: context.value(reference)
+        if kind == "range":
+            references = expand_range(text)
+            self.references.update(references)
+            return lambda context: _RangeValues(context.value(reference) for reference in references)
+        if kind == "function":
+            return self.function(text.upper())
+        if (kind, text) == ("punctuation", "("):
+            expression = self.comparison()
+            self.expect(")")
+            return expression
+        raise FormulaError(f"Formule non prise en charge : {self.formula!r}")
+    
+    def function(self, name):
+        if name not in _FUNCTIONS:
+            raise FormulaError(f"Fonction non prise en charge : {name}")
+        self.expect("(")
+        arguments = []
+        if not self.take(")"):
+            while True:
+                arguments.append(self.comparison())
+                if self.take(")"):
+                    break
+                if not self.take(",", ";"):
+                    raise FormulaError(f"« , » ou « ) » attendu dans la formule {self.formula!r}")
+        function = _FUNCTIONS[name]
+        return lambda context: function(context, *arguments)
+
+
+def compile_formula(formula):
+    """
+    Compile une formule
+    
+    Args:
+        formula (str): Formule, avec ou sans le signe = initial
+    
+    Returns:
+        tuple: Fonction du contexte d'évaluation et ensemble des cellules référencées
+    """
+    parser = _Parser(formula[1:] if formula.startswith("=") else formula)
+    return parser.parse(), frozenset(parser.references)
+
+
+class _EvaluationContext:
+    __slots__ = ("workbook", "inputs", "values", "pending")
+    
+    def __init__(self, workbook, inputs):
+        self.workbook = workbook
+        self.inputs = inputs
+        self.values = {}
+        self.pending = set()
+    
+    def value(self, reference):
+        if reference in self.inputs:
+            return self.inputs[reference]
+        if reference in self.values:
+            return self.values[reference]
+        
+        formula = self.workbook.formulas.get(reference)
+        if formula is None:
+            return self.workbook.constants.get(reference)
+        if reference in self.pending:
+            raise FormulaError(f"Référence circulaire : {reference}")
+        
+        self.pending.add(reference)
+        value = formula(self)
+        self.pending.discard(reference)
+        self.values[reference] = value
+        return value
+
+
+class FormulaWorkbook:
+    """
+    Feuille de calcul compilée : constantes et formules de chaque cellule
+    
+    Les formules sont compilées à la construction ; l'évaluation ne calcule que
+    les cellules dont dépendent les cellules demandées, chacune une seule fois.
+    """
+    
+    __slots__ = ("constants", "formulas", "sources")
+    
+    def __init__(self, cells):
+        """
+        Args:
+            cells (dict): Contenu de chaque cellule (formules : textes commençant par =)
+        """
+        self.constants = {}
+        self.formulas = {}
+        self.sources = {}
+        for reference, content in cells.items():
+            reference = normalize_reference(reference)
+            if isinstance(content, str) and content.startswith("="):
+                self.formulas[reference], _ = compile_formula(content)
+                self.sources[reference] = content
+            else:
+                self.constants[reference] = content
+    
+    def evaluate(self, inputs, references):
+        """
+        Évalue des cellules pour un jeu (ou un lot) de valeurs d'entrée
+        
+        Args:
+            inputs (dict): Valeur de chaque cellule d'entrée (scalaire ou vecteur), remplaçant
+                son contenu
+            references (list): Cellules à évaluer
+        
+        Returns:
+            dict: Valeur de chaque cellule demandée
+        """
+        context = _EvaluationContext(self, {normalize_reference(key): value for key, value in inputs.items()})
+        return {reference: context.value(normalize_reference(reference)) for reference in references}
+
+
+def load_workbook(path, sheet=None):
+    """
+    Charge une feuille d'un classeur Excel et compile ses formules
+    
+    Args:
+        path (str): Chemin du classeur (.xlsx)
+        sheet (str, optional): Nom de la feuille. Defaults to None (première feuille).
+    
+    Returns:
+        FormulaWorkbook: Feuille compilée
+    """
+    import warnings
+    
+    import openpyxl
+    
+    with warnings.catch_warnings():
+        # Extensions du classeur ignorées par openpyxl (mise en forme, validations)
+        warnings.simplefilter("ignore", UserWarning)
+        workbook = openpyxl.load_workbook(path)
+    worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+    cells = {
+        cell.coordinate: cell.value
+        for row in worksheet.iter_rows() for cell in row if cell.value is not None
+    }
+    return FormulaWorkbook(cells)
@@ -0,0 +1,144 @@
+"""
+Résolution de petits programmes linéaires (méthode du simplexe en deux phases)
+
+Le problème résolu est :
+    minimiser c·x  sous  A_ub x ≤ b_ub,  A_eq x = b_eq,  x ≥ 0
+
+Le tableau est dense (NumPy) et la règle de Bland garantit la terminaison : ce
+solveur convient aux problèmes de quelques centaines de variables posés par
+l'application (voir src/utils/reverse_solver.py).
+"""
+
+import numpy as np
+
+# Tolérance numérique des tests de signe et du test du ratio
+TOLERANCE = 1e-9
+
+
+class LinearProgramError(Exception):
+    """
+    Erreur levée lorsque le simplexe ne converge pas
+    """
+
+
+def _pivot(tableau, row, column):
+    tableau[row] /= tableau[row, column]
+    # Le tableau est creux : seuls les coefficients des lignes et des colonnes non
+    # nulles du pivot sont modifiés
+    rows = np.flatnonzero(tableau[:, column])
+    rows = rows[rows != row]
+    columns = np.flatnonzero(tableau[row])
+    block = np.ix_(rows, columns)
+    tableau[block] -= np.outer(tableau[rows, column], tableau[row, columns])
+
+def _run_simplex(tableau, basis, nb_columns, max_iterations):
+    """
+    Itère le simplexe sur le tableau (dernière ligne : coûts réduits, dernière colonne : second membre)
+    
+    Returns:
+        bool: False si le problème est non borné
+    """
+    for _ in range(max_iterations):
+        costs = tableau[-1, :nb_columns]
+        entering = np.flatnonzero(costs < -TOLERANCE)
+        if not len(entering):
+            return True
+        column = entering[0]  # Règle de Bland : plus petit indice
+        
+        coefficients = tableau[:-1, column]
+        candidates = np.flatnonzero(coefficients > TOLERANCE)
+        if not len(candidates):
+            return False
+        
+        ratios = tableau[candidates, -1] / coefficients[candidates]
+        best = ratios.min()
+        ties = candidates[ratios <= best + TOLERANCE]
+        row = min(ties, key=lambda i: basis[i])
+        
+        _pivot(tableau, row, column)
+        basis[row] = column
+    
+    raise LinearProgramError("Le simplexe n'a pas convergé")
+
+def solve_linear_program(c, A_ub=None, b_ub=None, A_eq=None, b_eq=None, max_iterations=20000):
+    """
+    Résout un programme linéaire à variables positives
+    
+    Args:
+        c (array): Coûts des variables
+        A_ub (array, optional): Matrice des contraintes d'inégalité (≤). Defaults to None.
+        b_ub (array, optional): Second membre des inégalités. Defaults to None.
+        A_eq (array, optional): Matrice des contraintes d'égalité. Defaults to None.
+        b_eq (array, optional): Second membre des égalités. Defaults to None.
+        max_iterations (int, optional): Nombre maximal de pivots par phase. Defaults to 20000.
+    
+    Returns:
+        dict: Statut ("optimal", "infeasible" ou "unbounded"), solution x et valeur de l'objectif
+    """
+    c = np.asarray(c, dtype=np.float64)
+    nb_variables = len(c)
+    A_ub = np.zeros((0, nb_variables)) if A_ub is None else np.asarray(A_ub, dtype=np.float64)
+    b_ub = np.zeros(0) if b_ub is None else np.asarray(b_ub, dtype=np.float64)
+    A_eq = np.zeros((0, nb_variables)) if A_eq is None else np.asarray(A_eq, dtype=np.float64)
+    b_eq = np.zeros(0) if b_eq is None else np.asarray(b_eq, dtype=np.float64)
+    
+    # Forme standard : une variable d'écart par inégalité, second membre positif
+    nb_slacks = len(A_ub)
+    A = np.vstack([
+        np.hstack([A_ub, np.eye(nb_slacks)]),
+        np.hstack([A_eq, np.zeros((len(A_eq), nb_slacks))])
+    ])
+    b = np.concatenate([b_ub, b_eq])
+    negative = b < 0
+    A[negative] *= -1
+    b[negative] *= -1
+    
+    nb_rows, nb_columns = A.shape
+    costs = np.concatenate([c, np.zeros(nb_slacks)])
+    
+    # Base initiale : variable d'écart des inégalités de second membre positif, variable
+    # artificielle pour les autres lignes (phase 1 : somme des artificielles minimisée)
+    slack_basis = np.full(nb_rows, -1)
+    slack_basis[:nb_slacks][~negative[:nb_slacks]] = nb_variables + np.flatnonzero(~negative[:nb_slacks])
+    artificial_rows = np.flatnonzero(slack_basis < 0)
+    nb_artificials = len(artificial_rows)
+    
+    tableau = np.zeros((nb_rows + 1, nb_columns + nb_artificials + 1))
+    tableau[:nb_rows, :nb_columns] = A
+    tableau[artificial_rows, nb_columns + np.arange(nb_artificials)] = 1
+    tableau[:nb_rows, -1] = b
+    tableau[-1, :nb_columns] = -A[artificial_rows].sum(axis=0)
+    tableau[-1, -1] = -b[artificial_rows].sum()
+    basis = slack_basis.tolist()
+    for i, row in enumerate(artificial_rows):
+        basis[row] = nb_columns + i
+    
+    _run_simplex(tableau, basis, nb_columns + nb_artificials, max_iterations)
+    if -tableau[-1, -1] > TOLERANCE * max(1.0, np.abs(b).max(initial=0)):
+        return {"status": "infeasible", "x": None, "objective": None}
+    
+    # Sortie des artificielles restées en base (lignes redondantes supprimées)
+    keep = []
+    for row, column in enumerate(basis):
+        if column >= nb_columns:
+            candidates = np.flatnonzero(np.abs(tableau[row, :nb_columns]) > TOLERANCE)
+            if not len(candidates):
+                continue
+            _pivot(tableau, row, candidates[0])
+            basis[row] = candidates[0]
+        keep.append(row)
+    
+    # Phase 2 : coûts d'origine, exprimés en fonction des variables hors base
+    tableau = np.vstack([tableau[keep][:, list(range(nb_columns)) + [-1]], np.zeros(nb_columns + 1)])
+    basis = [basis[row] for row in keep]
+    tableau[-1, :nb_columns] = costs
+    for row, column in enumerate(basis):
+        tableau[-1] -= costs[column] * tableau[row]
+    
+    if not _run_simplex(tableau, basis, nb_columns, max_iterations):
+        return {"status": "unbounded", "x": None, "objective": None}
+    
+    solution = np.zeros(nb_columns)
+    solution[basis] = tableau[:-1, -1]
+    x = solution[:nb_variables]
+    return {"status": "optimal", "x": x, "objective": float(c @ x)}
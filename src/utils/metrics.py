@@ -0,0 +1,310 @@
+"""
+Export des métriques de l'application au format texte Prometheus
+
+Les mesures des fonctions instrumentées (voir src/utils/profiling.py) alimentent
+des histogrammes étiquetés par page et par structure : temps d'affichage des
+pages et des graphiques, temps des calculs, durées de chargement et de
+sauvegarde des données. S'y ajoutent la taille des exports et les taux de
+succès des caches.
+
+Les métriques sont exposées sur un port local, dans un fichier (collecteur
+« textfile » de node_exporter), ou les deux, selon les variables d'environnement :
+    SISA_METRICS_PORT     Port HTTP local (chemin /metrics)
+    SISA_METRICS_ADDR     Adresse d'écoute (127.0.0.1 par défaut)
+    SISA_METRICS_FILE     Fichier réécrit à la fin de chaque exécution du script
+    SISA_STRUCTURE_ID     Identifiant de la structure (« default » par défaut)
+Sans configuration, rien n'est mesuré.
+"""
+
+import os
+import threading
+from bisect import bisect_left
+
+from src.utils import profiling
+
+# Bornes des histogrammes de durée (secondes)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Bornes des histogrammes de taille (octets)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+DEFAULT_STRUCTURE = "default"
+
+
+class Histogram:
+    """
+    Histogramme Prometheus à bornes fixes, indexé par valeurs d'étiquettes
+    """
+    
+    def __init__(self, name, help_text, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+    
+    def observe(self, value, *label_values):
+        """
+        Enregistre une observation
+        
+        Args:
+            value (float): Valeur observée
+            *label_values: Valeurs des étiquettes, dans l'ordre de label_names
+        """
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+    
+    def render(self):
+        """
+        Retourne les lignes de l'histogramme au format texte Prometheus
+        """
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(data[0]), data[1], data[2]]) for labels, data in self._series.items())
+        
+        for label_values, (counts, total, count) in series:
+            labels = _format_labels(self.label_names, label_values)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (None,), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound is None else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_add_label(labels, 'le', le)} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        
+        return lines
+
+
+class _Context(threading.local):
+    def __init__(self):
+        self.page = ""
+        self.structure = DEFAULT_STRUCTURE
+
+
+PAGE_RENDER = Histogram(
+    "sisa_page_render_seconds", "Durée d'affichage des pages.", ("page", "structure")
+)
+RERUN = Histogram(
+    "sisa_rerun_seconds", "Durée d'une exécution complète du script.", ("page", "structure")
+)
+CHART_RENDER = Histogram(
+    "sisa_chart_render_seconds", "Durée de construction des graphiques.", ("chart", "page", "structure")
+)
+CALCULATION = Histogram(
+    "sisa_calculation_seconds", "Durée des fonctions de calcul.", ("function", "page", "structure")
+)
+DATA_IO = Histogram(
+    "sisa_data_io_seconds", "Durée des chargements, sauvegardes, exports et imports.", ("operation", "structure")
+)
+EXPORT_SIZE = Histogram(
+    "sisa_export_size_bytes", "Taille des fichiers exportés.", ("format", "structure"), buckets=SIZE_BUCKETS
+)
+
+HISTOGRAMS = (PAGE_RENDER, RERUN, CHART_RENDER, CALCULATION, DATA_IO, EXPORT_SIZE)
+
+# Caches suivis : nom -> fonction exposant cache_info() (functools.lru_cache)
+_caches = {}
+
+_context = _Context()
+_config = {"enabled": False, "file": None, "server": None, "structure": DEFAULT_STRUCTURE}
+_config_lock = threading.Lock()
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+def _add_label(labels, name, value):
+    label = f'{name}="{value}"'
+    return "{" + label + "}" if not labels else labels[:-1] + "," + label + "}"
+
+def is_enabled():
+    """
+    Indique si l'export des métriques est actif
+    """
+    return _config["enabled"]
+
+def set_context(page, structure=None):
+    """
+    Définit la page et la structure de l'exécution en cours (propres au thread)
+    
+    Args:
+        page (str): Nom de la page affichée
+        structure (str, optional): Identifiant de la structure. Defaults to la structure configurée.
+    """
+    _context.page = page
+    _context.structure = str(structure) if structure is not None else _config["structure"]
+
+def register_cache(name, cached_function):
+    """
+    Suit le taux de succès d'un cache functools.lru_cache
+    
+    Args:
+        name (str): Nom du cache dans les métriques
+        cached_function: Fonction décorée par lru_cache
+    """
+    _caches[name] = cached_function
+
+def observe_export_size(file_format, size):
+    """
+    Enregistre la taille d'un fichier exporté
+    
+    Args:
+        file_format (str): Format du fichier (xlsx, json, ...)
+        size (int): Taille en octets
+    """
+    if _config["enabled"]:
+        EXPORT_SIZE.observe(size, file_format, _context.structure)
+
+def _observe(name, elapsed):
+    """
+    Reçoit les mesures de src.utils.profiling et les range dans l'histogramme adapté
+    """
+    page = _context.page
+    structure = _context.structure
+    module, _, function = name.partition(".")
+    
+    if module == "page":
+        PAGE_RENDER.observe(elapsed, function, structure)
+    elif module == "app":
+        RERUN.observe(elapsed, page, structure)
+    elif module == "calculations":
+        CALCULATION.observe(elapsed, function, page, structure)
+    elif module == "data_manager":
+        DATA_IO.observe(elapsed, function, structure)
+    elif function.startswith("chart."):
+        CHART_RENDER.observe(elapsed, function[len("chart."):], module, structure)
+
+def _render_caches():
+    lines = []
+    infos = []
+    for name, cached_function in sorted(_caches.items()):
+        info = cached_function.cache_info()
+        infos.append((_format_labels(("cache",), (name,)), info.hits, info.misses))
+    
+    for metric, help_text, position in (
+        ("sisa_cache_hits_total", "Nombre de succès du cache.", 1),
+        ("sisa_cache_misses_total", "Nombre d'échecs du cache.", 2)
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} counter")
+        lines.extend(f"{metric}{info[0]} {info[position]}" for info in infos)
+    
+    return lines
+
+def render():
+    """
+    Retourne l'ensemble des métriques au format texte Prometheus
+    
+    Returns:
+        str: Texte d'exposition (version 0.0.4)
+    """
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    lines.extend(_render_caches())
+    return "\n".join(lines) + "\n"
+
+def write_textfile(path):
+    """
+    Écrit les métriques dans un fichier, de façon atomique
+    
+    Args:
+        path (str): Chemin du fichier (extension .prom pour node_exporter)
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    
+    temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(temporary_path, path)
+
+def start_http_server(port, address="127.0.0.1"):
+    """
+    Expose les métriques sur http://<address>:<port>/metrics dans un thread dédié
+    
+    Args:
+        port (int): Port d'écoute
+        address (str, optional): Adresse d'écoute. Defaults to "127.0.0.1".
+    
+    Returns:
+        ThreadingHTTPServer: Serveur démarré
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            
+            body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="sisa-metrics", daemon=True)
+    thread.start()
+    return server
+
+def configure(port=None, path=None, address="127.0.0.1", structure=None):
+    """
+    Active l'export des métriques (une seule fois par processus)
+    
+    Args:
+        port (int, optional): Port HTTP local. Defaults to None.
+        path (str, optional): Fichier de métriques. Defaults to None.
+        address (str, optional): Adresse d'écoute. Defaults to "127.0.0.1".
+        structure (str, optional): Identifiant de la structure par défaut. Defaults to None.
+    """
+    with _config_lock:
+        if _config["enabled"] or (port is None and path is None):
+            return
+        
+        if structure:
+            _config["structure"] = str(structure)
+        if port is not None:
+            _config["server"] = start_http_server(int(port), address)
+        _config["file"] = path
+        _config["enabled"] = True
+        profiling.add_observer(_observe)
+
+def configure_from_env(environ=None):
+    """
+    Active l'export des métriques selon les variables d'environnement SISA_METRICS_*
+    """
+    environ = os.environ if environ is None else environ
+    configure(
+        port=environ.get("SISA_METRICS_PORT") or None,
+        path=environ.get("SISA_METRICS_FILE") or None,
+        address=environ.get("SISA_METRICS_ADDR", "127.0.0.1"),
+        structure=environ.get("SISA_STRUCTURE_ID")
+    )
+
+def flush():
+    """
+    Réécrit le fichier de métriques s'il est configuré (appelé à la fin de chaque exécution)
+    """
+    if _config["file"]:
+        write_textfile(_config["file"])
@@ -0,0 +1,163 @@
+"""
+Montants en centimes entiers : arrondi au centime et répartitions exactes
+
+Les montants en euros (float) accumulent des erreurs d'arrondi : la somme des parts
+d'une répartition diffère du montant réparti de quelques fractions de centime, et
+le montant net d'un associé n'est pas un nombre entier de centimes. Tous les
+montants calculés sont donc des centimes entiers (int, ou int64 dans un tableau) :
+    - to_cents et to_euros convertissent un montant ou un tableau de montants ;
+    - allocate_cents répartit un montant en centimes selon des poids, par la
+      méthode du plus fort reste : chaque part est arrondie au centime inférieur,
+      puis les centimes restants sont attribués aux parts dont le reste est le plus
+      grand (à reste égal, dans l'ordre des parts). La somme des parts est
+      exactement le montant réparti.
+Les fonctions acceptent des scalaires ou des tableaux NumPy : allocate_cents
+répartit en une seule opération un lot de montants (une ligne de poids par montant).
+split_cents répartit un seul montant et retourne une liste d'entiers ; pour
+quelques parts, elle n'utilise que des opérations Python.
+
+Montant total ACI, montants des charges et leurs totaux, répartitions, montants
+nets, projection de trésorerie et calcul inverse sont exprimés en centimes : leurs
+sommes sont exactes. Seuls les montants saisis (montant d'une charge, valeur du
+point) sont en euros ; ils sont convertis par to_cents à l'entrée des calculs. Les
+centimes ne sont convertis en euros qu'à l'affichage (format_cents dans
+src/utils/calculations.py) et à l'export.
+"""
+
+import math
+
+import numpy as np
+
+CENTS_PER_EURO = 100
+
+# Au-delà de ce nombre de parts, une répartition unique est calculée avec NumPy ; en deçà,
+# les opérations Python sur une liste sont plus rapides (mêmes opérations flottantes)
+SMALL_ALLOCATION = 32
+
+def to_cents(amount):
+    """
+    Convertit un montant en euros en centimes entiers (arrondi au centime le plus proche,
+    les demi-centimes étant arrondis à l'opposé de zéro)
+    
+    Args:
+        amount (float | numpy.ndarray): Montant(s) en euros
+    
+    Returns:
+        int | numpy.ndarray: Montant(s) en centimes (int64 pour un tableau)
+    """
+    # Arrondi préalable à 1e-6 centime : 0.285 € (28.4999… centimes en binaire) donne 29 centimes
+    if isinstance(amount, (int, float)):
+        amount = round(amount * CENTS_PER_EURO, 6)
+        cents = math.floor(abs(amount) + 0.5)
+        return cents if amount >= 0 else -cents
+    
+    amount = np.round(np.asarray(amount, dtype=np.float64) * CENTS_PER_EURO, 6)
+    cents = (np.sign(amount) * np.floor(np.abs(amount) + 0.5)).astype(np.int64)
+    return cents if cents.ndim else int(cents)
+
+def to_euros(cents):
+    """
+    Convertit un montant en centimes en euros
+    
+    Args:
+        cents (int | numpy.ndarray): Montant(s) en centimes
+    
+    Returns:
+        float | numpy.ndarray: Montant(s) en euros
+    """
+    if isinstance(cents, int):
+        return cents / CENTS_PER_EURO
+    if isinstance(cents, np.ndarray):
+        return cents / CENTS_PER_EURO
+    
+    euros = np.asarray(cents, dtype=np.int64) / CENTS_PER_EURO
+    return euros if euros.ndim else float(euros)
+
+def allocate_cents(total_cents, weights):
+    """
+    Répartit un montant en centimes selon des poids, par la méthode du plus fort reste
+    
+    Args:
+        total_cents (int | numpy.ndarray): Montant(s) à répartir, en centimes ; pour un
+            lot, un montant par ligne de poids
+        weights (numpy.ndarray): Poids des parts (dernier axe) ; des poids de somme
+            nulle donnent des parts nulles
+    
+    Returns:
+        numpy.ndarray: Parts en centimes (int64), de même forme que les poids (ou que
+            le lot), dont la somme sur le dernier axe est le montant réparti
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    if weights.ndim == 1 and isinstance(total_cents, int):
+        return _allocate_single(total_cents, weights)
+    
+    total_cents = np.asarray(total_cents, dtype=np.int64)
+    nb_shares = weights.shape[-1]
+    if nb_shares == 0:
+        return np.zeros(np.broadcast_shapes(total_cents.shape + (0,), weights.shape), dtype=np.int64)
+    
+    weight_sums = weights.sum(axis=-1, keepdims=True)
+    valid = weight_sums != 0
+    # Part exacte : poids × (montant / somme des poids), comme split_cents
+    exact = weights * np.where(valid, total_cents[..., None] / np.where(valid, weight_sums, 1), 0)
+    floor = np.floor(exact)
+    
+    # Centimes restant après l'arrondi inférieur de chaque part (entre 0 et le nombre de parts - 1)
+    remaining = np.where(valid[..., 0], total_cents - floor.sum(axis=-1).astype(np.int64), 0)
+    
+    # Rang de chaque part par reste décroissant : les « remaining » premières reçoivent un centime
+    order = np.argsort(floor - exact, axis=-1, kind="stable")
+    ranks = np.empty(order.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(nb_shares), order.shape), axis=-1)
+    return floor.astype(np.int64) + (ranks < remaining[..., None])
+
+def _allocate_single(total_cents, weights):
+    """
+    Répartition d'un seul montant (allocate_cents sans les opérations par lot)
+    """
+    if len(weights) <= SMALL_ALLOCATION:
+        return np.array(split_cents(total_cents, weights.tolist()), dtype=np.int64)
+    
+    weight_sum = float(weights.sum())
+    if weight_sum == 0:
+        return np.zeros(len(weights), dtype=np.int64)
+    
+    exact = weights * (total_cents / weight_sum)
+    floor = np.floor(exact)
+    cents = floor.astype(np.int64)
+    remaining = total_cents - int(cents.sum())
+    if remaining:
+        cents[np.argsort(floor - exact, kind="stable")[:remaining]] += 1
+    return cents
+
+def split_cents(total_cents, weights):
+    """
+    Répartit un montant en centimes selon des poids (voir allocate_cents), sous forme de liste
+    
+    Args:
+        total_cents (int): Montant à répartir, en centimes
+        weights (list | numpy.ndarray): Poids des parts ; des poids de somme nulle
+            donnent des parts nulles
+    
+    Returns:
+        list: Parts en centimes (int), dont la somme est le montant réparti
+    """
+    if len(weights) > SMALL_ALLOCATION:
+        return _allocate_single(total_cents, np.asarray(weights, dtype=np.float64)).tolist()
+    if isinstance(weights, np.ndarray):
+        weights = weights.tolist()
+    
+    weight_sum = sum(weights)
+    if weight_sum == 0:
+        return [0] * len(weights)
+    
+    scale = total_cents / weight_sum
+    exact = [weight * scale for weight in weights]
+    cents = list(map(math.floor, exact))
+    remaining = total_cents - sum(cents)
+    if remaining:
+        # Parts par reste décroissant (tri stable, comme allocate_cents)
+        remainders = [floor - value for floor, value in zip(cents, exact)]
+        for i in sorted(range(len(cents)), key=remainders.__getitem__)[:remaining]:
+            cents[i] += 1
+    return cents
@@ -0,0 +1,139 @@
+"""
+Instrumentation des chemins critiques : temps d'exécution, nombre d'appels et solde mémoire
+
+L'instrumentation est désactivée par défaut ; les fonctions décorées par timed()
+ne paient alors que deux tests de booléen. L'activation et les statistiques sont
+propres au thread qui exécute le script Streamlit : chaque session mesure ses
+propres exécutions (reruns) sans perturber les autres.
+
+Des observateurs globaux (par exemple l'export des métriques, voir
+src/utils/metrics.py) peuvent en outre recevoir chaque mesure, pour toutes les
+sessions.
+
+Le solde mémoire est la variation du nombre de blocs alloués par l'interpréteur
+(sys.getallocatedblocks) pendant la mesure : blocs alloués moins blocs libérés,
+par toutes les sessions. Il peut être négatif et ne compte pas les allocations.
+"""
+
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+class _ThreadState(threading.local):
+    def __init__(self):
+        self.enabled = False
+        self.stats = {}
+
+_state = _ThreadState()
+
+# Fonctions appelées avec (nom, durée en secondes) pour chaque mesure
+_observers = []
+
+def enable(enabled=True):
+    """
+    Active ou désactive l'instrumentation pour le thread courant
+    """
+    _state.enabled = bool(enabled)
+
+def is_enabled():
+    """
+    Indique si l'instrumentation est active pour le thread courant
+    """
+    return _state.enabled
+
+def start_rerun():
+    """
+    Réinitialise les statistiques au début d'une exécution du script
+    """
+    _state.stats = {}
+
+def get_rerun_stats():
+    """
+    Retourne les statistiques de l'exécution en cours
+    
+    Returns:
+        dict: Pour chaque mesure, nombre d'appels, temps total et maximal (secondes)
+            et solde des blocs mémoire (net_blocks, négatif si des blocs ont été libérés)
+    """
+    return _state.stats
+
+def add_observer(observer):
+    """
+    Ajoute un observateur recevant chaque mesure, quel que soit le thread
+    
+    Args:
+        observer (callable): Fonction appelée avec le nom de la mesure et sa durée (secondes)
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+
+def remove_observer(observer):
+    """
+    Retire un observateur ajouté par add_observer
+    """
+    if observer in _observers:
+        _observers.remove(observer)
+
+def _record(name, elapsed, net_blocks):
+    for observer in _observers:
+        observer(name, elapsed)
+    
+    if not _state.enabled:
+        return
+    
+    stats = _state.stats
+    entry = stats.get(name)
+    if entry is None:
+        entry = stats[name] = {"calls": 0, "total_s": 0.0, "max_s": 0.0, "net_blocks": 0}
+    
+    entry["calls"] += 1
+    entry["total_s"] += elapsed
+    entry["max_s"] = max(entry["max_s"], elapsed)
+    entry["net_blocks"] += net_blocks
+
+@contextmanager
+def timer(name):
+    """
+    Mesure un bloc de code (par exemple la construction d'un graphique)
+    
+    Args:
+        name (str): Nom de la mesure
+    """
+    if not _state.enabled and not _observers:
+        yield
+        return
+    
+    blocks = sys.getallocatedblocks()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+
+def timed(name=None):
+    """
+    Décorateur mesurant chaque appel de la fonction décorée
+    
+    Args:
+        name (str, optional): Nom de la mesure. Defaults to "<module>.<fonction>".
+    """
+    def decorator(func):
+        measure_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__qualname__}"
+        
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _state.enabled and not _observers:
+                return func(*args, **kwargs)
+            
+            blocks = sys.getallocatedblocks()
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(measure_name, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+        
+        return wrapper
+    
+    return decorator
@@ -0,0 +1,322 @@
+"""
+Index en mémoire des listes d'associés et de charges
+
+Les pages de gestion filtrent, recherchent et modifient des listes de plusieurs
+centaines d'associés ou de milliers de charges. Un RecordIndex maintient, à côté
+de la liste de la session (qui reste la source des calculs) :
+    - un dictionnaire identifiant → enregistrement (recherche en O(1)) ;
+    - un dictionnaire identifiant → position dans la liste ;
+    - pour chaque champ indexé (profession, rôle, catégorie, fréquence…), un index
+      inversé valeur → identifiants ;
+    - les noms normalisés (sans accents ni majuscules), regroupés par leurs deux
+      premiers caractères, pour la recherche par préfixe.
+Les ajouts, modifications et suppressions passent par l'index (add, update,
+remove, et restore pour replacer un enregistrement supprimé), qui met à jour la
+liste et les seuls index touchés par l'enregistrement.
+Une suppression ne décale pas la liste : le dernier enregistrement prend la place
+de l'enregistrement supprimé, en O(1). restore fait l'échange inverse, si bien
+qu'annuler une suppression rend à la liste son ordre d'origine.
+
+Les index sont conservés dans l'état de session (get_session_index) et reconstruits
+si la liste de la session a été remplacée (chargement, import, réinitialisation).
+"""
+
+import unicodedata
+
+from src.utils.data_manager import DataRepository
+
+# Clé des index dans l'état de session
+SESSION_KEY = "record_indexes"
+
+# Nombre de lignes par page des tableaux paginés
+PAGE_SIZE = 50
+
+# Nombre de caractères des clés de regroupement des noms
+PREFIX_LENGTH = 2
+
+def normalize_text(text):
+    """
+    Normalise un texte pour la recherche : minuscules, sans accents ni espaces superflus
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return " ".join("".join(char for char in decomposed if not unicodedata.combining(char)).lower().split())
+
+class RecordIndex:
+    """
+    Index d'une liste d'enregistrements ayant un attribut id
+    
+    Args:
+        records (list): Liste indexée (modifiée en place par add, remove et restore)
+        fields (dict): Pour chaque champ indexé, fonction retournant le tuple des
+            valeurs d'un enregistrement (plusieurs valeurs pour les rôles)
+        names (callable, optional): Fonction retournant le tuple des noms d'un
+            enregistrement, recherchés par préfixe. Defaults to None.
+    """
+    
+    __slots__ = ("records", "fields", "names", "_by_id", "_positions", "_keys", "_indexes", "_prefixes")
+    
+    def __init__(self, records, fields, names=None):
+        self.records = records
+        self.fields = fields
+        self.names = names
+        self._by_id = {}
+        self._positions = {}
+        self._keys = {}
+        self._indexes = {field: {} for field in fields}
+        self._prefixes = {}
+        for position, record in enumerate(records):
+            self._insert(record, position)
+    
+    def __len__(self):
+        return len(self._by_id)
+    
+    def __contains__(self, record_id):
+        return record_id in self._by_id
+    
+    def matches(self, records):
+        """
+        Indique si l'index correspond toujours à la liste (même objet, même taille)
+        """
+        return records is self.records and len(records) == len(self._by_id)
+    
+    def get(self, record_id):
+        """
+        Retourne l'enregistrement d'un identifiant (None s'il n'existe pas)
+        """
+        return self._by_id.get(record_id)
+    
+    def values(self, field):
+        """
+        Retourne les valeurs d'un champ portées par au moins un enregistrement, triées
+        """
+        return sorted(self._indexes[field])
+    
+    def count(self, field, value):
+        """
+        Retourne le nombre d'enregistrements portant une valeur d'un champ
+        """
+        return len(self._indexes[field].get(value, ()))
+    
+    def find(self, field, value):
+        """
+        Retourne les enregistrements portant une valeur d'un champ, dans l'ordre de la liste
+        """
+        return self._records(self._indexes[field].get(value, ()))
+    
+    def search(self, criteria=None, prefix=None):
+        """
+        Retourne les enregistrements satisfaisant tous les critères, dans l'ordre de la liste
+        
+        Args:
+            criteria (dict, optional): Valeur attendue pour chaque champ indexé (None : pas
+                de critère sur ce champ). Defaults to None.
+            prefix (str, optional): Début d'un des noms de l'enregistrement (sans tenir
+                compte des accents ni des majuscules). Defaults to None.
+        
+        Returns:
+            list: Enregistrements trouvés
+        """
+        candidates = [
+            self._indexes[field].get(value, {}) for field, value in (criteria or {}).items() if value is not None
+        ]
+        prefix = normalize_text(prefix)
+        if prefix:
+            candidates.append(self._prefix_ids(prefix))
+        if not candidates:
+            return list(self.records)
+        
+        # Intersection en partant de l'ensemble le plus petit
+        candidates.sort(key=len)
+        ids = [record_id for record_id in candidates[0] if all(record_id in other for other in candidates[1:])]
+        return self._records(ids)
+    
+    def add(self, record):
+        """
+        Ajoute un enregistrement à la fin de la liste
+        """
+        if record.id in self._by_id:
+            raise ValueError(f"Identifiant déjà présent : {record.id}")
+        self.records.append(record)
+        self._insert(record, len(self.records) - 1)
+    
+    def update(self, record):
+        """
+        Met à jour les index après la modification en place d'un enregistrement
+        
+        Seuls les index dont les valeurs de l'enregistrement ont changé sont modifiés.
+        """
+        old_keys = self._keys[record.id]
+        new_keys = self._record_keys(record)
+        for field, values in new_keys.items():
+            if field == "names" or values == old_keys[field]:
+                continue
+            self._unindex(field, record.id, old_keys[field])
+            self._index(field, record.id, values)
+        if new_keys["names"] != old_keys["names"]:
+            self._unindex_names(record.id, old_keys["names"])
+            self._index_names(record.id, new_keys["names"])
+        self._keys[record.id] = new_keys
+        self._by_id[record.id] = record
+    
+    def restore(self, position, record):
+        """
+        Replace un enregistrement supprimé à sa position (annulation d'une suppression)
+        
+        L'enregistrement occupant la position repart en fin de liste, d'où remove
+        l'avait tiré : c'est l'échange inverse de la suppression.
+        """
+        if record.id in self._by_id:
+            raise ValueError(f"Identifiant déjà présent : {record.id}")
+        position = min(max(position, 0), len(self.records))
+        if position == len(self.records):
+            self.add(record)
+            return
+        
+        moved = self.records[position]
+        self.records.append(moved)
+        self._positions[moved.id] = len(self.records) - 1
+        self.records[position] = record
+        self._insert(record, position)
+    
+    def position(self, record_id):
+        """
+        Retourne la position d'un enregistrement dans la liste
+        """
+        return self._positions[record_id]
+    
+    def remove(self, record_id):
+        """
+        Supprime un enregistrement ; le dernier enregistrement de la liste prend sa place
+        
+        Returns:
+            Enregistrement supprimé
+        """
+        record = self._by_id.pop(record_id)
+        position = self._positions.pop(record_id)
+        last = self.records.pop()
+        if last is not record:
+            self.records[position] = last
+            self._positions[last.id] = position
+        keys = self._keys.pop(record_id)
+        for field in self.fields:
+            self._unindex(field, record_id, keys[field])
+        self._unindex_names(record_id, keys["names"])
+        return record
+    
+    def _insert(self, record, position):
+        record_id = record.id
+        self._by_id[record_id] = record
+        self._positions[record_id] = position
+        keys = self._keys[record_id] = self._record_keys(record)
+        for field in self.fields:
+            self._index(field, record_id, keys[field])
+        self._index_names(record_id, keys["names"])
+    
+    def _record_keys(self, record):
+        keys = {field: tuple(dict.fromkeys(function(record))) for field, function in self.fields.items()}
+        keys["names"] = tuple(normalize_text(name) for name in self.names(record)) if self.names else ()
+        return keys
+    
+    def _index(self, field, record_id, values):
+        index = self._indexes[field]
+        for value in values:
+            index.setdefault(value, {})[record_id] = None
+    
+    def _unindex(self, field, record_id, values):
+        index = self._indexes[field]
+        for value in values:
+            ids = index[value]
+            del ids[record_id]
+            if not ids:
+                del index[value]
+    
+    def _index_names(self, record_id, names):
+        for key in dict.fromkeys(name[:PREFIX_LENGTH] for name in names):
+            self._prefixes.setdefault(key, {})[record_id] = None
+    
+    def _unindex_names(self, record_id, names):
+        for key in dict.fromkeys(name[:PREFIX_LENGTH] for name in names):
+            ids = self._prefixes[key]
+            del ids[record_id]
+            if not ids:
+                del self._prefixes[key]
+    
+    def _prefix_ids(self, prefix):
+        # Préfixe court : réunion des groupes dont la clé commence par le préfixe
+        if len(prefix) >= PREFIX_LENGTH:
+            groups = [self._prefixes.get(prefix[:PREFIX_LENGTH], {})]
+        else:
+            groups = [ids for key, ids in self._prefixes.items() if key.startswith(prefix)]
+        keys = self._keys
+        return {
+            record_id: None for ids in groups for record_id in ids
+            if any(name.startswith(prefix) for name in keys[record_id]["names"])
+        }
+    
+    def _records(self, ids):
+        positions = self._positions
+        return [self._by_id[record_id] for record_id in sorted(ids, key=positions.__getitem__)]
+
+def build_associate_index(associates):
+    """
+    Construit l'index des associés : profession, rôles, noms (« Nom Prénom » et « Prénom Nom »)
+    """
+    return RecordIndex(
+        associates,
+        {"profession": lambda associate: (associate.profession,), "roles": lambda associate: associate.roles},
+        names=lambda associate: (
+            f"{associate.last_name} {associate.first_name}", f"{associate.first_name} {associate.last_name}"
+        )
+    )
+
+def build_expense_index(expenses):
+    """
+    Construit l'index des charges : catégorie, fréquence, nom
+    """
+    return RecordIndex(
+        expenses,
+        {"category": lambda expense: (expense.category,), "frequency": lambda expense: (expense.frequency,)},
+        names=lambda expense: (expense.name,)
+    )
+
+_BUILDERS = {"associates": build_associate_index, "expenses": build_expense_index}
+
+def get_session_index(session_state, name):
+    """
+    Retourne l'index d'une liste de la session ("associates" ou "expenses")
+    
+    L'index est construit au premier appel, puis reconstruit si la liste de la
+    session a été remplacée ou modifiée sans passer par l'index. La liste est lue
+    dans le dépôt de la session (chargée au premier accès).
+    
+    Args:
+        session_state: État de session (st.session_state)
+        name (str): Nom de la liste dans l'état de session
+    
+    Returns:
+        RecordIndex: Index de la liste
+    """
+    if SESSION_KEY not in session_state:
+        session_state[SESSION_KEY] = {}
+    
+    indexes = session_state[SESSION_KEY]
+    records = DataRepository(session_state).get(name)
+    if name not in indexes or not indexes[name].matches(records):
+        indexes[name] = _BUILDERS[name](records)
+    return indexes[name]
+
+def paginate(records, page, page_size=PAGE_SIZE):
+    """
+    Retourne les enregistrements d'une page
+    
+    Args:
+        records (list): Enregistrements
+        page (int): Numéro de la page (à partir de 1, ramené au nombre de pages)
+        page_size (int, optional): Nombre d'enregistrements par page. Defaults to PAGE_SIZE.
+    
+    Returns:
+        tuple: Enregistrements de la page, numéro de la page et nombre de pages
+    """
+    nb_pages = max(1, -(-len(records) // page_size))
+    page = min(max(int(page), 1), nb_pages)
+    return records[(page - 1) * page_size:page * page_size], page, nb_pages
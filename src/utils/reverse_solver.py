@@ -0,0 +1,257 @@
+"""
+Calcul inverse de la répartition : objectifs de rémunération nette par associé
+
+À partir d'un montant net visé pour certains associés, et/ou d'un montant net
+minimal (plancher) pour d'autres, on recherche :
+    - les clés de répartition (méthode "distribution_key") ;
+    - ou la combinaison des méthodes de répartition des rémunérations.
+
+Les calculs sont ceux de calculate_associate_distribution et de
+calculate_associate_net_amount : le net d'un associé est sa part de la
+rémunération moins sa part de chaque charge. Dans les deux cas, ce net est une
+fonction linéaire de parts x positives de somme 1 :
+    net = G x − charges fixes
+où les colonnes de G sont les montants répartis selon chaque clé (clés de
+répartition) ou selon chaque méthode (combinaison de méthodes). Les charges
+réparties selon la clé de répartition dépendent elles aussi des clés : elles sont
+intégrées à G.
+
+Le programme linéaire minimise la somme des écarts absolus aux objectifs, sous les
+contraintes de plancher. Les associés sans objectif sont rappelés, avec un poids
+faible, vers leur montant net actuel : sans objectif, la solution reste proche de
+la répartition en place.
+
+Les montants (montant réparti, objectifs, planchers, résultats) sont en centimes.
+Les montants nets retournés ne sont pas ceux du programme linéaire : ils sont
+recalculés au centime, comme le ferait le calcul de la rémunération avec les clés
+ou les poids trouvés (parts et charges réparties par la méthode du plus fort reste).
+
+Le solveur (src/utils/linear_program.py) résout le programme en quelques
+millisecondes pour une structure de 50 associés.
+"""
+
+import numpy as np
+
+from src.utils.calculations import (
+    BLENDED_METHODS, calculate_expense_amounts, combine_shares, get_allocation_key, get_allocation_weights,
+    get_share_matrix
+)
+from src.utils.linear_program import solve_linear_program
+from src.utils.money import allocate_cents
+from src.utils.profiling import timed
+
+# Poids du rappel vers le montant net actuel des associés sans objectif
+REFERENCE_WEIGHT = 1e-3
+
+# Clé de répartition selon les clés des associés (voir get_allocation_key)
+KEY_ALLOCATION = ("distribution_key", ())
+
+
+def _shares(associates, allocation_key):
+    weights = get_allocation_weights(associates, allocation_key)
+    return weights / weights.sum()
+
+def _expenses_by_allocation(expenses, expense_amounts):
+    """
+    Retourne le montant des charges (en centimes) pour chaque clé de répartition
+    """
+    totals = {}
+    for expense, amount in zip(expenses, expense_amounts):
+        key = get_allocation_key(expense)
+        totals[key] = totals.get(key, 0) + amount
+    return totals
+
+def _expense_cents_by_associate(expenses, expense_amounts, associates, key_weights=None):
+    """
+    Charges de chaque associé, en centimes : chaque charge est répartie au centime,
+    comme dans le graphe de calcul (les charges réparties selon la clé de répartition
+    suivent les poids key_weights lorsqu'ils sont donnés)
+    """
+    if not expenses:
+        return np.zeros(len(associates), dtype=np.int64)
+    
+    weights_by_key = {}
+    rows = []
+    for expense in expenses:
+        key = get_allocation_key(expense)
+        if key not in weights_by_key:
+            weights_by_key[key] = (
+                key_weights if key == KEY_ALLOCATION and key_weights is not None
+                else get_allocation_weights(associates, key)
+            )
+        rows.append(weights_by_key[key])
+    return allocate_cents(np.asarray(expense_amounts, dtype=np.int64), np.array(rows)).sum(axis=0)
+
+def _vector(values, associates):
+    """
+    Convertit un dictionnaire {id d'associé: montant} en vecteur (NaN si absent)
+    """
+    values = values or {}
+    return np.array(
+        [np.nan if values.get(associate.id) is None else float(values[associate.id]) for associate in associates],
+        dtype=np.float64
+    )
+
+def _solve_allocation(G, offset, targets, floors, reference):
+    """
+    Résout : min Σ |G x − offset − objectif| sous G x − offset ≥ plancher, x ≥ 0, Σ x = 1
+    
+    Pour les associés sans objectif, le programme minimise aussi (avec un poids
+    faible) le plus grand manque par rapport au montant net de référence : la
+    baisse est répartie entre eux au lieu de porter sur quelques associés.
+    
+    Returns:
+        tuple: Statut et parts x (None si aucune solution)
+    """
+    nb_associates, nb_shares = G.shape
+    free = np.isnan(targets)
+    goals = np.where(free, reference, targets)
+    costs = np.where(free, REFERENCE_WEIGHT / nb_associates, 1.0)
+    
+    # Mise à l'échelle : les montants sont exprimés en unités du plus grand coefficient
+    scale = max(np.abs(G).max(initial=0), np.abs(offset).max(initial=0), 1.0)
+    G = G / scale
+    
+    # Variables : parts x, excédents et manques de chaque associé, plus grand manque z
+    identity = np.eye(nb_associates)
+    nb_variables = nb_shares + 2 * nb_associates + 1
+    c = np.concatenate([np.zeros(nb_shares), costs, costs, [REFERENCE_WEIGHT]])
+    A_eq = np.zeros((nb_associates + 1, nb_variables))
+    A_eq[:nb_associates, :nb_shares] = G
+    A_eq[:nb_associates, nb_shares:nb_shares + nb_associates] = -identity
+    A_eq[:nb_associates, nb_shares + nb_associates:-1] = identity
+    A_eq[-1, :nb_shares] = 1
+    b_eq = np.append((goals + offset) / scale, 1.0)
+    
+    # Planchers : −G x ≤ −(plancher + offset) ; manques des associés sans objectif ≤ z
+    has_floor = ~np.isnan(floors)
+    floor_rows = np.zeros((has_floor.sum(), nb_variables))
+    floor_rows[:, :nb_shares] = -G[has_floor]
+    free_index = np.flatnonzero(free)
+    shortfall_rows = np.zeros((len(free_index), nb_variables))
+    shortfall_rows[np.arange(len(free_index)), nb_shares + nb_associates + free_index] = 1
+    shortfall_rows[:, -1] = -1
+    A_ub = np.vstack([floor_rows, shortfall_rows])
+    b_ub = np.concatenate([-(floors[has_floor] + offset[has_floor]) / scale, np.zeros(len(free_index))])
+    
+    result = solve_linear_program(c, A_ub, b_ub, A_eq, b_eq)
+    if result["status"] != "optimal":
+        return result["status"], None
+    return "optimal", np.clip(result["x"][:nb_shares], 0, None)
+
+def _result(status, associates, net, targets):
+    if status != "optimal":
+        return {"status": status, "net_amounts": {}, "deviation": None}
+    
+    has_target = ~np.isnan(targets)
+    return {
+        "status": status,
+        "net_amounts": dict(zip((associate.id for associate in associates), net.tolist())),
+        "deviation": int(np.abs(net[has_target] - targets[has_target]).sum())
+    }
+
+@timed()
+def solve_distribution_keys(total_amount, associates, expenses, targets=None, floors=None, fiscal_year=None):
+    """
+    Recherche les clés de répartition qui atteignent les montants nets visés
+    
+    Args:
+        total_amount (int): Montant total des rémunérations, en centimes (réparti selon les clés)
+        associates (list): Liste des associés
+        expenses (list): Liste des charges
+        targets (dict, optional): Montant net visé par identifiant d'associé, en centimes.
+            Defaults to None.
+        floors (dict, optional): Montant net minimal par identifiant d'associé, en centimes.
+            Defaults to None.
+        fiscal_year (int, optional): Exercice de proratisation des charges. Defaults to None.
+    
+    Returns:
+        dict: Statut ("optimal" ou "infeasible"), clés de répartition (la plus grande vaut 1),
+            montants nets obtenus et écart total aux objectifs (en centimes)
+    """
+    targets = _vector(targets, associates)
+    floors = _vector(floors, associates)
+    expense_amounts = calculate_expense_amounts(expenses, fiscal_year)
+    by_allocation = _expenses_by_allocation(expenses, expense_amounts)
+    
+    # Part x_i de l'associé i : rémunération et charges réparties selon la clé
+    key_amount = total_amount - by_allocation.get(KEY_ALLOCATION, 0)
+    offset = np.zeros(len(associates), dtype=np.float64)
+    for allocation, amount in by_allocation.items():
+        if allocation != KEY_ALLOCATION:
+            offset += amount * _shares(associates, allocation)
+    
+    G = np.eye(len(associates)) * key_amount
+    reference = G @ _shares(associates, KEY_ALLOCATION) - offset
+    status, shares = _solve_allocation(G, offset, targets, floors, reference)
+    if shares is None:
+        return _result(status, associates, None, targets)
+    
+    # Montants nets obtenus avec les clés trouvées (rémunération et charges au centime)
+    keys = shares / shares.max() if shares.max() > 0 else shares
+    net = (
+        allocate_cents(int(total_amount), keys)
+        - _expense_cents_by_associate(expenses, expense_amounts, associates, key_weights=keys)
+    )
+    result = _result(status, associates, net, targets)
+    result["distribution_keys"] = dict(zip((associate.id for associate in associates), keys.tolist()))
+    return result
+
+@timed()
+def solve_distribution_methods(total_amount, associates, expenses, targets=None, floors=None,
+                               fiscal_year=None, methods=BLENDED_METHODS, reference_weights=None):
+    """
+    Recherche la combinaison de méthodes de répartition qui atteint les montants nets visés
+    
+    La rémunération de chaque associé est la somme, pour chaque méthode, du montant
+    attribué à la méthode réparti selon celle-ci (répartition mixte, voir
+    calculate_blended_distribution). Les charges restent réparties selon leur
+    propre méthode.
+    
+    Args:
+        total_amount (int): Montant total des rémunérations, en centimes
+        associates (list): Liste des associés
+        expenses (list): Liste des charges
+        targets (dict, optional): Montant net visé par identifiant d'associé, en centimes.
+            Defaults to None.
+        floors (dict, optional): Montant net minimal par identifiant d'associé, en centimes.
+            Defaults to None.
+        fiscal_year (int, optional): Exercice de proratisation des charges. Defaults to None.
+        methods (list, optional): Méthodes combinées. Defaults to BLENDED_METHODS.
+        reference_weights (dict, optional): Poids des méthodes de la répartition en place,
+            vers laquelle sont rappelés les associés sans objectif. Defaults to None
+            (répartition égale).
+    
+    Returns:
+        dict: Statut ("optimal" ou "infeasible"), part du montant attribuée à chaque méthode,
+            montants nets obtenus et écart total aux objectifs (en centimes)
+    """
+    targets = _vector(targets, associates)
+    floors = _vector(floors, associates)
+    expense_amounts = calculate_expense_amounts(expenses, fiscal_year)
+    
+    offset = np.zeros(len(associates), dtype=np.float64)
+    for allocation, amount in _expenses_by_allocation(expenses, expense_amounts).items():
+        offset += amount * _shares(associates, allocation)
+    
+    # Parts de chaque méthode (matrice mémoïsée) et répartition en place
+    share_matrix = get_share_matrix(tuple(associates), tuple(methods))
+    G = total_amount * share_matrix
+    current = np.array(list((reference_weights or {}).values()), dtype=np.float64)
+    if not current.sum() > 0:
+        reference_weights, current = {"equal": 1.0}, np.ones(1)
+    reference = total_amount * get_share_matrix(tuple(associates), tuple(reference_weights)) @ (current / current.sum())
+    reference -= offset
+    status, weights = _solve_allocation(G, offset, targets, floors, reference)
+    if weights is None:
+        return _result(status, associates, None, targets)
+    
+    # Montants nets obtenus avec la répartition mixte trouvée (voir combine_shares)
+    method_weights = dict(zip(methods, (weights / weights.sum()).tolist()))
+    net = (
+        combine_shares(total_amount, share_matrix, tuple(methods), method_weights)
+        - _expense_cents_by_associate(expenses, expense_amounts, associates)
+    )
+    result = _result(status, associates, net, targets)
+    result["method_weights"] = method_weights
+    return result
@@ -0,0 +1,323 @@
+"""
+Contribution de chaque associé au montant ACI (valeur de Shapley)
+
+Le montant ACI dépend des associés par trois entrées : le nombre de patients
+médecin traitant des médecins (partie variable des indicateurs), le nombre de PS
+associés (A3S1) et la présence d'un IPA (bonus). La valeur d'une coalition
+d'associés est le montant que la structure obtiendrait avec ces seuls associés ;
+la valeur de Shapley d'un associé est la moyenne de son apport marginal
+v(S ∪ {i}) − v(S) sur tous les ordres d'arrivée des associés.
+
+La somme des valeurs de Shapley est égale au montant de la structure moins celui
+d'une structure sans associé (points acquis indépendamment des associés). Les
+valeurs et leurs erreurs-types sont en centimes (non arrondis : ce sont des
+moyennes d'apports marginaux).
+
+Le calcul exact énumère les 2^n coalitions : il est réservé aux petites
+structures (EXACT_MAX_ASSOCIATES). Au-delà, les valeurs sont estimées par
+échantillonnage de permutations :
+    - chaque lot de permutations est évalué en une opération matricielle
+      (score_coalitions), les coalitions identiques n'étant évaluées qu'une fois ;
+    - les lots sont répartis entre plusieurs threads lorsque le calcul est
+      assez long (les opérations NumPy libèrent le GIL) ; aucun processus n'est
+      créé depuis le serveur Streamlit, qui exécute déjà plusieurs threads ;
+    - après chaque série de lots, l'erreur-type de chaque estimation est
+      calculée ; l'échantillonnage s'arrête lorsque la plus grande erreur-type
+      passe sous la tolérance (relative à la part moyenne d'un associé).
+Les lots reçoivent des graines dérivées d'une graine unique : le résultat ne
+dépend pas du nombre de threads.
+"""
+
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+
+import numpy as np
+
+from src.utils.calculations import POINT_VALUE, completion_vectors, score_coalitions
+from src.utils.money import CENTS_PER_EURO
+from src.utils.profiling import timed
+
+# Nombre maximal d'associés pour le calcul exact (2^n coalitions)
+EXACT_MAX_ASSOCIATES = 14
+
+# Échantillonnage : permutations par lot, nombre maximal de permutations et
+# erreur-type maximale visée (relative à la part moyenne d'un associé)
+BATCH_SIZE = 64
+MAX_PERMUTATIONS = 4096
+TOLERANCE = 0.05
+
+# Nombre d'apports marginaux (permutations × associés) à partir duquel les lots
+# sont répartis entre plusieurs threads
+PARALLEL_MIN_EVALUATIONS = 500000
+
+DEFAULT_SEED = 0
+
+
+class CoalitionGame:
+    """
+    Jeu coopératif des associés : valeur (montant ACI) de toute coalition d'associés
+    
+    Les associés sont décrits par deux vecteurs : patients médecin traitant comptés
+    (médecins seulement) et présence d'un IPA. Le jeu n'est pas modifié par son
+    évaluation, qui peut donc être partagée entre plusieurs threads.
+    """
+    
+    __slots__ = ("catalog", "status", "percentage", "counts", "point_value", "patients", "ipa")
+    
+    def __init__(self, catalog, status, percentage, patients, ipa, counts=None, point_value=POINT_VALUE):
+        self.catalog = catalog
+        self.status = status
+        self.percentage = percentage
+        self.counts = counts
+        self.point_value = point_value
+        self.patients = np.asarray(patients, dtype=np.float64)
+        self.ipa = np.asarray(ipa, dtype=bool)
+    
+    def __len__(self):
+        return len(self.patients)
+    
+    def values(self, nb_patients, nb_associates, has_ipa):
+        """
+        Retourne la valeur de plusieurs coalitions, décrites par leurs entrées
+        
+        Args:
+            nb_patients (array): Nombre de patients médecin traitant de chaque coalition
+            nb_associates (array): Nombre d'associés de chaque coalition
+            has_ipa (array): Présence d'un IPA dans chaque coalition
+        
+        Returns:
+            numpy.ndarray: Montant ACI de chaque coalition, en centimes
+        """
+        # Seules les coalitions d'entrées distinctes sont évaluées
+        inputs = np.column_stack([nb_patients, nb_associates, has_ipa]).astype(np.float64)
+        unique, inverse = np.unique(inputs, axis=0, return_inverse=True)
+        totals = score_coalitions(
+            self.catalog, self.status, self.percentage, unique[:, 0], unique[:, 1], self.counts, unique[:, 2] > 0
+        )
+        return (totals * (self.point_value * CENTS_PER_EURO))[inverse.reshape(-1)]
+    
+    def members_values(self, members):
+        """
+        Retourne la valeur de coalitions données par leurs membres
+        
+        Args:
+            members (numpy.ndarray): Matrice booléenne coalitions × associés
+        
+        Returns:
+            numpy.ndarray: Montant ACI de chaque coalition, en centimes
+        """
+        members = np.atleast_2d(np.asarray(members, dtype=bool))
+        return self.values(members @ self.patients, members.sum(axis=1), (members & self.ipa).any(axis=1))
+
+
+class ShapleyEstimate:
+    """
+    Valeurs de Shapley des associés et qualité de leur estimation
+    
+    history contient, après chaque série de lots, le nombre de permutations
+    échantillonnées et la plus grande erreur-type ; il est vide pour un calcul
+    exact (erreurs-types nulles).
+    """
+    
+    __slots__ = ("associate_ids", "values", "standard_errors", "nb_permutations", "history", "converged", "exact")
+    
+    def __init__(self, associate_ids, values, standard_errors, nb_permutations, history, converged, exact):
+        self.associate_ids = associate_ids
+        self.values = values
+        self.standard_errors = standard_errors
+        self.nb_permutations = nb_permutations
+        self.history = history
+        self.converged = converged
+        self.exact = exact
+    
+    def as_dict(self):
+        """
+        Retourne la valeur de Shapley de chaque associé, par identifiant
+        """
+        return dict(zip(self.associate_ids, self.values.tolist()))
+    
+    def distribution_weights(self):
+        """
+        Retourne les poids de répartition de chaque associé, par identifiant
+        
+        Une contribution négative (estimation bruitée d'un apport nul) compte pour zéro.
+        """
+        return dict(zip(self.associate_ids, np.clip(self.values, 0, None).tolist()))
+
+
+def build_coalition_game(completion, associates, counts=None, point_value=POINT_VALUE):
+    """
+    Construit le jeu coopératif d'une structure
+    
+    Args:
+        completion (tuple): Catalogue et vecteurs de complétion (voir completion_vectors)
+        associates (list): Liste des associés
+        counts (dict, optional): Nombres propres aux indicateurs. Defaults to None.
+        point_value (float, optional): Valeur du point en euros. Defaults to POINT_VALUE.
+    
+    Returns:
+        CoalitionGame: Jeu des associés
+    """
+    catalog, status, percentage = completion
+    # Mêmes entrées que get_total_patients_mt et has_ipa
+    patients = [associate.patients_mt if associate.is_doctor() else 0 for associate in associates]
+    ipa = [associate.profession == "Infirmier en pratique avancée (IPA)" for associate in associates]
+    return CoalitionGame(catalog, status, percentage, patients, ipa, counts, point_value)
+
+def _sample_permutations(game, nb_permutations, seed):
+    """
+    Évalue un lot de permutations aléatoires des associés
+    
+    Returns:
+        tuple: Somme et somme des carrés des apports marginaux de chaque associé
+    """
+    rng = np.random.default_rng(seed)
+    nb_associates = len(game)
+    permutations = rng.permuted(np.tile(np.arange(nb_associates), (nb_permutations, 1)), axis=1)
+    
+    # Entrées des coalitions successives de chaque permutation (coalition vide comprise)
+    patients = np.zeros((nb_permutations, nb_associates + 1))
+    patients[:, 1:] = np.cumsum(game.patients[permutations], axis=1)
+    sizes = np.broadcast_to(np.arange(nb_associates + 1), patients.shape)
+    ipa = np.zeros(patients.shape, dtype=bool)
+    ipa[:, 1:] = np.logical_or.accumulate(game.ipa[permutations], axis=1)
+    values = game.values(patients.ravel(), sizes.ravel(), ipa.ravel()).reshape(patients.shape)
+    
+    # Apport marginal de l'associé arrivé à chaque rang, rangé dans la colonne de l'associé
+    marginals = np.empty((nb_permutations, nb_associates))
+    np.put_along_axis(marginals, permutations, np.diff(values, axis=1), axis=1)
+    return marginals.sum(axis=0), (marginals ** 2).sum(axis=0)
+
+def _standard_errors(sums, squares, count):
+    if count < 2:
+        return np.full(len(sums), np.inf)
+    variance = np.clip(squares - sums ** 2 / count, 0, None) / (count - 1)
+    return np.sqrt(variance / count)
+
+@timed()
+def exact_shapley_values(game):
+    """
+    Calcule les valeurs de Shapley exactes en énumérant toutes les coalitions
+    
+    Args:
+        game (CoalitionGame): Jeu des associés (au plus EXACT_MAX_ASSOCIATES associés)
+    
+    Returns:
+        numpy.ndarray: Valeur de Shapley de chaque associé
+    """
+    nb_associates = len(game)
+    if nb_associates > EXACT_MAX_ASSOCIATES:
+        raise ValueError(f"Calcul exact limité à {EXACT_MAX_ASSOCIATES} associés")
+    
+    # Coalition k : associés des bits à 1 de k
+    coalitions = np.arange(2 ** nb_associates)
+    members = (coalitions[:, None] >> np.arange(nb_associates)) & 1 == 1
+    values = game.members_values(members)
+    sizes = members.sum(axis=1)
+    
+    # Poids d'une coalition S ne contenant pas i : |S|! (n − |S| − 1)! / n!
+    weights = np.array([
+        math.factorial(size) * math.factorial(nb_associates - size - 1) / math.factorial(nb_associates)
+        for size in range(nb_associates)
+    ])
+    
+    shapley = np.zeros(nb_associates)
+    for i in range(nb_associates):
+        without = coalitions[~members[:, i]]
+        shapley[i] = (weights[sizes[without]] * (values[without | (1 << i)] - values[without])).sum()
+    return shapley
+
+@timed()
+def estimate_shapley_values(game, max_permutations=MAX_PERMUTATIONS, tolerance=TOLERANCE,
+                            batch_size=BATCH_SIZE, workers=None, seed=DEFAULT_SEED):
+    """
+    Estime les valeurs de Shapley par échantillonnage de permutations
+    
+    Args:
+        game (CoalitionGame): Jeu des associés
+        max_permutations (int, optional): Nombre maximal de permutations. Defaults to MAX_PERMUTATIONS.
+        tolerance (float, optional): Plus grande erreur-type acceptée, relative à la part
+            moyenne d'un associé (valeur de la structure moins celle d'une structure sans
+            associé, divisée par le nombre d'associés). Defaults to TOLERANCE.
+        batch_size (int, optional): Permutations par lot. Defaults to BATCH_SIZE.
+        workers (int, optional): Nombre de threads. Defaults to None (un seul thread
+            pour les petits calculs, sinon un par cœur).
+        seed (int, optional): Graine de l'échantillonnage. Defaults to DEFAULT_SEED.
+    
+    Returns:
+        tuple: Valeurs estimées, erreurs-types, nombre de permutations, historique de
+            convergence et indicateur de convergence
+    """
+    nb_associates = len(game)
+    if workers is None:
+        workers = 1 if max_permutations * nb_associates < PARALLEL_MIN_EVALUATIONS else os.cpu_count() or 1
+    
+    # Erreur-type visée, en centimes
+    grand, empty = game.members_values(np.array([np.ones(nb_associates), np.zeros(nb_associates)]))
+    target = tolerance * max(abs(grand - empty) / max(nb_associates, 1), CENTS_PER_EURO)
+    
+    batch_sizes = [min(batch_size, max_permutations - start) for start in range(0, max_permutations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batch_sizes))
+    
+    sums = np.zeros(nb_associates)
+    squares = np.zeros(nb_associates)
+    count = 0
+    errors = np.full(nb_associates, np.inf)
+    history = []
+    converged = False
+    
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+    try:
+        # Une série compte un lot par thread (au moins deux lots avant le premier test)
+        series = max(workers, 2)
+        for start in range(0, len(batch_sizes), series):
+            sizes = batch_sizes[start:start + series]
+            arguments = (repeat(game), sizes, seeds[start:start + series])
+            results = executor.map(_sample_permutations, *arguments) if executor else map(_sample_permutations, *arguments)
+            for batch_sums, batch_squares in results:
+                sums += batch_sums
+                squares += batch_squares
+            count += sum(sizes)
+            
+            errors = _standard_errors(sums, squares, count)
+            history.append((count, float(errors.max(initial=0))))
+            if errors.max(initial=0) <= target:
+                converged = True
+                break
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    return sums / max(count, 1), errors, count, history, converged
+
+@timed()
+def calculate_shapley_values(completion, associates, counts=None, point_value=POINT_VALUE, **options):
+    """
+    Calcule la contribution de chaque associé au montant ACI
+    
+    Le calcul est exact jusqu'à EXACT_MAX_ASSOCIATES associés, estimé au-delà
+    (voir estimate_shapley_values, dont les options sont acceptées).
+    
+    Args:
+        completion (tuple | IndicatorState): Vecteurs de complétion (voir completion_vectors)
+            ou état des indicateurs
+        associates (list): Liste des associés
+        counts (dict, optional): Nombres propres aux indicateurs. Defaults to None.
+        point_value (float, optional): Valeur du point en euros. Defaults to POINT_VALUE.
+    
+    Returns:
+        ShapleyEstimate: Valeurs de Shapley des associés
+    """
+    if not isinstance(completion, tuple):
+        completion = completion_vectors(completion)
+    associate_ids = tuple(associate.id for associate in associates)
+    game = build_coalition_game(completion, associates, counts, point_value)
+    
+    if len(game) <= EXACT_MAX_ASSOCIATES:
+        values = exact_shapley_values(game)
+        return ShapleyEstimate(associate_ids, values, np.zeros(len(values)), 0, [], True, True)
+    
+    values, errors, count, history, converged = estimate_shapley_values(game, **options)
+    return ShapleyEstimate(associate_ids, values, errors, count, history, converged, False)
@@ -0,0 +1,244 @@
+"""
+Trace des calculs de rémunération, pour justifier un montant auprès des associés
+
+La trace est désactivée par défaut : les fonctions de calcul ne paient alors
+qu'une lecture d'attribut (current() retourne None). Activée pour un bloc
+(tracing()), elle enregistre chaque étape dans un tampon compact :
+    - "indicators" : entrées du calcul des points (patients, PS associés,
+      nombres propres, IPA), ratio de patients et points fixes, variables et
+      obtenus de chaque indicateur, sous forme de vecteurs ;
+    - "total" : total des points, valeur du point et montant ;
+    - "distribution" : répartition d'un montant (rémunération ou charge) entre
+      les associés, avec la méthode et le montant de chacun ;
+    - "net" : montant brut, charges et montant net d'un associé.
+Les montants sont enregistrés en centimes et exportés en euros. Les étapes ne sont développées en lignes (un indicateur, un associé) qu'à
+l'export, au format JSON ou dans un classeur Excel. La règle appliquée à chaque
+indicateur est décrite à partir de la table INDICATOR_RULES.
+
+Comme l'instrumentation (src/utils/profiling.py), la trace est propre au thread
+qui exécute le script : chaque session trace ses propres calculs.
+"""
+
+import json
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+import numpy as np
+
+from src.models.indicator_rules import INDICATOR_RULES, evaluate_rule
+from src.utils.money import to_euros
+
+# Nombre maximal d'étapes conservées (les plus anciennes sont oubliées)
+MAX_STEPS = 10000
+
+# Libellé des répartitions enregistrées hors de tout contexte
+DEFAULT_CONTEXT = "Rémunération"
+
+# Feuilles du classeur Excel, par type d'étape
+SHEET_NAMES = {
+    "indicators": "Indicateurs",
+    "total": "Montant total",
+    "distribution": "Répartitions",
+    "net": "Montants nets",
+}
+
+# Libellés des entrées et des parts d'un indicateur, pour la description des règles
+_SOURCES = {None: "constante", "nb_patients": "patients MT", "nb_associates": "PS associés", "count": "nombre propre"}
+_PARTS = {"fixed": "fixe", "variable": "variable"}
+
+class _ThreadState(threading.local):
+    def __init__(self):
+        self.buffer = None
+
+_state = _ThreadState()
+
+class TraceBuffer:
+    """
+    Tampon des étapes de calcul : chaque étape est un tuple (type, contexte, valeurs)
+    """
+    
+    __slots__ = ("steps", "context")
+    
+    def __init__(self, max_steps=MAX_STEPS):
+        self.steps = deque(maxlen=max_steps)
+        self.context = DEFAULT_CONTEXT
+    
+    def __len__(self):
+        return len(self.steps)
+    
+    def add(self, kind, *values):
+        """
+        Enregistre une étape
+        
+        Args:
+            kind (str): Type d'étape ("indicators", "total", "distribution", "net")
+            *values: Valeurs de l'étape, dans l'ordre attendu par son type
+        """
+        self.steps.append((kind, self.context, values))
+    
+    def to_rows(self):
+        """
+        Développe les étapes en lignes, regroupées par type d'étape
+        
+        Returns:
+            dict: Liste de lignes (dictionnaires) par type d'étape
+        """
+        rows = {kind: [] for kind in SHEET_NAMES}
+        for number, (kind, context, values) in enumerate(self.steps, start=1):
+            rows[kind].extend(
+                {"Étape": number, "Contexte": context, **row} for row in _EXPANDERS[kind](*values)
+            )
+        return rows
+    
+    def to_json(self, indent=2):
+        """
+        Retourne la trace au format JSON
+        """
+        payload = {"generated": datetime.now().isoformat(timespec="seconds"), "steps": self.to_rows()}
+        return json.dumps(payload, ensure_ascii=False, indent=indent, default=_json_default)
+    
+    def to_excel(self, target):
+        """
+        Écrit la trace dans un classeur Excel (une feuille par type d'étape)
+        
+        Args:
+            target (str | file): Chemin ou fichier (par exemple io.BytesIO) de destination
+        
+        Returns:
+            str | file: Destination
+        """
+        import pandas as pd
+        
+        with pd.ExcelWriter(target, engine="openpyxl") as writer:
+            for kind, rows in self.to_rows().items():
+                pd.DataFrame(rows).to_excel(writer, sheet_name=SHEET_NAMES[kind], index=False)
+        return target
+
+def current():
+    """
+    Retourne le tampon de la trace active du thread courant (None si la trace est désactivée)
+    """
+    return _state.buffer
+
+@contextmanager
+def tracing(max_steps=MAX_STEPS):
+    """
+    Active la trace pour un bloc de code
+    
+    Yields:
+        TraceBuffer: Tampon des étapes calculées dans le bloc
+    """
+    previous = _state.buffer
+    buffer = _state.buffer = TraceBuffer(max_steps)
+    try:
+        yield buffer
+    finally:
+        _state.buffer = previous
+
+def context(label):
+    """
+    Nomme les étapes enregistrées dans un bloc (par exemple « Charge : Loyer »)
+    
+    Sans trace active, retourne un contexte vide.
+    """
+    buffer = _state.buffer
+    if buffer is None:
+        return nullcontext()
+    return _labelled(buffer, label)
+
+@contextmanager
+def _labelled(buffer, label):
+    previous = buffer.context
+    buffer.context = label
+    try:
+        yield
+    finally:
+        buffer.context = previous
+
+def describe_rules(indicator_id, nb_patients, nb_associates, count, has_ipa):
+    """
+    Décrit les règles de la table INDICATOR_RULES appliquées à un indicateur
+    
+    Returns:
+        str: Règles et points obtenus (vide si l'indicateur n'a pas de règle)
+    """
+    inputs = {None: 0, "nb_patients": nb_patients, "nb_associates": nb_associates, "count": count}
+    descriptions = []
+    for rule in INDICATOR_RULES:
+        if rule["indicator"] != indicator_id:
+            continue
+        value = inputs[rule.get("source")]
+        source = _SOURCES[rule.get("source")]
+        if value is None:
+            descriptions.append(f"{source} non renseigné : règle inactive")
+        elif rule.get("requires_ipa") and not has_ipa:
+            descriptions.append(f"{source} = {value} : règle inactive (IPA requis)")
+        else:
+            replaces = f", remplace la part {_PARTS[rule['replaces']]}" if rule.get("replaces") else ""
+            descriptions.append(
+                f"{source} = {value} : {evaluate_rule(rule, value):g} points {_PARTS[rule['target']]}s{replaces}"
+            )
+    return " ; ".join(descriptions)
+
+def _expand_indicators(catalog, status, percentage, nb_patients, nb_associates, counts, has_ipa,
+                       ratio, points_fixed, points_variable, points):
+    counts = counts or {}
+    for i, indicator_id in enumerate(catalog.ids):
+        completed = bool(status[i])
+        yield {
+            "Indicateur": indicator_id,
+            "Libellé": catalog.names[i],
+            "Niveau": int(status[i]),
+            "Pourcentage": float(percentage[i]),
+            "Patients MT": nb_patients,
+            "PS associés": nb_associates,
+            "Nombre propre": counts.get(indicator_id),
+            "IPA": bool(has_ipa),
+            "Règle": (
+                "prérequis non validé : aucun point" if ratio is None
+                else "non complété : aucun point" if not completed
+                else describe_rules(indicator_id, nb_patients, nb_associates, counts.get(indicator_id), has_ipa)
+                or "points du catalogue"
+            ),
+            "Ratio": None if ratio is None else float(ratio[i]),
+            "Points fixes": float(points_fixed[i]),
+            "Points variables": float(points_variable[i]),
+            "Points obtenus": float(points[i]),
+        }
+
+def _expand_total(total_points, point_value, amount):
+    yield {"Total des points": float(total_points), "Valeur du point": float(point_value), "Montant": to_euros(int(amount))}
+
+def _expand_distribution(total_amount, distribution_method, campaign_year, distribution):
+    total = sum(distribution.values())
+    for associate_id, amount in distribution.items():
+        yield {
+            "Montant réparti": to_euros(int(total_amount)),
+            "Méthode": distribution_method,
+            "Année de proratisation": campaign_year,
+            "Associé": associate_id,
+            "Part": amount / total if total else 0.0,
+            "Montant": to_euros(int(amount)),
+        }
+
+def _expand_net(associate_id, gross_amount, total_expenses, net_amount):
+    yield {
+        "Associé": associate_id,
+        "Montant brut": to_euros(int(gross_amount)),
+        "Charges": to_euros(int(total_expenses)),
+        "Montant net": to_euros(int(net_amount)),
+    }
+
+_EXPANDERS = {
+    "indicators": _expand_indicators,
+    "total": _expand_total,
+    "distribution": _expand_distribution,
+    "net": _expand_net,
+}
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Valeur non sérialisable : {value!r}")
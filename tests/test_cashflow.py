@@ -0,0 +1,103 @@
+"""
+Projection de trésorerie : versements ACI et charges répartis au centime, parts de la rémunération proratisées par exercice
+"""
+
+import numpy as np
+
+from benchmarks.synthetic import generate_associates, generate_expenses
+from src.models.expense_schedule import MONTHS_PER_YEAR
+from src.utils.calculations import (
+    calculate_associate_distribution, calculate_total_expenses, get_distribution_shares
+)
+from src.utils.cashflow import ACI_ADVANCE_RATE, build_cash_flow_projection, project_cash_flow
+from src.utils.money import allocate_cents
+
+FIRST_YEAR = 2025
+HORIZON = 4
+ANNUAL_AMOUNT = 12_345_679
+METHOD_WEIGHTS = {"equal": 30, "presence_time": 50, "patients_mt": 20}
+
+def _by_year(matrix):
+    return matrix.reshape(HORIZON, MONTHS_PER_YEAR, -1).sum(axis=1)
+
+def _expected_payments(annual_amount, previous_amount):
+    def advance(amount):
+        return int(round(amount * ACI_ADVANCE_RATE))
+    return [
+        advance(annual_amount) + (previous_amount if year == 0 else annual_amount)
+        - advance(previous_amount if year == 0 else annual_amount)
+        for year in range(HORIZON)
+    ]
+
+def _projections(associates, expenses, previous_amount=None):
+    custom_weights = {associate.id: float(i % 7 + 1) for i, associate in enumerate(associates)}
+    yield build_cash_flow_projection(associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, HORIZON, "equal", previous_amount)
+    yield build_cash_flow_projection(
+        associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, HORIZON, "presence_time", previous_amount
+    )
+    yield build_cash_flow_projection(
+        associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, HORIZON, "blended", previous_amount,
+        method_weights=METHOD_WEIGHTS
+    )
+    yield build_cash_flow_projection(
+        associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, HORIZON, "custom", previous_amount,
+        custom_weights=custom_weights
+    )
+
+def test_inflows_sum_to_aci_payments():
+    associates = generate_associates(40)
+    for previous_amount, previous_expected in ((None, ANNUAL_AMOUNT), (0, 0), (9_999_999, 9_999_999)):
+        expected = _expected_payments(ANNUAL_AMOUNT, previous_expected)
+        for projection in _projections(associates, [], previous_amount):
+            assert projection.inflows.dtype == np.int64
+            assert _by_year(projection.inflows).sum(axis=1).tolist() == expected
+
+def test_outflows_sum_to_expenses():
+    associates = generate_associates(25)
+    expenses = generate_expenses(200)
+    projection = build_cash_flow_projection(associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, HORIZON)
+    assert projection.outflows.dtype == np.int64
+    assert _by_year(projection.outflows).sum(axis=1).tolist() == [
+        calculate_total_expenses(expenses, FIRST_YEAR + year) for year in range(HORIZON)
+    ]
+    assert np.array_equal(projection.balance, np.cumsum(projection.inflows - projection.outflows, axis=0))
+
+def test_departed_associate_stops_receiving():
+    associates = generate_associates(10)
+    for associate in associates:
+        associate.entry_date = "2015-01-01"
+    associates[0].exit_date = f"{FIRST_YEAR}-06-30"
+    associates[1].entry_date = f"{FIRST_YEAR + 2}-01-01"
+    
+    for projection in _projections(associates, []):
+        inflows = _by_year(projection.inflows)
+        # Sorti en cours d'exercice : avance de l'exercice, puis solde l'exercice suivant
+        assert inflows[0, 0] > 0 and inflows[1, 0] > 0
+        assert not inflows[2:, 0].any()
+        # Entré au troisième exercice : rien avant
+        assert not inflows[:2, 1].any() and inflows[2:, 1].all()
+
+def test_yearly_shares_match_remuneration_tab():
+    associates = generate_associates(30)
+    associates[3].exit_date = f"{FIRST_YEAR}-03-31"
+    associates[4].entry_date = f"{FIRST_YEAR}-09-01"
+    custom_weights = {associate.id: float(i % 5) for i, associate in enumerate(associates)}
+    for method, options in [
+        ("equal", {}), ("distribution_key", {}), ("blended", {"method_weights": METHOD_WEIGHTS}),
+        ("custom", {"custom_weights": custom_weights})
+    ]:
+        for campaign_year in (None, FIRST_YEAR):
+            shares = get_distribution_shares(associates, method, campaign_year, **options)
+            assert np.isclose(shares.sum(), 1)
+            distribution = calculate_associate_distribution(ANNUAL_AMOUNT, associates, method, campaign_year, **options)
+            amounts = allocate_cents(ANNUAL_AMOUNT, shares)
+            assert int(amounts.sum()) == ANNUAL_AMOUNT
+            assert np.abs(amounts - np.array(list(distribution.values()))).max() <= 1
+
+def test_projection_is_memoized():
+    associates = tuple(generate_associates(5))
+    expenses = tuple(generate_expenses(10))
+    weights = tuple(METHOD_WEIGHTS.items())
+    first = project_cash_flow(associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, 2, "blended", None, weights)
+    assert project_cash_flow(associates, expenses, ANNUAL_AMOUNT, FIRST_YEAR, 2, "blended", None, weights) is first
+    assert not first.inflows.flags.writeable
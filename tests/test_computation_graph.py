@@ -0,0 +1,128 @@
+"""
+Graphe de calcul : après une modification, seuls les nœuds en aval sont recalculés, une seule fois chacun
+"""
+
+from collections import Counter
+
+from benchmarks.synthetic import generate_associates, generate_expenses
+from src.models.indicators import IndicatorState
+from src.utils.computation_graph import build_remuneration_graph
+
+OUTPUTS = ("points_by_axis", "points_by_type", "net_amount", "net_amounts")
+
+INDICATOR_NODES = {
+    "completion", "indicator_points", "points_by_axis", "points_by_type", "total_points", "total_amount",
+    "shapley_values", "associate_distribution", "net_amount", "net_amounts"
+}
+
+def _graph():
+    indicators = IndicatorState()
+    for indicator in indicators:
+        if indicator.is_prerequisite or indicator.id == "A2S2":
+            indicator.completion_status = indicator.max_level
+    graph = build_remuneration_graph()
+    graph.set_inputs(
+        indicators=indicators, associates=generate_associates(12), expenses=generate_expenses(40), counts={},
+        fiscal_year=2025
+    )
+    _read(graph)
+    graph.reset_stats()
+    return graph
+
+def _read(graph):
+    return [graph.get(name) for name in OUTPUTS]
+
+def _recomputed(graph):
+    # Nœuds recalculés par la lecture des sorties (chacun une seule fois)
+    graph.reset_stats()
+    _read(graph)
+    counts = Counter(graph.recomputed)
+    assert all(count == 1 for count in counts.values()), counts
+    return set(counts)
+
+def test_unchanged_inputs_are_reused():
+    graph = _graph()
+    values = _read(graph)
+    assert graph.recomputed == []
+    
+    # Mêmes objets, mêmes valeurs : rien à recalculer
+    assert not graph.set_input("associates", graph.get("associates"))
+    assert not graph.set_input("indicators", graph.get("indicators"))
+    assert _recomputed(graph) == set()
+    assert _read(graph) == values
+
+def test_indicator_edit_recomputes_downstream_nodes():
+    graph = _graph()
+    indicators = graph.get("indicators")
+    total_amount = graph.get("total_amount")
+    indicators.get("A2S3").completion_status = 1
+    assert graph.set_input("indicators", indicators)
+    assert _recomputed(graph) == INDICATOR_NODES
+    assert graph.get("total_amount") > total_amount
+
+def test_indicator_edit_without_point_change_stops_early():
+    graph = _graph()
+    indicators = graph.get("indicators")
+    # Indicateur sans points variables : le pourcentage ne change pas ses points
+    indicators.get("A2S2").completion_percentage = 50
+    graph.set_input("indicators", indicators)
+    assert _recomputed(graph) == {"completion", "indicator_points", "points_by_axis", "points_by_type",
+                                  "shapley_values"}
+
+def test_associate_edit():
+    graph = _graph()
+    associates = graph.get("associates")
+    associate_nodes = {
+        "nb_patients", "nb_associates", "has_ipa", "share_matrix", "shapley_values", "associate_distribution",
+        "expenses_by_associate"
+    }
+    
+    # Nom modifié : les valeurs déduites des associés sont inchangées, les montants sont conservés
+    associates[3].first_name = "Camille"
+    graph.set_input("associates", associates)
+    assert _recomputed(graph) == associate_nodes
+    
+    # Patients médecin traitant modifiés : les points et les montants sont recalculés, pas les charges
+    associates[0].patients_mt += 5000
+    graph.set_input("associates", associates)
+    recomputed = _recomputed(graph)
+    assert {"indicator_points", "total_amount", "associate_distribution", "net_amounts"} <= recomputed
+    assert not recomputed & {"completion", "expense_amounts", "total_expenses"}
+
+def test_expense_edit():
+    graph = _graph()
+    expenses = graph.get("expenses")
+    net_amount = graph.get("net_amount")
+    # Charge de l'exercice (une charge hors de l'exercice ne change aucun montant)
+    expense = next(expense for expense in expenses if expense.get_annual_amount(2025) > 0)
+    expense.amount += 1000
+    graph.set_input("expenses", expenses)
+    assert _recomputed(graph) == {"expense_amounts", "total_expenses", "expenses_by_associate", "net_amount",
+                                  "net_amounts"}
+    assert graph.get("net_amount") < net_amount
+
+def test_in_place_item_mutation_bumps_version():
+    graph = _graph()
+    for name, mutate in [
+        ("associates", lambda associates: setattr(associates[0], "presence_time", 0.25)),
+        ("expenses", lambda expenses: setattr(expenses[0], "name", "Assurance")),
+        ("indicators", lambda indicators: setattr(indicators.get("A2S3"), "completion_percentage", 12.5)),
+    ]:
+        node = graph._nodes[name]
+        value = graph.get(name)
+        version = node.version
+        mutate(value)
+        assert graph.set_input(name, value)
+        assert node.version == version + 1
+        assert not graph.set_input(name, value)
+        assert node.version == version + 1
+
+def test_blend_weight_change_reuses_share_matrix():
+    graph = _graph()
+    graph.set_inputs(distribution_method="blended", method_weights={"equal": 50, "presence_time": 50})
+    _recomputed(graph)
+    share_matrix = graph.get("share_matrix")
+    
+    graph.set_input("method_weights", {"equal": 20, "presence_time": 80})
+    assert _recomputed(graph) == {"associate_distribution", "net_amounts"}
+    assert graph.get("share_matrix") is share_matrix
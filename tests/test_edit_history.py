@@ -0,0 +1,156 @@
+"""
+Historique des modifications : chaque étape annulée puis rétablie rend exactement l'état d'avant et d'après
+"""
+
+import streamlit as st
+
+from benchmarks.synthetic import generate_associates, generate_expenses
+from src.models.indicators import IndicatorState
+from src.pages.indicators import store_indicator_completion
+from src.utils.edit_history import get_history, snapshot_record
+from src.utils.record_index import get_session_index
+
+def _session_state():
+    return {
+        "indicators": IndicatorState(),
+        "indicator_counts": {},
+        "associates": generate_associates(20),
+        "expenses": generate_expenses(30)
+    }
+
+def _indicator_values(session_state):
+    return [
+        (indicator.completion_status, indicator.completion_percentage) for indicator in session_state["indicators"]
+    ]
+
+def _records(session_state, name):
+    return [(record.id, snapshot_record(record)) for record in session_state[name]]
+
+def test_set_indicator_round_trip():
+    session_state = _session_state()
+    history = get_history(session_state, "indicators")
+    indicators = session_state["indicators"]
+    first, second = indicators[0], indicators[3]
+    
+    states = [_indicator_values(session_state)]
+    for indicator, field, value in [
+        (first, "completion_status", 2), (first, "completion_percentage", 37.5), (second, "completion_percentage", 80),
+        (first, "completion_percentage", 12.25)
+    ]:
+        history.set_indicator(indicator, field, value)
+        states.append(_indicator_values(session_state))
+    assert first.completion_percentage == 12.25
+    
+    # Valeur inchangée : pas d'étape
+    history.set_indicator(second, "completion_percentage", 80)
+    assert len(history.undo_steps) == 4
+    
+    for expected in reversed(states[:-1]):
+        assert history.undo(session_state)
+        assert _indicator_values(session_state) == expected
+    assert not history.undo(session_state)
+    for expected in states[1:]:
+        assert history.redo(session_state)
+        assert _indicator_values(session_state) == expected
+    assert not history.redo(session_state)
+
+def test_set_count_round_trip():
+    session_state = _session_state()
+    history = get_history(session_state, "indicators")
+    counts = session_state["indicator_counts"]
+    
+    history.set_count(counts, "A2S2", 3)
+    history.set_count(counts, "A2S2", 5)
+    history.set_count(counts, "A1O4", 1)
+    history.set_count(counts, "A1O4", 1)
+    assert len(history.undo_steps) == 3
+    
+    history.undo(session_state)
+    assert counts == {"A2S2": 5}
+    history.undo(session_state)
+    assert counts == {"A2S2": 3}
+    history.undo(session_state)
+    # Nombre jamais saisi : retiré, et non remis à zéro
+    assert counts == {}
+    history.redo(session_state)
+    history.redo(session_state)
+    history.redo(session_state)
+    assert counts == {"A2S2": 5, "A1O4": 1}
+
+def test_new_step_clears_redo():
+    session_state = _session_state()
+    history = get_history(session_state, "indicators")
+    indicator = session_state["indicators"][0]
+    history.set_indicator(indicator, "completion_status", 1)
+    history.undo(session_state)
+    assert history.can_redo()
+    history.set_indicator(indicator, "completion_status", 2)
+    assert not history.can_redo()
+
+def test_record_changes_round_trip():
+    for name in ("associates", "expenses"):
+        session_state = _session_state()
+        history = get_history(session_state, name)
+        extra = (generate_associates(25) if name == "associates" else generate_expenses(35))[-5:]
+        
+        states = [_records(session_state, name)]
+        index = get_session_index(session_state, name)
+        history.add_record(index, extra[0])
+        states.append(_records(session_state, name))
+        history.remove_record(index, session_state[name][2].id)
+        states.append(_records(session_state, name))
+        
+        record = session_state[name][5]
+        before = snapshot_record(record)
+        if name == "associates":
+            record.roles = record.roles + ["Coordinateur"]
+            record.presence_time = 0.5
+        else:
+            record.amount = record.amount + 10.5
+            record.name = "Loyer"
+        history.update_record(index, record, before)
+        states.append(_records(session_state, name))
+        
+        history.remove_record(index, extra[0].id)
+        states.append(_records(session_state, name))
+        history.add_record(index, extra[1])
+        states.append(_records(session_state, name))
+        
+        for expected in reversed(states[:-1]):
+            assert history.undo(session_state)
+            assert _records(session_state, name) == expected
+        for expected in states[1:]:
+            assert history.redo(session_state)
+            assert _records(session_state, name) == expected
+
+def test_update_without_change_is_not_recorded():
+    session_state = _session_state()
+    history = get_history(session_state, "associates")
+    index = get_session_index(session_state, "associates")
+    record = session_state["associates"][0]
+    history.update_record(index, record, snapshot_record(record))
+    assert not history.can_undo()
+
+def test_history_reset_when_collection_replaced():
+    session_state = _session_state()
+    history = get_history(session_state, "associates")
+    history.add_record(get_session_index(session_state, "associates"), generate_associates(21)[-1])
+    session_state["associates"] = generate_associates(3)
+    assert not get_history(session_state, "associates").can_undo()
+
+def test_fractional_percentage_kept_by_page(monkeypatch):
+    session_state = _session_state()
+    monkeypatch.setattr(st, "session_state", session_state)
+    indicator = session_state["indicators"][0]
+    
+    session_state["percentage"] = 37.5
+    store_indicator_completion(indicator.id, "completion_percentage", "percentage")
+    assert indicator.completion_percentage == 37.5
+    
+    session_state["status"] = 2.0
+    store_indicator_completion(indicator.id, "completion_status", "status")
+    assert indicator.completion_status == 2
+    
+    get_history(session_state, "indicators").undo(session_state)
+    get_history(session_state, "indicators").undo(session_state)
+    assert (indicator.completion_status, indicator.completion_percentage) == (0, 0)
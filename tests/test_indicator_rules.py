@@ -0,0 +1,136 @@
+"""
+Règles propres aux indicateurs : la table compilée (score_indicators) donne les mêmes points que le calcul indicateur par indicateur
+"""
+
+import itertools
+
+import numpy as np
+
+from src.models.indicator_rules import DEFAULT_COUNTS, CompiledRules, apply_indicator_rules, compile_rules
+from src.models.indicators import IndicatorState, get_indicator_catalog
+from src.utils.calculations import score_indicators
+
+NB_PATIENTS = (0, 2500, 4000, 8000, 8001, 12000)
+NB_ASSOCIATES = (None, 0, 1, 16, 17, 40)
+COUNTS = (
+    {},
+    DEFAULT_COUNTS,
+    {"A1O4": 0, "A2S2": 0, "A2O1": 0, "A2O4": 0},
+    {"A1O4": 1, "A2S2": 3, "A2O1": 3, "A2O4": 6},
+    {"A1O4": 5, "A2S2": 12, "A2O1": 9, "A2O4": 20},
+)
+
+def _state(seed):
+    # Indicateurs prérequis complétés (sinon aucun point), autres niveaux et pourcentages tirés au hasard
+    rng = np.random.default_rng(seed)
+    state = IndicatorState()
+    for indicator in state:
+        if indicator.is_prerequisite:
+            indicator.completion_status = indicator.max_level
+        else:
+            indicator.completion_status = int(rng.integers(0, indicator.max_level + 1))
+        indicator.completion_percentage = float(rng.choice([0, 37.5, 100]))
+    return state
+
+def test_score_indicators_matches_calculate_points():
+    for seed, (nb_patients, nb_associates, counts, has_ipa) in enumerate(
+        itertools.product(NB_PATIENTS, NB_ASSOCIATES, COUNTS, (False, True))
+    ):
+        state = _state(seed)
+        points = score_indicators(state.catalog, state.status, state.percentage, nb_patients, nb_associates, counts,
+                                  has_ipa)
+        expected = [
+            indicator.calculate_points(nb_patients, nb_associates, count=counts.get(indicator.id), has_ipa=has_ipa)
+            for indicator in state
+        ]
+        np.testing.assert_allclose(points, expected, rtol=0, atol=1e-9)
+
+def test_compiled_rules_match_apply_indicator_rules():
+    catalog = get_indicator_catalog()
+    rules = compile_rules(catalog)
+    for nb_patients, nb_associates, counts, has_ipa in itertools.product(
+        NB_PATIENTS, NB_ASSOCIATES, COUNTS, (False, True)
+    ):
+        points_fixed, points_variable = rules.apply(nb_patients, nb_associates, counts, has_ipa)
+        for position, indicator_id in enumerate(catalog.ids):
+            assert (points_fixed[position], points_variable[position]) == apply_indicator_rules(
+                indicator_id, catalog.points_fixed[position], catalog.points_variable[position], nb_patients,
+                nb_associates, counts.get(indicator_id), has_ipa
+            )
+
+# Points fixes et variables attendus : indicateur, patients, associés, nombre propre, IPA
+EXPECTED_POINTS = [
+    # Fonction de coordination : +1100 points fixes au-delà (strictement) de 8000 patients
+    ("A2S1", 7999, None, None, False, 1000, 1700),
+    ("A2S1", 8000, None, None, False, 1000, 1700),
+    ("A2S1", 8001, None, None, False, 2100, 1700),
+    # Système d'information : 200 points par associé jusqu'à 16, puis 150
+    ("A3S1", 4000, None, None, False, 500, 200),
+    ("A3S1", 4000, 0, None, False, 500, 0),
+    ("A3S1", 4000, 10, None, False, 2500, 0),
+    ("A3S1", 4000, 16, None, False, 3700, 0),
+    ("A3S1", 4000, 17, None, False, 3850, 0),
+    ("A3S1", 4000, 40, None, False, 7300, 0),
+    # Protocoles : 100 points par protocole (8 au maximum), +40 par protocole avec un IPA
+    ("A2S2", 4000, None, None, True, 100, 0),
+    ("A2S2", 4000, None, 3, False, 300, 0),
+    ("A2S2", 4000, None, 3, True, 420, 0),
+    ("A2S2", 4000, None, 12, False, 800, 0),
+    ("A2S2", 4000, None, 12, True, 1120, 0),
+    # Missions de santé publique : 350 points variables par mission, +200 fixes avec un IPA et 2 missions
+    ("A1O4", 4000, None, None, True, 200, 700),
+    ("A1O4", 4000, None, 1, True, 200, 350),
+    ("A1O4", 4000, None, 2, False, 200, 700),
+    ("A1O4", 4000, None, 2, True, 400, 700),
+    ("A1O4", 4000, None, 5, True, 400, 700),
+    # Concertation : +200 points variables avec un IPA
+    ("A2S3", 4000, None, None, False, 0, 1000),
+    ("A2S3", 4000, None, None, True, 0, 1200),
+    # Formation : 450 points à partir de 2 stages, +225 pour le 3ème et le 4ème
+    ("A2O1", 4000, None, 1, False, 0, 0),
+    ("A2O1", 4000, None, 2, False, 450, 0),
+    ("A2O1", 4000, None, 4, False, 900, 0),
+    ("A2O1", 4000, None, 9, False, 900, 0),
+    # Protocoles de coopération : 100 points par protocole (6 au maximum)
+    ("A2O4", 4000, None, 7, False, 600, 0),
+]
+
+def test_rule_points():
+    catalog = get_indicator_catalog()
+    rules = compile_rules(catalog)
+    for indicator_id, nb_patients, nb_associates, count, has_ipa, fixed, variable in EXPECTED_POINTS:
+        counts = {} if count is None else {indicator_id: count}
+        points_fixed, points_variable = rules.apply(nb_patients, nb_associates, counts, has_ipa)
+        position = catalog.positions[indicator_id]
+        assert (points_fixed[position], points_variable[position]) == (fixed, variable), indicator_id
+
+def test_batch_matches_single_inputs():
+    catalog = get_indicator_catalog()
+    rules = compile_rules(catalog)
+    inputs = list(itertools.product(NB_PATIENTS, [n for n in NB_ASSOCIATES if n is not None], (False, True)))
+    for counts in COUNTS:
+        batch_fixed, batch_variable = rules.apply_batch(
+            [row[0] for row in inputs], [row[1] for row in inputs], counts, [row[2] for row in inputs]
+        )
+        for row, (nb_patients, nb_associates, has_ipa) in enumerate(inputs):
+            points_fixed, points_variable = rules.apply(nb_patients, nb_associates, counts, has_ipa)
+            assert np.array_equal(batch_fixed[row], points_fixed)
+            assert np.array_equal(batch_variable[row], points_variable)
+
+def test_results_cache_is_bounded():
+    catalog = get_indicator_catalog()
+    rules = CompiledRules(catalog)
+    first = rules.apply(4000, 1)
+    assert rules.apply(4000, 1) is first
+    assert not first[0].flags.writeable and not first[1].flags.writeable
+    
+    for nb_associates in range(2, 3 * CompiledRules.MAX_RESULTS):
+        result = rules.apply(4000, nb_associates)
+        assert len(rules._results) <= CompiledRules.MAX_RESULTS
+        position = catalog.positions["A3S1"]
+        assert result[0][position] == 500 + 200 * min(nb_associates, 16) + 150 * max(nb_associates - 16, 0)
+    
+    # Résultat oublié puis recalculé à l'identique
+    again = rules.apply(4000, 1)
+    assert again is not first
+    assert np.array_equal(again[0], first[0]) and np.array_equal(again[1], first[1])
@@ -0,0 +1,72 @@
+"""
+Répartitions en centimes : la somme des parts est toujours exactement le montant réparti
+"""
+
+import numpy as np
+
+from src.utils.money import SMALL_ALLOCATION, allocate_cents, split_cents, to_cents, to_euros
+
+def _cases(seed=0, count=500):
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        nb_shares = int(rng.integers(1, 3 * SMALL_ALLOCATION))
+        weights = rng.random(nb_shares) * rng.choice([1, 10, 1000])
+        # Parts de poids nul
+        weights[rng.random(nb_shares) < 0.2] = 0
+        total = int(rng.integers(-10 ** 9, 10 ** 9))
+        yield total, weights
+
+def test_split_sums_to_total():
+    for total, weights in _cases():
+        shares = split_cents(total, weights.tolist())
+        assert sum(shares) == (total if weights.sum() > 0 else 0)
+        assert all(isinstance(share, int) for share in shares)
+
+def test_allocate_sums_to_total():
+    for total, weights in _cases(seed=1):
+        shares = allocate_cents(total, weights)
+        assert shares.dtype == np.int64
+        assert int(shares.sum()) == (total if weights.sum() > 0 else 0)
+
+def test_split_matches_allocate():
+    for total, weights in _cases(seed=2):
+        assert split_cents(total, weights.tolist()) == allocate_cents(total, weights).tolist()
+
+def test_batch_matches_single_allocations():
+    rng = np.random.default_rng(3)
+    for nb_shares in (1, 5, SMALL_ALLOCATION, SMALL_ALLOCATION + 1, 100):
+        weights = rng.random((50, nb_shares))
+        weights[rng.random(weights.shape) < 0.3] = 0
+        totals = rng.integers(-10 ** 7, 10 ** 7, size=50)
+        batch = allocate_cents(totals, weights)
+        assert batch.sum(axis=1).tolist() == np.where(weights.sum(axis=1) > 0, totals, 0).tolist()
+        for total, row, shares in zip(totals.tolist(), weights, batch):
+            assert shares.tolist() == split_cents(total, row.tolist())
+
+def test_zero_weight_shares_receive_nothing():
+    for total, weights in _cases(seed=4):
+        shares = np.array(split_cents(total, weights.tolist()))
+        assert not shares[weights == 0].any()
+
+def test_shares_are_within_one_cent_of_exact():
+    for total, weights in _cases(seed=5):
+        if not weights.sum() > 0:
+            continue
+        exact = weights * (total / weights.sum())
+        shares = np.array(split_cents(total, weights.tolist()))
+        assert np.all(shares - np.floor(exact) >= 0)
+        assert np.all(shares - np.floor(exact) <= 1)
+
+def test_zero_and_negative_totals():
+    assert split_cents(0, [1, 2, 3]) == [0, 0, 0]
+    assert split_cents(100, [0, 0]) == [0, 0]
+    assert split_cents(-100, [1, 1, 1]) == [-33, -33, -34]
+    assert split_cents(100, [1, 1, 1]) == [34, 33, 33]
+    assert allocate_cents(7, np.zeros(0)).tolist() == []
+
+def test_cents_conversion():
+    assert to_cents(0.285) == 29
+    assert to_cents(-0.285) == -29
+    assert to_cents(10000.01) == 1000001
+    assert to_cents(np.array([0.1, 0.2])).tolist() == [10, 20]
+    assert to_euros(1000001) == 10000.01
@@ -0,0 +1,155 @@
+"""
+Index des listes de la session : suppression en O(1), positions, recherche et annulation
+"""
+
+import random
+
+from benchmarks.synthetic import generate_associates
+from src.utils.data_manager import DataRepository
+from src.utils.edit_history import get_history, snapshot_record
+from src.utils.record_index import build_associate_index, get_session_index, paginate
+
+def _check_index(index):
+    # Positions, index inversés et recherche conformes à la liste
+    records = index.records
+    assert len(index) == len(records)
+    assert all(index.position(record.id) == position for position, record in enumerate(records))
+    for profession in {record.profession for record in records}:
+        expected = [record for record in records if record.profession == profession]
+        assert index.find("profession", profession) == expected
+        assert index.count("profession", profession) == len(expected)
+    assert index.search() == records
+
+def test_remove_moves_last_record():
+    associates = generate_associates(10)
+    ids = [associate.id for associate in associates]
+    index = build_associate_index(associates)
+    
+    index.remove(ids[3])
+    assert [associate.id for associate in associates] == ids[:3] + [ids[9]] + ids[4:9]
+    index.remove(ids[8])
+    assert [associate.id for associate in associates] == ids[:3] + [ids[9]] + ids[4:8]
+    assert ids[3] not in index and index.get(ids[3]) is None
+    _check_index(index)
+
+def test_restore_inverts_remove():
+    associates = generate_associates(10)
+    original = list(associates)
+    index = build_associate_index(associates)
+    
+    removed = []
+    for record_id in ("2", "10", "5", "1"):
+        removed.append((index.position(record_id), index.remove(record_id)))
+        _check_index(index)
+    for position, record in reversed(removed):
+        index.restore(position, record)
+        _check_index(index)
+    assert associates == original
+
+def test_add_appends():
+    associates = generate_associates(12)
+    index = build_associate_index(associates[:10])
+    index.add(associates[10])
+    assert index.position(associates[10].id) == 10
+    index.remove(associates[0].id)
+    index.add(associates[11])
+    assert index.records[0] is associates[10]
+    assert index.records[-1] is associates[11]
+    _check_index(index)
+
+def test_prefix_search():
+    associates = generate_associates(6)
+    for associate, (first_name, last_name) in zip(associates, [
+        ("Éloïse", "Martin"), ("Elodie", "Marchand"), ("Paul", "Émile"), ("Jean", "Dupont"), ("E", "Lenoir"),
+        ("Anne", "Leroy")
+    ]):
+        associate.first_name, associate.last_name = first_name, last_name
+    index = build_associate_index(associates)
+    
+    def names(prefix, criteria=None):
+        return [associate.first_name for associate in index.search(criteria, prefix=prefix)]
+    
+    assert names("elo") == ["Éloïse", "Elodie"]
+    assert names("ÉLOÏ") == ["Éloïse"]
+    assert names("e") == ["Éloïse", "Elodie", "Paul", "E"]
+    assert names("le") == ["E", "Anne"]
+    assert names("mar") == ["Éloïse", "Elodie"]
+    assert names("martin e") == ["Éloïse"]
+    assert names("x") == []
+    assert names("  ") == [associate.first_name for associate in associates]
+    
+    profession = associates[1].profession
+    assert names("elo", {"profession": profession}) == [
+        associate.first_name for associate in associates[:2] if associate.profession == profession
+    ]
+    
+    # Changement de nom puis suppression
+    associates[1].first_name = "Zoé"
+    index.update(associates[1])
+    assert names("elo") == ["Éloïse"]
+    assert names("zo") == ["Zoé"]
+    index.remove(associates[0].id)
+    assert names("elo") == []
+    assert names("e") == ["Paul", "E"]
+
+def test_paginate():
+    records = list(range(120))
+    assert paginate(records, 1, 50) == (records[:50], 1, 3)
+    assert paginate(records, 3, 50) == (records[100:], 3, 3)
+    assert paginate(records, 9, 50) == (records[100:], 3, 3)
+    assert paginate(records, 0, 50) == (records[:50], 1, 3)
+    assert paginate([], 1, 50) == ([], 1, 1)
+
+def test_session_index_rebuilt_when_list_replaced():
+    session_state = {"associates": generate_associates(5)}
+    index = get_session_index(session_state, "associates")
+    index.remove("3")
+    # La lecture par le dépôt ne modifie plus la liste
+    assert DataRepository(session_state).get("associates") is index.records
+    assert get_session_index(session_state, "associates") is index
+    
+    DataRepository(session_state).replace("associates", generate_associates(3))
+    assert get_session_index(session_state, "associates") is not index
+    assert len(get_session_index(session_state, "associates")) == 3
+
+def test_history_round_trip():
+    rng = random.Random(0)
+    pool = generate_associates(300)
+    session_state = {"associates": pool[:100]}
+    history = get_history(session_state, "associates")
+    professions = sorted({associate.profession for associate in pool})
+    
+    def state():
+        return [(associate.id, snapshot_record(associate)) for associate in session_state["associates"]]
+    
+    states = [state()]
+    next_record = 100
+    for _ in range(300):
+        index = get_session_index(session_state, "associates")
+        nb_steps = len(history.undo_steps)
+        operation = rng.random()
+        if operation < 0.3 and next_record < len(pool):
+            history.add_record(index, pool[next_record])
+            next_record += 1
+        elif operation < 0.7 and len(index):
+            history.remove_record(index, rng.choice(index.records).id)
+        elif len(index):
+            record = rng.choice(index.records)
+            before = snapshot_record(record)
+            record.profession = rng.choice(professions)
+            record.last_name = f"Nom{rng.randrange(1000)}"
+            history.update_record(index, record, before)
+        if len(history.undo_steps) > nb_steps:
+            states.append(state())
+        _check_index(index)
+    
+    # Chaque annulation rend exactement la liste précédente (ordre compris)
+    steps = len(history.undo_steps)
+    for expected in reversed(states[-steps - 1:-1]):
+        assert history.undo(session_state)
+        assert state() == expected
+        _check_index(get_session_index(session_state, "associates"))
+    for expected in states[-steps:]:
+        assert history.redo(session_state)
+        assert state() == expected
+        _check_index(get_session_index(session_state, "associates"))
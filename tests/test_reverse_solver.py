@@ -0,0 +1,59 @@
+"""
+Calcul inverse : les montants nets annoncés sont ceux du calcul de la rémunération, en centimes
+"""
+
+import copy
+
+from benchmarks.synthetic import generate_associates, generate_expenses
+from src.utils.calculations import (
+    calculate_associate_distribution, calculate_associate_net_amount, calculate_expense_distributions,
+    calculate_total_expenses
+)
+from src.utils.reverse_solver import solve_distribution_keys, solve_distribution_methods
+
+FISCAL_YEAR = 2025
+
+def _structure(nb_associates):
+    associates = generate_associates(nb_associates)
+    expenses = generate_expenses(40)
+    total_amount = 3 * calculate_total_expenses(expenses, FISCAL_YEAR)
+    share = (total_amount - total_amount // 3) // nb_associates
+    targets = {associate.id: share * 13 // 10 for associate in associates[:2]}
+    floors = {associate.id: share // 2 for associate in associates[2:]}
+    return associates, expenses, total_amount, targets, floors
+
+def _pipeline_net_amounts(total_amount, associates, expenses, distribution_method, method_weights=None):
+    distribution = calculate_associate_distribution(
+        total_amount, associates, distribution_method, method_weights=method_weights
+    )
+    expense_distributions = calculate_expense_distributions(expenses, associates, FISCAL_YEAR)
+    return {
+        associate.id: calculate_associate_net_amount(associate.id, distribution, expense_distributions)
+        for associate in associates
+    }
+
+def test_distribution_keys_net_amounts_match_pipeline():
+    for nb_associates in (5, 40):
+        associates, expenses, total_amount, targets, floors = _structure(nb_associates)
+        solution = solve_distribution_keys(total_amount, associates, expenses, targets, floors, FISCAL_YEAR)
+        assert solution["status"] == "optimal"
+        
+        # Clés trouvées reportées sur les associés
+        associates = copy.deepcopy(associates)
+        for associate in associates:
+            associate.distribution_key = solution["distribution_keys"][associate.id]
+        net_amounts = _pipeline_net_amounts(total_amount, associates, expenses, "distribution_key")
+        assert solution["net_amounts"] == net_amounts
+        assert all(isinstance(amount, int) for amount in net_amounts.values())
+        assert isinstance(solution["deviation"], int)
+
+def test_method_weights_net_amounts_match_pipeline():
+    for nb_associates in (5, 40):
+        associates, expenses, total_amount, targets, floors = _structure(nb_associates)
+        solution = solve_distribution_methods(total_amount, associates, expenses, targets, floors, FISCAL_YEAR)
+        assert solution["status"] == "optimal"
+        
+        net_amounts = _pipeline_net_amounts(
+            total_amount, associates, expenses, "blended", method_weights=solution["method_weights"]
+        )
+        assert solution["net_amounts"] == net_amounts
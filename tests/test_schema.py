@@ -0,0 +1,151 @@
+"""
+Schémas des enregistrements : emplacement des erreurs, décodage en une passe identique au décodage champ par champ
+"""
+
+import json
+import os
+
+import pytest
+
+from benchmarks.synthetic import generate_associates, generate_expenses
+from src.models.associates import ASSOCIATE_SCHEMA
+from src.models.expenses import EXPENSE_SCHEMA
+from src.models.indicators import INDICATOR_SCHEMA, get_indicators
+from src.models.schema import SchemaError
+from src.utils import data_manager
+
+PATH = "data/records.json"
+
+def _associates():
+    return [associate.to_dict() for associate in generate_associates(5)]
+
+def _expenses():
+    return [expense.to_dict() for expense in generate_expenses(5)]
+
+def _indicators():
+    return [indicator.to_dict() for indicator in get_indicators()[:5]]
+
+def _with(records, position, **values):
+    records[position].update(values)
+    return records
+
+def _without(records, position, name):
+    del records[position][name]
+    return records
+
+# Schéma, enregistrements, emplacement et message attendus
+ERRORS = [
+    (ASSOCIATE_SCHEMA, _without(_associates(), 1, "last_name"), f"{PATH}[1].last_name",
+     "champ obligatoire, champ absent reçu"),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 0, profession=None), f"{PATH}[0].profession", "chaîne attendue, null reçu"),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 2, entry_date="2024-13-01"), f"{PATH}[2].entry_date",
+     'date AAAA-MM-JJ attendue, "2024-13-01" reçu'),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 2, exit_date="01/02/2024"), f"{PATH}[2].exit_date",
+     'date AAAA-MM-JJ attendue, "01/02/2024" reçu'),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 3, roles=["Coordinateur", 3]), f"{PATH}[3].roles[1]",
+     "chaîne attendue, 3 reçu"),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 4, patients_mt=-1), f"{PATH}[4].patients_mt",
+     "valeur supérieure ou égale à 0 attendue, -1 reçu"),
+    (ASSOCIATE_SCHEMA, _with(_associates(), 0, presence_time=True), f"{PATH}[0].presence_time",
+     "nombre attendu, true reçu"),
+    (EXPENSE_SCHEMA, _with(_expenses(), 1, custom_weights={"1": 2, "3": -1}), f"{PATH}[1].custom_weights['3']",
+     "poids positif attendu, -1 reçu"),
+    (EXPENSE_SCHEMA, _with(_expenses(), 0, amount="12"), f"{PATH}[0].amount", 'nombre attendu, "12" reçu'),
+    (INDICATOR_SCHEMA, _with(_indicators(), 2, completion_status=5), f"{PATH}[2].completion_status",
+     "valeur inférieure ou égale à max_level attendue, 5 reçu"),
+    (INDICATOR_SCHEMA, _with(_indicators(), 0, completion_percentage=150), f"{PATH}[0].completion_percentage",
+     "valeur inférieure ou égale à 100 attendue, 150 reçu"),
+    (INDICATOR_SCHEMA, _indicators()[:2] + ["A1S1"], f"{PATH}[2]", 'objet attendu, "A1S1" reçu'),
+    (INDICATOR_SCHEMA, {"A1S1": {}}, PATH, 'tableau attendu, {"A1S1": {}} reçu'),
+]
+
+@pytest.mark.parametrize("schema, records, location, message", ERRORS)
+def test_error_locations(schema, records, location, message):
+    with pytest.raises(SchemaError) as error:
+        schema.decode_records(records, path=PATH)
+    assert (error.value.location, error.value.message) == (location, message)
+    assert str(error.value) == f"{location} : {message}"
+
+def test_single_record_location_uses_label():
+    record = _with(_associates(), 0, profession=None)[0]
+    with pytest.raises(SchemaError) as error:
+        ASSOCIATE_SCHEMA.decode_record(record)
+    assert error.value.location == "associé.profession"
+
+def _values(record):
+    return [(name, type(getattr(record, name)), getattr(record, name)) for name in type(record).__slots__]
+
+def _decode_both(schema, record):
+    # Décodage en une passe et décodage champ par champ d'un même enregistrement
+    results = []
+    for decode in (lambda: schema.decode_records([record], path=PATH)[0], lambda: schema.decode_record(record)):
+        try:
+            results.append(_values(decode()))
+        except SchemaError as error:
+            results.append(error.message)
+    return results
+
+# Valeurs remplaçant chaque champ : valides, nulles, absentes ou invalides
+SUBSTITUTES = [None, "", "x", "2024-02-29", "2023-02-29", 0, 1, -1, 706.0, 0.5, float("nan"), True, [], ["a"], {},
+               {"1": 0, "2": 1.5}, {"1": -1}]
+
+@pytest.mark.parametrize("schema, records", [
+    (ASSOCIATE_SCHEMA, _associates()), (EXPENSE_SCHEMA, _expenses()), (INDICATOR_SCHEMA, _indicators())
+])
+def test_fast_path_matches_field_decoder(schema, records):
+    decoded = schema.decode_records(records, path=PATH)
+    assert [_values(record) for record in decoded] == [_values(schema.decode_record(record)) for record in records]
+    
+    for field in schema.fields:
+        name = field["name"]
+        missing = dict(records[0])
+        del missing[name]
+        first, second = _decode_both(schema, missing)
+        assert first == second, name
+        for value in SUBSTITUTES:
+            first, second = _decode_both(schema, dict(records[0], **{name: value}))
+            assert first == second, (name, value)
+
+def test_fast_path_defaults():
+    record = dict(_associates()[0], patients_mt=706.0, distribution_key=0, roles=None, speciality=None)
+    associate = ASSOCIATE_SCHEMA.decode_records([record], path=PATH)[0]
+    assert (associate.patients_mt, type(associate.patients_mt)) == (706, int)
+    assert associate.distribution_key == 1.0
+    assert associate.roles == []
+    
+    expense = EXPENSE_SCHEMA.decode_records([dict(_expenses()[0], custom_weights={"1": 0, "2": 3})], path=PATH)[0]
+    assert expense.custom_weights == {"2": 3.0}
+
+@pytest.mark.parametrize("loader, filename", [
+    (data_manager.load_associates, "associates.json"),
+    (data_manager.load_expenses, "expenses.json"),
+    (data_manager.load_indicators, "indicators.json"),
+    (data_manager.load_indicator_counts, "indicator_counts.json"),
+])
+def test_load_raises_on_bad_json(tmp_path, monkeypatch, loader, filename):
+    monkeypatch.setattr(data_manager, "DATA_DIR", str(tmp_path))
+    path = os.path.join(str(tmp_path), filename)
+    
+    # Fichier illisible
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('[{"id": "1",')
+    with pytest.raises(json.JSONDecodeError):
+        loader()
+    
+    # JSON valide mais de mauvaise forme : l'erreur indique le fichier
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([{"id": "1"}] if filename != "indicator_counts.json" else {"A2S2": -1}, f)
+    with pytest.raises(SchemaError) as error:
+        loader()
+    assert error.value.location.startswith(path)
+
+def test_load_reads_saved_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_manager, "DATA_DIR", str(tmp_path))
+    associates = generate_associates(20)
+    expenses = generate_expenses(20)
+    data_manager.save_associates(associates)
+    data_manager.save_expenses(expenses)
+    assert [associate.to_dict() for associate in data_manager.load_associates()] == [
+        associate.to_dict() for associate in associates
+    ]
+    assert [expense.to_dict() for expense in data_manager.load_expenses()] == [expense.to_dict() for expense in expenses]
@@ -0,0 +1,39 @@
+"""
+Valeurs de Shapley : les patients médecin traitant des médecins comptent dans la contribution
+"""
+
+from src.models.associates import Associate
+from src.models.indicators import get_indicators
+from src.utils.shapley import build_coalition_game, calculate_shapley_values, estimate_shapley_values
+from src.utils.calculations import completion_vectors
+
+def _structure():
+    indicators = get_indicators()
+    for indicator in indicators:
+        indicator.completion_status = indicator.max_level
+        indicator.completion_percentage = 100
+    associates = [
+        Associate("1", "A", "Médecin", "Médecin généraliste", patients_mt=706),
+        Associate("2", "B", "Médecin", "Médecin généraliste", patients_mt=844),
+        Associate("3", "C", "Médecin", "Médecin spécialiste", patients_mt=1018),
+    ]
+    associates += [Associate(str(i), "D", "Infirmier", "Infirmier") for i in range(4, 9)]
+    return indicators, associates
+
+def test_doctor_patients_are_counted():
+    indicators, associates = _structure()
+    game = build_coalition_game(completion_vectors(indicators), associates)
+    assert game.patients.tolist() == [706, 844, 1018, 0, 0, 0, 0, 0]
+
+def test_doctor_with_patients_gets_larger_value():
+    indicators, associates = _structure()
+    values = calculate_shapley_values(indicators, associates).values.tolist()
+    assert values[0] < values[1] < values[2]
+    assert min(values[:3]) > max(values[3:])
+
+def test_threaded_estimate_matches_single_thread():
+    indicators, associates = _structure()
+    game = build_coalition_game(completion_vectors(indicators), associates)
+    single = estimate_shapley_values(game, max_permutations=256, tolerance=0, workers=1)
+    threaded = estimate_shapley_values(game, max_permutations=256, tolerance=0, workers=4)
+    assert single[0].tolist() == threaded[0].tolist()